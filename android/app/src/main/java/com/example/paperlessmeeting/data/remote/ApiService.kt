@@ -175,6 +175,15 @@ interface ApiService {
         @retrofit2.http.Query("limit") limit: Int = 0
     ): com.example.paperlessmeeting.domain.model.MediaItemPage
 
+    // 平板端媒体浏览：只含安卓可见条目，服务端缓存并支持 If-None-Match（由 OkHttp 缓存自动携带）
+    @GET("media/feed")
+    suspend fun getMediaFeed(
+        @retrofit2.http.Query("parent_id") parentId: Int? = null,
+        @retrofit2.http.Query("kind") kind: String? = null,
+        @retrofit2.http.Query("skip") skip: Int = 0,
+        @retrofit2.http.Query("limit") limit: Int = 0
+    ): com.example.paperlessmeeting.domain.model.MediaItemPage
+
     @GET("media/ancestors/{item_id}")
     suspend fun getMediaAncestors(
         @retrofit2.http.Path("item_id") itemId: Int
@@ -1,6 +1,7 @@
 package com.example.paperlessmeeting.data.remote
 
 import android.util.Log
+import com.example.paperlessmeeting.data.local.UserPreferences
 import com.example.paperlessmeeting.data.remote.model.LotterySessionPayload
 import com.example.paperlessmeeting.data.remote.model.VotePayload
 import com.example.paperlessmeeting.data.remote.model.toDomain
@@ -33,16 +34,24 @@ import com.example.paperlessmeeting.R
 /**
  * Socket.IO 客户端管理器
  * 用于实时投票等 WebSocket 通信
+ *
+ * 每次连接（含自动重连）后先 identify 表明用户身份，服务端只推送与本人相关的会议变化；
+ * 媒体库页面打开期间加入 media 房间接收 media_changed。
  */
 @Singleton
 class SocketManager @Inject constructor(
     private val okHttpClient: OkHttpClient,
+    private val userPreferences: UserPreferences,
     @ApplicationContext private val context: Context
 ) {
 
     private var socket: Socket? = null
     private val gson = Gson()
 
+    // 正在浏览媒体库的页面数，大于 0 时（重连后也）保持在 media 房间
+    @Volatile
+    private var mediaSubscribers = 0
+
     init {
         createNotificationChannel()
     }
@@ -95,6 +104,10 @@ class SocketManager @Inject constructor(
 
             socket?.on(Socket.EVENT_CONNECT) {
                 Log.d(TAG, "Socket connected")
+                identify()
+                if (mediaSubscribers > 0) {
+                    socket?.emit("join_media")
+                }
                 _connectionState.tryEmit(true)
             }
 
@@ -200,6 +213,31 @@ class SocketManager @Inject constructor(
         })
     }
 
+    /** 登录后或连接建立时调用；未登录时不表明身份，按旧方式接收全部推送。 */
+    fun identify() {
+        val userId = userPreferences.getUserId()
+        if (userId <= 0) return
+        socket?.emit("identify", JSONObject().apply {
+            put("user_id", userId)
+        })
+        Log.d(TAG, "Identified as user $userId")
+    }
+
+    fun joinMedia() {
+        mediaSubscribers += 1
+        if (mediaSubscribers == 1) {
+            socket?.emit("join_media")
+        }
+    }
+
+    fun leaveMedia() {
+        if (mediaSubscribers == 0) return
+        mediaSubscribers -= 1
+        if (mediaSubscribers == 0) {
+            socket?.emit("leave_media")
+        }
+    }
+
     fun disconnect() {
         socket?.disconnect()
         socket = null
@@ -342,5 +380,8 @@ data class MediaChangedData(
     val parent_id: Int? = null,
     val previous_parent_id: Int? = null,
     val kind: String? = null,
-    val visible_on_android: Boolean? = null
+    val visible_on_android: Boolean? = null,
+    // 批量操作 (bulk_*) 的聚合事件：涉及的条目与父文件夹 (根目录为 null)
+    val item_ids: List<Int>? = null,
+    val parent_ids: List<Int?>? = null
 )
@@ -7,8 +7,12 @@ import dagger.Module
 import dagger.Provides
 import dagger.hilt.InstallIn
 import dagger.hilt.components.SingletonComponent
+import android.content.Context
+import dagger.hilt.android.qualifiers.ApplicationContext
+import okhttp3.Cache
 import okhttp3.HttpUrl.Companion.toHttpUrlOrNull
 import okhttp3.OkHttpClient
+import java.io.File
 import java.util.concurrent.TimeUnit
 import javax.inject.Singleton
 
@@ -16,9 +20,12 @@ import javax.inject.Singleton
 @InstallIn(SingletonComponent::class)
 object AppModule {
 
+    private const val HTTP_CACHE_SIZE_BYTES = 20L * 1024 * 1024
+
     @Provides
     @Singleton
     fun provideOkHttpClient(
+        @ApplicationContext context: Context,
         userPreferences: com.example.paperlessmeeting.data.local.UserPreferences,
         appSettingsState: AppSettingsState
     ): OkHttpClient {
@@ -68,6 +75,8 @@ object AppModule {
                         chain.proceed(original)
                     }
                 }
+                // HTTP 缓存：带 ETag 的响应（会议列表、媒体 feed）再次请求时自动携带 If-None-Match，304 直接用本地副本
+                .cache(Cache(File(context.cacheDir, "http_cache"), HTTP_CACHE_SIZE_BYTES))
                 .sslSocketFactory(sslSocketFactory, trustAllCerts[0] as javax.net.ssl.X509TrustManager)
                 .hostnameVerifier { _, _ -> true }
                 .connectTimeout(15, TimeUnit.SECONDS)
@@ -0,0 +1,25 @@
+package com.example.paperlessmeeting.domain.model
+
+import android.os.Build
+
+/** 服务端生成的响应式衍生图（srcset 项），按宽度从小到大排列 */
+data class ImageSource(
+    val url: String,
+    val width: Int,
+    val height: Int,
+    val format: String
+)
+
+/**
+ * 取宽度不小于 targetWidth 的最小一项，都不够宽时取最大的一项；
+ * AVIF 只在系统解码器支持的 Android 12+ 上使用，否则退回 WebP。
+ */
+fun List<ImageSource>?.pickUrlFor(targetWidth: Int): String? {
+    val avifSupported = Build.VERSION.SDK_INT >= Build.VERSION_CODES.S
+    val candidates = orEmpty().filter { it.url.isNotBlank() && (avifSupported || it.format != "avif") }
+    if (candidates.isEmpty()) return null
+    val adequate = candidates.filter { it.width >= targetWidth }
+    val chosenWidth = adequate.minOfOrNull { it.width } ?: candidates.maxOf { it.width }
+    val sameWidth = candidates.filter { it.width == chosenWidth }
+    return (sameWidth.firstOrNull { it.format == "avif" } ?: sameWidth.first()).url
+}
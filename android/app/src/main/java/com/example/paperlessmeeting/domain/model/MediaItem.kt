@@ -20,6 +20,11 @@ data class MediaItem(
     val size: String? = null,
     val previewUrl: String? = null,
     val thumbnailUrl: String? = null,
+    // 服务端转码完成后的 H.264 faststart MP4，未就绪时为空，播放原文件
+    val optimizedUrl: String? = null,
+    val hlsUrl: String? = null,
+    // 图片的多宽度 WebP / AVIF 衍生图
+    val srcset: List<ImageSource>? = emptyList(),
     @SerializedName("children_count")
     val childrenCount: Int = 0
 )
@@ -26,7 +26,14 @@ data class Attachment(
     val fileSize: Int,
     @com.google.gson.annotations.SerializedName("sort_order")
     val sortOrder: Int,
-    val filename: String
+    val filename: String,
+    // 服务端后台预处理完成后才有值（附件 attachment_updated 事件推送）
+    @com.google.gson.annotations.SerializedName("page_count")
+    val pageCount: Int? = null,
+    @com.google.gson.annotations.SerializedName("preview_page_count")
+    val previewPageCount: Int = 0,
+    @com.google.gson.annotations.SerializedName("preview_url")
+    val previewUrl: String? = null
 )
 
 data class Attendee(
@@ -61,6 +68,8 @@ data class Meeting(
     val cardImageUrl: String? = null,
     @com.google.gson.annotations.SerializedName("card_image_thumb_url")
     val cardImageThumbUrl: String? = null,
+    @com.google.gson.annotations.SerializedName("card_image_srcset")
+    val cardImageSrcset: List<ImageSource>? = emptyList(),
     val speaker: String? = null,
     val agenda: String? = null,
     @com.google.gson.annotations.SerializedName("agenda_items")
@@ -49,6 +49,7 @@ import coil.size.Size
 import com.example.paperlessmeeting.R
 import com.example.paperlessmeeting.domain.model.MediaItem
 import com.example.paperlessmeeting.domain.model.Meeting
+import com.example.paperlessmeeting.domain.model.pickUrlFor
 
 enum class AppImageSlot {
     LoginPoster,
@@ -85,6 +86,9 @@ data class AppImageModel(
 
 object MeetingImageResolver {
 
+    private const val CARD_TARGET_WIDTH = 640
+    private const val HERO_TARGET_WIDTH = 1280
+
     fun loginPosterModel(
         posterUrl: String? = null,
         posterVersion: String? = null
@@ -119,9 +123,11 @@ object MeetingImageResolver {
         }
 
         val primaryUrl = when (slot) {
-            AppImageSlot.MeetingCard -> meeting.cardImageThumbUrl?.takeIf { it.isNotBlank() }
+            AppImageSlot.MeetingCard -> meeting.cardImageSrcset.pickUrlFor(CARD_TARGET_WIDTH)
+                ?: meeting.cardImageThumbUrl?.takeIf { it.isNotBlank() }
+                ?: meeting.cardImageUrl?.takeIf { it.isNotBlank() }
+            AppImageSlot.MeetingHero -> meeting.cardImageSrcset.pickUrlFor(HERO_TARGET_WIDTH)
                 ?: meeting.cardImageUrl?.takeIf { it.isNotBlank() }
-            AppImageSlot.MeetingHero -> meeting.cardImageUrl?.takeIf { it.isNotBlank() }
                 ?: meeting.cardImageThumbUrl?.takeIf { it.isNotBlank() }
             else -> null
         }
@@ -158,6 +164,8 @@ object MeetingImageResolver {
 
 object MediaImageResolver {
 
+    private const val FULLSCREEN_TARGET_WIDTH = 1280
+
     fun resolveGrid(item: MediaItem, staticBaseUrl: String): AppImageModel {
         val resolvedUrl = resolveStaticUrl(
             rawUrl = item.thumbnailUrl?.takeIf { it.isNotBlank() }
@@ -181,7 +189,8 @@ object MediaImageResolver {
 
     fun resolveFullscreen(item: MediaItem, staticBaseUrl: String): AppImageModel {
         val resolvedUrl = resolveStaticUrl(
-            rawUrl = item.previewUrl?.takeIf { it.isNotBlank() }
+            rawUrl = item.srcset.pickUrlFor(FULLSCREEN_TARGET_WIDTH)
+                ?: item.previewUrl?.takeIf { it.isNotBlank() }
                 ?: item.thumbnailUrl?.takeIf { it.isNotBlank() },
             staticBaseUrl = staticBaseUrl
         )
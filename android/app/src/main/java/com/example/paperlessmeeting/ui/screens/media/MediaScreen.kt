@@ -707,7 +707,9 @@ private fun MediaVideoPreviewDialog(
         properties = DialogProperties(usePlatformDefaultWidth = false)
     ) {
         val context = LocalContext.current
-        val videoUrl = item.previewUrl?.takeIf { it.isNotEmpty() }?.let {
+        val videoPath = item.optimizedUrl?.takeIf { it.isNotEmpty() }
+            ?: item.previewUrl?.takeIf { it.isNotEmpty() }
+        val videoUrl = videoPath?.let {
             staticBaseUrl.trimEnd('/') + it.removePrefix("/static")
         }
         val player = remember(videoUrl) {
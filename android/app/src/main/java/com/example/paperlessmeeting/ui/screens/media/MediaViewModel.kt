@@ -63,10 +63,9 @@ class MediaViewModel @Inject constructor(
             }
             try {
                 val kind = _uiState.value.activeFilter.takeIf { it != "all" }
-                val page = api.getMediaItems(
+                val page = api.getMediaFeed(
                     parentId = _uiState.value.currentFolderId,
                     kind = kind,
-                    visibleOnAndroid = true,
                     skip = 0,
                     limit = PAGE_SIZE
                 )
@@ -94,10 +93,9 @@ class MediaViewModel @Inject constructor(
                 val nextPage = state.currentPage + 1
                 val skip = nextPage * PAGE_SIZE
                 val kind = state.activeFilter.takeIf { it != "all" }
-                val page = api.getMediaItems(
+                val page = api.getMediaFeed(
                     parentId = state.currentFolderId,
                     kind = kind,
-                    visibleOnAndroid = true,
                     skip = skip,
                     limit = PAGE_SIZE
                 )
@@ -187,6 +185,7 @@ class MediaViewModel @Inject constructor(
         if (socketInitialized) return
         socketInitialized = true
         socketManager.connect(appSettingsState.getSocketBaseUrl())
+        socketManager.joinMedia()
         viewModelScope.launch {
             socketManager.mediaChangedEvent.collectLatest { data ->
                 handleMediaChanged(data)
@@ -194,6 +193,13 @@ class MediaViewModel @Inject constructor(
         }
     }
 
+    override fun onCleared() {
+        if (socketInitialized) {
+            socketManager.leaveMedia()
+        }
+        super.onCleared()
+    }
+
     private fun handleMediaChanged(data: MediaChangedData) {
         if (!shouldRefreshCurrentFolder(data) && !shouldRefreshBreadcrumbs(data)) {
             return
@@ -206,10 +212,11 @@ class MediaViewModel @Inject constructor(
 
     private fun shouldRefreshCurrentFolder(data: MediaChangedData): Boolean {
         val currentFolderId = _uiState.value.currentFolderId
-        val touchedParents = setOf(data.parent_id, data.previous_parent_id)
+        val touchedParents = setOf(data.parent_id, data.previous_parent_id) + data.parent_ids.orEmpty()
+        val touchedItems = setOfNotNull(data.item_id) + data.item_ids.orEmpty()
         return when (currentFolderId) {
             null -> touchedParents.any { it == null }
-            else -> currentFolderId in touchedParents || data.item_id == currentFolderId
+            else -> currentFolderId in touchedParents || currentFolderId in touchedItems
         }
     }
 
@@ -218,6 +225,7 @@ class MediaViewModel @Inject constructor(
         val breadcrumbIds = _uiState.value.breadcrumbs.map { it.id }.toSet() + currentFolderId
         return data.item_id in breadcrumbIds ||
             data.parent_id in breadcrumbIds ||
-            data.previous_parent_id in breadcrumbIds
+            data.previous_parent_id in breadcrumbIds ||
+            data.item_ids.orEmpty().any { it in breadcrumbIds }
     }
 }
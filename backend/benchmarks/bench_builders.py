@@ -0,0 +1,74 @@
+"""序列化密集的构建函数：投票详情、投票结果、抽签会话快照、会议卡片列表、媒体条目。"""
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import Session, select
+
+from benchmarks.datasets import SIZES, build_dataset
+from models import MediaItem, Vote
+from routes.media import _to_read
+from routes.meetings import read_meetings
+from routes.vote import _build_vote_read, _build_vote_reads, _build_vote_result
+from services.lottery_service import build_session_snapshot
+
+
+SIZE_NAMES = list(SIZES)
+
+
+@pytest.fixture(params=SIZE_NAMES)
+def dataset(request):
+    return build_dataset(request.param)
+
+
+@pytest.fixture
+def session(dataset):
+    with Session(dataset.engine) as session:
+        yield session
+
+
+def bench_build_vote_read(bench, dataset, session):
+    vote = session.get(Vote, dataset.vote_ids[0])
+    read = bench(_build_vote_read, vote, session, dataset.user_id)
+    assert read.total_voters > 0
+
+
+def bench_build_vote_reads(bench, dataset, session):
+    votes = session.exec(select(Vote).where(Vote.id.in_(dataset.vote_ids))).all()
+    reads = bench(_build_vote_reads, votes, session, dataset.user_id)
+    assert len(reads) == len(votes)
+
+
+def bench_build_vote_result(bench, dataset, session):
+    vote = session.get(Vote, dataset.vote_ids[0])
+    result = bench(_build_vote_result, vote, session)
+    assert result.total_voters > 0
+
+
+def bench_build_session_snapshot(bench, dataset, session):
+    snapshot = bench(build_session_snapshot, dataset.meeting_id, session, dataset.user_id)
+    assert snapshot["participants_count"] > 0
+
+
+def bench_read_meetings(bench, dataset, session):
+    request = SimpleNamespace(base_url="http://testserver/")
+    cards = bench(
+        read_meetings,
+        request=request,
+        skip=0,
+        limit=1000,
+        status=None,
+        sort="desc",
+        start_date=None,
+        end_date=None,
+        user_id=dataset.user_id,
+        force_show_all=True,
+        session=session,
+    )
+    assert cards
+
+
+def bench_media_to_read(bench, dataset, session):
+    items = session.exec(select(MediaItem).where(MediaItem.parent_id == dataset.media_folder_id)).all()
+    children_counts = {item.id: 0 for item in items if item.kind == "folder"}
+    reads = bench(lambda: [_to_read(item, session, children_counts) for item in items])
+    assert len(reads) == len(items)
@@ -0,0 +1,84 @@
+"""
+微基准运行方式（在 backend 目录下）：
+  python -m pytest benchmarks -q                                  # 运行并与 baseline.json 对比
+  python -m pytest benchmarks -q --bench-save benchmarks/baseline.json   # 更新基线
+  python -m pytest benchmarks -q --bench-max-regression 0.2       # 吞吐下降超过 20% 时失败
+  python -m pytest benchmarks -q -k small                         # 只跑某个规模
+文件名为 bench_*.py，默认的 python -m pytest 不会收集。
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from benchmarks.harness import find_regressions, format_report, load_baseline, measure, save_baseline  # noqa: E402
+
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+_results = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("bench")
+    group.addoption("--bench-baseline", default=str(DEFAULT_BASELINE), help="baseline JSON to compare against")
+    group.addoption("--bench-save", default=None, help="write results as a new baseline")
+    group.addoption("--bench-min-time", type=float, default=0.5, help="minimum seconds per benchmark")
+    group.addoption("--bench-max-regression", type=float, default=None, help="fail when ops/sec drops more than this ratio")
+
+
+class Bench:
+    def __init__(self, name: str, min_time: float):
+        self.name = name
+        self.min_time = min_time
+        self.result = None
+
+    def __call__(self, fn, *args, **kwargs):
+        self.result = measure(self.name, lambda: fn(*args, **kwargs), min_time=self.min_time)
+        _results.append(self.result)
+        return fn(*args, **kwargs)
+
+
+@pytest.fixture
+def bench(request):
+    name = request.node.name.replace("bench_", "", 1)
+    return Bench(name, request.config.getoption("--bench-min-time"))
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not _results:
+        return
+    baseline = load_baseline(Path(config.getoption("--bench-baseline")))
+    terminalreporter.write_sep("-", "benchmarks")
+    terminalreporter.write_line(format_report(_results, baseline))
+
+    save_path = config.getoption("--bench-save")
+    if save_path:
+        save_baseline(Path(save_path), _results)
+        terminalreporter.write_line(f"baseline saved to {save_path}")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    max_regression = session.config.getoption("--bench-max-regression")
+    if max_regression is None or not _results:
+        return
+    baseline = load_baseline(Path(session.config.getoption("--bench-baseline")))
+    regressions = find_regressions(_results, baseline, max_regression)
+    if regressions:
+        session.config._bench_regressions = regressions
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+        print("\nbenchmark regressions:\n  " + "\n  ".join(regressions))
@@ -0,0 +1,202 @@
+"""
+基准数据集
+先用 seed_data.seed() 在内存 SQLite 中生成种子会议与人员，再按规模追加：
+投票选项与投票记录、抽签轮次与参与者、媒体库条目、会议与附件。
+随机数固定种子，同一规模每次生成的数据一致。
+"""
+import contextlib
+import io
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List
+from unittest import mock
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+import seed_data
+from models import (
+    Attachment,
+    Lottery,
+    LotteryParticipant,
+    LotterySession,
+    LotteryWinner,
+    MediaItem,
+    Meeting,
+    User,
+    UserVote,
+    Vote,
+    VoteOption,
+)
+
+
+@dataclass(frozen=True)
+class DataSize:
+    users: int
+    votes: int
+    options: int
+    media_items: int
+    meetings: int
+    attachments_per_meeting: int
+
+
+SIZES = {
+    "small": DataSize(users=20, votes=5, options=4, media_items=20, meetings=17, attachments_per_meeting=2),
+    "medium": DataSize(users=200, votes=20, options=8, media_items=200, meetings=100, attachments_per_meeting=4),
+    "large": DataSize(users=1000, votes=50, options=16, media_items=1000, meetings=400, attachments_per_meeting=6),
+}
+
+
+@dataclass
+class Dataset:
+    engine: object
+    meeting_id: int
+    user_id: int
+    vote_ids: List[int]
+    media_folder_id: int
+
+
+def _seed(engine) -> None:
+    random.seed(2026)
+    with mock.patch.object(seed_data, "engine", engine), contextlib.redirect_stdout(io.StringIO()):
+        seed_data.seed()
+
+
+def _add_users(session: Session, count: int) -> List[User]:
+    users = [
+        User(name=f"基准用户{index:04d}", department=f"部门{index % 12}", phone=f"1880000{index:04d}", is_active=True)
+        for index in range(count)
+    ]
+    session.add_all(users)
+    session.flush()
+    return users
+
+
+def _add_meetings(session: Session, size: DataSize) -> None:
+    existing = session.exec(select(Meeting)).all()
+    templates = list(existing)
+    for index in range(max(size.meetings - len(existing), 0)):
+        template = templates[index % len(templates)]
+        session.add(
+            Meeting(
+                title=f"{template.title}（{index + 1}）",
+                meeting_type_id=template.meeting_type_id,
+                start_time=template.start_time + timedelta(days=index + 1),
+                end_time=template.end_time + timedelta(days=index + 1) if template.end_time else None,
+                location=template.location,
+                speaker=template.speaker,
+                agenda=template.agenda,
+                status=template.status,
+            )
+        )
+    session.flush()
+
+    for meeting in session.exec(select(Meeting)).all():
+        for order in range(size.attachments_per_meeting):
+            session.add(
+                Attachment(
+                    filename=f"bench_{meeting.id}_{order}.pdf",
+                    display_name=f"会议材料{order + 1}.pdf",
+                    file_path=f"uploads/bench_{meeting.id}_{order}.pdf",
+                    file_size=1024 * 1024 * (order + 1),
+                    content_type="application/pdf",
+                    sort_order=order,
+                    meeting_id=meeting.id,
+                )
+            )
+
+
+def _add_votes(session: Session, meeting_id: int, users: List[User], size: DataSize) -> List[int]:
+    vote_ids = []
+    started_at = datetime(2026, 3, 3, 9, 30)
+    for index in range(size.votes):
+        vote = Vote(
+            meeting_id=meeting_id,
+            title=f"表决事项{index + 1}",
+            is_multiple=index % 2 == 1,
+            max_selections=2 if index % 2 == 1 else 1,
+            status="closed",
+            started_at=started_at,
+            closed_at=started_at + timedelta(minutes=1),
+        )
+        session.add(vote)
+        session.flush()
+        options = [VoteOption(vote_id=vote.id, content=f"选项{order + 1}", sort_order=order) for order in range(size.options)]
+        session.add_all(options)
+        session.flush()
+        for user in users:
+            session.add(UserVote(vote_id=vote.id, user_id=user.id, option_id=random.choice(options).id))
+        vote_ids.append(vote.id)
+    return vote_ids
+
+
+def _add_lottery(session: Session, meeting_id: int, users: List[User]) -> None:
+    rounds = [
+        Lottery(meeting_id=meeting_id, title=f"第{order + 1}轮", count=3, sort_order=order + 1, status=status)
+        for order, status in enumerate(("finished", "ready", "draft"))
+    ]
+    session.add_all(rounds)
+    session.flush()
+
+    winners = random.sample(users, k=min(3, len(users)))
+    for user in winners:
+        session.add(LotteryWinner(lottery_id=rounds[0].id, user_id=user.id, user_name=user.name))
+    winner_ids = {user.id for user in winners}
+    for user in users:
+        session.add(
+            LotteryParticipant(
+                meeting_id=meeting_id,
+                user_id=user.id,
+                user_name=user.name,
+                department=user.department,
+                is_winner=user.id in winner_ids,
+                winning_lottery_id=rounds[0].id if user.id in winner_ids else None,
+            )
+        )
+    session.add(LotterySession(meeting_id=meeting_id, session_status="collecting", current_round_id=rounds[1].id))
+
+
+def _add_media(session: Session, size: DataSize) -> int:
+    folder = MediaItem(kind="folder", title="基准相册")
+    session.add(folder)
+    session.flush()
+    kinds = ("image", "image", "image", "video", "folder")
+    for index in range(size.media_items):
+        kind = kinds[index % len(kinds)]
+        extension = {"image": "jpg", "video": "mp4"}.get(kind)
+        session.add(
+            MediaItem(
+                kind=kind,
+                title=f"媒体{index:04d}",
+                parent_id=folder.id,
+                filename=f"bench_{index:04d}.{extension}" if extension else None,
+                file_size=(index + 1) * 2048 if extension else 0,
+                extension=extension,
+            )
+        )
+    return folder.id
+
+
+@lru_cache(maxsize=None)
+def build_dataset(size_name: str) -> Dataset:
+    size = SIZES[size_name]
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+    SQLModel.metadata.create_all(engine)
+    _seed(engine)
+
+    with Session(engine) as session:
+        meeting_id = session.exec(select(Meeting.id).order_by(Meeting.id)).first()
+        users = _add_users(session, size.users)
+        _add_meetings(session, size)
+        vote_ids = _add_votes(session, meeting_id, users, size)
+        _add_lottery(session, meeting_id, users)
+        media_folder_id = _add_media(session, size)
+        session.commit()
+        return Dataset(
+            engine=engine,
+            meeting_id=meeting_id,
+            user_id=users[0].id,
+            vote_ids=vote_ids,
+            media_folder_id=media_folder_id,
+        )
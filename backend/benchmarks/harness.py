@@ -0,0 +1,135 @@
+"""
+微基准计时与基线对比
+- measure() 反复调用被测函数直到达到最短计时，给出 ops/sec、均值、中位数
+- 额外用 tracemalloc 跑一次，记录单次调用的内存分配峰值与分配块数
+- 结果可保存为基线 JSON，之后的运行按名称与基线对比
+"""
+import gc
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    rounds: int
+    ops_per_sec: float
+    mean_us: float
+    median_us: float
+    stddev_us: float
+    alloc_peak_kib: float
+    alloc_blocks: int
+
+
+def _measure_allocations(fn: Callable[[], object]) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        baseline_current, _ = tracemalloc.get_traced_memory()
+        result = fn()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    # 分配块数取调用结束时仍存活的新增块（含返回值），峰值取调用期间最高占用
+    blocks = sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "filename"))
+    return (peak - baseline_current) / 1024, blocks
+
+
+def measure(
+    name: str,
+    fn: Callable[[], object],
+    min_time: float = 0.5,
+    max_rounds: int = 10_000,
+    warmup_rounds: int = 3,
+) -> BenchmarkResult:
+    for _ in range(warmup_rounds):
+        fn()
+
+    timings: List[float] = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        while len(timings) < max_rounds:
+            call_started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - call_started)
+            if time.perf_counter() - started >= min_time and len(timings) >= 5:
+                break
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    alloc_peak_kib, alloc_blocks = _measure_allocations(fn)
+    mean = statistics.fmean(timings)
+    return BenchmarkResult(
+        name=name,
+        rounds=len(timings),
+        ops_per_sec=1 / mean if mean else 0.0,
+        mean_us=mean * 1e6,
+        median_us=statistics.median(timings) * 1e6,
+        stddev_us=(statistics.stdev(timings) if len(timings) > 1 else 0.0) * 1e6,
+        alloc_peak_kib=alloc_peak_kib,
+        alloc_blocks=alloc_blocks,
+    )
+
+
+def load_baseline(path: Path) -> Dict[str, dict]:
+    if not path.exists():
+        return {}
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return data.get("results", {})
+
+
+def save_baseline(path: Path, results: List[BenchmarkResult]) -> None:
+    payload = {
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {
+            result.name: {key: round(value, 3) if isinstance(value, float) else value for key, value in asdict(result).items() if key != "name"}
+            for result in sorted(results, key=lambda item: item.name)
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def ops_change(result: BenchmarkResult, baseline: Optional[dict]) -> Optional[float]:
+    """相对基线的吞吐变化比例，+0.2 表示快了 20%。"""
+    if not baseline or not baseline.get("ops_per_sec"):
+        return None
+    return result.ops_per_sec / baseline["ops_per_sec"] - 1
+
+
+def format_report(results: List[BenchmarkResult], baseline: Dict[str, dict]) -> str:
+    header = f"{'benchmark':<40} {'ops/sec':>10} {'mean(us)':>10} {'peak KiB':>9} {'blocks':>7} {'vs base':>8}"
+    lines = [header, "-" * len(header)]
+    for result in sorted(results, key=lambda item: item.name):
+        change = ops_change(result, baseline.get(result.name))
+        change_text = f"{change * 100:+.1f}%" if change is not None else "-"
+        lines.append(
+            f"{result.name:<40} {result.ops_per_sec:>10.1f} {result.mean_us:>10.1f} "
+            f"{result.alloc_peak_kib:>9.1f} {result.alloc_blocks:>7d} {change_text:>8}"
+        )
+    return "\n".join(lines)
+
+
+def find_regressions(results: List[BenchmarkResult], baseline: Dict[str, dict], max_regression: float) -> List[str]:
+    regressions = []
+    for result in results:
+        change = ops_change(result, baseline.get(result.name))
+        if change is not None and change < -max_regression:
+            regressions.append(f"{result.name}: {change * 100:+.1f}% ops/sec")
+    return regressions
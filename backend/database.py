@@ -1,7 +1,21 @@
 import os
-from sqlalchemy import inspect, text
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+import anyio
 from sqlmodel import SQLModel, create_engine, Session
 
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    SQLALCHEMY_ASYNC_AVAILABLE = True
+except Exception:
+    async_sessionmaker = None
+    create_async_engine = None
+    AsyncSession = None
+    SQLALCHEMY_ASYNC_AVAILABLE = False
+
 # ============================================================
 # 数据库配置 - 支持 SQLite (开发) 和 PostgreSQL (生产)
 # ============================================================
@@ -55,222 +69,115 @@ else:
         pool_pre_ping=True    # 使用前检测连接是否有效
     )
 
-def create_db_and_tables():
-    """
-    创建数据库和表结构
-    如果没有表会自动创建，有的话会跳过
-    """
-    try:
-        SQLModel.metadata.create_all(engine)
-        _ensure_compatible_meeting_schema()
-        _ensure_compatible_device_schema()
-        _ensure_compatible_vote_schema()
-        _ensure_compatible_lottery_schema()
-    except Exception as e:
-        # 在多 worker 启动时，可能会遇到并发创建表的竞争条件
-        # 如果甚至 "UniqueViolation" 等错误，通常意味着另一个 worker 已经创建了表
-        print(f"[WARN] Database creation warning (likely race condition): {e}")
+# ============================================================
+# 异步会话 - 实时接口 (设备心跳、抽签、投票启停/提交) 与投票自动关闭任务使用
+# SQLite 走 aiosqlite，PostgreSQL 走 asyncpg；驱动未安装或 ASYNC_DB_ENABLED=false 时
+# 退回线程池中的同步会话。两种实现都通过 run_sync(fn, *args) 执行同步的数据库函数，
+# 事件循环不再被数据库 I/O 阻塞，同一循环里的 Socket.IO 推送保持响应
+# ============================================================
 
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB_ENABLED", "true").lower() in ("true", "1", "yes")
 
-def _table_exists(inspector, table_name: str) -> bool:
-    return table_name in inspector.get_table_names()
+_ASYNC_DRIVERS = {
+    "sqlite": ("sqlite+aiosqlite", "aiosqlite"),
+    "postgresql": ("postgresql+asyncpg", "asyncpg"),
+    "postgres": ("postgresql+asyncpg", "asyncpg"),
+}
 
+T = TypeVar("T")
 
-def _get_column_names(inspector, table_name: str) -> set[str]:
-    try:
-        return {column["name"] for column in inspector.get_columns(table_name)}
-    except Exception as e:
-        print(f"[WARN] Failed to inspect columns for {table_name}: {e}")
-        return set()
 
-def _ensure_compatible_device_schema():
-    """
-    兼容旧库，补齐新增的设备版本号字段。
-    """
+def _async_database_url(url: str) -> Optional[str]:
+    """sqlite:///x.db -> sqlite+aiosqlite:///x.db；驱动未安装时返回 None。"""
+    scheme, separator, rest = url.partition(":")
+    dialect = scheme.split("+", 1)[0]
+    if not separator or dialect not in _ASYNC_DRIVERS:
+        return None
+    async_scheme, driver_module = _ASYNC_DRIVERS[dialect]
     try:
-        inspector = inspect(engine)
-        if not _table_exists(inspector, "device"):
-            return
+        __import__(driver_module)
+    except ImportError:
+        return None
+    return f"{async_scheme}:{rest}"
+
+
+def _create_async_engine():
+    if not (ASYNC_DB_ENABLED and SQLALCHEMY_ASYNC_AVAILABLE):
+        return None
+    async_url = _async_database_url(DATABASE_URL)
+    if async_url is None:
+        print("[WARN] Async database driver not installed, realtime endpoints use the threadpool session")
+        return None
+    if async_url.startswith("sqlite"):
+        return create_async_engine(async_url)
+    return create_async_engine(
+        async_url,
+        pool_size=_int_env("ASYNC_DB_POOL_SIZE", _int_env("DB_POOL_SIZE", 5)),
+        max_overflow=_int_env("ASYNC_DB_MAX_OVERFLOW", _int_env("DB_MAX_OVERFLOW", 5)),
+        pool_timeout=_int_env("DB_POOL_TIMEOUT", 15),
+        pool_recycle=_int_env("DB_POOL_RECYCLE", 1800),
+        pool_pre_ping=True,
+    )
 
-        existing_columns = _get_column_names(inspector, "device")
-        if "app_version_code" in existing_columns:
-            return
 
-        with engine.begin() as connection:
-            connection.execute(text("ALTER TABLE device ADD COLUMN app_version_code INTEGER"))
+async_engine = _create_async_engine()
+async_session_factory = (
+    async_sessionmaker(async_engine, class_=AsyncSession) if async_engine is not None else None
+)
 
-        print("[INFO] Added device.app_version_code column")
-    except Exception as e:
-        print(f"[WARN] Device schema compatibility check failed: {e}")
 
-def _ensure_compatible_meeting_schema():
-    """
-    兼容旧库，补齐会议扩展字段。
-    """
-    try:
-        inspector = inspect(engine)
-        if not _table_exists(inspector, "meeting"):
-            return
-
-        existing_columns = _get_column_names(inspector, "meeting")
-        statements = []
-
-        if "manual_attendees" not in existing_columns:
-            if "sqlite" in DATABASE_URL:
-                statements.append("ALTER TABLE meeting ADD COLUMN manual_attendees TEXT")
-            else:
-                statements.append("ALTER TABLE meeting ADD COLUMN manual_attendees TEXT")
-
-        if "meeting_contacts" not in existing_columns:
-            if "sqlite" in DATABASE_URL:
-                statements.append("ALTER TABLE meeting ADD COLUMN meeting_contacts TEXT")
-            else:
-                statements.append("ALTER TABLE meeting ADD COLUMN meeting_contacts TEXT")
-
-        if "show_media_link" not in existing_columns:
-            if "sqlite" in DATABASE_URL:
-                statements.append("ALTER TABLE meeting ADD COLUMN show_media_link BOOLEAN DEFAULT 0")
-            else:
-                statements.append("ALTER TABLE meeting ADD COLUMN show_media_link BOOLEAN DEFAULT FALSE")
-
-        if "cover_image" not in existing_columns:
-            if "sqlite" in DATABASE_URL:
-                statements.append("ALTER TABLE meeting ADD COLUMN cover_image TEXT")
-            else:
-                statements.append("ALTER TABLE meeting ADD COLUMN cover_image TEXT")
-
-        if "android_visibility_mode" not in existing_columns:
-            if "sqlite" in DATABASE_URL:
-                statements.append("ALTER TABLE meeting ADD COLUMN android_visibility_mode TEXT DEFAULT 'inherit'")
-            else:
-                statements.append("ALTER TABLE meeting ADD COLUMN android_visibility_mode VARCHAR DEFAULT 'inherit'")
-
-        if "android_visibility_hide_after_hours" not in existing_columns:
-            if "sqlite" in DATABASE_URL:
-                statements.append("ALTER TABLE meeting ADD COLUMN android_visibility_hide_after_hours INTEGER")
-            else:
-                statements.append("ALTER TABLE meeting ADD COLUMN android_visibility_hide_after_hours INTEGER")
-
-        if not statements:
-            return
-
-        with engine.begin() as connection:
-            for statement in statements:
-                connection.execute(text(statement))
-
-        print("[INFO] Added meeting compatibility columns")
-    except Exception as e:
-        print(f"[WARN] Meeting schema compatibility check failed: {e}")
+# 退路线程池的并发上限：与同步路由共用的默认线程池分开，突发时排队而不是占满连接池
+DB_THREAD_LIMIT = _int_env("DB_THREAD_LIMIT", 10)
+_db_thread_limiter: Optional[anyio.CapacityLimiter] = None
 
-def _ensure_compatible_vote_schema():
-    """
-    兼容旧库，补齐投票扩展字段。
-    """
-    try:
-        inspector = inspect(engine)
-        if not _table_exists(inspector, "vote"):
-            return
 
-        existing_columns = _get_column_names(inspector, "vote")
-        statements = []
+def _get_db_thread_limiter() -> anyio.CapacityLimiter:
+    global _db_thread_limiter
+    if _db_thread_limiter is None:
+        _db_thread_limiter = anyio.CapacityLimiter(DB_THREAD_LIMIT)
+    return _db_thread_limiter
 
-        if "countdown_seconds" not in existing_columns:
-            if "sqlite" in DATABASE_URL:
-                statements.append("ALTER TABLE vote ADD COLUMN countdown_seconds INTEGER DEFAULT 10")
-            else:
-                statements.append("ALTER TABLE vote ADD COLUMN countdown_seconds INTEGER DEFAULT 10")
 
-        if "closed_at" not in existing_columns:
-            if "sqlite" in DATABASE_URL:
-                statements.append("ALTER TABLE vote ADD COLUMN closed_at TIMESTAMP")
-            else:
-                statements.append("ALTER TABLE vote ADD COLUMN closed_at TIMESTAMP")
+class ThreadedSession:
+    """异步驱动不可用时的退路：同步会话在有界线程池中执行，接口与 AsyncSession.run_sync 一致。"""
 
-        if not statements:
-            return
+    def __init__(self):
+        self.sync_session = Session(engine)
 
-        with engine.begin() as connection:
-            for statement in statements:
-                connection.execute(text(statement))
+    async def run_sync(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        return await anyio.to_thread.run_sync(
+            partial(fn, self.sync_session, *args, **kwargs),
+            limiter=_get_db_thread_limiter(),
+        )
 
-        print("[INFO] Added vote compatibility columns")
-    except Exception as e:
-        print(f"[WARN] Vote schema compatibility check failed: {e}")
+    async def close(self) -> None:
+        await anyio.to_thread.run_sync(self.sync_session.close, limiter=_get_db_thread_limiter())
+
+
+@asynccontextmanager
+async def open_async_session():
+    if async_session_factory is not None:
+        async with async_session_factory() as session:
+            yield session
+        return
+    session = ThreadedSession()
+    try:
+        yield session
+    finally:
+        await session.close()
 
-def _ensure_compatible_lottery_schema():
+
+def create_db_and_tables():
     """
-    兼容旧库中的抽签状态枚举值、轮次顺序字段和会话锁定字段。
+    创建数据库和表结构，并执行 migrations.py 中尚未执行的版本化迁移
+    稳态启动（已是最新版本）只查询一次版本号，不再逐表检查结构
     """
+    from migrations import run_migrations
+
     try:
-        inspector = inspect(engine)
-        if not _table_exists(inspector, "lottery"):
-            return
-
-        existing_columns = _get_column_names(inspector, "lottery")
-        session_table_name = "lotterysession"
-        session_columns = _get_column_names(inspector, session_table_name) if _table_exists(inspector, session_table_name) else set()
-
-        with engine.begin() as connection:
-            if "sort_order" not in existing_columns:
-                connection.execute(text("ALTER TABLE lottery ADD COLUMN IF NOT EXISTS sort_order INTEGER DEFAULT 0"))
-                print("[INFO] Added lottery.sort_order column")
-
-            if session_columns and "self_service_locked" not in session_columns:
-                if "sqlite" in DATABASE_URL:
-                    connection.execute(text("ALTER TABLE lotterysession ADD COLUMN self_service_locked BOOLEAN DEFAULT 0"))
-                else:
-                    connection.execute(text("ALTER TABLE lotterysession ADD COLUMN IF NOT EXISTS self_service_locked BOOLEAN DEFAULT FALSE"))
-                print("[INFO] Added lotterysession.self_service_locked column")
-
-            if session_columns or _table_exists(inspect(engine), session_table_name):
-                connection.execute(
-                    text(
-                        "UPDATE lotterysession SET self_service_locked = 1 "
-                        "WHERE session_status IN ('rolling', 'result', 'completed')"
-                    )
-                )
-                connection.execute(
-                    text(
-                        "UPDATE lotterysession SET self_service_locked = 1 "
-                        "WHERE EXISTS ("
-                        "  SELECT 1 FROM lottery "
-                        "  WHERE lottery.meeting_id = lotterysession.meeting_id "
-                        "    AND lottery.status = 'finished'"
-                        ")"
-                    )
-                )
-
-            connection.execute(
-                text("UPDATE lottery SET status = 'draft' WHERE status IN ('pending', 'waiting', 'active')")
-            )
-
-            rows = connection.execute(
-                text(
-                    "SELECT meeting_id, id FROM lottery "
-                    "ORDER BY meeting_id, "
-                    "CASE WHEN sort_order IS NULL OR sort_order = 0 THEN 1 ELSE 0 END, "
-                    "sort_order, created_at, id"
-                )
-            ).fetchall()
-            current_meeting_id = None
-            meeting_order = 0
-            for row in rows:
-                meeting_id = row[0]
-                lottery_id = row[1]
-                if meeting_id != current_meeting_id:
-                    current_meeting_id = meeting_id
-                    meeting_order = 1
-                else:
-                    meeting_order += 1
-                connection.execute(
-                    text("UPDATE lottery SET sort_order = :sort_order WHERE id = :lottery_id"),
-                    {"sort_order": meeting_order, "lottery_id": lottery_id},
-                )
-
-        print("[INFO] Normalized lottery status values")
+        run_migrations(engine, metadata=SQLModel.metadata)
     except Exception as e:
-        print(f"[WARN] Lottery schema compatibility check failed: {e}")
-        raise
+        print(f"[WARN] Database migration warning: {e}")
 
 def get_session():
     """
@@ -279,3 +186,12 @@ def get_session():
     """
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session():
+    """
+    实时接口使用的异步会话 (Dependency Injection)
+    数据库操作写成接收同步 Session 的函数，通过 await session.run_sync(fn, ...) 执行
+    """
+    async with open_async_session() as session:
+        yield session
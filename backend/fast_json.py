@@ -0,0 +1,85 @@
+"""
+快速 JSON 序列化
+- FastJSONResponse：全局默认响应类，优先用 orjson，未安装时退回标准库 json
+- model_json_response：列表接口直接用 TypeAdapter.dump_json 把模型序列化为字节，
+  跳过 jsonable_encoder 生成的中间 dict 以及 response_model 的二次校验
+- socket_json：传给 socketio.AsyncServer(json=...)，Socket.IO 推送同样走 orjson
+"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Optional
+from uuid import UUID
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson  # type: ignore
+    ORJSON_AVAILABLE = True
+except Exception:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if ORJSON_AVAILABLE else 0
+
+
+def _default(obj: Any) -> Any:
+    """orjson / json 都不认识的类型按 jsonable_encoder 的习惯转换。"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def model_json_response(data: Any, adapter: TypeAdapter, status_code: int = 200, headers: Optional[dict] = None) -> Response:
+    """按 response_model 的约定（by_alias）直接输出 JSON 字节。"""
+    return Response(
+        content=adapter.dump_json(data, by_alias=True),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+class _SocketJSON:
+    """python-socketio 的 json 模块接口：dumps 需返回 str，并接受 separators 等参数。"""
+
+    @staticmethod
+    def dumps(obj: Any, *args, **kwargs) -> str:
+        return dumps(obj).decode("utf-8")
+
+    @staticmethod
+    def loads(data: Any, *args, **kwargs) -> Any:
+        return loads(data)
+
+
+socket_json = _SocketJSON()
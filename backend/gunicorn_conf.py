@@ -0,0 +1,16 @@
+"""
+gunicorn 配置 (由 run_production.sh 通过 -c 加载)
+prometheus_client 多进程模式下，worker 退出时需要清理其指标文件，
+否则 /metrics 会继续汇总已退出进程的 gauge 数据。
+"""
+import os
+
+
+def child_exit(server, worker):
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    try:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+    except Exception:
+        pass
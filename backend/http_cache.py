@@ -0,0 +1,198 @@
+"""
+会议列表 / 详情的条件请求与响应压缩
+- MeetingETagMiddleware：按 services.change_versions 的版本号计算弱 ETag，
+  If-None-Match 命中时直接返回 304，不进入路由、不查库；
+  ETag 另含时间分桶，"今天的会议"、可见时效等随时间变化的字段最多滞后一个分桶
+- CompressionMiddleware：超过阈值的 JSON / 文本响应按 Accept-Encoding 做 brotli 或 gzip 压缩，
+  brotli 可选（未安装时只用 gzip）；分块发送的响应（静态文件、PDF 等）原样透传
+"""
+import gzip
+import hashlib
+import os
+import re
+import time
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+
+from services.change_versions import LIST_SCOPE, SHARED_SCOPE, change_versions, meeting_scope
+
+try:
+    import brotli  # type: ignore
+    BROTLI_AVAILABLE = True
+except Exception:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+
+ETAG_ENABLED = os.getenv("ETAG_ENABLED", "true").lower() in ("true", "1", "yes")
+ETAG_TIME_BUCKET_SECONDS = int(os.getenv("ETAG_TIME_BUCKET_SECONDS", "60"))
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+_MEETING_LIST_PATH = re.compile(r"^/meetings/?$")
+_MEETING_DETAIL_PATH = re.compile(r"^/meetings/(\d+)$")
+_COMPRESSIBLE_TYPES = ("application/json", "text/")
+# 超过该大小的响应体放到线程里压缩，避免阻塞事件循环
+_THREAD_MIN_SIZE = 256 * 1024
+
+
+class _RouteTemplate:
+    """304 不经过路由匹配，补上模板供指标中间件按路由归类。"""
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str):
+        self.path = path
+
+
+_LIST_ROUTE = _RouteTemplate("/meetings/")
+_DETAIL_ROUTE = _RouteTemplate("/meetings/{meeting_id}")
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # 弱比较：忽略 W/ 前缀
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+class MeetingETagMiddleware:
+    def __init__(self, app, time_bucket_seconds: int = ETAG_TIME_BUCKET_SECONDS):
+        self.app = app
+        self.time_bucket_seconds = max(time_bucket_seconds, 1)
+
+    def _match(self, path: str) -> Optional[Tuple[_RouteTemplate, Tuple[str, ...]]]:
+        if _MEETING_LIST_PATH.match(path):
+            return _LIST_ROUTE, (LIST_SCOPE, SHARED_SCOPE)
+        detail = _MEETING_DETAIL_PATH.match(path)
+        if detail:
+            return _DETAIL_ROUTE, (meeting_scope(int(detail.group(1))), SHARED_SCOPE)
+        return None
+
+    async def compute_etag(self, scope) -> Optional[Tuple[_RouteTemplate, str]]:
+        matched = self._match(scope["path"])
+        if matched is None:
+            return None
+        route, scopes = matched
+        versions = await change_versions.get_many(*scopes)
+        if versions is None:
+            return None
+        bucket = int(time.time() // self.time_bucket_seconds)
+        # 路径与查询参数一起参与哈希：不同会议、不同 user_id 的响应不能互相命中
+        request_hash = hashlib.blake2s(scope["path"].encode() + b"?" + scope.get("query_string", b""), digest_size=6).hexdigest()
+        version_part = ".".join(str(versions[name]) for name in scopes)
+        return route, f'W/"{change_versions.epoch}-{version_part}-{bucket}-{request_hash}"'
+
+    async def __call__(self, scope, receive, send):
+        if not ETAG_ENABLED or scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        computed = await self.compute_etag(scope)
+        if computed is None:
+            await self.app(scope, receive, send)
+            return
+        route, etag = computed
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        if if_none_match and etag_matches(if_none_match, etag):
+            scope.setdefault("route", route)
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode()), (b"cache-control", b"no-cache")],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_etag(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                headers["etag"] = etag
+                headers["cache-control"] = "no-cache"
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+def _select_encoding(accept_encoding: str) -> Optional[str]:
+    if BROTLI_AVAILABLE and "br" in accept_encoding:
+        return "br"
+    if "gzip" in accept_encoding:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class _CompressingResponder:
+    """缓存响应头直到首个响应体分片；只有一次性发送完的可压缩响应才压缩。"""
+
+    def __init__(self, app, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.send = None
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    async def send_wrapper(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.start_message is None:
+            await self.send(message)
+            return
+
+        start, self.start_message = self.start_message, None
+        headers = Headers(raw=start["headers"])
+        body = message.get("body", b"")
+        compressible = (
+            not message.get("more_body", False)
+            and len(body) >= self.minimum_size
+            and "content-encoding" not in headers
+            and headers.get("content-type", "").startswith(_COMPRESSIBLE_TYPES)
+        )
+        if compressible:
+            if len(body) >= _THREAD_MIN_SIZE:
+                body = await anyio.to_thread.run_sync(_compress, body, self.encoding)
+            else:
+                body = _compress(body, self.encoding)
+            mutable = MutableHeaders(scope=start)
+            mutable["content-encoding"] = self.encoding
+            mutable["content-length"] = str(len(body))
+            mutable.add_vary_header("Accept-Encoding")
+            message = {**message, "body": body}
+        await self.send(start)
+        await self.send(message)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressingResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
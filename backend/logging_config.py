@@ -0,0 +1,136 @@
+"""
+日志配置
+默认安静：各子系统独立设置级别，高频事件按采样输出，
+日志记录先进入内存队列，由单独线程写 stdout，请求线程不会阻塞在 I/O 上。
+
+环境变量：
+    LOG_LEVEL=INFO                          全局默认级别
+    LOG_LEVELS=socket=DEBUG,lottery=WARNING 按子系统覆盖级别
+    LOG_FORMAT=text|json                    输出格式
+    SOCKETIO_LOG_PACKETS=false              是否输出 Socket.IO / Engine.IO 逐包日志
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+from typing import Dict, Optional
+
+
+LOGGER_PREFIX = "paperless"
+
+_STANDARD_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_setup_lock = threading.Lock()
+
+_sample_counters: Dict[str, int] = {}
+_sample_lock = threading.Lock()
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).lower() in ("true", "1", "yes")
+
+
+SOCKETIO_LOG_PACKETS = _env_flag("SOCKETIO_LOG_PACKETS")
+
+
+class StructuredFormatter(logging.Formatter):
+    """在消息后追加 extra 字段；LOG_FORMAT=json 时整行输出 JSON。"""
+
+    def __init__(self, as_json: bool = False):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+        self.as_json = as_json
+
+    @staticmethod
+    def _extra_fields(record: logging.LogRecord) -> dict:
+        return {key: value for key, value in record.__dict__.items() if key not in _STANDARD_RECORD_ATTRS}
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = self._extra_fields(record)
+        if self.as_json:
+            payload = {
+                "ts": self.formatTime(record),
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage(),
+                **fields,
+            }
+            if record.exc_info:
+                payload["exc_info"] = self.formatException(record.exc_info)
+            return json.dumps(payload, ensure_ascii=False, default=str)
+
+        line = super().format(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def _parse_levels(raw: str) -> Dict[str, str]:
+    levels = {}
+    for item in raw.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging() -> None:
+    """进程内只初始化一次；重复调用直接返回。"""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(StructuredFormatter(as_json=os.getenv("LOG_FORMAT", "text").lower() == "json"))
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        app_logger = logging.getLogger(LOGGER_PREFIX)
+        app_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        app_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        app_logger.propagate = False
+
+        for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(f"{LOGGER_PREFIX}.{name}").setLevel(level)
+
+        # Socket.IO 逐包日志只在显式开启时输出
+        packet_level = logging.INFO if SOCKETIO_LOG_PACKETS else logging.WARNING
+        logging.getLogger("socketio").setLevel(packet_level)
+        logging.getLogger("engineio").setLevel(packet_level)
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """子系统日志，如 get_logger("socket") -> paperless.socket。"""
+    return logging.getLogger(f"{LOGGER_PREFIX}.{subsystem}")
+
+
+def log_sampled(
+    logger: logging.Logger,
+    level: int,
+    key: str,
+    msg: str,
+    *args,
+    every: int = 100,
+    **kwargs,
+) -> None:
+    """
+    高频事件按 key 采样，每 every 次只输出一次并附带累计次数。
+    级别未启用时直接返回，不做计数。
+    """
+    if not logger.isEnabledFor(level):
+        return
+    with _sample_lock:
+        count = _sample_counters.get(key, 0) + 1
+        _sample_counters[key] = count
+    if count % every != 1 and every > 1:
+        return
+    extra = kwargs.pop("extra", None) or {}
+    extra["sample_count"] = count
+    logger.log(level, msg, *args, extra=extra, **kwargs)
@@ -1,22 +1,32 @@
 from fastapi import FastAPI
+from fastapi.datastructures import Default
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-import uvicorn
 import os
 import shutil
 from contextlib import asynccontextmanager
 from pathlib import Path
 
+# 日志需在其他模块创建 logger 之前初始化
+from logging_config import get_logger, setup_logging
+setup_logging()
+logger = get_logger("app")
+
 # 导入数据库初始化函数和路由模块
 from database import create_db_and_tables
 from routes import users, meetings, auth, meeting_types, notes, devices, app_updates, system_settings, sync, vote, lottery, reading_progress, checkin, dashboard, media, cover_center, interactions
 from socket_manager import sio, socket_app
 
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from sqlmodel import Session, select
-from database import engine
+from database import async_engine, engine
 from models import MeetingType
+from fast_json import FastJSONResponse
+from http_cache import CompressionMiddleware, MeetingETagMiddleware
+from metrics import MetricsMiddleware, PROMETHEUS_AVAILABLE, instrument_engine, render_metrics
+import query_budget
+from schema_advisor import SCHEMA_ADVISOR_ENABLED, schema_advisor
 
 # 调试模式：生产环境设为 false，避免泄露 traceback
 DEBUG = os.getenv("DEBUG", "false").lower() in ("true", "1", "yes")
@@ -35,7 +45,20 @@ def sync_default_meeting_assets() -> None:
     for asset in DEFAULT_MEETING_SOURCE_DIR.iterdir():
         if not asset.is_file():
             continue
-        shutil.copy2(asset, DEFAULT_MEETING_UPLOAD_DIR / asset.name)
+        target = DEFAULT_MEETING_UPLOAD_DIR / asset.name
+        # copy2 保留修改时间，大小与修改时间一致即视为未变化，重启时不再重复拷贝
+        source_stat = asset.stat()
+        try:
+            target_stat = target.stat()
+        except FileNotFoundError:
+            target_stat = None
+        if (
+            target_stat is not None
+            and target_stat.st_size == source_stat.st_size
+            and target_stat.st_mtime_ns == source_stat.st_mtime_ns
+        ):
+            continue
+        shutil.copy2(asset, target)
 
 # 定义应用生命周期管理器
 @asynccontextmanager
@@ -56,6 +79,30 @@ async def lifespan(app: FastAPI):
     from vote_auto_closer import auto_close_expired_votes
     auto_close_task = asyncio.create_task(auto_close_expired_votes())
     print("[STARTUP] 已启动投票自动关闭任务")
+
+    # 启动合并写入的后台刷盘任务 (last_login 等)
+    from services.write_behind import flush_all_buffers, run_write_behind_flusher
+    write_behind_task = asyncio.create_task(run_write_behind_flusher())
+
+    # 启动在线状态续期任务 (多 worker 下依赖它让退出进程的连接自动过期)
+    from services.presence import run_presence_refresher
+    presence_task = asyncio.create_task(run_presence_refresher())
+
+    # 事件循环延迟监控 (event_loop_lag_seconds)，阻塞超过阈值时记录警告
+    from metrics import run_event_loop_lag_monitor
+    loop_lag_task = asyncio.create_task(run_event_loop_lag_monitor())
+
+    # 后台线程（视频转码、附件预处理）完成后经主事件循环推送；尚未处理的媒体视频与附件在后台补提交
+    from socket_manager import bind_event_loop
+    from services.background_jobs import background_jobs
+    from services import attachment_preprocess, meeting_search
+    bind_event_loop(asyncio.get_running_loop())
+    background_jobs.submit("media.transcode_backfill", media.enqueue_pending_transcodes)
+    background_jobs.submit(
+        "attachments.preprocess_backfill", attachment_preprocess.enqueue_pending, meetings._on_attachment_processed
+    )
+    # SQLite 下预先建好会议全文检索的进程内索引，首个检索请求不必等待
+    background_jobs.submit("meeting_search.rebuild", meeting_search.warm_index)
     
     yield
     
@@ -66,14 +113,38 @@ async def lifespan(app: FastAPI):
     except asyncio.CancelledError:
         print("[SHUTDOWN] 投票自动关闭任务已停止")
 
+    for task in (write_behind_task, presence_task, loop_lag_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    # 退出前把尚未落库的合并写入刷掉，并等待已排队的后台任务（文件删除等）执行完
+    flush_all_buffers()
+    from services.background_jobs import shutdown_background_jobs
+    from services.video_transcode import shutdown_transcode_jobs
+    shutdown_transcode_jobs()
+    attachment_preprocess.shutdown_preprocess_jobs()
+    shutdown_background_jobs()
+    bind_event_loop(None)
+
+    if SCHEMA_ADVISOR_ENABLED:
+        schema_advisor.log_report(engine)
+
 # 创建 FastAPI 应用实例
-app = FastAPI(title="Paperless Meeting System", lifespan=lifespan)
+# 用 Default 包装：声明了 response_model 的路由仍走 FastAPI 自带的 dump_json 快速路径，
+# 其余返回 dict 的路由由 FastJSONResponse (orjson) 序列化
+app = FastAPI(
+    title="Paperless Meeting System",
+    lifespan=lifespan,
+    default_response_class=Default(FastJSONResponse),
+)
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     import traceback
     error_msg = "".join(traceback.format_exception(None, exc, exc.__traceback__))
-    print(f"Global Exception: {error_msg}")
+    logger.error("Global Exception: %s", error_msg, extra={"path": request.url.path})
     if DEBUG:
         # 开发环境：返回详细错误信息便于调试
         return JSONResponse(
@@ -93,6 +164,9 @@ CORS_ORIGINS = os.getenv(
     "http://localhost:5173,http://127.0.0.1:5173,http://localhost:8000"
 ).split(",")
 
+# 会议列表 / 详情的 ETag 与 304；放在 CORS 内层，304 响应同样带上 CORS 头
+app.add_middleware(MeetingETagMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[o.strip() for o in CORS_ORIGINS],
@@ -101,6 +175,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 大于阈值的 JSON / 文本响应按 Accept-Encoding 做 brotli / gzip 压缩
+app.add_middleware(CompressionMiddleware)
+
+# 请求耗时 / 每请求 SQL 次数 / 连接池等待 指标采集
+# 异步会话的语句同样经过底层同步引擎的事件
+_instrumented_engines = [engine] + ([async_engine.sync_engine] if async_engine is not None else [])
+for _engine in _instrumented_engines:
+    instrument_engine(_engine)
+app.add_middleware(MetricsMiddleware)
+
+# 调试 / CI：每请求 SQL 预算与 N+1 检测 (QUERY_BUDGET_ENABLED=true)
+if query_budget.QUERY_BUDGET_ENABLED:
+    for _engine in _instrumented_engines:
+        query_budget.instrument_engine(_engine)
+    app.add_middleware(query_budget.QueryBudgetMiddleware)
+
+# 调试 / 压测：统计运行时的慢查询与全表扫描 (SCHEMA_ADVISOR_ENABLED=true)，关闭时写入日志
+if SCHEMA_ADVISOR_ENABLED:
+    for _engine in _instrumented_engines:
+        schema_advisor.instrument(_engine)
+
+    @app.get("/debug/schema-advisor", include_in_schema=False)
+    def read_schema_advisor():
+        return {"patterns": schema_advisor.report(engine)}
+
 # 挂载静态文件目录
 # 用于让平版端可以通过 URL (如 http://ip:8000/static/file.pdf) 访问上传的文件
 app.mount("/static", StaticFiles(directory="uploads"), name="static")
@@ -127,6 +226,14 @@ app.include_router(interactions.router)
 # 挂载 Socket.IO (WebSocket 端点位于 /socket.io/)
 app.mount("/socket.io", socket_app)
 
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """
+    Prometheus 抓取接口 (多 worker 时汇总 PROMETHEUS_MULTIPROC_DIR 下所有进程的数据)
+    """
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type, status_code=200 if PROMETHEUS_AVAILABLE else 503)
+
 @app.get("/")
 def read_root():
     """
@@ -137,4 +244,6 @@ def read_root():
 if __name__ == "__main__":
     # 启动开发服务器
     # host="0.0.0.0" 表示监听所有网卡，允许局域网访问
+    import uvicorn
+
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,216 @@
+"""
+Prometheus 指标
+- 每个路由的请求耗时、每个请求的数据库查询次数
+- 连接池获取连接的等待时间
+- Socket.IO 按事件名和房间统计的推送次数
+- 缩略图生成耗时
+- 事件循环延迟：定时唤醒实际晚到的时长，反映协程里的阻塞调用（同步数据库访问等）
+
+依赖 prometheus_client（可选）；未安装时所有记录函数都是空操作，/metrics 返回 503。
+gunicorn 多 worker 部署时设置 PROMETHEUS_MULTIPROC_DIR，各 worker 写入共享目录，
+/metrics 汇总所有 worker 的数据（见 gunicorn_conf.py）。
+"""
+import asyncio
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from logging_config import get_logger, log_sampled
+
+try:
+    from prometheus_client import (  # type: ignore
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        REGISTRY,
+        generate_latest,
+        multiprocess,
+    )
+    PROMETHEUS_AVAILABLE = True
+except Exception:
+    PROMETHEUS_AVAILABLE = False
+
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_ENABLED = PROMETHEUS_AVAILABLE and os.getenv("METRICS_ENABLED", "true").lower() in ("true", "1", "yes")
+
+# 当前请求的查询计数，[count]；由中间件在请求开始时放入
+_request_query_counter: ContextVar[Optional[List[int]]] = ContextVar("request_query_counter", default=None)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+_QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0)
+_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+EVENT_LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("EVENT_LOOP_LAG_INTERVAL_SECONDS", "0.5"))
+EVENT_LOOP_LAG_WARN_SECONDS = float(os.getenv("EVENT_LOOP_LAG_WARN_SECONDS", "0.25"))
+
+logger = get_logger("metrics")
+
+if METRICS_ENABLED:
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by route template",
+        ["method", "route", "status"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    REQUEST_DB_QUERIES = Histogram(
+        "http_request_db_queries",
+        "SQL statements executed per HTTP request",
+        ["method", "route"],
+        buckets=_QUERY_BUCKETS,
+    )
+    POOL_CHECKOUT_WAIT = Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time spent waiting for a pooled DB connection",
+        buckets=_WAIT_BUCKETS,
+    )
+    SOCKET_EMITS = Counter(
+        "socketio_emits_total",
+        "Socket.IO emits by event and room",
+        ["event", "room"],
+    )
+    THUMBNAIL_DURATION = Histogram(
+        "thumbnail_job_duration_seconds",
+        "Thumbnail generation time by kind",
+        ["kind"],
+        buckets=_LATENCY_BUCKETS,
+    )
+    EVENT_LOOP_LAG = Histogram(
+        "event_loop_lag_seconds",
+        "How late a scheduled event-loop wakeup ran",
+        buckets=_LAG_BUCKETS,
+    )
+
+# 带标签的子指标缓存，避免每次请求都做标签解析
+_latency_children: Dict[Tuple[str, str, int], object] = {}
+_query_children: Dict[Tuple[str, str], object] = {}
+_emit_children: Dict[Tuple[str, str], object] = {}
+
+
+def _child(cache: dict, metric, key: tuple):
+    child = cache.get(key)
+    if child is None:
+        child = cache[key] = metric.labels(*key)
+    return child
+
+
+def record_socket_emit(event_name: str, room: Optional[str]) -> None:
+    if not METRICS_ENABLED:
+        return
+    _child(_emit_children, SOCKET_EMITS, (event_name, room or "broadcast")).inc()
+
+
+def observe_thumbnail(kind: str, seconds: float) -> None:
+    if not METRICS_ENABLED:
+        return
+    THUMBNAIL_DURATION.labels(kind).observe(seconds)
+
+
+def observe_event_loop_lag(seconds: float) -> None:
+    if seconds >= EVENT_LOOP_LAG_WARN_SECONDS:
+        log_sampled(logger, logging.WARNING, "metrics.event_loop_lag", "Event loop blocked for %.3fs", seconds, every=20)
+    if not METRICS_ENABLED:
+        return
+    EVENT_LOOP_LAG.observe(seconds)
+
+
+async def run_event_loop_lag_monitor(interval_seconds: Optional[float] = None):
+    """按固定间隔 sleep，实际唤醒比预期晚的部分即为这段时间内事件循环被阻塞的时长。"""
+    interval = interval_seconds or EVENT_LOOP_LAG_INTERVAL_SECONDS
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        observe_event_loop_lag(max(loop.time() - started - interval, 0.0))
+
+
+class timed_thumbnail:
+    """with timed_thumbnail("media_image"): ... 只在真正生成时使用，缓存命中不计。"""
+
+    __slots__ = ("kind", "_started")
+
+    def __init__(self, kind: str):
+        self.kind = kind
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe_thumbnail(self.kind, time.perf_counter() - self._started)
+        return False
+
+
+def instrument_engine(engine) -> None:
+    """统计每个请求的 SQL 次数，并记录连接池获取连接的等待时间。"""
+    if not METRICS_ENABLED or getattr(engine, "_metrics_instrumented", False):
+        return
+    engine._metrics_instrumented = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        counter = _request_query_counter.get()
+        if counter is not None:
+            counter[0] += 1
+
+    pool = engine.pool
+    original_connect: Callable = pool.connect
+
+    def _timed_connect(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original_connect(*args, **kwargs)
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+
+    pool.connect = _timed_connect
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件，只处理 http 请求；路由模板取自路由匹配后写入的 scope["route"]。"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        counter = [0]
+        token = _request_query_counter.set(counter)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_query_counter.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            _child(_latency_children, REQUEST_LATENCY, (method, route_path, status_holder[0])).observe(elapsed)
+            _child(_query_children, REQUEST_DB_QUERIES, (method, route_path)).observe(counter[0])
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    if not PROMETHEUS_AVAILABLE:
+        return b"# prometheus_client is not installed\n", "text/plain; charset=utf-8"
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,421 @@
+"""
+版本化数据库迁移
+- schema_version 表记录已执行的迁移版本；稳态启动只执行一次 SELECT MAX(version)，已是最新版本时直接返回
+- 有待执行的迁移时先取数据库锁（PostgreSQL advisory lock / SQLite 锁文件），多个 worker 同时启动时
+  只有一个执行 create_all 与迁移，其余等锁释放后复查版本号即返回
+- 每个迁移在独立事务中执行并写入版本号，SQLite 与 PostgreSQL 共用同一份定义
+- 迁移本身保持幂等：老库没有版本表时从第 1 版开始执行，已存在的列和索引会被跳过
+新增迁移时在 MIGRATIONS 末尾追加，版本号递增，不要修改已发布的迁移。
+新增数据表同样要追加一条迁移（可以是空操作），否则已是最新版本的库在稳态启动时不会执行 create_all。
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError, IntegrityError
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows 开发环境没有 fcntl，SQLite 下不加锁
+    fcntl = None
+
+from logging_config import get_logger
+
+
+logger = get_logger("migrations")
+
+SCHEMA_VERSION_TABLE = "schema_version"
+MIGRATION_LOCK_KEY = 20260410
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _is_sqlite(connection: Connection) -> bool:
+    return connection.dialect.name == "sqlite"
+
+
+def _table_exists(connection: Connection, table_name: str) -> bool:
+    return inspect(connection).has_table(table_name)
+
+
+def _column_names(connection: Connection, table_name: str) -> Set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table_name)}
+
+
+def _add_missing_columns(connection: Connection, table_name: str, columns: Sequence[Tuple[str, str, str]]) -> None:
+    """columns: (列名, SQLite 类型定义, PostgreSQL 类型定义)"""
+    if not _table_exists(connection, table_name):
+        return
+    existing_columns = _column_names(connection, table_name)
+    sqlite = _is_sqlite(connection)
+    for column_name, sqlite_definition, postgres_definition in columns:
+        if column_name in existing_columns:
+            continue
+        definition = sqlite_definition if sqlite else postgres_definition
+        connection.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN {column_name} {definition}'))
+        logger.info("Added column %s.%s", table_name, column_name)
+
+
+def _meeting_columns(connection: Connection) -> None:
+    _add_missing_columns(connection, "meeting", (
+        ("manual_attendees", "TEXT", "TEXT"),
+        ("meeting_contacts", "TEXT", "TEXT"),
+        ("show_media_link", "BOOLEAN DEFAULT 0", "BOOLEAN DEFAULT FALSE"),
+        ("cover_image", "TEXT", "TEXT"),
+        ("android_visibility_mode", "TEXT DEFAULT 'inherit'", "VARCHAR DEFAULT 'inherit'"),
+        ("android_visibility_hide_after_hours", "INTEGER", "INTEGER"),
+    ))
+
+
+def _device_columns(connection: Connection) -> None:
+    _add_missing_columns(connection, "device", (
+        ("app_version_code", "INTEGER", "INTEGER"),
+    ))
+
+
+def _vote_columns(connection: Connection) -> None:
+    _add_missing_columns(connection, "vote", (
+        ("countdown_seconds", "INTEGER DEFAULT 10", "INTEGER DEFAULT 10"),
+        ("closed_at", "TIMESTAMP", "TIMESTAMP"),
+    ))
+
+
+def _lottery_schema(connection: Connection) -> None:
+    """抽签轮次顺序字段、会话锁定字段，以及旧版状态枚举值与轮次顺序的归一化。"""
+    if not _table_exists(connection, "lottery"):
+        return
+    _add_missing_columns(connection, "lottery", (
+        ("sort_order", "INTEGER DEFAULT 0", "INTEGER DEFAULT 0"),
+    ))
+
+    if _table_exists(connection, "lotterysession"):
+        _add_missing_columns(connection, "lotterysession", (
+            ("self_service_locked", "BOOLEAN DEFAULT 0", "BOOLEAN DEFAULT FALSE"),
+        ))
+        locked = "1" if _is_sqlite(connection) else "TRUE"
+        connection.execute(
+            text(
+                f"UPDATE lotterysession SET self_service_locked = {locked} "
+                "WHERE session_status IN ('rolling', 'result', 'completed')"
+            )
+        )
+        connection.execute(
+            text(
+                f"UPDATE lotterysession SET self_service_locked = {locked} "
+                "WHERE EXISTS ("
+                "  SELECT 1 FROM lottery "
+                "  WHERE lottery.meeting_id = lotterysession.meeting_id "
+                "    AND lottery.status = 'finished'"
+                ")"
+            )
+        )
+
+    connection.execute(
+        text("UPDATE lottery SET status = 'draft' WHERE status IN ('pending', 'waiting', 'active')")
+    )
+
+    # 按会议重新编号，一条 UPDATE 完成；编号未变的行不写
+    connection.execute(
+        text(
+            "UPDATE lottery SET sort_order = ranked.position "
+            "FROM ("
+            "  SELECT id, ROW_NUMBER() OVER ("
+            "    PARTITION BY meeting_id "
+            "    ORDER BY CASE WHEN sort_order IS NULL OR sort_order = 0 THEN 1 ELSE 0 END, "
+            "    sort_order, created_at, id"
+            "  ) AS position FROM lottery"
+            ") AS ranked "
+            "WHERE lottery.id = ranked.id "
+            "AND (lottery.sort_order IS NULL OR lottery.sort_order <> ranked.position)"
+        )
+    )
+
+
+def _user_schema(connection: Connection) -> None:
+    """登录按姓名查询所需的索引和检索用的拼音首字母字段。"""
+    if not _table_exists(connection, "user"):
+        return
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_user_name ON "user" (name)'))
+    _add_missing_columns(connection, "user", (
+        ("name_initials", "TEXT", "TEXT"),
+    ))
+
+
+def _reading_progress_unique(connection: Connection) -> None:
+    """(user_id, file_url) 唯一索引，批量 upsert 依赖它做冲突判定；建索引前只保留最新一条重复记录。"""
+    if not _table_exists(connection, "readingprogress"):
+        return
+    inspector = inspect(connection)
+    unique_names = {item["name"] for item in inspector.get_unique_constraints("readingprogress")}
+    unique_names.update(item["name"] for item in inspector.get_indexes("readingprogress") if item.get("unique"))
+    if "uq_readingprogress_user_file" in unique_names:
+        return
+    connection.execute(
+        text(
+            "DELETE FROM readingprogress WHERE id NOT IN ("
+            "  SELECT MAX(id) FROM readingprogress GROUP BY user_id, file_url"
+            ")"
+        )
+    )
+    connection.execute(
+        text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_readingprogress_user_file "
+            "ON readingprogress (user_id, file_url)"
+        )
+    )
+
+
+# 高频过滤 / 排序条件上的索引：(索引名, 表名, 列)
+HOT_PATH_INDEXES: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = (
+    ("ix_vote_meeting_created", "vote", ("meeting_id", "created_at")),
+    ("ix_vote_status", "vote", ("status",)),
+    ("ix_voteoption_vote_sort", "voteoption", ("vote_id", "sort_order")),
+    ("ix_uservote_vote_option", "uservote", ("vote_id", "option_id")),
+    ("ix_uservote_user_voted", "uservote", ("user_id", "voted_at")),
+    ("ix_meeting_start_time", "meeting", ("start_time",)),
+    ("ix_meeting_type_start", "meeting", ("meeting_type_id", "start_time")),
+    ("ix_attachment_meeting_sort", "attachment", ("meeting_id", "sort_order")),
+    ("ix_lottery_meeting_sort", "lottery", ("meeting_id", "sort_order")),
+    ("ix_lotterywinner_lottery", "lotterywinner", ("lottery_id",)),
+    ("ix_devicecommand_device_status", "devicecommand", ("device_id", "status", "created_at")),
+    ("ix_meetingattendeelink_user", "meetingattendeelink", ("user_id",)),
+)
+
+
+def _hot_path_indexes(connection: Connection) -> None:
+    for index_name, table_name, columns in HOT_PATH_INDEXES:
+        if not _table_exists(connection, table_name):
+            continue
+        column_list = ", ".join(columns)
+        connection.execute(text(f'CREATE INDEX IF NOT EXISTS {index_name} ON "{table_name}" ({column_list})'))
+
+
+def _backfill_name_initials(connection: Connection) -> None:
+    """补齐历史用户的拼音首字母；新写入的用户由 services.user_search 的 ORM 事件维护。"""
+    if not _table_exists(connection, "user"):
+        return
+    from utils.text_search import pinyin_initials
+
+    missing = connection.execute(text('SELECT id, name FROM "user" WHERE name_initials IS NULL')).fetchall()
+    if not missing:
+        return
+    connection.execute(
+        text('UPDATE "user" SET name_initials = :initials WHERE id = :user_id'),
+        [{"initials": pinyin_initials(name), "user_id": user_id} for user_id, name in missing],
+    )
+    logger.info("Backfilled name_initials for %s users", len(missing))
+
+
+def _user_trigram_indexes(connection: Connection) -> None:
+    """PostgreSQL 下为姓名 / 手机号 / 拼音首字母建 pg_trgm GIN 索引，用户检索依赖它做模糊匹配。"""
+    if connection.dialect.name != "postgresql" or not _table_exists(connection, "user"):
+        return
+    try:
+        # 没有建扩展权限时只回滚这一段，检索退回普通 LIKE
+        with connection.begin_nested():
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for column in ("name", "phone", "name_initials"):
+                connection.execute(
+                    text(
+                        f'CREATE INDEX IF NOT EXISTS ix_user_{column}_trgm '
+                        f'ON "user" USING gin ({column} gin_trgm_ops)'
+                    )
+                )
+    except DBAPIError as e:
+        logger.warning("pg_trgm indexes skipped: %s", e)
+
+
+def _attachment_preprocess_columns(connection: Connection) -> None:
+    """附件预处理结果列；attachmentpage 表由 create_all 创建。已有附件保持 pending，启动后在后台补处理。"""
+    _add_missing_columns(connection, "attachment", (
+        ("page_count", "INTEGER", "INTEGER"),
+        ("preview_page_count", "INTEGER DEFAULT 0", "INTEGER DEFAULT 0"),
+        ("preprocess_status", "VARCHAR DEFAULT 'pending'", "VARCHAR DEFAULT 'pending'"),
+    ))
+
+
+
+def _fulltext_search_schema(connection: Connection) -> None:
+    """
+    全文检索：attachmentpage.search_tokens 列（meetingsearchdocument 表由 create_all 创建）。
+    PostgreSQL 下补齐历史会议与附件页的词向量并建 GIN 索引；其他数据库使用进程内索引，无需处理。
+    """
+    _add_missing_columns(connection, "attachmentpage", (("search_tokens", "TEXT", "TSVECTOR"),))
+    if connection.dialect.name != "postgresql" or not _table_exists(connection, "meetingsearchdocument"):
+        return
+    from services.meeting_search import meeting_tsvector, page_tsvector
+
+    meetings = connection.execute(text(
+        "SELECT id, title, speaker, location, agenda FROM meeting "
+        "WHERE id NOT IN (SELECT meeting_id FROM meetingsearchdocument)"
+    )).fetchall()
+    if meetings:
+        connection.execute(
+            text("INSERT INTO meetingsearchdocument (meeting_id, search_tokens) VALUES (:meeting_id, :tokens)"),
+            [
+                {"meeting_id": meeting_id, "tokens": meeting_tsvector(title, speaker, location, agenda)}
+                for meeting_id, title, speaker, location, agenda in meetings
+            ],
+        )
+    pages = connection.execute(text(
+        "SELECT id, text FROM attachmentpage WHERE search_tokens IS NULL AND text <> ''"
+    )).fetchall()
+    if pages:
+        connection.execute(
+            text("UPDATE attachmentpage SET search_tokens = :tokens WHERE id = :page_id"),
+            [{"tokens": page_tsvector(page_text), "page_id": page_id} for page_id, page_text in pages],
+        )
+    for table_name in ("meetingsearchdocument", "attachmentpage"):
+        connection.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{table_name}_search_tokens ON "{table_name}" USING gin (search_tokens)'
+        ))
+    logger.info("Indexed %s meetings and %s attachment pages for full-text search", len(meetings), len(pages))
+
+
+def _reading_progress_tombstone(connection: Connection) -> None:
+    """readingprogress.deleted_at：删除改为打标记，批量 upsert 据此忽略删除前产生的旧进度。"""
+    _add_missing_columns(connection, "readingprogress", (("deleted_at", "DATETIME", "TIMESTAMP"),))
+
+
+def _attachment_preprocess_claim(connection: Connection) -> None:
+    """attachment.preprocess_started_at：多 worker 认领预处理的时间，用于回收中途退出留下的 processing。"""
+    _add_missing_columns(connection, "attachment", (("preprocess_started_at", "DATETIME", "TIMESTAMP"),))
+
+
+MIGRATIONS: Tuple[Migration, ...] = (
+    Migration(1, "meeting compatibility columns", _meeting_columns),
+    Migration(2, "device.app_version_code", _device_columns),
+    Migration(3, "vote countdown_seconds / closed_at", _vote_columns),
+    Migration(4, "lottery sort_order, session lock and status normalization", _lottery_schema),
+    Migration(5, "user name index and name_initials", _user_schema),
+    Migration(6, "readingprogress (user_id, file_url) unique index", _reading_progress_unique),
+    Migration(7, "hot foreign key / filter indexes", _hot_path_indexes),
+    Migration(8, "user name_initials backfill", _backfill_name_initials),
+    Migration(9, "user pg_trgm indexes", _user_trigram_indexes),
+    Migration(10, "attachment preprocessing columns and attachmentpage table", _attachment_preprocess_columns),
+    Migration(11, "full-text search vectors and GIN indexes", _fulltext_search_schema),
+    Migration(12, "readingprogress.deleted_at tombstone", _reading_progress_tombstone),
+    Migration(13, "attachment.preprocess_started_at claim", _attachment_preprocess_claim),
+)
+
+
+def _ensure_version_table(engine: Engine) -> None:
+    try:
+        with engine.begin() as connection:
+            connection.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} ("
+                    "  version INTEGER PRIMARY KEY,"
+                    "  description VARCHAR(255) NOT NULL,"
+                    "  applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP"
+                    ")"
+                )
+            )
+    except IntegrityError:
+        # PostgreSQL 上多个 worker 并发建表时，落后的一方会撞上系统目录的唯一约束
+        logger.info("Schema version table created by another worker")
+
+
+def get_applied_versions(engine: Engine) -> Set[int]:
+    with engine.connect() as connection:
+        return {row[0] for row in connection.execute(text(f"SELECT version FROM {SCHEMA_VERSION_TABLE}"))}
+
+
+def get_current_version(engine: Engine) -> int:
+    """版本表不存在（新库或升级前的老库）时返回 0。"""
+    try:
+        with engine.connect() as connection:
+            return connection.execute(text(f"SELECT MAX(version) FROM {SCHEMA_VERSION_TABLE}")).scalar() or 0
+    except DBAPIError:
+        return 0
+
+
+def _sqlite_lock_path(engine: Engine) -> Optional[str]:
+    database = engine.url.database
+    if not database or database == ":memory:" or database.startswith("file:"):
+        return None
+    return f"{database}.migrate.lock"
+
+
+@contextmanager
+def _migration_lock(engine: Engine) -> Iterator[None]:
+    """多 worker 同时启动时串行化迁移。"""
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        # 会话级 advisory lock，跨越多个迁移事务，连接关闭前显式释放
+        with engine.connect() as connection:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+                connection.commit()
+        return
+
+    lock_path = _sqlite_lock_path(engine) if dialect == "sqlite" else None
+    if lock_path is None or fcntl is None:
+        yield
+        return
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def latest_version(migrations: Sequence[Migration] = MIGRATIONS) -> int:
+    return max((migration.version for migration in migrations), default=0)
+
+
+def run_migrations(
+    engine: Engine,
+    migrations: Sequence[Migration] = MIGRATIONS,
+    metadata: Optional[MetaData] = None,
+) -> List[int]:
+    """
+    执行尚未执行的迁移，返回本次执行的版本号。
+    传入 metadata 时在迁移前于锁内执行 create_all。某一版失败时停止，后续版本留到下次启动。
+    """
+    if get_current_version(engine) >= latest_version(migrations):
+        return []
+
+    with _migration_lock(engine):
+        if metadata is not None:
+            metadata.create_all(engine)
+        _ensure_version_table(engine)
+        # 等锁期间其他 worker 可能已执行完毕
+        applied = get_applied_versions(engine)
+        executed: List[int] = []
+        for migration in sorted(migrations, key=lambda item: item.version):
+            if migration.version in applied:
+                continue
+            try:
+                with engine.begin() as connection:
+                    migration.apply(connection)
+                    connection.execute(
+                        text(f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description) VALUES (:version, :description)"),
+                        {"version": migration.version, "description": migration.description},
+                    )
+            except IntegrityError as e:
+                # 未加锁的数据库上多 worker 同时启动：版本号已被另一个 worker 写入，本 worker 的事务整体回滚。
+                # 版本表里查不到该版本说明是迁移本身违反了约束，按失败处理
+                if migration.version in get_applied_versions(engine):
+                    logger.info("Migration %s already applied by another worker", migration.version)
+                    continue
+                logger.error("Migration %s (%s) failed: %s", migration.version, migration.description, e)
+                break
+            except Exception as e:
+                logger.error("Migration %s (%s) failed: %s", migration.version, migration.description, e)
+                break
+            executed.append(migration.version)
+            logger.info("Applied migration %s: %s", migration.version, migration.description)
+    return executed
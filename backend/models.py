@@ -1,7 +1,12 @@
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
+from pydantic import computed_field
 from sqlmodel import Field, Relationship, SQLModel
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Column, Text, UniqueConstraint
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+# 全文检索词向量：PostgreSQL 下为 tsvector 列（GIN 索引），其他数据库不使用、保持为空
+SearchVectorType = Text().with_variant(TSVECTOR(), "postgresql")
 
 SHANGHAI_TZ = timezone(timedelta(hours=8), name="Asia/Shanghai")
 
@@ -17,7 +22,7 @@ class MeetingAttendeeLink(SQLModel, table=True):
 
 # 用户 (参会人员) 模型
 class UserBase(SQLModel):
-    name: str # 姓名 (Real Name)
+    name: str = Field(index=True) # 姓名 (Real Name)，登录按姓名精确匹配
 
     email: Optional[str] = None
     phone: Optional[str] = Field(default=None, index=True)
@@ -30,6 +35,7 @@ class UserBase(SQLModel):
 
 class User(UserBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
+    name_initials: Optional[str] = None # 姓名拼音首字母 (检索用，写入时自动维护)
     
     # 反向关联: 该用户参加的所有会议
     meetings: List["Meeting"] = Relationship(back_populates="attendees", link_model=MeetingAttendeeLink)
@@ -61,10 +67,18 @@ class AttachmentBase(SQLModel):
     content_type: str = Field(default="application/octet-stream") # 文件类型
     sort_order: int = Field(default=0) # 排序权重
     meeting_id: Optional[int] = Field(default=None, foreign_key="meeting.id") # 所属会议
+    # 上传后后台预处理（services.attachment_preprocess）填充
+    page_count: Optional[int] = None # PDF 页数
+    preview_page_count: int = Field(default=0) # 已生成预览图的页数（从第 1 页起连续）
+    preprocess_status: str = Field(default="pending") # pending / processing / ready / failed / unsupported
+
+# 附件预览图地址，page 从 1 开始
+ATTACHMENT_PREVIEW_URL = "/static/previews/attachments/{attachment_id}/page_{page:04d}.webp"
 
 class Attachment(AttachmentBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     uploaded_at: datetime = Field(default_factory=datetime.now) # 上传时间
+    preprocess_started_at: Optional[datetime] = None # 认领预处理的时间，超时未完成的由其他 worker 重新认领
 
     # 反向关联: 所属会议对象
     meeting: Optional["Meeting"] = Relationship(back_populates="attachments")
@@ -73,6 +87,35 @@ class AttachmentRead(AttachmentBase):
     id: int
     uploaded_at: datetime
 
+    @computed_field
+    @property
+    def preview_url(self) -> Optional[str]:
+        """首页预览图，预处理完成前为 None"""
+        if self.preview_page_count <= 0:
+            return None
+        return ATTACHMENT_PREVIEW_URL.format(attachment_id=self.id, page=1)
+
+# 附件每页的文本（预处理抽取），供跳页与全文检索
+class AttachmentPage(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("attachment_id", "page_number", name="uq_attachmentpage_attachment_page"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    attachment_id: int = Field(foreign_key="attachment.id", index=True)
+    page_number: int # 从 1 开始
+    text: str = Field(default="", sa_column=Column(Text, nullable=False, default=""))
+    search_tokens: Optional[str] = Field(default=None, sa_column=Column(SearchVectorType, nullable=True))
+
+class AttachmentPageRead(SQLModel):
+    page_number: int
+    preview_url: Optional[str] = None
+    text: Optional[str] = None
+
+class AttachmentPagesResponse(SQLModel):
+    attachment_id: int
+    page_count: Optional[int] = None
+    preprocess_status: str
+    pages: List[AttachmentPageRead] = []
+
 # 会议模型
 class MeetingBase(SQLModel):
     title: str # 会议标题
@@ -99,6 +142,35 @@ class Meeting(MeetingBase, table=True):
     attendees: List[User] = Relationship(back_populates="meetings", link_model=MeetingAttendeeLink) # 参会人员列表
     attachments: List[Attachment] = Relationship(back_populates="meeting") # 附件列表
 
+# 会议全文检索文档 (仅 PostgreSQL 写入；与 meeting 表分开，列表查询不必读出词向量)
+class MeetingSearchDocument(SQLModel, table=True):
+    meeting_id: int = Field(primary_key=True, foreign_key="meeting.id")
+    search_tokens: Optional[str] = Field(default=None, sa_column=Column(SearchVectorType, nullable=True))
+
+class MeetingSearchPageHit(SQLModel):
+    attachment_id: int
+    display_name: str
+    page_number: int
+    snippet: Optional[str] = None
+    preview_url: Optional[str] = None
+
+class MeetingSearchHit(SQLModel):
+    id: int
+    title: str
+    meeting_type_id: Optional[int] = None
+    start_time: datetime
+    location: Optional[str] = None
+    speaker: Optional[str] = None
+    score: float
+    matched_fields: List[str] = [] # title / speaker / location / agenda / attachment
+    snippet: Optional[str] = None
+    attachment_hits: List[MeetingSearchPageHit] = []
+
+class MeetingSearchResponse(SQLModel):
+    query: str
+    total: int
+    items: List[MeetingSearchHit] = []
+
 class MeetingRead(MeetingBase):
     id: int
     created_at: datetime
@@ -147,6 +219,8 @@ class ReadingProgress(SQLModel, table=True):
     current_page: int       # 当前页码 (0-indexed)
     total_pages: int        # 总页数
     updated_at: datetime = Field(default_factory=datetime.now)
+    # 删除时间（墓碑）：删除只做标记，早于它的进度（其他 worker 缓冲区中的旧条目）落库时被忽略
+    deleted_at: Optional[datetime] = None
 
 
 # 签到/打卡模型（非强制，用户自主记录参会数据）
@@ -420,6 +494,14 @@ class MediaItem(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=datetime.now)
 
 
+class ImageSource(SQLModel):
+    """响应式图片的一个候选（srcset 项）：客户端取宽度够用的最小一项，同宽度优先 avif。"""
+    url: str
+    width: int
+    height: int
+    format: str
+
+
 class MediaItemRead(SQLModel):
     id: int
     kind: str
@@ -433,6 +515,11 @@ class MediaItemRead(SQLModel):
     size: str = ""
     previewUrl: str = ""
     thumbnailUrl: str = ""
+    # 视频转码完成后的 H.264 faststart MP4 / HLS 播放列表，未就绪时为空
+    optimizedUrl: str = ""
+    hlsUrl: str = ""
+    # 图片的多宽度 WebP / AVIF 衍生图，从小到大；尚未生成时为空
+    srcset: List[ImageSource] = []
     children_count: int = 0
 
 
@@ -450,3 +537,17 @@ class MediaItemUpdate(SQLModel):
 
 class MediaItemMove(SQLModel):
     parent_id: Optional[int] = None
+
+
+class MediaBulkDelete(SQLModel):
+    ids: List[int]
+
+
+class MediaBulkMove(SQLModel):
+    ids: List[int]
+    parent_id: Optional[int] = None
+
+
+class MediaBulkVisibility(SQLModel):
+    ids: List[int]
+    visible_on_android: bool
@@ -0,0 +1,153 @@
+"""
+每请求 SQL 查询预算与 N+1 检测 (调试 / CI 使用)
+QUERY_BUDGET_ENABLED=true 时在 database.engine 上挂 before_cursor_execute：
+- 统计每个请求执行的语句数，响应头附带 X-Query-Count
+- 按语句指纹（去掉字面量、折叠 IN 列表）计数，同一指纹重复达到阈值记为 N+1 嫌疑
+- 路由用 @query_budget(n) 声明预算；超出时记录警告，QUERY_BUDGET_STRICT=true 时直接抛错，
+  配合 TestClient 可让测试在回归时失败
+测试中也可直接使用 assert_query_budget(engine, n) 包住一段代码。
+"""
+import os
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+
+from sqlalchemy import event
+
+from logging_config import get_logger
+
+
+QUERY_BUDGET_ENABLED = os.getenv("QUERY_BUDGET_ENABLED", "false").lower() in ("true", "1", "yes")
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "false").lower() in ("true", "1", "yes")
+QUERY_N1_THRESHOLD = int(os.getenv("QUERY_N1_THRESHOLD", "3"))
+
+logger = get_logger("query_budget")
+
+_current_tracker: ContextVar[Optional["QueryTracker"]] = ContextVar("query_budget_tracker", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,?)+\)", re.IGNORECASE)
+_POSTCOMPILE_IN = re.compile(r"\(__\[POSTCOMPILE_\w+\]\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(statement: str) -> str:
+    """归一化 SQL，使只有参数不同的语句得到相同指纹。"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _POSTCOMPILE_IN.sub("(?)", normalized)
+    normalized = _IN_LIST.sub("IN (?)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+class QueryTracker:
+    __slots__ = ("count", "fingerprints")
+
+    def __init__(self):
+        self.count = 0
+        self.fingerprints: Counter = Counter()
+
+    def record(self, statement: str) -> None:
+        self.count += 1
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def n_plus_one_suspects(self, threshold: int = QUERY_N1_THRESHOLD) -> List[tuple]:
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count >= threshold]
+
+    def describe(self) -> str:
+        lines = [f"{self.count} queries"]
+        for sql, count in self.n_plus_one_suspects():
+            lines.append(f"  x{count}: {sql[:200]}")
+        return "\n".join(lines)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.record(statement)
+
+
+def instrument_engine(engine) -> None:
+    if getattr(engine, "_query_budget_instrumented", False):
+        return
+    engine._query_budget_instrumented = True
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def query_budget(max_queries: int) -> Callable:
+    """声明路由的查询预算，放在 @router.get(...) 之下。"""
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__query_budget__ = max_queries
+        return endpoint
+    return decorator
+
+
+@contextmanager
+def assert_query_budget(engine, max_queries: int):
+    """测试用：代码块内执行的语句数超过 max_queries 时抛出 QueryBudgetExceeded。"""
+    instrument_engine(engine)
+    tracker = QueryTracker()
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+    if tracker.count > max_queries:
+        raise QueryBudgetExceeded(f"query budget {max_queries} exceeded: {tracker.describe()}")
+
+
+class QueryBudgetMiddleware:
+    """纯 ASGI 中间件：统计本请求语句数，写入 X-Query-Count，并检查路由声明的预算。"""
+
+    def __init__(self, app, strict: bool = QUERY_BUDGET_STRICT):
+        self.app = app
+        self.strict = strict
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        tracker = QueryTracker()
+        token = _current_tracker.set(tracker)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(tracker.count).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_tracker.reset(token)
+
+        self._check(scope, tracker)
+
+    def _check(self, scope, tracker: QueryTracker) -> None:
+        route = scope.get("route")
+        route_path = getattr(route, "path", None) or scope.get("path")
+        suspects = tracker.n_plus_one_suspects()
+        if suspects:
+            logger.warning(
+                "Possible N+1 queries",
+                extra={"route": route_path, "query_count": tracker.count, "suspects": [count for _, count in suspects]},
+            )
+            for sql, count in suspects:
+                logger.debug("N+1 suspect x%s: %s", count, sql, extra={"route": route_path})
+
+        budget = getattr(scope.get("endpoint"), "__query_budget__", None)
+        if budget is None or tracker.count <= budget:
+            return
+        message = f"{scope['method']} {route_path} exceeded query budget {budget}: {tracker.describe()}"
+        if self.strict:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -1,11 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from sqlmodel import Session
 from pydantic import BaseModel
 from typing import Optional
 from database import get_session
-from models import User
-
-from datetime import datetime
+from services.auth_service import record_login, resolve_login_profile
 
 # 创建路由器，前缀为 /auth
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -36,42 +34,9 @@ def login(request: LoginRequest, session: Session = Depends(get_session)):
     if not q:
         raise HTTPException(status_code=400, detail="请输入姓名或手机号")
 
-    # 查找匹配的用户 (姓名或手机号)
-    statement = select(User).where((User.name == q) | (User.phone == q))
-    results = session.exec(statement).all()
-    
-    if not results:
-        raise HTTPException(status_code=401, detail="用户名或密码错误")
-
-    if len(results) > 1:
-        # 如果有多个人匹配 (通常是重名)
-        # 检查是否有完全匹配手机号的 (手机号理论上唯一)
-        exact_phone = [u for u in results if u.phone == q]
-        if len(exact_phone) == 1:
-            user = exact_phone[0]
-        else:
-            # 都是重名且输入的不是手机号 OR 手机号也重复(数据错误)
-            raise HTTPException(
-                status_code=300, 
-                detail=f"存在重名用户 '{q}'，请使用手机号登录"
-            )
-    else:
-        # 只有一个匹配
-        user = results[0]
+    profile = resolve_login_profile(q, session)
 
-    # Update last_login
-    user.last_login = datetime.now()
-    session.add(user)
-    session.commit()
-    session.refresh(user)
+    # last_login 交给后台合并批量写入，登录请求本身不再提交事务
+    record_login(profile["user_id"])
 
-    return LoginResponse(
-        user_id=user.id,
-        name=user.name,
-        department=user.department,
-        district=user.district,
-        phone=user.phone,
-        email=user.email,
-        role=user.position,
-        token="demo-token-12345"
-    )
+    return LoginResponse(**profile, token="demo-token-12345")
@@ -8,6 +8,7 @@ from zoneinfo import ZoneInfo
 
 from database import get_session
 from models import CheckIn, Meeting
+from services.change_versions import bump_meeting
 
 router = APIRouter(prefix="/checkin", tags=["签到"])
 SHANGHAI_TZ = ZoneInfo("Asia/Shanghai")
@@ -69,6 +70,7 @@ def check_in(req: CheckInRequest, session: Session = Depends(get_session)):
     session.add(checkin)
     session.commit()
     session.refresh(checkin)
+    bump_meeting(checkin.meeting_id)
     return CheckInResponse(
         **checkin.dict(),
         meeting_title=meeting.title,
@@ -100,6 +102,7 @@ def makeup_check_in(req: MakeupRequest, session: Session = Depends(get_session))
     session.add(checkin)
     session.commit()
     session.refresh(checkin)
+    bump_meeting(checkin.meeting_id)
     return CheckInResponse(
         **checkin.dict(),
         meeting_title=meeting.title,
@@ -114,8 +117,10 @@ def cancel_check_in(checkin_id: int, user_id: int, session: Session = Depends(ge
         raise HTTPException(status_code=404, detail="签到记录不存在")
     if checkin.user_id != user_id:
         raise HTTPException(status_code=403, detail="Forbidden")
+    meeting_id = checkin.meeting_id
     session.delete(checkin)
     session.commit()
+    bump_meeting(meeting_id)
     return {"message": "已取消打卡"}
 
 
@@ -9,6 +9,7 @@ from sqlmodel import Session, select
 
 from database import get_session
 from models import MeetingType, SystemSetting
+from services.change_versions import bump_shared
 
 router = APIRouter(prefix="/cover_center", tags=["cover_center"])
 
@@ -150,6 +151,8 @@ def upload_common_cover(
 
     with open(file_path, "wb") as output:
         output.write(content)
+    # 随机封面池变化会改变会议列表的 card_image_url
+    bump_shared()
 
     return _build_pool_item(file_path, "/static/meeting_backgrounds/common")
 
@@ -157,6 +160,7 @@ def upload_common_cover(
 @router.delete("/common/{filename}")
 def delete_common_cover(filename: str):
     _delete_pool_file(COMMON_POOL_DIR, filename)
+    bump_shared()
     return {"ok": True}
 
 
@@ -174,6 +178,7 @@ def upload_type_random_cover(
 
     with open(file_path, "wb") as output:
         output.write(content)
+    bump_shared()
 
     return _build_pool_item(file_path, f"/static/meeting_backgrounds/{meeting_type.name}")
 
@@ -187,4 +192,5 @@ def delete_type_random_cover(
     meeting_type = _get_type_or_404(session, type_id)
     directory = _get_type_pool_dir(meeting_type)
     _delete_pool_file(directory, filename)
+    bump_shared()
     return {"ok": True}
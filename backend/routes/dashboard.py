@@ -71,6 +71,7 @@ def get_stats(user_id: int, range: str = "month", session: Session = Depends(get
     reading_count = session.exec(
         select(func.count(ReadingProgress.id)).where(
             and_(ReadingProgress.user_id == user_id,
+                 ReadingProgress.deleted_at.is_(None),
                  ReadingProgress.updated_at >= start_dt,
                  ReadingProgress.updated_at <= end_dt)
         )
@@ -3,7 +3,7 @@ from sqlmodel import Session, select, SQLModel
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from database import get_session
+from database import AsyncSession, get_async_session
 from models import Device, DeviceRead, DeviceBase, DeviceUserBinding, User
 
 router = APIRouter(prefix="/devices", tags=["devices"])
@@ -45,25 +45,11 @@ def _sync_device_user_binding(session: Session, device_id: str, user_id: Optiona
         )
     )
 
-@router.post("/heartbeat", response_model=DeviceRead)
-async def device_heartbeat(
-    device_data: DeviceHeartbeatInput,
-    request: Request,
-    session: Session = Depends(get_session)
-):
-    """
-    设备心跳上报。如果设备不存在则创建，存在则更新状态。
-    """
+
+# 设备接口都是 async 路由：数据库操作写成同步函数，经 session.run_sync 执行，不阻塞事件循环
+def _record_heartbeat(session: Session, device_data: DeviceHeartbeatInput, final_ip: str) -> Device:
     statement = select(Device).where(Device.device_id == device_data.device_id)
     existing_device = session.exec(statement).first()
-    
-    # 获取IP地址: 优先使用客户端上报的局域网IP，如果没有则使用连接IP
-    client_ip = request.client.host
-    if "x-forwarded-for" in request.headers:
-        # 取最左侧的第一个 IP，即客户端真实 IP（信任链依赖 Nginx 正确配置 proxy_set_header）
-        client_ip = request.headers["x-forwarded-for"].split(",")[0].strip()
-
-    final_ip = device_data.ip_address if device_data.ip_address else client_ip
 
     if existing_device:
         existing_device.last_active_at = datetime.now()
@@ -102,32 +88,59 @@ async def device_heartbeat(
         session.refresh(new_device)
         return new_device
 
+
+def _get_device_or_404(session: Session, device_id: int) -> Device:
+    device = session.get(Device, device_id)
+    if not device:
+        raise HTTPException(status_code=404, detail="Device not found")
+    return device
+
+
+def _set_device_status(session: Session, device_id: int, status: str) -> None:
+    device = _get_device_or_404(session, device_id)
+    device.status = status
+    session.add(device)
+    session.commit()
+
+
+@router.post("/heartbeat", response_model=DeviceRead)
+async def device_heartbeat(
+    device_data: DeviceHeartbeatInput,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """
+    设备心跳上报。如果设备不存在则创建，存在则更新状态。
+    """
+    # 获取IP地址: 优先使用客户端上报的局域网IP，如果没有则使用连接IP
+    client_ip = request.client.host
+    if "x-forwarded-for" in request.headers:
+        # 取最左侧的第一个 IP，即客户端真实 IP（信任链依赖 Nginx 正确配置 proxy_set_header）
+        client_ip = request.headers["x-forwarded-for"].split(",")[0].strip()
+
+    final_ip = device_data.ip_address if device_data.ip_address else client_ip
+    return await session.run_sync(_record_heartbeat, device_data, final_ip)
+
 @router.get("/", response_model=List[DeviceRead])
 async def list_devices(
     skip: int = 0, 
     limit: int = 100, 
     filter_active: bool = False,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     query = select(Device).order_by(Device.last_active_at.desc())
     if filter_active:
         # 简单过滤: 状态为 active 且最近活跃? 暂时只看 status 字段
         query = query.where(Device.status == "active")
         
-    devices = session.exec(query.offset(skip).limit(limit)).all()
-    return devices
+    return await session.run_sync(lambda sync_session: sync_session.exec(query.offset(skip).limit(limit)).all())
 
 
-@router.post("/offline")
-async def report_device_offline(
-    payload: DeviceOfflineInput,
-    session: Session = Depends(get_session)
-):
-    """Client proactively reports offline state."""
-    statement = select(Device).where(Device.device_id == payload.device_id)
+def _mark_device_offline(session: Session, device_id: str) -> None:
+    statement = select(Device).where(Device.device_id == device_id)
     device = session.exec(statement).first()
     if not device:
-        return {"ok": True}
+        return
 
     forced_offline_time = datetime.now() - timedelta(minutes=6)
     if device.last_active_at > forced_offline_time:
@@ -135,58 +148,59 @@ async def report_device_offline(
         session.add(device)
         session.commit()
 
+
+@router.post("/offline")
+async def report_device_offline(
+    payload: DeviceOfflineInput,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Client proactively reports offline state."""
+    await session.run_sync(_mark_device_offline, payload.device_id)
     return {"ok": True}
 
-@router.delete("/{device_id}")
-async def delete_device(device_id: int, session: Session = Depends(get_session)):
-    device = session.get(Device, device_id)
-    if not device:
-        raise HTTPException(status_code=404, detail="Device not found")
-    session.delete(device)
+
+def _delete_device(session: Session, device_id: int) -> None:
+    session.delete(_get_device_or_404(session, device_id))
     session.commit()
+
+
+@router.delete("/{device_id}")
+async def delete_device(device_id: int, session: AsyncSession = Depends(get_async_session)):
+    await session.run_sync(_delete_device, device_id)
     return {"ok": True}
 
 @router.put("/{device_id}/block")
-async def block_device(device_id: int, session: Session = Depends(get_session)):
-    device = session.get(Device, device_id)
-    if not device:
-        raise HTTPException(status_code=404, detail="Device not found")
-    device.status = "blocked"
-    session.add(device)
-    session.commit()
+async def block_device(device_id: int, session: AsyncSession = Depends(get_async_session)):
+    await session.run_sync(_set_device_status, device_id, "blocked")
     return {"ok": True}
 
 class DeviceUpdate(SQLModel):
     alias: Optional[str] = None
     name: Optional[str] = None
 
-@router.put("/{device_id}", response_model=DeviceRead)
-async def update_device(
-    device_id: int, 
-    device_update: DeviceUpdate,
-    session: Session = Depends(get_session)
-):
-    device = session.get(Device, device_id)
-    if not device:
-        raise HTTPException(status_code=404, detail="Device not found")
-    
+
+def _update_device(session: Session, device_id: int, device_update: DeviceUpdate) -> Device:
+    device = _get_device_or_404(session, device_id)
     if device_update.alias is not None:
         device.alias = device_update.alias
-        
+
     session.add(device)
     session.commit()
     session.refresh(device)
     return device
 
+
+@router.put("/{device_id}", response_model=DeviceRead)
+async def update_device(
+    device_id: int, 
+    device_update: DeviceUpdate,
+    session: AsyncSession = Depends(get_async_session)
+):
+    return await session.run_sync(_update_device, device_id, device_update)
+
 @router.put("/{device_id}/unblock")
-async def unblock_device(device_id: int, session: Session = Depends(get_session)):
-    device = session.get(Device, device_id)
-    if not device:
-        raise HTTPException(status_code=404, detail="Device not found")
-    device.status = "active"
-    session.add(device)
-    session.commit()
-    session.refresh(device)
+async def unblock_device(device_id: int, session: AsyncSession = Depends(get_async_session)):
+    await session.run_sync(_set_device_status, device_id, "active")
     return {"ok": True}
 
 # ============= 设备指令相关接口 =============
@@ -198,12 +212,7 @@ class BatchCommandRequest(BaseModel):
     command_type: str  # "update_app", "restart"
     payload: Optional[str] = None
 
-@router.post("/commands", response_model=List[DeviceCommandRead])
-async def send_batch_commands(
-    request: BatchCommandRequest,
-    session: Session = Depends(get_session)
-):
-    """批量向设备发送指令"""
+def _create_commands(session: Session, request: BatchCommandRequest) -> List[DeviceCommand]:
     commands = []
     for device_id in request.device_ids:
         cmd = DeviceCommand(
@@ -218,31 +227,43 @@ async def send_batch_commands(
         session.refresh(cmd)
     return commands
 
+
+def _ack_command(session: Session, command_id: int) -> None:
+    cmd = session.get(DeviceCommand, command_id)
+    if not cmd:
+        raise HTTPException(status_code=404, detail="Command not found")
+    cmd.status = "acked"
+    cmd.acked_at = datetime.now()
+    session.add(cmd)
+    session.commit()
+
+
+@router.post("/commands", response_model=List[DeviceCommandRead])
+async def send_batch_commands(
+    request: BatchCommandRequest,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """批量向设备发送指令"""
+    return await session.run_sync(_create_commands, request)
+
 @router.get("/{device_id}/commands", response_model=List[DeviceCommandRead])
 async def get_device_commands(
     device_id: str,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """设备查询待执行的指令"""
     statement = select(DeviceCommand).where(
         DeviceCommand.device_id == device_id,
         DeviceCommand.status == "pending"
     ).order_by(DeviceCommand.created_at.asc())
-    commands = session.exec(statement).all()
-    return commands
+    return await session.run_sync(lambda sync_session: sync_session.exec(statement).all())
 
 @router.put("/commands/{command_id}/ack")
 async def ack_command(
     command_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """设备确认执行完成"""
-    cmd = session.get(DeviceCommand, command_id)
-    if not cmd:
-        raise HTTPException(status_code=404, detail="Command not found")
-    cmd.status = "acked"
-    cmd.acked_at = datetime.now()
-    session.add(cmd)
-    session.commit()
+    await session.run_sync(_ack_command, command_id)
     return {"ok": True}
 
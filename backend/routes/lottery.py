@@ -9,7 +9,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlmodel import Session, select
 
-from database import get_session
+from database import AsyncSession, get_async_session, get_session
+from fast_json import FastJSONResponse
 from models import Lottery, LotteryParticipant, LotteryWinner, User
 from services.lottery_service import (
     LOTTERY_ROUND_DRAFT,
@@ -38,6 +39,7 @@ from services.lottery_service import (
     serialize_winners,
 )
 from socket_manager import broadcast_lottery_session_change
+from query_budget import query_budget
 
 router = APIRouter(prefix="/lottery", tags=["lottery"])
 
@@ -66,8 +68,15 @@ class LotteryMoveRequest(BaseModel):
     direction: str
 
 
-async def _broadcast_snapshot(meeting_id: int, session: Session) -> dict:
-    snapshot = build_session_snapshot(meeting_id, session)
+# 写操作是现场大屏与平板的实时接口，走异步会话：
+# 数据库操作写成 _apply_* 同步函数由 session.run_sync 执行，提交后再构建快照并广播
+
+def _load_snapshot(session: Session, meeting_id: int, user_id: Optional[int] = None) -> dict:
+    return build_session_snapshot(meeting_id, session, user_id=user_id)
+
+
+async def _broadcast_snapshot(meeting_id: int, session: AsyncSession) -> dict:
+    snapshot = await session.run_sync(_load_snapshot, meeting_id)
     await broadcast_lottery_session_change(meeting_id, snapshot)
     return snapshot
 
@@ -159,16 +168,14 @@ def get_lottery_rounds(meeting_id: int, session: Session = Depends(get_session))
 
 
 @router.get("/{meeting_id}/session")
+@query_budget(6)
 def get_lottery_session(meeting_id: int, user_id: Optional[int] = None, session: Session = Depends(get_session)):
-    return build_session_snapshot(meeting_id, session, user_id=user_id)
+    return FastJSONResponse(build_session_snapshot(meeting_id, session, user_id=user_id))
 
 
-@router.post("/{meeting_id}/round")
-async def create_lottery_round(
-    meeting_id: int,
-    request: LotteryCreateRequest,
-    session: Session = Depends(get_session),
-):
+
+
+def _apply_create_round(session: Session, meeting_id: int, request: LotteryCreateRequest) -> dict:
     ensure_meeting_or_404(meeting_id, session)
     if not request.title.strip():
         raise HTTPException(status_code=400, detail="轮次名称不能为空")
@@ -192,17 +199,21 @@ async def create_lottery_round(
     session.add(round_item)
     session.commit()
     session.refresh(round_item)
-    snapshot = build_round_payload(round_item)
+    return build_round_payload(round_item)
+
+
+@router.post("/{meeting_id}/round")
+async def create_lottery_round(
+    meeting_id: int,
+    request: LotteryCreateRequest,
+    session: AsyncSession = Depends(get_async_session),
+):
+    snapshot = await session.run_sync(_apply_create_round, meeting_id, request)
     await _broadcast_snapshot(meeting_id, session)
     return snapshot
 
 
-@router.put("/round/{lottery_id}")
-async def update_lottery_round(
-    lottery_id: int,
-    request: LotteryRoundUpdateRequest,
-    session: Session = Depends(get_session),
-):
+def _apply_update_round(session: Session, lottery_id: int, request: LotteryRoundUpdateRequest) -> tuple:
     round_item = ensure_round_or_404(lottery_id, session)
     if round_status(round_item) == LOTTERY_ROUND_FINISHED:
         raise HTTPException(status_code=400, detail="已完成轮次不允许编辑")
@@ -223,13 +234,21 @@ async def update_lottery_round(
     session.add(round_item)
     session.commit()
     session.refresh(round_item)
-    snapshot = build_round_payload(round_item)
-    await _broadcast_snapshot(round_item.meeting_id, session)
+    return round_item.meeting_id, build_round_payload(round_item)
+
+
+@router.put("/round/{lottery_id}")
+async def update_lottery_round(
+    lottery_id: int,
+    request: LotteryRoundUpdateRequest,
+    session: AsyncSession = Depends(get_async_session),
+):
+    meeting_id, snapshot = await session.run_sync(_apply_update_round, lottery_id, request)
+    await _broadcast_snapshot(meeting_id, session)
     return snapshot
 
 
-@router.delete("/round/{lottery_id}")
-async def delete_lottery_round(lottery_id: int, session: Session = Depends(get_session)):
+def _apply_delete_round(session: Session, lottery_id: int) -> int:
     round_item = ensure_round_or_404(lottery_id, session)
     meeting_id = round_item.meeting_id
     lottery_session = ensure_lottery_session(meeting_id, session)
@@ -265,61 +284,70 @@ async def delete_lottery_round(lottery_id: int, session: Session = Depends(get_s
         dirty = True
     if dirty:
         session.commit()
+    return meeting_id
+
+
+@router.delete("/round/{lottery_id}")
+async def delete_lottery_round(lottery_id: int, session: AsyncSession = Depends(get_async_session)):
+    meeting_id = await session.run_sync(_apply_delete_round, lottery_id)
     await _broadcast_snapshot(meeting_id, session)
     return {"ok": True}
 
 
-@router.post("/{meeting_id}/participants/join")
-async def join_lottery_pool(
+def _apply_participant_change(
+    session: Session,
     meeting_id: int,
-    request: LotteryParticipantActionRequest,
-    session: Session = Depends(get_session),
-):
+    user_id: int,
+    joined: bool,
+    locked_detail: Optional[str] = None,
+) -> None:
+    """加入 / 退出抽签池；locked_detail 不为空时表示自助操作，抽签开始后拒绝。"""
     ensure_meeting_or_404(meeting_id, session)
     lottery_session = ensure_lottery_session(meeting_id, session)
-    if is_self_service_locked(lottery_session, get_rounds(meeting_id, session)):
-        raise HTTPException(status_code=400, detail="抽签已开始，当前不能加入抽签池")
+    if locked_detail and is_self_service_locked(lottery_session, get_rounds(meeting_id, session)):
+        raise HTTPException(status_code=400, detail=locked_detail)
 
-    _upsert_participant(meeting_id, request.user_id, session)
+    if joined:
+        _upsert_participant(meeting_id, user_id, session)
+    else:
+        _mark_participant_left(meeting_id, user_id, session)
     _sync_session_after_participant_change(meeting_id, lottery_session, session)
     session.commit()
 
+
+@router.post("/{meeting_id}/participants/join")
+async def join_lottery_pool(
+    meeting_id: int,
+    request: LotteryParticipantActionRequest,
+    session: AsyncSession = Depends(get_async_session),
+):
+    await session.run_sync(
+        _apply_participant_change, meeting_id, request.user_id, True, "抽签已开始，当前不能加入抽签池"
+    )
     await _broadcast_snapshot(meeting_id, session)
-    return build_session_snapshot(meeting_id, session, user_id=request.user_id)
+    return await session.run_sync(_load_snapshot, meeting_id, request.user_id)
 
 
 @router.post("/{meeting_id}/participants/quit")
 async def quit_lottery_pool(
     meeting_id: int,
     request: LotteryParticipantActionRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    ensure_meeting_or_404(meeting_id, session)
-    lottery_session = ensure_lottery_session(meeting_id, session)
-    if is_self_service_locked(lottery_session, get_rounds(meeting_id, session)):
-        raise HTTPException(status_code=400, detail="抽签已开始，当前不能退出抽签池")
-
-    _mark_participant_left(meeting_id, request.user_id, session)
-    _sync_session_after_participant_change(meeting_id, lottery_session, session)
-    session.commit()
-
+    await session.run_sync(
+        _apply_participant_change, meeting_id, request.user_id, False, "抽签已开始，当前不能退出抽签池"
+    )
     await _broadcast_snapshot(meeting_id, session)
-    return build_session_snapshot(meeting_id, session, user_id=request.user_id)
+    return await session.run_sync(_load_snapshot, meeting_id, request.user_id)
 
 
 @router.post("/{meeting_id}/participants/admin/add")
 async def admin_add_lottery_participant(
     meeting_id: int,
     request: LotteryParticipantActionRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    ensure_meeting_or_404(meeting_id, session)
-    lottery_session = ensure_lottery_session(meeting_id, session)
-
-    _upsert_participant(meeting_id, request.user_id, session)
-    _sync_session_after_participant_change(meeting_id, lottery_session, session)
-    session.commit()
-
+    await session.run_sync(_apply_participant_change, meeting_id, request.user_id, True)
     return await _broadcast_snapshot(meeting_id, session)
 
 
@@ -327,27 +355,16 @@ async def admin_add_lottery_participant(
 async def admin_remove_lottery_participant(
     meeting_id: int,
     request: LotteryParticipantActionRequest,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    ensure_meeting_or_404(meeting_id, session)
-    lottery_session = ensure_lottery_session(meeting_id, session)
-
-    _mark_participant_left(meeting_id, request.user_id, session)
-    _sync_session_after_participant_change(meeting_id, lottery_session, session)
-    session.commit()
-
+    await session.run_sync(_apply_participant_change, meeting_id, request.user_id, False)
     return await _broadcast_snapshot(meeting_id, session)
 
 
-@router.post("/{meeting_id}/prepare")
-async def prepare_lottery_round(
-    meeting_id: int,
-    request: LotteryPrepareRequest,
-    session: Session = Depends(get_session),
-):
+def _apply_prepare_round(session: Session, meeting_id: int, lottery_id: int) -> None:
     ensure_meeting_or_404(meeting_id, session)
     lottery_session = ensure_lottery_session(meeting_id, session)
-    round_item = ensure_round_or_404(request.lottery_id, session)
+    round_item = ensure_round_or_404(lottery_id, session)
     if round_item.meeting_id != meeting_id:
         raise HTTPException(status_code=400, detail="轮次与会议不匹配")
 
@@ -369,15 +386,18 @@ async def prepare_lottery_round(
     session.add(lottery_session)
     session.commit()
 
+
+@router.post("/{meeting_id}/prepare")
+async def prepare_lottery_round(
+    meeting_id: int,
+    request: LotteryPrepareRequest,
+    session: AsyncSession = Depends(get_async_session),
+):
+    await session.run_sync(_apply_prepare_round, meeting_id, request.lottery_id)
     return await _broadcast_snapshot(meeting_id, session)
 
 
-@router.post("/round/{lottery_id}/move")
-async def move_lottery_round(
-    lottery_id: int,
-    request: LotteryMoveRequest,
-    session: Session = Depends(get_session),
-):
+def _apply_move_round(session: Session, lottery_id: int, direction: str) -> int:
     round_item = ensure_round_or_404(lottery_id, session)
     lottery_session = ensure_lottery_session(round_item.meeting_id, session)
 
@@ -387,7 +407,7 @@ async def move_lottery_round(
         raise HTTPException(status_code=400, detail="已完成轮次不允许调整顺序")
     if lottery_session.current_round_id == round_item.id:
         raise HTTPException(status_code=400, detail="当前轮次不允许调整顺序")
-    if request.direction not in {"up", "down"}:
+    if direction not in {"up", "down"}:
         raise HTTPException(status_code=400, detail="移动方向无效")
 
     rounds = get_rounds(round_item.meeting_id, session)
@@ -398,7 +418,7 @@ async def move_lottery_round(
     if current_index is None:
         raise HTTPException(status_code=404, detail="轮次不存在")
 
-    target_index = current_index - 1 if request.direction == "up" else current_index + 1
+    target_index = current_index - 1 if direction == "up" else current_index + 1
     if target_index < 0 or target_index >= len(rounds):
         raise HTTPException(status_code=400, detail="当前轮次已无法继续移动")
 
@@ -412,12 +432,20 @@ async def move_lottery_round(
     session.add(round_item)
     session.add(target_round)
     session.commit()
+    return round_item.meeting_id
 
-    return await _broadcast_snapshot(round_item.meeting_id, session)
 
+@router.post("/round/{lottery_id}/move")
+async def move_lottery_round(
+    lottery_id: int,
+    request: LotteryMoveRequest,
+    session: AsyncSession = Depends(get_async_session),
+):
+    meeting_id = await session.run_sync(_apply_move_round, lottery_id, request.direction)
+    return await _broadcast_snapshot(meeting_id, session)
 
-@router.post("/{meeting_id}/roll")
-async def start_lottery_roll(meeting_id: int, session: Session = Depends(get_session)):
+
+def _apply_start_roll(session: Session, meeting_id: int) -> None:
     ensure_meeting_or_404(meeting_id, session)
     lottery_session = ensure_lottery_session(meeting_id, session)
     rounds = get_rounds(meeting_id, session)
@@ -440,11 +468,14 @@ async def start_lottery_roll(meeting_id: int, session: Session = Depends(get_ses
     session.add(lottery_session)
     session.commit()
 
+
+@router.post("/{meeting_id}/roll")
+async def start_lottery_roll(meeting_id: int, session: AsyncSession = Depends(get_async_session)):
+    await session.run_sync(_apply_start_roll, meeting_id)
     return await _broadcast_snapshot(meeting_id, session)
 
 
-@router.post("/{meeting_id}/stop")
-async def stop_lottery_roll(meeting_id: int, session: Session = Depends(get_session)):
+def _apply_stop_roll(session: Session, meeting_id: int) -> None:
     ensure_meeting_or_404(meeting_id, session)
     lottery_session = ensure_lottery_session(meeting_id, session)
     if lottery_session.session_status != LOTTERY_SESSION_ROLLING:
@@ -501,11 +532,14 @@ async def stop_lottery_roll(meeting_id: int, session: Session = Depends(get_sess
     session.add(lottery_session)
     session.commit()
 
+
+@router.post("/{meeting_id}/stop")
+async def stop_lottery_roll(meeting_id: int, session: AsyncSession = Depends(get_async_session)):
+    await session.run_sync(_apply_stop_roll, meeting_id)
     return await _broadcast_snapshot(meeting_id, session)
 
 
-@router.post("/{meeting_id}/reset")
-async def reset_lottery_session(meeting_id: int, session: Session = Depends(get_session)):
+def _apply_reset_session(session: Session, meeting_id: int) -> None:
     ensure_meeting_or_404(meeting_id, session)
     lottery_session = ensure_lottery_session(meeting_id, session)
 
@@ -532,4 +566,8 @@ async def reset_lottery_session(meeting_id: int, session: Session = Depends(get_
     session.add(lottery_session)
     session.commit()
 
+
+@router.post("/{meeting_id}/reset")
+async def reset_lottery_session(meeting_id: int, session: AsyncSession = Depends(get_async_session)):
+    await session.run_sync(_apply_reset_session, meeting_id)
     return await _broadcast_snapshot(meeting_id, session)
@@ -1,20 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Form
+from fastapi.responses import JSONResponse, Response
 from sqlmodel import Session, select
-from sqlalchemy import func
+from sqlalchemy import func, update
+from pydantic import TypeAdapter
 from typing import List, Optional, Dict, Union
 from pathlib import Path
 from datetime import datetime
+from functools import partial
+import hashlib
 import uuid
 import os
 import shutil
 import subprocess
 
-from database import get_session
-from models import MediaItem, MediaItemRead, MediaItemPage, MediaItemUpdate, MediaItemMove
-from socket_manager import sio, broadcast_media_changed
+from database import engine, get_session, open_async_session
+from models import (
+    ImageSource,
+    MediaBulkDelete,
+    MediaBulkMove,
+    MediaBulkVisibility,
+    MediaItem,
+    MediaItemMove,
+    MediaItemPage,
+    MediaItemRead,
+    MediaItemUpdate,
+)
+from services import image_derivatives, media_tree, video_transcode
+from services.background_jobs import background_jobs, remove_files_later
+from services.change_versions import MEDIA_SCOPE, bump_media, change_versions
+from services.media_feed import feed_version, media_feed_cache
+from socket_manager import broadcast_media_changed, schedule_broadcast
+from logging_config import get_logger
+from metrics import timed_thumbnail
+from fast_json import model_json_response
+from http_cache import etag_matches
 
 router = APIRouter(prefix="/media", tags=["media"])
+logger = get_logger("media")
 
 MEDIA_UPLOAD_DIR = Path("uploads/media")
 MEDIA_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -36,16 +58,18 @@ ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/gif", "image/webp", "im
 ALLOWED_VIDEO_TYPES = {"video/mp4", "video/quicktime", "video/x-msvideo", "video/webm", "video/x-matroska"}
 ALLOWED_TYPES = ALLOWED_IMAGE_TYPES | ALLOWED_VIDEO_TYPES
 
+# 批量操作单次最多处理的条目数
+MEDIA_BULK_MAX_ITEMS = int(os.getenv("MEDIA_BULK_MAX_ITEMS", "1000"))
 
-def _notify_media_changed(action: str, payload: Optional[dict] = None) -> None:
-    try:
-        sio.start_background_task(
-            broadcast_media_changed,
-            action,
-            payload or {}
-        )
-    except Exception as e:
-        print(f"[Socket.IO] failed to broadcast media_changed: {e}")
+
+def _notify_media_changed(action: str, payload: Optional[dict] = None, item: Optional[MediaItemRead] = None) -> None:
+    """item 为变化后的完整条目，客户端可直接就地更新，无需重新拉取列表。"""
+    # 调用方均在提交之后通知：先递增版本号，安卓媒体 feed 的缓存随之失效
+    bump_media()
+    payload = dict(payload or {})
+    if item is not None:
+        payload["item"] = item
+    schedule_broadcast(broadcast_media_changed, action, payload)
 
 
 def _format_size(size: int) -> str:
@@ -77,14 +101,14 @@ def _build_media_thumbnail(source_path: Path) -> str:
             return f"/static/thumbnails/media/{thumb_name}"
 
         resample = PILImage.Resampling.LANCZOS if hasattr(PILImage, "Resampling") else PILImage.LANCZOS
-        with PILImage.open(source) as img:
+        with timed_thumbnail("media_image"), PILImage.open(source) as img:
             img = ImageOps.exif_transpose(img).convert("RGB")
             fitted = ImageOps.fit(img, MEDIA_THUMB_SIZE, method=resample)
             fitted.save(thumb_path, format="WEBP", quality=MEDIA_THUMB_QUALITY, method=6)
 
         return f"/static/thumbnails/media/{thumb_name}"
     except Exception as e:
-        print(f"[media-thumb] failed to build thumbnail for {source_path}: {e}")
+        logger.warning("Failed to build thumbnail for %s: %s", source_path, e)
         return ""
 
 
@@ -121,14 +145,15 @@ def _build_video_thumbnail(source_path: Path) -> str:
             "4",
             str(thumb_path),
         ]
-        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=20)
+        with timed_thumbnail("media_video"):
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=20)
         if result.returncode != 0:
             return ""
         if thumb_path.exists():
             return f"/static/thumbnails/media/{thumb_name}"
         return ""
     except Exception as e:
-        print(f"[media-thumb] failed to build video thumbnail for {source_path}: {e}")
+        logger.warning("Failed to build video thumbnail for %s: %s", source_path, e)
         return ""
 
 
@@ -139,12 +164,17 @@ def _to_read(
 ) -> MediaItemRead:
     preview = ""
     thumbnail = ""
+    optimized = ""
+    hls = ""
+    srcset: List[ImageSource] = []
     if item.filename and item.kind in {"image", "video"}:
         preview = f"/static/media/{item.filename}"
         if item.kind == "image":
             thumbnail = _build_media_thumbnail(MEDIA_UPLOAD_DIR / item.filename)
+            srcset = _image_srcset(item)
         elif item.kind == "video":
             thumbnail = _build_video_thumbnail(MEDIA_UPLOAD_DIR / item.filename)
+            optimized, hls = video_transcode.optimized_urls(item.filename)
     children_count = 0
     if item.kind == "folder":
         if children_counts is not None and item.id is not None:
@@ -166,21 +196,98 @@ def _to_read(
         size=_format_size(item.file_size) if item.kind != "folder" else "",
         previewUrl=preview,
         thumbnailUrl=thumbnail,
+        optimizedUrl=optimized,
+        hlsUrl=hls,
+        srcset=srcset,
         children_count=children_count,
     )
 
 
+def _remove_media_derivatives(names: tuple) -> None:
+    video_transcode.remove_derivatives(names)
+    remove_files_later(
+        str(path) for name in names for path in image_derivatives.derivative_files(MEDIA_UPLOAD_DIR / name)
+    )
+
+
+def _remove_media_files_later(filenames: List[Optional[str]]) -> None:
+    """删除原文件及转码产物、响应式衍生图。"""
+    names = tuple(sorted({name for name in filenames if name}))
+    remove_files_later(str(MEDIA_UPLOAD_DIR / name) for name in names)
+    if names:
+        background_jobs.submit(("media_derivatives", names), _remove_media_derivatives, names)
+
+
+# ---------- 视频转码与响应式衍生图 ----------
+# 视频转码（services.video_transcode）与图片多宽度衍生图（services.image_derivatives）都在后台生成，
+# 完成后推送 updated（带 optimizedUrl / srcset），并使媒体 feed 缓存失效。
+
+def _on_derivatives_ready(item_id: int) -> None:
+    with Session(engine) as session:
+        item = session.get(MediaItem, item_id)
+        if item is None:
+            return
+        read = _to_read(item, session)
+    _notify_media_changed(
+        "updated",
+        {
+            "item_id": item.id,
+            "parent_id": item.parent_id,
+            "previous_parent_id": item.parent_id,
+            "kind": item.kind,
+            "visible_on_android": item.visible_on_android,
+        },
+        item=read,
+    )
+
+
+def _enqueue_video_transcode(item_id: int, source_path: Path) -> bool:
+    return video_transcode.enqueue_transcode(source_path, partial(_on_derivatives_ready, item_id))
+
+
+def _image_srcset(item: MediaItem) -> List[ImageSource]:
+    """
+    已生成的衍生图；缺失时后台补生成（历史图片在首次被浏览时生成）。
+    补生成完成只递增媒体版本号让 feed 缓存失效，不逐张推送，避免整库补生成时刷屏；新上传的图片由上传接口推送。
+    """
+    derivatives = image_derivatives.ready_derivatives(MEDIA_UPLOAD_DIR / item.filename, bump_media)
+    return [
+        ImageSource(url=f"/static/{d.path.as_posix()}", width=d.width, height=d.height, format=d.format)
+        for d in derivatives
+    ]
+
+
+def enqueue_pending_transcodes() -> int:
+    """启动时在后台调用：为尚未转码的视频补提交转码任务。"""
+    if not video_transcode.transcode_available():
+        return 0
+    with Session(engine) as session:
+        rows = session.exec(
+            select(MediaItem.id, MediaItem.filename).where(MediaItem.kind == "video", MediaItem.filename.is_not(None))
+        ).all()
+    count = video_transcode.enqueue_missing(
+        (MEDIA_UPLOAD_DIR / filename, partial(_on_derivatives_ready, item_id)) for item_id, filename in rows
+    )
+    if count:
+        logger.info("Queued %s media videos for transcoding", count)
+    return count
+
+
 # ---------- 列表 ----------
 
-@router.get("/items")
-def list_items(
-    parent_id: Optional[int] = None,
-    kind: Optional[str] = None,
-    visible_on_android: Optional[bool] = None,
-    skip: int = 0,
-    limit: int = 0,
-    session: Session = Depends(get_session),
-) -> Union[List[MediaItemRead], MediaItemPage]:
+_MEDIA_LIST_ADAPTER = TypeAdapter(List[MediaItemRead])
+_MEDIA_PAGE_ADAPTER = TypeAdapter(MediaItemPage)
+
+
+def _query_page(
+    session: Session,
+    parent_id: Optional[int],
+    kind: Optional[str],
+    visible_on_android: Optional[bool],
+    skip: int,
+    limit: int,
+) -> tuple:
+    """返回 (条目列表, 总数)；limit 为 0 时不分页，总数为 0。"""
     stmt = select(MediaItem).where(MediaItem.parent_id == parent_id)
     if kind and kind != "all":
         stmt = stmt.where(MediaItem.kind == kind)
@@ -209,11 +316,70 @@ def list_items(
         ).all()
         children_counts = {pid: cnt for pid, cnt in rows}
 
-    result = [_to_read(i, session, children_counts) for i in items]
+    return [_to_read(i, session, children_counts) for i in items], total
+
+
+@router.get("/items")
+def list_items(
+    parent_id: Optional[int] = None,
+    kind: Optional[str] = None,
+    visible_on_android: Optional[bool] = None,
+    skip: int = 0,
+    limit: int = 0,
+    session: Session = Depends(get_session),
+) -> Union[List[MediaItemRead], MediaItemPage]:
+    result, total = _query_page(session, parent_id, kind, visible_on_android, skip, limit)
+    if limit > 0:
+        return model_json_response(MediaItemPage(items=result, total=total, skip=skip, limit=limit), _MEDIA_PAGE_ADAPTER)
+    return model_json_response(result, _MEDIA_LIST_ADAPTER)
+
 
+# ---------- 安卓媒体 feed ----------
+# 与 /items?visible_on_android=true 的响应相同，但响应体按媒体库版本号缓存（services.media_feed），
+# 并带弱 ETag：平板携带 If-None-Match 且媒体库未变化时返回 304，缓存命中时不占用数据库连接。
+
+def _render_feed(session: Session, parent_id: Optional[int], kind: Optional[str], skip: int, limit: int) -> bytes:
+    result, total = _query_page(session, parent_id, kind, True, skip, limit)
     if limit > 0:
-        return MediaItemPage(items=result, total=total, skip=skip, limit=limit)
-    return result
+        page = MediaItemPage(items=result, total=total, skip=skip, limit=limit)
+        return _MEDIA_PAGE_ADAPTER.dump_json(page, by_alias=True)
+    return _MEDIA_LIST_ADAPTER.dump_json(result, by_alias=True)
+
+
+async def _build_feed(parent_id: Optional[int], kind: Optional[str], skip: int, limit: int) -> bytes:
+    async with open_async_session() as session:
+        return await session.run_sync(_render_feed, parent_id, kind, skip, limit)
+
+
+@router.get("/feed")
+async def media_feed(
+    request: Request,
+    parent_id: Optional[int] = None,
+    kind: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 0,
+):
+    kind = kind if kind and kind != "all" else None
+    skip, limit = max(skip, 0), max(limit, 0)
+    versions = await change_versions.get_many(MEDIA_SCOPE)
+    if versions is None:
+        # 版本号不可用（Redis 故障）时不缓存、不做条件请求
+        body = await _build_feed(parent_id, kind, skip, limit)
+        return Response(body, media_type="application/json")
+
+    key = (parent_id, kind, skip, limit)
+    version = feed_version(change_versions.epoch, versions[MEDIA_SCOPE])
+    key_hash = hashlib.blake2s(repr(key).encode(), digest_size=6).hexdigest()
+    headers = {"etag": f'W/"{version}-{key_hash}"', "cache-control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, headers["etag"]):
+        return Response(status_code=304, headers=headers)
+
+    body = media_feed_cache.get(key, version)
+    if body is None:
+        body = await _build_feed(parent_id, kind, skip, limit)
+        media_feed_cache.put(key, version, body)
+    return Response(body, media_type="application/json", headers=headers)
 
 
 # ---------- 单项详情 ----------
@@ -237,10 +403,7 @@ def get_folder_tree(
         select(MediaItem).where(MediaItem.kind == "folder")
     ).all()
 
-    excluded_ids = set()
-    if exclude_id is not None:
-        excluded_ids.add(exclude_id)
-        _collect_descendant_ids(exclude_id, folders, excluded_ids)
+    excluded_ids = media_tree.descendant_ids(session, exclude_id) if exclude_id is not None else set()
 
     by_parent: dict[Optional[int], list] = {}
     for f in folders:
@@ -261,31 +424,11 @@ def get_folder_tree(
     return [{"id": 0, "title": "媒体库（根目录）", "children": build(None)}]
 
 
-def _collect_descendant_ids(parent_id: int, all_folders, result_set: set):
-    for f in all_folders:
-        if f.parent_id == parent_id and f.id not in result_set:
-            result_set.add(f.id)
-            _collect_descendant_ids(f.id, all_folders, result_set)
-
-
 # ---------- 面包屑 ----------
 
 @router.get("/ancestors/{item_id}")
 def get_ancestors(item_id: int, session: Session = Depends(get_session)):
-    path = []
-    current_id = item_id
-    visited = set()
-    while current_id is not None:
-        if current_id in visited:
-            break
-        visited.add(current_id)
-        item = session.get(MediaItem, current_id)
-        if not item:
-            break
-        path.append({"id": item.id, "title": item.title})
-        current_id = item.parent_id
-    path.reverse()
-    return path
+    return [{"id": ancestor_id, "title": title} for ancestor_id, title in media_tree.ancestors(session, item_id)]
 
 
 # ---------- 创建文件夹 ----------
@@ -305,6 +448,7 @@ def create_folder(
     session.add(folder)
     session.commit()
     session.refresh(folder)
+    read = _to_read(folder, session)
     _notify_media_changed(
         "created",
         {
@@ -313,9 +457,10 @@ def create_folder(
             "previous_parent_id": None,
             "kind": folder.kind,
             "visible_on_android": folder.visible_on_android,
-        }
+        },
+        item=read,
     )
-    return _to_read(folder, session)
+    return read
 
 
 # ---------- 上传文件 ----------
@@ -366,10 +511,13 @@ def upload_files(
         # Pre-generate thumbnail for images at upload time
         if kind == "image":
             _build_media_thumbnail(save_path)
+            image_derivatives.enqueue_derivatives(save_path, partial(_on_derivatives_ready, item.id))
         if kind == "video":
             _build_video_thumbnail(save_path)
+            _enqueue_video_transcode(item.id, save_path)
 
-        created.append(_to_read(item, session))
+        read = _to_read(item, session)
+        created.append(read)
         _notify_media_changed(
             "created",
             {
@@ -378,7 +526,8 @@ def upload_files(
                 "previous_parent_id": None,
                 "kind": item.kind,
                 "visible_on_android": item.visible_on_android,
-            }
+            },
+            item=read,
         )
 
     if not created:
@@ -408,6 +557,7 @@ def update_item(
     session.add(item)
     session.commit()
     session.refresh(item)
+    read = _to_read(item, session)
     _notify_media_changed(
         "updated",
         {
@@ -416,9 +566,10 @@ def update_item(
             "previous_parent_id": previous_parent_id,
             "kind": item.kind,
             "visible_on_android": item.visible_on_android,
-        }
+        },
+        item=read,
     )
-    return _to_read(item, session)
+    return read
 
 
 # ---------- 移动 ----------
@@ -441,18 +592,15 @@ def move_item(
         target = session.get(MediaItem, target_id)
         if not target or target.kind != "folder":
             raise HTTPException(400, "目标文件夹不存在")
-        if item.kind == "folder":
-            all_folders = session.exec(select(MediaItem).where(MediaItem.kind == "folder")).all()
-            desc = set()
-            _collect_descendant_ids(item_id, all_folders, desc)
-            if target_id in desc:
-                raise HTTPException(400, "不能移动到自身的子文件夹中")
+        if item.kind == "folder" and media_tree.is_in_subtree(session, item_id, target_id):
+            raise HTTPException(400, "不能移动到自身的子文件夹中")
 
     item.parent_id = target_id
     item.updated_at = datetime.now()
     session.add(item)
     session.commit()
     session.refresh(item)
+    read = _to_read(item, session)
     _notify_media_changed(
         "moved",
         {
@@ -461,9 +609,10 @@ def move_item(
             "previous_parent_id": previous_parent_id,
             "kind": item.kind,
             "visible_on_android": item.visible_on_android,
-        }
+        },
+        item=read,
     )
-    return _to_read(item, session)
+    return read
 
 
 # ---------- 删除 ----------
@@ -481,26 +630,99 @@ def delete_item(item_id: int, session: Session = Depends(get_session)):
         "kind": item.kind,
         "visible_on_android": item.visible_on_android,
     }
-    _recursive_delete(item, session)
+    filenames = media_tree.delete_subtrees(session, [item.id])
     session.commit()
+    # 提交后在后台删除磁盘文件
+    _remove_media_files_later(filenames)
     _notify_media_changed("deleted", deleted_payload)
     return {"ok": True}
 
 
-def _recursive_delete(item: MediaItem, session: Session):
-    if item.kind == "folder":
-        children = session.exec(
-            select(MediaItem).where(MediaItem.parent_id == item.id)
-        ).all()
-        for child in children:
-            _recursive_delete(child, session)
-
-    if item.filename:
-        file_path = MEDIA_UPLOAD_DIR / item.filename
-        if file_path.exists():
-            try:
-                os.remove(file_path)
-            except OSError:
-                pass
-
-    session.delete(item)
+# ---------- 批量操作 ----------
+# 多选移动 / 删除 / 安卓可见性：一个事务完成，只推送一次聚合的 media_changed。
+# 聚合事件带 item_ids 与 parent_ids（受影响的父文件夹，根目录为 null）；
+# 所有条目父文件夹相同时同时填充 parent_id / previous_parent_id，兼容只看单条字段的旧客户端。
+
+
+def _load_bulk_targets(session: Session, ids: List[int]) -> List[tuple]:
+    unique_ids = list(dict.fromkeys(ids))
+    if not unique_ids:
+        raise HTTPException(400, "未选择媒体项")
+    if len(unique_ids) > MEDIA_BULK_MAX_ITEMS:
+        raise HTTPException(400, f"单次最多操作 {MEDIA_BULK_MAX_ITEMS} 项")
+    rows = session.exec(
+        select(MediaItem.id, MediaItem.parent_id, MediaItem.kind).where(MediaItem.id.in_(unique_ids))
+    ).all()
+    if len(rows) != len(unique_ids):
+        missing = sorted(set(unique_ids) - {row[0] for row in rows})
+        raise HTTPException(404, f"媒体项不存在: {missing}")
+    return rows
+
+
+def _common_parent_id(rows: List[tuple]) -> Optional[int]:
+    parents = {row[1] for row in rows}
+    return next(iter(parents)) if len(parents) == 1 else None
+
+
+def _bulk_payload(rows: List[tuple], parent_id: Optional[int], extra_parent_ids=(), **extra) -> dict:
+    touched = {row[1] for row in rows} | set(extra_parent_ids)
+    return {
+        "item_id": None,
+        "item_ids": [row[0] for row in rows],
+        "parent_ids": sorted(touched, key=lambda value: (value is not None, value or 0)),
+        "parent_id": parent_id,
+        "previous_parent_id": _common_parent_id(rows),
+        "count": len(rows),
+        **extra,
+    }
+
+
+@router.post("/bulk/move")
+def bulk_move(data: MediaBulkMove, session: Session = Depends(get_session)):
+    rows = _load_bulk_targets(session, data.ids)
+    target_id = data.parent_id
+    if target_id is not None:
+        target = session.get(MediaItem, target_id)
+        if not target or target.kind != "folder":
+            raise HTTPException(400, "目标文件夹不存在")
+        folder_ids = [row[0] for row in rows if row[2] == "folder"]
+        if folder_ids and media_tree.any_subtree_contains(session, folder_ids, target_id):
+            raise HTTPException(400, "不能移动到自身或其子文件夹中")
+
+    session.execute(
+        update(MediaItem)
+        .where(MediaItem.id.in_([row[0] for row in rows]))
+        .values(parent_id=target_id, updated_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    _notify_media_changed("bulk_moved", _bulk_payload(rows, target_id, extra_parent_ids=(target_id,)))
+    return {"ok": True, "count": len(rows)}
+
+
+@router.post("/bulk/delete")
+def bulk_delete(data: MediaBulkDelete, session: Session = Depends(get_session)):
+    rows = _load_bulk_targets(session, data.ids)
+    filenames = media_tree.delete_subtrees(session, [row[0] for row in rows])
+    session.commit()
+    _remove_media_files_later(filenames)
+    # 与单条删除一致：parent_id 为空，previous_parent_id 为原父文件夹
+    _notify_media_changed("bulk_deleted", _bulk_payload(rows, None))
+    return {"ok": True, "count": len(rows), "deleted": len(filenames)}
+
+
+@router.post("/bulk/visibility")
+def bulk_visibility(data: MediaBulkVisibility, session: Session = Depends(get_session)):
+    rows = _load_bulk_targets(session, data.ids)
+    session.execute(
+        update(MediaItem)
+        .where(MediaItem.id.in_([row[0] for row in rows]))
+        .values(visible_on_android=data.visible_on_android, updated_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    session.commit()
+    _notify_media_changed(
+        "bulk_updated",
+        _bulk_payload(rows, _common_parent_id(rows), visible_on_android=data.visible_on_android),
+    )
+    return {"ok": True, "count": len(rows)}
@@ -7,6 +7,7 @@ from datetime import datetime
 import shutil
 from database import get_session
 from models import MeetingType, MeetingTypeRead
+from services.change_versions import bump_shared
 
 # 创建路由器，前缀为 /meeting_types
 router = APIRouter(prefix="/meeting_types", tags=["meeting_types"])
@@ -164,6 +165,7 @@ def delete_meeting_type(type_id: int, session: Session = Depends(get_session)):
 
     session.delete(meeting_type)
     session.commit()
+    bump_shared()
     _delete_cover_file_if_unused(session, previous_cover, exclude_type_id=type_id)
     _cleanup_stale_type_covers(session)
     return {"ok": True}
@@ -184,6 +186,7 @@ def update_meeting_type(type_id: int, data: MeetingType, session: Session = Depe
     session.add(meeting_type)
     session.commit()
     session.refresh(meeting_type)
+    bump_shared()
     if previous_cover != meeting_type.cover_image:
         _delete_cover_file_if_unused(session, previous_cover, exclude_type_id=type_id)
     _cleanup_stale_type_covers(session, keep_urls={meeting_type.cover_image} if meeting_type.cover_image else set())
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
 from sqlmodel import Session, select, SQLModel, delete
 from sqlalchemy import func
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
 import shutil
 from pathlib import Path
@@ -10,23 +11,36 @@ import json
 import hashlib
 from zoneinfo import ZoneInfo
 
-from database import get_session
+from database import engine, get_session
 from models import (
     Meeting,
     MeetingType,
     Attachment,
+    AttachmentPage,
+    AttachmentPageRead,
+    AttachmentPagesResponse,
     AttachmentRead,
-    Vote,
-    VoteOption,
-    UserVote,
+    ImageSource,
     MeetingAttendeeLink,
+    MeetingSearchHit,
+    MeetingSearchPageHit,
+    MeetingSearchResponse,
     User,
     CheckIn,
     SystemSetting,
 )
-from socket_manager import sio, broadcast_meeting_changed
-
-from pydantic import BaseModel
+from socket_manager import broadcast_meeting_changed, schedule_broadcast
+from logging_config import get_logger
+from metrics import timed_thumbnail
+from services.presence import presence
+from services import attachment_preprocess, image_derivatives, meeting_search
+from services.background_jobs import background_jobs, remove_files_later
+from services.change_versions import bump_meeting, bump_shared
+from services.meeting_cascade import delete_meeting_cascade
+from query_budget import query_budget
+from fast_json import model_json_response
+
+from pydantic import BaseModel, TypeAdapter
 
 class AttendeeRoleInput(BaseModel):
     user_id: int
@@ -100,6 +114,7 @@ class AttendeeOutput(BaseModel):
 
 # 创建路由器，前缀为 /meetings
 router = APIRouter(prefix="/meetings", tags=["meetings"])
+logger = get_logger("meetings")
 
 # 定义上传文件存储目录
 UPLOAD_DIR = Path("uploads")
@@ -314,7 +329,21 @@ def _get_checkin_map_for_user(meetings: List[Meeting], user_id: Optional[int], s
     ).all()
     return {checkin.meeting_id: checkin for checkin in checkins}
 
-def _resolve_effective_visibility_hours(meeting: Meeting, session: Session) -> Optional[int]:
+def _get_inherited_visibility_hours(session: Session) -> int:
+    hide_after_hours_setting = session.get(SystemSetting, "meeting_visibility_hide_after_hours")
+    if not hide_after_hours_setting or not hide_after_hours_setting.value:
+        return 0
+
+    try:
+        return int(hide_after_hours_setting.value)
+    except ValueError:
+        return 0
+
+def _resolve_effective_visibility_hours(
+    meeting: Meeting,
+    session: Session,
+    inherited_hours: Optional[int] = None
+) -> Optional[int]:
     mode = (meeting.android_visibility_mode or "inherit").strip().lower()
 
     if mode == "always_show":
@@ -324,20 +353,17 @@ def _resolve_effective_visibility_hours(meeting: Meeting, session: Session) -> O
     if mode == "custom_hours":
         return meeting.android_visibility_hide_after_hours or 0
 
-    hide_after_hours_setting = session.get(SystemSetting, "meeting_visibility_hide_after_hours")
-    if not hide_after_hours_setting or not hide_after_hours_setting.value:
-        return 0
-
-    try:
-        return int(hide_after_hours_setting.value)
-    except ValueError:
-        return 0
+    # 列表场景由调用方预先读取一次全局设置，避免设置不存在时逐条会议查询
+    if inherited_hours is not None:
+        return inherited_hours
+    return _get_inherited_visibility_hours(session)
 
 def _is_meeting_visible_for_android(
     meeting: Meeting,
     session: Session,
     force_show_all: bool = False,
-    checkin: Optional[CheckIn] = None
+    checkin: Optional[CheckIn] = None,
+    inherited_hours: Optional[int] = None
 ) -> bool:
     if force_show_all:
         return True
@@ -345,7 +371,7 @@ def _is_meeting_visible_for_android(
     if checkin is not None:
         return True
 
-    effective_hours = _resolve_effective_visibility_hours(meeting, session)
+    effective_hours = _resolve_effective_visibility_hours(meeting, session, inherited_hours)
     if effective_hours is None or effective_hours == 0:
         return True
     if effective_hours < 0:
@@ -399,11 +425,9 @@ def _delete_meeting_cover_if_unused(
         return
 
     source = _resolve_local_source_path(image_url)
-    try:
-        if source and source.exists() and source.is_file():
-            source.unlink()
-    except OSError:
-        pass
+    if source is not None:
+        # 连同多宽度衍生图一起在后台删除
+        remove_files_later([str(source), *(str(path) for path in image_derivatives.derivative_files(source))])
 
 
 def _cleanup_stale_meeting_covers(session: Session, keep_urls: set[str] | None = None) -> None:
@@ -414,6 +438,7 @@ def _cleanup_stale_meeting_covers(session: Session, keep_urls: set[str] | None =
     }
     cutoff = datetime.now().timestamp() - STALE_MEETING_COVER_TTL_SECONDS
 
+    stale: List[str] = []
     for file in MEETING_COVER_UPLOAD_DIR.glob("*"):
         if not file.is_file():
             continue
@@ -423,9 +448,50 @@ def _cleanup_stale_meeting_covers(session: Session, keep_urls: set[str] | None =
         try:
             if file.stat().st_mtime >= cutoff:
                 continue
-            file.unlink()
         except OSError:
-            pass
+            continue
+        stale.append(str(file))
+        stale.extend(str(path) for path in image_derivatives.derivative_files(file))
+    remove_files_later(stale)
+
+# meeting_changed 推送携带的会议字段；updated 只带发生变化的部分
+MEETING_DIFF_FIELDS = (
+    "title",
+    "meeting_type_id",
+    "start_time",
+    "end_time",
+    "location",
+    "speaker",
+    "agenda",
+    "status",
+    "show_media_link",
+    "cover_image",
+    "android_visibility_mode",
+    "android_visibility_hide_after_hours",
+    "manual_attendees",
+    "meeting_contacts",
+)
+
+
+def _meeting_snapshot(meeting: Meeting) -> dict:
+    return {field: getattr(meeting, field, None) for field in MEETING_DIFF_FIELDS}
+
+
+def _get_attendee_user_ids(session: Session, meeting_id: int) -> List[int]:
+    return list(session.exec(
+        select(MeetingAttendeeLink.user_id).where(MeetingAttendeeLink.meeting_id == meeting_id)
+    ).all())
+
+
+def _notify_meeting_changed(action: str, meeting_id: int, payload: dict, attendee_user_ids=()) -> None:
+    """参会人在同步路由里查好，推送协程只负责发送，不访问数据库。"""
+    schedule_broadcast(
+        broadcast_meeting_changed,
+        action,
+        {"meeting_id": meeting_id, **payload},
+        attendee_user_ids=attendee_user_ids,
+    )
+
 
 @router.post("/", response_model=Meeting)
 def create_meeting(meeting_in: MeetingCreateInput, session: Session = Depends(get_session)):
@@ -462,19 +528,18 @@ def create_meeting(meeting_in: MeetingCreateInput, session: Session = Depends(ge
         session.add(link)
     if user_entries:
         session.commit()
-
-    try:
-        sio.start_background_task(
-            broadcast_meeting_changed,
-            "created",
-            {
-                "meeting_id": meeting.id,
-                "title": meeting.title,
-                "start_time": meeting.start_time.isoformat() if meeting.start_time else None
-            }
-        )
-    except Exception as e:
-        print(f"[Socket.IO] failed to broadcast meeting_changed: {e}")
+    bump_meeting(meeting.id)
+
+    _notify_meeting_changed(
+        "created",
+        meeting.id,
+        {
+            "title": meeting.title,
+            "start_time": meeting.start_time.isoformat() if meeting.start_time else None,
+            "meeting": _meeting_snapshot(meeting),
+        },
+        attendee_user_ids=[attendee["user_id"] for attendee in user_entries],
+    )
     
     return meeting
 
@@ -629,6 +694,8 @@ class MeetingCardResponse(BaseModel):
     created_at: datetime
     card_image_url: Optional[str] = None
     card_image_thumb_url: Optional[str] = None
+    # 封面的多宽度 WebP / AVIF（从小到大），客户端按显示宽度挑选；外链与尚未生成时为空或仅含 CDN 参数化地址
+    card_image_srcset: List[ImageSource] = []
     card_image_source: Optional[str] = None
     meeting_type_name: Optional[str] = None
     attachments: List[AttachmentRead] = []
@@ -642,6 +709,8 @@ class MeetingCardResponse(BaseModel):
     check_in_time: Optional[datetime] = None
     is_today_meeting: bool = False
 
+_MEETING_CARD_LIST_ADAPTER = TypeAdapter(List[MeetingCardResponse])
+
 # 默认会议图统一放到 uploads/meeting_defaults 下，通过现有 /static 链路暴露
 DEFAULT_IMAGES = {
     "weekly": "/static/meeting_defaults/weekly.png",
@@ -757,14 +826,14 @@ def _build_thumbnail_for_local_file(source_path: Path) -> Optional[Path]:
             return thumb_relative
 
         resample = Image.Resampling.LANCZOS if hasattr(Image, "Resampling") else Image.LANCZOS
-        with Image.open(source_path) as img:
+        with timed_thumbnail("meeting_cover"), Image.open(source_path) as img:
             img = ImageOps.exif_transpose(img).convert("RGB")
             fitted = ImageOps.fit(img, (THUMB_WIDTH, THUMB_HEIGHT), method=resample)
             fitted.save(thumb_path, format="WEBP", quality=THUMB_QUALITY, method=6)
 
         return thumb_relative
     except Exception as e:
-        print(f"[thumb] failed to build thumbnail for {source_path}: {e}")
+        logger.warning("Failed to build thumbnail for %s: %s", source_path, e)
         return None
 
 
@@ -790,6 +859,41 @@ def build_thumbnail_url(image_url: Optional[str], base_url: str) -> Optional[str
     return _optimize_unsplash_url(image_url)
 
 
+def build_image_srcset(image_url: Optional[str], base_url: str) -> List[ImageSource]:
+    """
+    本地封面返回已生成的多宽度衍生图（缺失的在后台补生成，下次请求即可用）；
+    Unsplash 外链按同样的宽度档位生成参数化地址（auto=format 由 CDN 按客户端选择格式）。
+    """
+    if not image_url:
+        return []
+
+    source = _resolve_local_source_path(image_url)
+    if source is not None:
+        # 衍生图生成完成后递增版本号，会议列表 / 详情的 ETag 随之失效，客户端拿到新的 srcset
+        derivatives = image_derivatives.ready_derivatives(source, bump_shared)
+        if not derivatives:
+            return []
+        version = _file_version_token(source)
+        return [
+            ImageSource(
+                url=_append_version_query(f"{base_url}static/{d.path.as_posix()}", version),
+                width=d.width,
+                height=d.height,
+                format=d.format,
+            )
+            for d in derivatives
+        ]
+
+    if "images.unsplash.com" not in (urlparse(image_url).hostname or "").lower():
+        return []
+    sources = []
+    for width in image_derivatives.IMAGE_DERIVATIVE_WIDTHS:
+        height = round(width * THUMB_HEIGHT / THUMB_WIDTH)
+        url = _optimize_unsplash_url(image_url, width=width, height=height)
+        sources.append(ImageSource(url=url, width=width, height=height, format="auto"))
+    return sources
+
+
 def _append_version_query(url: Optional[str], version: Optional[str]) -> Optional[str]:
     if not url or not version:
         return url
@@ -901,6 +1005,7 @@ def _resolve_meeting_cover(meeting: Meeting, meeting_type: Optional[MeetingType]
     return _normalize_public_image_url(default_path, base_url), "default"
 
 @router.get("/", response_model=List[MeetingCardResponse])
+@query_budget(8)
 def read_meetings(
     request: Request,
     skip: int = 0, 
@@ -931,21 +1036,19 @@ def read_meetings(
             s_dt = datetime.strptime(start_date, "%Y-%m-%d")
             # If server is in UTC, the DB stores naive datetimes which are effectively CST
             # So we compare directly without conversion
-            print(f"[DEBUG] Filtering start_date >= {s_dt}")
+            logger.debug("Filtering start_date >= %s", s_dt)
             query = query.where(Meeting.start_time >= s_dt)
         except ValueError as e:
-            print(f"[DEBUG] start_date parse error: {e}")
-            pass
+            logger.debug("start_date parse error: %s", e)
             
     if end_date:
         try:
             # Parse end of day (23:59:59)
             e_dt = datetime.strptime(end_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
-            print(f"[DEBUG] Filtering end_date <= {e_dt}")
+            logger.debug("Filtering end_date <= %s", e_dt)
             query = query.where(Meeting.start_time <= e_dt)
         except ValueError as e:
-            print(f"[DEBUG] end_date parse error: {e}")
-            pass
+            logger.debug("end_date parse error: %s", e)
 
     # Sorting
     if sort == "asc":
@@ -958,15 +1061,17 @@ def read_meetings(
     # 2. always_show 始终可见
     # 3. inherit/custom_hours 按时效窗口可见
     # 4. hidden 仅对未签到用户隐藏
-    meetings = session.exec(query).all()
+    meetings = session.exec(query.options(selectinload(Meeting.attachments))).all()
     checkin_map = _get_checkin_map_for_user(meetings, user_id, session)
+    inherited_hours = None if force_show_all else _get_inherited_visibility_hours(session)
     meetings = [
         meeting for meeting in meetings
         if _is_meeting_visible_for_android(
             meeting,
             session=session,
             force_show_all=force_show_all,
-            checkin=checkin_map.get(meeting.id)
+            checkin=checkin_map.get(meeting.id),
+            inherited_hours=inherited_hours
         )
     ][skip: skip + limit]
     
@@ -1005,16 +1110,111 @@ def read_meetings(
         final_url, image_source = _resolve_meeting_cover(m, m_type, base_url)
         resp.card_image_url = final_url
         resp.card_image_thumb_url = build_thumbnail_url(final_url, base_url)
+        resp.card_image_srcset = build_image_srcset(final_url, base_url)
         resp.card_image_source = image_source
         resp.meeting_type_name = m_type.name if m_type else "普通会议"
         results.append(resp)
-        
-    return results
+
+    return model_json_response(results, _MEETING_CARD_LIST_ADAPTER)
+
+@router.get("/search", response_model=MeetingSearchResponse)
+def search_meetings(
+    q: str,
+    skip: int = 0,
+    limit: int = 20,
+    user_id: Optional[int] = None,
+    force_show_all: bool = False, # 后台检索全部会议，忽略安卓可见性规则
+    session: Session = Depends(get_session)
+):
+    """
+    全文检索会议 (标题、主讲人、地点、议程、附件文本)，按相关度排序分页；
+    可见性规则与会议列表一致，只在相关度最高的 MEETING_SEARCH_MAX_RESULTS 个会议中分页
+    """
+    terms = meeting_search.parse_query(q)
+    if not terms:
+        return MeetingSearchResponse(query=q, total=0, items=[])
+    limit = max(1, min(limit, 100))
+
+    ranked = meeting_search.search_meeting_ids(session, terms)
+    scores = dict(ranked)
+    loaded = {
+        meeting.id: meeting
+        for meeting in session.exec(select(Meeting).where(Meeting.id.in_(list(scores)))).all()
+    } if scores else {}
+    meetings = [loaded[meeting_id] for meeting_id, _ in ranked if meeting_id in loaded]
+    if not force_show_all:
+        checkin_map = _get_checkin_map_for_user(meetings, user_id, session)
+        inherited_hours = _get_inherited_visibility_hours(session)
+        meetings = [
+            meeting for meeting in meetings
+            if _is_meeting_visible_for_android(
+                meeting, session=session, checkin=checkin_map.get(meeting.id), inherited_hours=inherited_hours
+            )
+        ]
+    page = meetings[skip: skip + limit]
+
+    page_matches = meeting_search.matching_pages(session, terms, [meeting.id for meeting in page])
+    attachment_ids = {match.attachment_id for matches in page_matches.values() for match in matches}
+    attachments = {
+        attachment_id: (display_name, preview_page_count)
+        for attachment_id, display_name, preview_page_count in session.exec(
+            select(Attachment.id, Attachment.display_name, Attachment.preview_page_count)
+            .where(Attachment.id.in_(attachment_ids))
+        ).all()
+    } if attachment_ids else {}
+
+    items = []
+    for meeting in page:
+        segments = meeting_search.meeting_segments(meeting.title, meeting.speaker, meeting.location, meeting.agenda)
+        fields = meeting_search.matched_fields(segments, terms)
+        hits = []
+        for match in page_matches.get(meeting.id, []):
+            if match.attachment_id not in attachments:
+                continue
+            display_name, preview_page_count = attachments[match.attachment_id]
+            hits.append(MeetingSearchPageHit(
+                attachment_id=match.attachment_id,
+                display_name=display_name,
+                page_number=match.page_number,
+                snippet=meeting_search.make_snippet(match.text, terms),
+                preview_url=(
+                    attachment_preprocess.preview_url(match.attachment_id, match.page_number)
+                    if match.page_number <= (preview_page_count or 0) else None
+                ),
+            ))
+        if hits:
+            fields.append("attachment")
+        # 标题在结果中完整显示，摘要取其他命中字段，其次取附件页
+        snippet = next(
+            (meeting_search.make_snippet(text, terms) for name, text, _ in segments if name in fields and name != "title"),
+            None,
+        ) or next((hit.snippet for hit in hits if hit.snippet), None)
+        items.append(MeetingSearchHit(
+            id=meeting.id,
+            title=meeting.title,
+            meeting_type_id=meeting.meeting_type_id,
+            start_time=meeting.start_time,
+            location=meeting.location,
+            speaker=meeting.speaker,
+            score=round(scores.get(meeting.id, 0.0), 6),
+            matched_fields=fields,
+            snippet=snippet,
+            attachment_hits=hits,
+        ))
+    return MeetingSearchResponse(query=q, total=len(meetings), items=items)
+
+@router.get("/{meeting_id}/presence")
+async def read_meeting_presence(meeting_id: int):
+    """
+    会议房间当前在线的平板数量 (后台控制台使用，不扫描连接列表)
+    """
+    return {"meeting_id": meeting_id, "connected": await presence.meeting_count(meeting_id)}
 
 class MeetingWithAttachments(MeetingCardResponse):
     attendees: List[AttendeeOutput] = []
 
 @router.get("/{meeting_id}", response_model=MeetingWithAttachments)
+@query_budget(10)
 def read_meeting(
     meeting_id: int, 
     request: Request,
@@ -1070,6 +1270,7 @@ def read_meeting(
     final_url, image_source = _resolve_meeting_cover(meeting, m_type, base_url)
     resp.card_image_url = final_url
     resp.card_image_thumb_url = build_thumbnail_url(final_url, base_url)
+    resp.card_image_srcset = build_image_srcset(final_url, base_url)
     resp.card_image_source = image_source
     
     # 填充与会者角色列表
@@ -1104,6 +1305,8 @@ def update_meeting(
     if not db_meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
     previous_cover = db_meeting.cover_image
+    previous_snapshot = _meeting_snapshot(db_meeting)
+    previous_attendee_ids = set(_get_attendee_user_ids(session, meeting_id))
         
     meeting_data = meeting_update.model_dump(
         exclude_unset=True,
@@ -1158,50 +1361,58 @@ def update_meeting(
     if previous_cover != db_meeting.cover_image:
         _delete_meeting_cover_if_unused(session, previous_cover, exclude_meeting_id=meeting_id)
     _cleanup_stale_meeting_covers(session, keep_urls={db_meeting.cover_image} if db_meeting.cover_image else set())
-
-    try:
-        sio.start_background_task(
-            broadcast_meeting_changed,
-            "updated",
-            {
-                "meeting_id": db_meeting.id,
-                "title": db_meeting.title,
-                "start_time": db_meeting.start_time.isoformat() if db_meeting.start_time else None
-            }
-        )
-    except Exception as e:
-        print(f"[Socket.IO] failed to broadcast meeting_changed: {e}")
+    bump_meeting(db_meeting.id)
+
+    snapshot = _meeting_snapshot(db_meeting)
+    attendee_ids = set(_get_attendee_user_ids(session, meeting_id))
+    # 移出参会名单的人也要收到这次变化，才能把会议从自己的列表中去掉
+    _notify_meeting_changed(
+        "updated",
+        db_meeting.id,
+        {
+            "title": db_meeting.title,
+            "start_time": db_meeting.start_time.isoformat() if db_meeting.start_time else None,
+            "changes": {key: value for key, value in snapshot.items() if previous_snapshot.get(key) != value},
+            "attendees_added": sorted(attendee_ids - previous_attendee_ids),
+            "attendees_removed": sorted(previous_attendee_ids - attendee_ids),
+        },
+        attendee_user_ids=attendee_ids | previous_attendee_ids,
+    )
 
     return db_meeting
 
 @router.delete("/{meeting_id}")
 def delete_meeting(meeting_id: int, session: Session = Depends(get_session)):
-    """删除会议 (级联删除附件)"""
-    meeting = session.get(Meeting, meeting_id)
-    if not meeting:
+    """删除会议 (按表级联删除投票、抽签、签到、附件等从属数据，文件在提交后由后台任务删除)"""
+    attendee_ids = _get_attendee_user_ids(session, meeting_id)
+    result = delete_meeting_cascade(session, meeting_id)
+    if result is None:
         raise HTTPException(status_code=404, detail="Meeting not found")
-    previous_cover = meeting.cover_image
-    
-    # 删除关联的物理文件
-    for attachment in meeting.attachments:
-        try:
-            if os.path.exists(attachment.file_path):
-                os.remove(attachment.file_path)
-        except Exception as e:
-            print(f"Error deleting file {attachment.file_path}: {e}")
-    # 手动级联删除关联投票
-    votes = session.exec(select(Vote).where(Vote.meeting_id == meeting_id)).all()
-    for vote in votes:
-        session.exec(delete(UserVote).where(UserVote.vote_id == vote.id))
-        session.exec(delete(VoteOption).where(VoteOption.vote_id == vote.id))
-        session.delete(vote)
-
-    session.delete(meeting)
     session.commit()
-    _delete_meeting_cover_if_unused(session, previous_cover, exclude_meeting_id=meeting_id)
-    _cleanup_stale_meeting_covers(session)
+    bump_meeting(meeting_id)
+    meeting_search.remove_meeting(meeting_id)
+    _notify_meeting_changed("deleted", meeting_id, {}, attendee_user_ids=attendee_ids)
+
+    remove_files_later(result.file_paths)
+    if result.attachment_ids:
+        background_jobs.submit(
+            ("attachment_previews", meeting_id), attachment_preprocess.remove_previews, result.attachment_ids
+        )
+    if result.cover_image:
+        background_jobs.submit(("meeting_cover", result.cover_image), _delete_meeting_cover_in_background, result.cover_image)
+    background_jobs.submit("meeting_covers.cleanup", _cleanup_stale_meeting_covers_in_background)
     return {"ok": True}
 
+
+def _delete_meeting_cover_in_background(image_url: str) -> None:
+    with Session(engine) as session:
+        _delete_meeting_cover_if_unused(session, image_url)
+
+
+def _cleanup_stale_meeting_covers_in_background() -> None:
+    with Session(engine) as session:
+        _cleanup_stale_meeting_covers(session)
+
 import os
 
 @router.post("/{meeting_id}/upload")
@@ -1264,21 +1475,65 @@ def upload_file(
     session.add(attachment)
     session.commit()
     session.refresh(attachment)
+    bump_meeting(meeting.id)
 
-    try:
-        sio.start_background_task(
-            broadcast_meeting_changed,
-            "attachment_uploaded",
-            {
-                "meeting_id": meeting.id,
-                "attachment_id": attachment.id
-            }
-        )
-    except Exception as e:
-        print(f"[Socket.IO] failed to broadcast attachment_uploaded: {e}")
+    _notify_meeting_changed(
+        "attachment_uploaded",
+        meeting.id,
+        {"attachment_id": attachment.id, "attachment": AttachmentRead.model_validate(attachment)},
+        attendee_user_ids=_get_attendee_user_ids(session, meeting.id),
+    )
+    # 页数、预览图与页文本在后台生成，完成后再推送一次 attachment_updated
+    attachment_preprocess.enqueue_preprocess(attachment.id, _on_attachment_processed)
 
     return attachment
 
+
+def _on_attachment_processed(attachment_id: int) -> None:
+    """附件预处理完成（在后台线程中执行）。"""
+    with Session(engine) as session:
+        attachment = session.get(Attachment, attachment_id)
+        if attachment is None:
+            return
+        bump_meeting(attachment.meeting_id)
+        _notify_meeting_changed(
+            "attachment_updated",
+            attachment.meeting_id,
+            {"attachment_id": attachment.id, "attachment": AttachmentRead.model_validate(attachment)},
+            attendee_user_ids=_get_attendee_user_ids(session, attachment.meeting_id),
+        )
+
+
+@router.get("/attachments/{attachment_id}/pages", response_model=AttachmentPagesResponse)
+def get_attachment_pages(attachment_id: int, include_text: bool = False, session: Session = Depends(get_session)):
+    """附件逐页信息：预览图地址（未生成预览的页为空），include_text=true 时附带页文本"""
+    attachment = session.get(Attachment, attachment_id)
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+
+    texts = {}
+    if include_text:
+        texts = dict(session.exec(
+            select(AttachmentPage.page_number, AttachmentPage.text).where(AttachmentPage.attachment_id == attachment_id)
+        ).all())
+    pages = [
+        AttachmentPageRead(
+            page_number=number,
+            preview_url=(
+                attachment_preprocess.preview_url(attachment_id, number)
+                if number <= attachment.preview_page_count else None
+            ),
+            text=texts.get(number) if include_text else None,
+        )
+        for number in range(1, (attachment.page_count or 0) + 1)
+    ]
+    return AttachmentPagesResponse(
+        attachment_id=attachment_id,
+        page_count=attachment.page_count,
+        preprocess_status=attachment.preprocess_status,
+        pages=pages,
+    )
+
 class AttachmentUpdate(SQLModel):
     display_name: Optional[str] = None
     sort_order: Optional[int] = None
@@ -1302,18 +1557,14 @@ def update_attachment(
     session.add(attachment)
     session.commit()
     session.refresh(attachment)
+    bump_meeting(attachment.meeting_id)
 
-    try:
-        sio.start_background_task(
-            broadcast_meeting_changed,
-            "attachment_updated",
-            {
-                "meeting_id": attachment.meeting_id,
-                "attachment_id": attachment.id
-            }
-        )
-    except Exception as e:
-        print(f"[Socket.IO] failed to broadcast attachment_updated: {e}")
+    _notify_meeting_changed(
+        "attachment_updated",
+        attachment.meeting_id,
+        {"attachment_id": attachment.id, "attachment": AttachmentRead.model_validate(attachment)},
+        attendee_user_ids=_get_attendee_user_ids(session, attachment.meeting_id),
+    )
 
     return attachment
 
@@ -1324,27 +1575,22 @@ def delete_attachment(attachment_id: int, session: Session = Depends(get_session
     if not attachment:
         raise HTTPException(status_code=404, detail="Attachment not found")
     meeting_id = attachment.meeting_id
-        
-    # 删除物理文件
-    try:
-        if os.path.exists(attachment.file_path):
-            os.remove(attachment.file_path)
-    except Exception as e:
-        print(f"Error deleting file: {e}")
+    file_path = attachment.file_path
 
+    session.execute(delete(AttachmentPage).where(AttachmentPage.attachment_id == attachment_id))
     session.delete(attachment)
     session.commit()
-
-    try:
-        sio.start_background_task(
-            broadcast_meeting_changed,
-            "attachment_deleted",
-            {
-                "meeting_id": meeting_id,
-                "attachment_id": attachment_id
-            }
-        )
-    except Exception as e:
-        print(f"[Socket.IO] failed to broadcast attachment_deleted: {e}")
+    bump_meeting(meeting_id)
+    meeting_search.remove_attachment(meeting_id, attachment_id)
+    # 提交后再删除物理文件
+    remove_files_later([file_path])
+    background_jobs.submit(("attachment_previews", attachment_id), attachment_preprocess.remove_previews, [attachment_id])
+
+    _notify_meeting_changed(
+        "attachment_deleted",
+        meeting_id,
+        {"attachment_id": attachment_id},
+        attendee_user_ids=_get_attendee_user_ids(session, meeting_id),
+    )
 
     return {"ok": True}
@@ -3,11 +3,16 @@ from sqlmodel import Session, select
 from pydantic import BaseModel
 from typing import List
 from datetime import datetime
+import os
 from database import get_session
 from models import ReadingProgress
+from services import reading_progress_service
 
 router = APIRouter(prefix="/reading-progress", tags=["Reading Progress"])
 
+# 单次批量同步的最大条数，超出时客户端应分批提交
+READING_PROGRESS_BATCH_MAX_ITEMS = int(os.getenv("READING_PROGRESS_BATCH_MAX_ITEMS", "500"))
+
 
 class ReadingProgressRequest(BaseModel):
     user_id: int
@@ -30,66 +35,58 @@ class DeleteReadingProgressRequest(BaseModel):
     file_url: str
 
 
+class ReadingProgressBatchRequest(BaseModel):
+    items: List[ReadingProgressRequest]
+
+
+class ReadingProgressBatchResponse(BaseModel):
+    saved: int
+
+
 def _delete_progress_entry(user_id: int, file_url: str, session: Session):
-    entry = session.exec(
-        select(ReadingProgress).where(
-            ReadingProgress.user_id == user_id,
-            ReadingProgress.file_url == file_url
-        )
-    ).first()
-
-    if not entry:
+    if not reading_progress_service.delete_progress(session, user_id=user_id, file_url=file_url):
         raise HTTPException(status_code=404, detail="Reading progress not found")
 
-    session.delete(entry)
-    session.commit()
-
     return {"message": "deleted"}
 
 
+def _to_response(entry) -> ReadingProgressResponse:
+    if isinstance(entry, dict):
+        return ReadingProgressResponse(**entry)
+    return ReadingProgressResponse(
+        file_url=entry.file_url,
+        file_name=entry.file_name,
+        current_page=entry.current_page,
+        total_pages=entry.total_pages,
+        updated_at=entry.updated_at
+    )
+
+
+def _ensure_users_exist(session: Session, user_ids) -> None:
+    # 未知用户的进度无法落库（外键），在进入缓冲区 / 批量写入前直接拒绝
+    unknown = reading_progress_service.unknown_user_ids(session, user_ids)
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"User not found: {', '.join(map(str, sorted(unknown)))}")
+
+
 @router.post("/", response_model=ReadingProgressResponse)
 def save_progress(req: ReadingProgressRequest, session: Session = Depends(get_session)):
-    """保存或更新阅读进度（按 user_id + file_url upsert）"""
-    existing = session.exec(
-        select(ReadingProgress).where(
-            ReadingProgress.user_id == req.user_id,
-            ReadingProgress.file_url == req.file_url
-        )
-    ).first()
-
-    if existing:
-        existing.current_page = req.current_page
-        existing.total_pages = req.total_pages
-        existing.file_name = req.file_name
-        existing.updated_at = datetime.now()
-        session.add(existing)
-    else:
-        entry = ReadingProgress(
-            user_id=req.user_id,
-            file_url=req.file_url,
-            file_name=req.file_name,
-            current_page=req.current_page,
-            total_pages=req.total_pages,
-            updated_at=datetime.now()
-        )
-        session.add(entry)
-
-    session.commit()
-
-    result = session.exec(
-        select(ReadingProgress).where(
-            ReadingProgress.user_id == req.user_id,
-            ReadingProgress.file_url == req.file_url
-        )
-    ).first()
+    """保存或更新阅读进度（按 user_id + file_url 合并，短窗口后批量落库）"""
+    _ensure_users_exist(session, [req.user_id])
+    entry = reading_progress_service.build_progress_entry(**req.model_dump())
+    reading_progress_service.queue_progress(entry)
+    return _to_response(entry)
 
-    return ReadingProgressResponse(
-        file_url=result.file_url,
-        file_name=result.file_name,
-        current_page=result.current_page,
-        total_pages=result.total_pages,
-        updated_at=result.updated_at
-    )
+
+@router.post("/batch", response_model=ReadingProgressBatchResponse)
+def save_progress_batch(req: ReadingProgressBatchRequest, session: Session = Depends(get_session)):
+    """批量同步阅读进度（离线翻页记录等），一次 upsert 落库"""
+    if len(req.items) > READING_PROGRESS_BATCH_MAX_ITEMS:
+        raise HTTPException(400, f"单次最多同步 {READING_PROGRESS_BATCH_MAX_ITEMS} 条阅读进度")
+    _ensure_users_exist(session, {item.user_id for item in req.items})
+    entries = [reading_progress_service.build_progress_entry(**item.model_dump()) for item in req.items]
+    saved = reading_progress_service.save_progress_batch(session, entries)
+    return ReadingProgressBatchResponse(saved=saved)
 
 
 @router.get("/{user_id}", response_model=List[ReadingProgressResponse])
@@ -97,21 +94,17 @@ def get_progress(user_id: int, session: Session = Depends(get_session)):
     """获取指定用户的阅读进度列表（按更新时间倒序，最多 20 条）"""
     results = session.exec(
         select(ReadingProgress)
-        .where(ReadingProgress.user_id == user_id)
+        .where(ReadingProgress.user_id == user_id, ReadingProgress.deleted_at.is_(None))
         .order_by(ReadingProgress.updated_at.desc())
         .limit(20)
     ).all()
 
-    return [
-        ReadingProgressResponse(
-            file_url=item.file_url,
-            file_name=item.file_name,
-            current_page=item.current_page,
-            total_pages=item.total_pages,
-            updated_at=item.updated_at
-        )
-        for item in results
-    ]
+    # 合并尚未落库的进度，保证刚翻过的页能立即读到
+    merged = {item.file_url: _to_response(item) for item in results}
+    for entry in reading_progress_service.pending_progress_for_user(session, user_id):
+        merged[entry["file_url"]] = _to_response(entry)
+
+    return sorted(merged.values(), key=lambda item: item.updated_at, reverse=True)[:20]
 
 
 @router.delete("/{user_id}")
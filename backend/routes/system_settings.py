@@ -8,7 +8,8 @@ from sqlmodel import Session, select
 
 from database import get_session
 from models import SystemSetting
-from socket_manager import sio, broadcast_meeting_changed
+from socket_manager import broadcast_meeting_changed, schedule_broadcast
+from services.change_versions import bump_shared
 
 router = APIRouter(prefix="/settings", tags=["settings"])
 
@@ -110,14 +111,13 @@ def update_settings(settings: Dict[str, str], session: Session = Depends(get_ses
         _cleanup_login_poster_files(current_poster_url)
 
     if visibility_setting_changed:
-        try:
-            sio.start_background_task(
-                broadcast_meeting_changed,
-                "settings_updated",
-                {"setting_key": ANDROID_VISIBILITY_SETTING_KEY}
-            )
-        except Exception as e:
-            print(f"[Socket.IO] failed to broadcast settings_updated: {e}")
+        bump_shared()
+        # 不针对具体会议，仍推送给所有连接
+        schedule_broadcast(
+            broadcast_meeting_changed,
+            "settings_updated",
+            {"setting_key": ANDROID_VISIBILITY_SETTING_KEY}
+        )
 
     return {"ok": True}
 
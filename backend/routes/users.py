@@ -4,12 +4,15 @@ from sqlmodel import Session, select, func
 from pydantic import BaseModel
 from typing import List, Optional
 import io
-import openpyxl
 from datetime import datetime, timedelta
 from urllib.parse import quote
 from database import get_session
 from models import User, UserRead, Device, DeviceUserBinding
 from utils.security import hash_password, verify_password
+from services.auth_service import invalidate_login_cache
+from services.user_search import build_user_search_clauses
+from services.change_versions import bump_shared
+from fast_json import FastJSONResponse
 
 # Create Router
 router = APIRouter(prefix="/users", tags=["users"])
@@ -57,6 +60,9 @@ def download_template():
     """
     Download User Import Template
     """
+    # openpyxl 导入较慢，只在导入 / 导出时加载，缩短 worker 冷启动
+    import openpyxl
+
     wb = openpyxl.Workbook()
     ws = wb.active
     ws.title = "用户导入模板"
@@ -90,6 +96,8 @@ async def import_users(file: UploadFile = File(...), session: Session = Depends(
     if not file.filename.endswith('.xlsx'):
         raise HTTPException(status_code=400, detail="Invalid file format. Please upload .xlsx file")
 
+    import openpyxl
+
     try:
         content = await file.read()
         wb = openpyxl.load_workbook(io.BytesIO(content))
@@ -154,6 +162,7 @@ async def import_users(file: UploadFile = File(...), session: Session = Depends(
 
         session.add_all(users_to_add)
         session.commit()
+        invalidate_login_cache()
 
         return {"count": len(users_to_add), "message": f"新增成功了 {len(users_to_add)} 人"}
 
@@ -180,6 +189,7 @@ def create_user(user: User, session: Session = Depends(get_session)):
     session.add(user)
     session.commit()
     session.refresh(user)
+    invalidate_login_cache()
     return user
 
 @router.get("/")
@@ -230,25 +240,13 @@ def read_users(
             stmt = stmt.where(district_expr)
         return stmt
 
-    # Efficient Count
-    # We clone the query conditions for counting
-    count_query = select(func.count()).select_from(User)
-    if q:
-        count_query = count_query.where((User.phone.contains(q)) | (User.name.contains(q)))
-    if is_active is not None:
-        count_query = count_query.where(User.is_active == is_active)
-    if online_status is True:
-        count_query = count_query.where(User.id.in_(online_user_ids_query))
-    elif online_status is False:
-        count_query = count_query.where(~User.id.in_(online_user_ids_query))
-    count_query = apply_district_filter(count_query, districts)
-        
-    total = session.exec(count_query).one()
-    
     # Build Result Query
-    query = select(User)
-    if q:
-        query = query.where((User.phone.contains(q)) | (User.name.contains(q)))
+    # 结果与总数在同一条查询里取出 (COUNT(*) OVER())，不再为计数重复执行一遍过滤条件
+    query = select(User, func.count().over().label("total"))
+    search_order = []
+    if q and q.strip():
+        search_filter, search_order = build_user_search_clauses(session, q)
+        query = query.where(search_filter)
     if is_active is not None:
         query = query.where(User.is_active == is_active)
     if online_status is True:
@@ -257,15 +255,20 @@ def read_users(
         query = query.where(~User.id.in_(online_user_ids_query))
     query = apply_district_filter(query, districts)
 
-    # Sorting
-    order_col = User.id.desc() # Default
+    # Sorting: 有关键字且未指定排序时按匹配度排序
+    order_cols = [*search_order, User.id.desc()]
     if sort_by == "district":
-        order_col = User.district.asc() if sort_order == "ascending" else User.district.desc()
+        order_cols = [User.district.asc() if sort_order == "ascending" else User.district.desc()]
     elif sort_by == "department":
-        order_col = User.department.asc() if sort_order == "ascending" else User.department.desc()
-        
-    query = query.offset((page - 1) * page_size).limit(page_size).order_by(order_col)
-    items = session.exec(query).all()
+        order_cols = [User.department.asc() if sort_order == "ascending" else User.department.desc()]
+
+    rows = session.exec(query.order_by(*order_cols).offset((page - 1) * page_size).limit(page_size)).all()
+    items = [row[0] for row in rows]
+    if rows:
+        total = rows[0][1]
+    else:
+        # 页码越界时窗口函数拿不到总数，退回单独计数
+        total = session.exec(select(func.count()).select_from(query.subquery())).one()
 
     online_user_ids = {
         uid for uid in session.exec(online_user_ids_query).all()
@@ -274,16 +277,17 @@ def read_users(
 
     items_payload = []
     for user in items:
-        user_dict = user.model_dump()
+        user_dict = user.model_dump(exclude={"name_initials"})
         user_dict["is_online"] = user.id in online_user_ids
         items_payload.append(user_dict)
     
-    return {
+    # 直接交给 orjson，跳过 jsonable_encoder 对每个用户字段的逐一转换
+    return FastJSONResponse({
         "items": items_payload,
         "total": total,
         "page": page,
         "page_size": page_size
-    }
+    })
 
 @router.get("/district-options", response_model=List[str])
 def get_district_options(session: Session = Depends(get_session)):
@@ -319,6 +323,9 @@ def update_user(user_id: int, user_data: User, session: Session = Depends(get_se
     session.add(user)
     session.commit()
     session.refresh(user)
+    invalidate_login_cache()
+    # 参会人姓名、部门显示在会议详情中
+    bump_shared()
     return user
 
 
@@ -343,6 +350,8 @@ def update_user_profile(user_id: int, data: UserProfileUpdate, session: Session
     session.add(user)
     session.commit()
     session.refresh(user)
+    invalidate_login_cache()
+    bump_shared()
     return user
 
 @router.delete("/{user_id}")
@@ -355,6 +364,8 @@ def delete_user(user_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="User not found")
     session.delete(user)
     session.commit()
+    invalidate_login_cache()
+    bump_shared()
     return {"ok": True}
 
 @router.post("/change_password")
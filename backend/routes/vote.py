@@ -11,7 +11,7 @@ from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, delete, select
 
-from database import get_session
+from database import AsyncSession, get_async_session, get_session
 from models import (
     User,
     UserVote,
@@ -25,6 +25,7 @@ from models import (
     VoteUpdate,
 )
 from socket_manager import broadcast_vote_results, broadcast_vote_state
+from query_budget import query_budget
 
 router = APIRouter(prefix="/vote", tags=["投票管理"])
 logger = logging.getLogger(__name__)
@@ -163,16 +164,6 @@ def _get_user_voted(vote_id: int, user_id: Optional[int], session: Session) -> b
     )
 
 
-def _get_user_selected_option_ids(vote_id: int, user_id: Optional[int], session: Session) -> List[int]:
-    if not user_id:
-        return []
-    return session.exec(
-        select(UserVote.option_id)
-        .where(UserVote.vote_id == vote_id, UserVote.user_id == user_id)
-        .order_by(UserVote.option_id)
-    ).all()
-
-
 def _build_vote_result(vote: Vote, session: Session) -> VoteResult:
     status, _, _ = _resolve_effective_vote_state(vote)
     total_voters = _get_total_voters(vote.id, session)
@@ -219,11 +210,13 @@ def _build_vote_result(vote: Vote, session: Session) -> VoteResult:
     )
 
 
-def _build_vote_read(vote: Vote, session: Session, user_id: Optional[int] = None) -> VoteRead:
+def _assemble_vote_read(
+    vote: Vote,
+    options: List[VoteOption],
+    total_voters: int,
+    selected_option_ids: List[int],
+) -> VoteRead:
     status, started_at, closed_at = _resolve_effective_vote_state(vote)
-    options = _get_vote_options(vote.id, session)
-    total_voters = _get_total_voters(vote.id, session)
-    selected_option_ids = list(_get_user_selected_option_ids(vote.id, user_id, session) or [])
 
     now = _local_now()
     remaining_seconds: Optional[int] = None
@@ -256,11 +249,61 @@ def _build_vote_read(vote: Vote, session: Session, user_id: Optional[int] = None
         wait_seconds=wait_seconds,
         countdown_remaining_seconds=countdown_remaining_seconds,
         selected_option_ids=selected_option_ids,
-        user_voted=_get_user_voted(vote.id, user_id, session),
+        user_voted=bool(selected_option_ids),
         total_voters=total_voters,
     )
 
 
+def _build_vote_reads(votes: List[Vote], session: Session, user_id: Optional[int] = None) -> List[VoteRead]:
+    """
+    批量构建投票详情，选项、投票人数与当前用户的选择各一次查询，
+    查询次数与投票数量无关。
+    """
+    vote_ids = [vote.id for vote in votes]
+    if not vote_ids:
+        return []
+
+    options_by_vote: dict[int, List[VoteOption]] = {}
+    for option in session.exec(
+        select(VoteOption)
+        .where(VoteOption.vote_id.in_(vote_ids))
+        .order_by(VoteOption.vote_id, VoteOption.sort_order, VoteOption.id)
+    ).all():
+        options_by_vote.setdefault(option.vote_id, []).append(option)
+
+    total_voters_by_vote = {
+        int(vote_id): int(total or 0)
+        for vote_id, total in session.exec(
+            select(UserVote.vote_id, func.count(func.distinct(UserVote.user_id)))
+            .where(UserVote.vote_id.in_(vote_ids))
+            .group_by(UserVote.vote_id)
+        ).all()
+    }
+
+    selected_by_vote: dict[int, List[int]] = {}
+    if user_id:
+        for vote_id, option_id in session.exec(
+            select(UserVote.vote_id, UserVote.option_id)
+            .where(UserVote.vote_id.in_(vote_ids), UserVote.user_id == user_id)
+            .order_by(UserVote.vote_id, UserVote.option_id)
+        ).all():
+            selected_by_vote.setdefault(int(vote_id), []).append(int(option_id))
+
+    return [
+        _assemble_vote_read(
+            vote,
+            options_by_vote.get(vote.id, []),
+            total_voters_by_vote.get(vote.id, 0),
+            selected_by_vote.get(vote.id, []),
+        )
+        for vote in votes
+    ]
+
+
+def _build_vote_read(vote: Vote, session: Session, user_id: Optional[int] = None) -> VoteRead:
+    return _build_vote_reads([vote], session, user_id=user_id)[0]
+
+
 def _build_public_vote_snapshot(vote: Vote, session: Session) -> dict:
     snapshot = _build_vote_read(vote, session).model_dump(mode="json")
     snapshot["user_voted"] = False
@@ -287,17 +330,27 @@ def _sync_effective_vote_state(vote: Vote, session: Session, *, commit: bool = T
     return True
 
 
-async def _broadcast_vote_snapshot(vote_id: int, session: Session) -> None:
-    vote = _get_vote_or_404(vote_id, session)
-    vote_result = _build_vote_result(vote, session)
+def _build_vote_broadcast(vote: Vote, session: Session) -> Tuple[dict, dict]:
+    """vote_state 快照与 vote_results 载荷。"""
+    result_payload = _build_vote_result(vote, session).model_dump(mode="json")
     snapshot = _build_public_vote_snapshot(vote, session)
-    result_payload = vote_result.model_dump(mode="json")
     snapshot["results"] = result_payload["results"]
-    await broadcast_vote_state(vote.meeting_id, snapshot)
-    await broadcast_vote_results(vote.meeting_id, vote.id, result_payload)
+    return snapshot, result_payload
 
 
-async def _broadcast_vote_snapshot_safely(vote_id: int, session: Session) -> None:
+def _load_vote_broadcast(session: Session, vote_id: int) -> Tuple[int, dict, dict]:
+    vote = _get_vote_or_404(vote_id, session)
+    snapshot, result_payload = _build_vote_broadcast(vote, session)
+    return vote.meeting_id, snapshot, result_payload
+
+
+async def _broadcast_vote_snapshot(vote_id: int, session: AsyncSession) -> None:
+    meeting_id, snapshot, result_payload = await session.run_sync(_load_vote_broadcast, vote_id)
+    await broadcast_vote_state(meeting_id, snapshot)
+    await broadcast_vote_results(meeting_id, vote_id, result_payload)
+
+
+async def _broadcast_vote_snapshot_safely(vote_id: int, session: AsyncSession) -> None:
     try:
         await _broadcast_vote_snapshot(vote_id, session)
     except Exception:
@@ -399,9 +452,10 @@ def delete_vote(vote_id: int, session: Session = Depends(get_session)):
 
 
 @router.get("/meeting/{meeting_id}/list", response_model=List[VoteRead])
+@query_budget(5)
 def list_meeting_votes(meeting_id: int, user_id: Optional[int] = None, session: Session = Depends(get_session)):
     votes = session.exec(select(Vote).where(Vote.meeting_id == meeting_id).order_by(Vote.created_at.desc())).all()
-    return [_build_vote_read(vote, session, user_id=user_id) for vote in votes]
+    return _build_vote_reads(votes, session, user_id=user_id)
 
 
 @router.get("/meeting/{meeting_id}/active", response_model=Optional[VoteRead])
@@ -419,6 +473,7 @@ def get_active_vote(meeting_id: int, user_id: Optional[int] = None, session: Ses
 
 
 @router.get("/history", response_model=List[VoteRead])
+@query_budget(6)
 def get_vote_history(user_id: int, skip: int = 0, limit: int = 20, session: Session = Depends(get_session)):
     history_rows = session.exec(
         select(UserVote.vote_id, func.max(UserVote.voted_at))
@@ -434,7 +489,7 @@ def get_vote_history(user_id: int, skip: int = 0, limit: int = 20, session: Sess
 
     votes = session.exec(select(Vote).where(Vote.id.in_(vote_ids))).all()
     vote_map = {vote.id: vote for vote in votes}
-    return [_build_vote_read(vote_map[vote_id], session, user_id=user_id) for vote_id in vote_ids if vote_id in vote_map]
+    return _build_vote_reads([vote_map[vote_id] for vote_id in vote_ids if vote_id in vote_map], session, user_id=user_id)
 
 
 @router.get("/{vote_id}", response_model=VoteRead)
@@ -443,87 +498,72 @@ def get_vote(vote_id: int, user_id: Optional[int] = None, session: Session = Dep
     return _build_vote_read(vote, session, user_id=user_id)
 
 
-@router.post("/{vote_id}/start")
-async def start_vote(vote_id: int, session: Session = Depends(get_session)):
+# 启动 / 关闭 / 提交是现场高并发接口，走异步会话：
+# 数据库操作写成同步函数由 session.run_sync 执行，返回 (是否需要广播, 错误信息)；
+# 校验失败前若已修正了过期状态，先提交并广播再返回错误，与原有行为一致
+
+def _apply_vote_start(session: Session, vote_id: int) -> Tuple[bool, Optional[str]]:
     vote = _get_vote_for_update(vote_id, session)
     state_changed = _sync_effective_vote_state(vote, session, commit=False)
 
     if vote.status in {"countdown", "active"}:
         if state_changed:
             session.commit()
-            session.refresh(vote)
-            await _broadcast_vote_snapshot_safely(vote.id, session)
-        return {"success": True, "vote_id": vote.id}
+        return state_changed, None
     if vote.status != "draft":
         if state_changed:
             session.commit()
-            session.refresh(vote)
-            await _broadcast_vote_snapshot_safely(vote.id, session)
-        raise HTTPException(status_code=400, detail="只能启动草稿状态的投票")
+        return state_changed, "只能启动草稿状态的投票"
 
     vote.status = "countdown"
     vote.started_at = _local_now() + timedelta(seconds=vote.countdown_seconds)
     vote.closed_at = None
     session.add(vote)
     session.commit()
-    session.refresh(vote)
-
-    await _broadcast_vote_snapshot_safely(vote.id, session)
-    return {"success": True, "vote_id": vote.id}
+    return True, None
 
 
-@router.post("/{vote_id}/close")
-async def close_vote(vote_id: int, session: Session = Depends(get_session)):
+def _apply_vote_close(session: Session, vote_id: int) -> Tuple[bool, Optional[str]]:
     vote = _get_vote_for_update(vote_id, session)
     state_changed = _sync_effective_vote_state(vote, session, commit=False)
 
     if vote.status == "closed":
         if state_changed:
             session.commit()
-            session.refresh(vote)
-            await _broadcast_vote_snapshot_safely(vote.id, session)
-        return {"success": True, "vote_id": vote.id}
+        return state_changed, None
     if vote.status not in {"countdown", "active"}:
         if state_changed:
             session.commit()
-            session.refresh(vote)
-            await _broadcast_vote_snapshot_safely(vote.id, session)
-        raise HTTPException(status_code=400, detail="当前投票不在进行中")
+        return state_changed, "当前投票不在进行中"
 
     vote.status = "closed"
     vote.closed_at = _local_now()
     session.add(vote)
     session.commit()
-    session.refresh(vote)
-
-    await _broadcast_vote_snapshot_safely(vote.id, session)
-    return {"success": True, "vote_id": vote.id}
+    return True, None
 
 
-@router.post("/{vote_id}/submit")
-async def submit_vote(vote_id: int, data: VoteSubmit, session: Session = Depends(get_session)):
+def _apply_vote_submit(session: Session, vote_id: int, data: VoteSubmit) -> Tuple[bool, Optional[str]]:
     vote = _get_vote_or_404(vote_id, session)
     state_changed = _sync_effective_vote_state(vote, session)
-    if state_changed:
-        await _broadcast_vote_snapshot_safely(vote.id, session)
 
     if vote.status != "active":
-        raise HTTPException(status_code=400, detail="投票未开始或已结束")
+        return state_changed, "投票未开始或已结束"
 
     if _get_user_voted(vote.id, data.user_id, session):
-        raise HTTPException(status_code=400, detail="您已投过票")
+        return state_changed, "您已投过票"
 
     option_ids = list(dict.fromkeys(data.option_ids))
     if not option_ids:
-        raise HTTPException(status_code=400, detail="请至少选择 1 个选项")
+        return state_changed, "请至少选择 1 个选项"
     if len(option_ids) > vote.max_selections:
-        raise HTTPException(status_code=400, detail=f"最多只能选择 {vote.max_selections} 个选项")
+        return state_changed, f"最多只能选择 {vote.max_selections} 个选项"
     if not vote.is_multiple and len(option_ids) != 1:
-        raise HTTPException(status_code=400, detail="单选投票只能选择 1 个选项")
+        return state_changed, "单选投票只能选择 1 个选项"
 
     valid_option_ids = {option.id for option in _get_vote_options(vote.id, session)}
     if any(option_id not in valid_option_ids for option_id in option_ids):
-        raise HTTPException(status_code=400, detail="存在无效的投票选项")
+        return state_changed, "存在无效的投票选项"
 
     for option_id in option_ids:
         session.add(UserVote(vote_id=vote.id, user_id=data.user_id, option_id=option_id))
@@ -532,9 +572,35 @@ async def submit_vote(vote_id: int, data: VoteSubmit, session: Session = Depends
         session.commit()
     except IntegrityError:
         session.rollback()
-        raise HTTPException(status_code=400, detail="您已投过票")
+        return state_changed, "您已投过票"
+    return True, None
+
+
+async def _finish_runtime_action(vote_id: int, session: AsyncSession, should_broadcast: bool, error: Optional[str]) -> None:
+    if should_broadcast:
+        await _broadcast_vote_snapshot_safely(vote_id, session)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+
+@router.post("/{vote_id}/start")
+async def start_vote(vote_id: int, session: AsyncSession = Depends(get_async_session)):
+    should_broadcast, error = await session.run_sync(_apply_vote_start, vote_id)
+    await _finish_runtime_action(vote_id, session, should_broadcast, error)
+    return {"success": True, "vote_id": vote_id}
 
-    await _broadcast_vote_snapshot_safely(vote.id, session)
+
+@router.post("/{vote_id}/close")
+async def close_vote(vote_id: int, session: AsyncSession = Depends(get_async_session)):
+    should_broadcast, error = await session.run_sync(_apply_vote_close, vote_id)
+    await _finish_runtime_action(vote_id, session, should_broadcast, error)
+    return {"success": True, "vote_id": vote_id}
+
+
+@router.post("/{vote_id}/submit")
+async def submit_vote(vote_id: int, data: VoteSubmit, session: AsyncSession = Depends(get_async_session)):
+    should_broadcast, error = await session.run_sync(_apply_vote_submit, vote_id, data)
+    await _finish_runtime_action(vote_id, session, should_broadcast, error)
     return {"success": True}
 
 
@@ -16,10 +16,16 @@ cd "$(dirname "$0")"
 # Worker 数量建议: CPU核数 * 2 + 1
 # 例如 4 核 CPU 使用 9 个 Worker
 # 使用 Redis 作为 Socket.IO 消息队列，支持多 Worker 模式
-WORKERS=${WORKERS:-4}
+# 导出给 worker 进程：未配置 REDIS_URL 时 change_versions 据此在启动日志中提示版本号不跨进程共享
+export WORKERS=${WORKERS:-4}
 
 echo "Starting Paperless Meeting Backend with $WORKERS workers..."
 
+# /metrics 多进程汇总目录：每次启动前清空，避免混入上次运行的数据
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/paperless_metrics}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 # 使用 gunicorn 启动 uvicorn worker
 # --bind: 绑定地址和端口
 # --workers: 工作进程数
@@ -28,7 +34,9 @@ echo "Starting Paperless Meeting Backend with $WORKERS workers..."
 # --error-logfile: 错误日志
 # --keep-alive: 长连接保持时间（秒），WebSocket 需要较长时间
 # --timeout: 请求超时时间
+# -c gunicorn_conf.py: worker 退出时清理 Prometheus 多进程指标
 gunicorn main:app \
+    -c gunicorn_conf.py \
     --bind 0.0.0.0:8000 \
     --workers $WORKERS \
     --worker-class uvicorn.workers.UvicornWorker \
@@ -0,0 +1,170 @@
+"""
+运行时索引建议 (调试 / 压测使用)
+SCHEMA_ADVISOR_ENABLED=true 时在引擎上挂 before/after_cursor_execute，按语句指纹统计次数与耗时，
+并保留一条样本语句和参数。report() 对高频或慢的 SELECT / UPDATE / DELETE 执行
+EXPLAIN (SQLite 为 EXPLAIN QUERY PLAN)，标出全表扫描，提示需要补索引的查询。
+EXPLAIN 在调用 report() 时才执行，请求路径上只有计数开销。
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from logging_config import get_logger
+from query_budget import fingerprint
+
+
+SCHEMA_ADVISOR_ENABLED = os.getenv("SCHEMA_ADVISOR_ENABLED", "false").lower() in ("true", "1", "yes")
+SCHEMA_ADVISOR_SLOW_MS = float(os.getenv("SCHEMA_ADVISOR_SLOW_MS", "50"))
+SCHEMA_ADVISOR_MIN_CALLS = int(os.getenv("SCHEMA_ADVISOR_MIN_CALLS", "20"))
+# 指纹数量上限，避免拼接 SQL 之类的写法把内存撑大
+SCHEMA_ADVISOR_MAX_PATTERNS = int(os.getenv("SCHEMA_ADVISOR_MAX_PATTERNS", "500"))
+
+logger = get_logger("schema_advisor")
+
+_ANALYZED_PREFIXES = ("SELECT", "UPDATE", "DELETE")
+
+
+class QueryPattern:
+    __slots__ = ("calls", "total_seconds", "max_seconds", "statement", "parameters", "paramstyle")
+
+    def __init__(self, statement: str, parameters, paramstyle: str):
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.statement = statement
+        self.parameters = parameters
+        self.paramstyle = paramstyle
+
+    def observe(self, seconds: float) -> None:
+        self.calls += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+
+
+class SchemaAdvisor:
+    def __init__(self, slow_ms: float = SCHEMA_ADVISOR_SLOW_MS, min_calls: int = SCHEMA_ADVISOR_MIN_CALLS,
+                 max_patterns: int = SCHEMA_ADVISOR_MAX_PATTERNS):
+        self.slow_seconds = slow_ms / 1000
+        self.min_calls = min_calls
+        self.max_patterns = max_patterns
+        self._patterns: Dict[str, QueryPattern] = {}
+        self._lock = threading.Lock()
+
+    def instrument(self, engine) -> None:
+        if getattr(engine, "_schema_advisor_instrumented", False):
+            return
+        engine._schema_advisor_instrumented = True
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("schema_advisor_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("schema_advisor_started")
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if executemany or not statement.lstrip().upper().startswith(_ANALYZED_PREFIXES):
+            return
+        self.record(statement, parameters, elapsed, conn.dialect.paramstyle)
+
+    def record(self, statement: str, parameters, seconds: float, paramstyle: str) -> None:
+        key = fingerprint(statement)
+        with self._lock:
+            pattern = self._patterns.get(key)
+            if pattern is None:
+                if len(self._patterns) >= self.max_patterns:
+                    return
+                pattern = self._patterns[key] = QueryPattern(statement, parameters, paramstyle)
+            pattern.observe(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._patterns.clear()
+
+    def _candidates(self) -> List[tuple]:
+        with self._lock:
+            items = list(self._patterns.items())
+        return [
+            (key, pattern) for key, pattern in items
+            if pattern.calls >= self.min_calls or pattern.max_seconds >= self.slow_seconds
+        ]
+
+    def report(self, engine) -> List[dict]:
+        """高频或慢查询的统计与执行计划，发现全表扫描的排在前面。"""
+        entries = []
+        for key, pattern in self._candidates():
+            plan: Optional[List[str]] = None
+            if pattern.paramstyle == engine.dialect.paramstyle:
+                plan = _explain(engine, pattern.statement, pattern.parameters)
+            full_scans = _full_scans(engine.dialect.name, plan or [])
+            entries.append({
+                "fingerprint": key,
+                "calls": pattern.calls,
+                "avg_ms": round(pattern.total_seconds / pattern.calls * 1000, 3),
+                "max_ms": round(pattern.max_seconds * 1000, 3),
+                "slow": pattern.max_seconds >= self.slow_seconds,
+                "full_scans": full_scans,
+                "plan": plan,
+            })
+        entries.sort(key=lambda item: (not item["full_scans"], -item["calls"] * item["avg_ms"]))
+        return entries
+
+    def log_report(self, engine) -> None:
+        for entry in self.report(engine):
+            if not entry["full_scans"] and not entry["slow"]:
+                continue
+            logger.warning(
+                "Query pattern needs attention: %s",
+                entry["fingerprint"][:300],
+                extra={
+                    "calls": entry["calls"],
+                    "avg_ms": entry["avg_ms"],
+                    "max_ms": entry["max_ms"],
+                    "full_scans": entry["full_scans"],
+                },
+            )
+
+
+def _explain(engine, statement: str, parameters) -> Optional[List[str]]:
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        with engine.connect() as connection:
+            rows = connection.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+    except Exception as e:
+        logger.debug("EXPLAIN failed: %s", e)
+        return None
+    if engine.dialect.name == "sqlite":
+        # (id, parent, notused, detail)
+        return [str(row[-1]) for row in rows]
+    return [str(row[0]) for row in rows]
+
+
+def _full_scans(dialect_name: str, plan: List[str]) -> List[str]:
+    """从执行计划里提取被全表扫描的表名。"""
+    tables = []
+    for line in plan:
+        detail = line.strip()
+        if dialect_name == "sqlite":
+            # "SCAN vote" / "SCAN TABLE vote"；"SCAN x USING COVERING INDEX" 不算
+            if not detail.startswith("SCAN ") or " USING " in detail:
+                continue
+            words = detail.split()
+            table = words[2] if len(words) > 2 and words[1] == "TABLE" else words[1]
+        else:
+            marker = "Seq Scan on "
+            position = detail.find(marker)
+            if position < 0:
+                continue
+            table = detail[position + len(marker):].split()[0]
+        if table not in tables:
+            tables.append(table)
+    return tables
+
+
+schema_advisor = SchemaAdvisor()
@@ -15,7 +15,7 @@ import sys
 from datetime import datetime
 from sqlmodel import Session, select, delete
 from database import engine
-from models import User, MeetingType, Meeting, MeetingAttendeeLink
+from models import User, MeetingType, Meeting, MeetingAttendeeLink, MeetingSearchDocument
 
 # ============================================================
 # 1. 人员数据
@@ -365,6 +365,7 @@ def seed(force: bool = False):
             else:
                 print("🗑️  --force 模式：清空旧数据...")
                 session.exec(delete(MeetingAttendeeLink))
+                session.exec(delete(MeetingSearchDocument))
                 session.exec(delete(Meeting))
                 session.exec(delete(MeetingType))
                 session.exec(delete(User))
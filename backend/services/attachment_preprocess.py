@@ -0,0 +1,274 @@
+"""
+会议附件（PDF）预处理
+附件上传后在后台线程池中执行：读取页数，把前 ATTACHMENT_PREVIEW_MAX_PAGES 页渲染成宽 ATTACHMENT_PREVIEW_WIDTH 的
+低分辨率 WebP 预览，并把每页文本写入 attachmentpage 表。平板据此直接显示首页预览、页数并跳页，不必先下载整个 PDF；
+每页文本同时供全文检索（services.meeting_search）使用。
+- 渲染与抽取文本使用 PyMuPDF（可选依赖）；未安装时退回 pypdf，只有页数与文本没有预览；
+  都未安装时不处理，附件保持 pending，安装依赖后重启即补处理；非 PDF 附件标记 unsupported
+- 预览先写入本进程独占的临时目录（PREVIEW_ROOT 下 mkdtemp），完成后整体替换；页文本与附件字段在同一事务中更新
+- 多 worker 各自启动补处理：处理前先在库中把 pending 条件更新为 processing 认领，只有认领成功的 worker 处理；
+  认领超过 ATTACHMENT_PREPROCESS_STALE_SECONDS 仍未完成（进程中途退出）的附件可被重新认领
+- 独立的有界线程池（ATTACHMENT_PREPROCESS_WORKERS），队列满时放弃，附件保持 pending，下次启动由 enqueue_pending 补处理
+"""
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from sqlalchemy import and_, delete, insert, or_, select, update
+from sqlmodel import Session
+
+from database import engine
+from logging_config import get_logger
+from metrics import timed_thumbnail
+from models import ATTACHMENT_PREVIEW_URL, Attachment, AttachmentPage
+from services import meeting_search
+from services.background_jobs import BackgroundJobRunner
+
+try:
+    import fitz  # type: ignore  # PyMuPDF
+    PYMUPDF_AVAILABLE = True
+except Exception:
+    fitz = None
+    PYMUPDF_AVAILABLE = False
+
+try:
+    from pypdf import PdfReader  # type: ignore
+    PYPDF_AVAILABLE = True
+except Exception:
+    PdfReader = None
+    PYPDF_AVAILABLE = False
+
+try:
+    from PIL import Image  # type: ignore
+    PIL_AVAILABLE = True
+except Exception:
+    PIL_AVAILABLE = False
+
+
+ATTACHMENT_PREPROCESS_WORKERS = int(os.getenv("ATTACHMENT_PREPROCESS_WORKERS", "1"))
+ATTACHMENT_PREPROCESS_MAX_PENDING = int(os.getenv("ATTACHMENT_PREPROCESS_MAX_PENDING", "500"))
+ATTACHMENT_PREVIEW_WIDTH = int(os.getenv("ATTACHMENT_PREVIEW_WIDTH", "360"))
+ATTACHMENT_PREVIEW_QUALITY = int(os.getenv("ATTACHMENT_PREVIEW_QUALITY", "60"))
+ATTACHMENT_PREVIEW_MAX_PAGES = int(os.getenv("ATTACHMENT_PREVIEW_MAX_PAGES", "200"))
+ATTACHMENT_TEXT_MAX_CHARS = int(os.getenv("ATTACHMENT_TEXT_MAX_CHARS", "20000"))
+ATTACHMENT_PREPROCESS_STALE_SECONDS = int(os.getenv("ATTACHMENT_PREPROCESS_STALE_SECONDS", "1800"))
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+STATUS_UNSUPPORTED = "unsupported"
+
+PREVIEW_ROOT = Path("uploads/previews/attachments")
+
+logger = get_logger("attachment_preprocess")
+
+preprocess_jobs = BackgroundJobRunner(
+    max_workers=ATTACHMENT_PREPROCESS_WORKERS,
+    max_pending=ATTACHMENT_PREPROCESS_MAX_PENDING,
+    name="attachment-preprocess",
+    inline_when_full=False,
+)
+
+
+@dataclass
+class PdfAnalysis:
+    page_count: int = 0
+    preview_pages: int = 0
+    texts: List[str] = field(default_factory=list)
+
+
+def preprocess_available() -> bool:
+    return PYMUPDF_AVAILABLE or PYPDF_AVAILABLE
+
+
+def preview_dir(attachment_id: int) -> Path:
+    return PREVIEW_ROOT / str(int(attachment_id))
+
+
+def preview_url(attachment_id: int, page_number: int) -> str:
+    return ATTACHMENT_PREVIEW_URL.format(attachment_id=attachment_id, page=page_number)
+
+
+def _preview_filename(page_number: int) -> str:
+    # 与 models.ATTACHMENT_PREVIEW_URL 的文件名部分一致
+    return f"page_{page_number:04d}.webp"
+
+
+def _clean_text(value: Optional[str]) -> str:
+    # PostgreSQL 的 TEXT 不接受 NUL
+    return (value or "").replace("\x00", "").strip()[:ATTACHMENT_TEXT_MAX_CHARS]
+
+
+def _analyze_with_pymupdf(source: Path, output_dir: Optional[Path]) -> PdfAnalysis:
+    analysis = PdfAnalysis()
+    with fitz.open(source) as document:
+        analysis.page_count = document.page_count
+        for index, page in enumerate(document):
+            analysis.texts.append(_clean_text(page.get_text("text")))
+            if output_dir is None or index >= ATTACHMENT_PREVIEW_MAX_PAGES or page.rect.width <= 0:
+                continue
+            zoom = ATTACHMENT_PREVIEW_WIDTH / page.rect.width
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+            image.save(output_dir / _preview_filename(index + 1), format="WEBP", quality=ATTACHMENT_PREVIEW_QUALITY)
+            analysis.preview_pages = index + 1
+    return analysis
+
+
+def _analyze_with_pypdf(source: Path) -> PdfAnalysis:
+    reader = PdfReader(str(source))
+    texts = [_clean_text(page.extract_text()) for page in reader.pages]
+    return PdfAnalysis(page_count=len(texts), texts=texts)
+
+
+def analyze_pdf(source: Path, output_dir: Optional[Path]) -> PdfAnalysis:
+    """output_dir 为 None 或缺少渲染依赖时只取页数与文本。"""
+    if PYMUPDF_AVAILABLE:
+        return _analyze_with_pymupdf(source, output_dir if PIL_AVAILABLE else None)
+    if PYPDF_AVAILABLE:
+        return _analyze_with_pypdf(source)
+    raise RuntimeError("no PDF backend installed (PyMuPDF / pypdf)")
+
+
+def _is_pdf(attachment: Attachment) -> bool:
+    return attachment.filename.lower().endswith(".pdf") or attachment.content_type == "application/pdf"
+
+
+def _save_result(session: Session, attachment: Attachment, analysis: PdfAnalysis, status: str) -> None:
+    session.execute(delete(AttachmentPage).where(AttachmentPage.attachment_id == attachment.id))
+    if analysis.texts:
+        # PostgreSQL 下词向量随页文本一起写入
+        with_tokens = meeting_search.uses_tsvector(session)
+        session.execute(
+            insert(AttachmentPage),
+            [
+                {
+                    "attachment_id": attachment.id,
+                    "page_number": number,
+                    "text": text,
+                    "search_tokens": meeting_search.page_tsvector(text) if with_tokens else None,
+                }
+                for number, text in enumerate(analysis.texts, start=1)
+            ],
+        )
+    attachment.page_count = analysis.page_count if status == STATUS_READY else None
+    attachment.preview_page_count = analysis.preview_pages
+    attachment.preprocess_status = status
+    session.add(attachment)
+    session.commit()
+    meeting_search.replace_attachment_pages(attachment.meeting_id, attachment.id, analysis.texts)
+
+
+def _claimable(only_pending: bool):
+    stale = and_(
+        Attachment.preprocess_status == STATUS_PROCESSING,
+        or_(
+            Attachment.preprocess_started_at.is_(None),
+            Attachment.preprocess_started_at < datetime.now() - timedelta(seconds=ATTACHMENT_PREPROCESS_STALE_SECONDS),
+        ),
+    )
+    if only_pending:
+        return or_(Attachment.preprocess_status == STATUS_PENDING, stale)
+    return or_(Attachment.preprocess_status != STATUS_PROCESSING, stale)
+
+
+def _claim(session: Session, attachment_id: int, only_pending: bool) -> bool:
+    """条件更新为 processing，多个 worker 同时认领时只有一个成功。"""
+    result = session.execute(
+        update(Attachment)
+        .where(Attachment.id == attachment_id, _claimable(only_pending))
+        .values(preprocess_status=STATUS_PROCESSING, preprocess_started_at=datetime.now())
+    )
+    session.commit()
+    return result.rowcount > 0
+
+
+def process_attachment(attachment_id: int, only_pending: bool = False) -> Optional[str]:
+    """
+    同步处理一个附件，返回最终状态；附件不存在或已被其他 worker 认领时返回 None。
+    only_pending 为 True 时只处理仍为 pending 的附件（后台任务使用），否则已处理过的附件也重新处理。
+    """
+    with Session(engine) as session:
+        if not _claim(session, attachment_id, only_pending):
+            return None
+        attachment = session.get(Attachment, attachment_id)
+        if attachment is None:
+            return None
+        if not _is_pdf(attachment):
+            _save_result(session, attachment, PdfAnalysis(), STATUS_UNSUPPORTED)
+            return STATUS_UNSUPPORTED
+        source = Path(attachment.file_path)
+
+    target_dir = preview_dir(attachment_id)
+    staging_dir = None
+    try:
+        PREVIEW_ROOT.mkdir(parents=True, exist_ok=True)
+        staging_dir = Path(tempfile.mkdtemp(prefix=f"{int(attachment_id)}.", suffix=".tmp", dir=PREVIEW_ROOT))
+        with timed_thumbnail("attachment_pdf"):
+            analysis = analyze_pdf(source, staging_dir)
+        status = STATUS_READY
+    except Exception as e:
+        logger.warning("Failed to preprocess attachment %s (%s): %s", attachment_id, source, e)
+        analysis, status = PdfAnalysis(), STATUS_FAILED
+
+    try:
+        shutil.rmtree(target_dir, ignore_errors=True)
+        if analysis.preview_pages:
+            staging_dir.rename(target_dir)
+    finally:
+        if staging_dir is not None:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    with Session(engine) as session:
+        attachment = session.get(Attachment, attachment_id)
+        if attachment is None:
+            # 处理期间附件已被删除
+            shutil.rmtree(target_dir, ignore_errors=True)
+            return None
+        _save_result(session, attachment, analysis, status)
+    return status
+
+
+def _process_job(attachment_id: int, on_done: Optional[Callable[[int], None]]) -> None:
+    if process_attachment(attachment_id, only_pending=True) is not None and on_done is not None:
+        on_done(attachment_id)
+
+
+def enqueue_preprocess(attachment_id: int, on_done: Optional[Callable[[int], None]] = None) -> bool:
+    """提交后台预处理；未安装 PDF 依赖、同一附件排队中或队列已满时返回 False。"""
+    if not preprocess_available():
+        return False
+    return preprocess_jobs.submit(("attachment", attachment_id), _process_job, attachment_id, on_done)
+
+
+def enqueue_pending(on_done: Optional[Callable[[int], None]] = None) -> int:
+    """
+    启动时在后台调用：补处理仍为 pending 的附件（含升级前上传的）及认领超时的附件，返回提交数量。
+    每个 worker 都会调用，实际处理前再认领，同一附件只会被处理一次。
+    """
+    if not preprocess_available():
+        return 0
+    with Session(engine) as session:
+        attachment_ids = session.execute(
+            select(Attachment.id).where(_claimable(only_pending=True)).order_by(Attachment.id)
+        ).scalars().all()
+    count = sum(1 for attachment_id in attachment_ids if enqueue_preprocess(attachment_id, on_done))
+    if count:
+        logger.info("Queued %s attachments for preprocessing", count)
+    return count
+
+
+def remove_previews(attachment_ids) -> None:
+    """附件删除后调用（在后台线程中执行）。"""
+    for attachment_id in attachment_ids:
+        shutil.rmtree(preview_dir(attachment_id), ignore_errors=True)
+
+
+def shutdown_preprocess_jobs() -> None:
+    """退出时不等待：排队中的附件保持 pending，处理中的在认领超时后由下次启动重新处理。"""
+    preprocess_jobs.shutdown(wait=False)
@@ -0,0 +1,91 @@
+"""
+登录服务层
+平板端早高峰集中登录时，身份解析走进程内 LRU 缓存，last_login 写入合并后由后台批量落库。
+"""
+import os
+import threading
+from datetime import datetime
+from typing import List, Optional
+
+from cachetools import TTLCache
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from database import engine
+from models import User
+from services.write_behind import WriteBehindBuffer, register_buffer
+
+
+LOGIN_CACHE_SIZE = int(os.getenv("LOGIN_CACHE_SIZE", "4096"))
+# 多 worker 下各进程缓存独立失效，TTL 兜底限制跨进程的陈旧时间
+LOGIN_CACHE_TTL_SECONDS = int(os.getenv("LOGIN_CACHE_TTL_SECONDS", "300"))
+LAST_LOGIN_FLUSH_SECONDS = float(os.getenv("LAST_LOGIN_FLUSH_SECONDS", "5"))
+
+_login_cache = TTLCache(maxsize=LOGIN_CACHE_SIZE, ttl=LOGIN_CACHE_TTL_SECONDS)
+_login_cache_lock = threading.Lock()
+
+
+def _profile_from_user(user: User) -> dict:
+    return {
+        "user_id": user.id,
+        "name": user.name,
+        "department": user.department,
+        "district": user.district,
+        "phone": user.phone,
+        "email": user.email,
+        "role": user.position,
+    }
+
+
+def invalidate_login_cache() -> None:
+    """用户新增/修改/删除后调用，清空可登录身份缓存。"""
+    with _login_cache_lock:
+        _login_cache.clear()
+
+
+def resolve_login_profile(query: str, session: Session) -> dict:
+    """按姓名或手机号解析登录用户，命中缓存时不访问数据库。"""
+    with _login_cache_lock:
+        cached = _login_cache.get(query)
+    if cached is not None:
+        return cached
+
+    # name 与 phone 均有索引，两个等值条件各自走索引后合并
+    results = session.exec(select(User).where((User.name == query) | (User.phone == query))).all()
+
+    if not results:
+        raise HTTPException(status_code=401, detail="用户名或密码错误")
+
+    if len(results) > 1:
+        # 如果有多个人匹配 (通常是重名)，检查是否有完全匹配手机号的 (手机号理论上唯一)
+        exact_phone = [u for u in results if u.phone == query]
+        if len(exact_phone) != 1:
+            raise HTTPException(
+                status_code=300,
+                detail=f"存在重名用户 '{query}'，请使用手机号登录"
+            )
+        user = exact_phone[0]
+    else:
+        user = results[0]
+
+    profile = _profile_from_user(user)
+    with _login_cache_lock:
+        _login_cache[query] = profile
+    return profile
+
+
+def _flush_last_logins(entries: List[dict]) -> None:
+    with Session(engine) as session:
+        session.execute(update(User), entries)
+        session.commit()
+
+
+_last_login_buffer = register_buffer(
+    WriteBehindBuffer("user.last_login", _flush_last_logins, interval_seconds=LAST_LOGIN_FLUSH_SECONDS)
+)
+
+
+def record_login(user_id: int, login_at: Optional[datetime] = None) -> None:
+    """登记一次登录，同一用户在合并窗口内只保留最后一次时间。"""
+    _last_login_buffer.put(user_id, {"id": user_id, "last_login": login_at or datetime.now()})
@@ -0,0 +1,116 @@
+"""
+后台任务执行器
+删除文件、清理过期封面等不影响响应内容的收尾工作放到有界线程池中执行，请求在提交事务后立即返回。
+- 按 key 去重：同一 key 的任务在排队或执行中时，重复提交直接忽略（如多次删除会议只触发一次封面清理）
+- 排队数量有上限：超过 BACKGROUND_JOB_MAX_PENDING 时在调用方线程同步执行，不丢任务；
+  耗时很长的任务（视频转码）可设 inline_when_full=False，队列满时直接放弃并返回 False
+任务异常只记日志；进程退出前由 shutdown_background_jobs 等待已排队的任务执行完毕。
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+from logging_config import get_logger
+
+
+BACKGROUND_JOB_WORKERS = int(os.getenv("BACKGROUND_JOB_WORKERS", "2"))
+BACKGROUND_JOB_MAX_PENDING = int(os.getenv("BACKGROUND_JOB_MAX_PENDING", "1000"))
+
+logger = get_logger("background_jobs")
+
+
+class BackgroundJobRunner:
+    def __init__(
+        self,
+        max_workers: int = BACKGROUND_JOB_WORKERS,
+        max_pending: int = BACKGROUND_JOB_MAX_PENDING,
+        name: str = "background-job",
+        inline_when_full: bool = True,
+    ):
+        self.max_workers = max(max_workers, 1)
+        self.max_pending = max(max_pending, 1)
+        self.name = name
+        self.inline_when_full = inline_when_full
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def submit(self, key: Hashable, fn: Callable, *args, **kwargs) -> bool:
+        """提交任务；同 key 任务尚未结束、或队列已满且不允许同步执行时返回 False。"""
+        with self._lock:
+            if key in self._pending:
+                return False
+            if len(self._pending) >= self.max_pending:
+                if not self.inline_when_full:
+                    logger.warning("Background job queue full, dropping job", extra={"job": str(key)})
+                    return False
+                run_inline = True
+            else:
+                run_inline = False
+                future = self._get_executor().submit(self._run, key, fn, *args, **kwargs)
+                self._pending[key] = future
+
+        if run_inline:
+            logger.warning("Background job queue full, running inline", extra={"job": str(key)})
+            self._run(None, fn, *args, **kwargs)
+        return True
+
+    def _run(self, key: Optional[Hashable], fn: Callable, *args, **kwargs) -> None:
+        try:
+            fn(*args, **kwargs)
+        except Exception as e:
+            logger.warning("Background job failed: %s", e, extra={"job": str(key)})
+        finally:
+            if key is not None:
+                with self._lock:
+                    self._pending.pop(key, None)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> None:
+        """等待当前已提交的任务完成（测试与关闭时使用）。"""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            future.result(timeout=timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """wait=False 时取消尚未开始的任务，不等待正在执行的任务。"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+        if not wait:
+            with self._lock:
+                self._pending.clear()
+
+
+background_jobs = BackgroundJobRunner()
+
+
+def _remove_files(paths: Iterable[str]) -> None:
+    for path in paths:
+        try:
+            Path(path).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning("Error deleting file %s: %s", path, e)
+
+
+def remove_files_later(paths: Iterable[Optional[str]]) -> None:
+    """事务提交后调用：在后台删除文件，不存在的文件忽略。"""
+    unique_paths = tuple(sorted({path for path in paths if path}))
+    if unique_paths:
+        background_jobs.submit(("remove_files", unique_paths), _remove_files, unique_paths)
+
+
+def shutdown_background_jobs() -> None:
+    background_jobs.shutdown()
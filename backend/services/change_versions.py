@@ -0,0 +1,132 @@
+"""
+会议数据变更版本号
+会议列表 / 详情的 ETag 由这里的版本号计算，写操作提交后调用 bump_meeting / bump_shared：
+- list            任一会议变化都递增，会议列表使用
+- meeting:{id}    单个会议及其附件、参会人、签到变化时递增，会议详情使用
+- shared          会议类型、系统设置、人员等跨会议数据变化时递增，列表与详情都受影响
+- media           媒体库任一条目变化时递增，安卓媒体 feed 使用
+版本号与进程启动时生成的 epoch 组合，重启后旧 ETag 不会误命中。
+配置 REDIS_URL 时版本号存放在 Redis，多 worker 共享。
+未配置时版本号只在本进程内递增：多 worker 部署下其他 worker 的写操作不会改变本进程的 ETag，
+客户端最长要等 ETAG_TIME_BUCKET_SECONDS 的时间桶翻转才能拿到新数据，因此 WORKERS > 1 时启动会打印警告。
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+try:
+    import redis  # type: ignore
+    import redis.asyncio as redis_asyncio  # type: ignore
+    REDIS_AVAILABLE = True
+except Exception:
+    redis = None
+    redis_asyncio = None
+    REDIS_AVAILABLE = False
+
+from logging_config import get_logger, log_sampled
+
+
+logger = get_logger("change_versions")
+
+CHANGE_VERSION_KEY_PREFIX = os.getenv("CHANGE_VERSION_KEY_PREFIX", "change_version")
+# 与 run_production.sh / compose 中的 gunicorn worker 数一致，仅用于判断是否需要提示
+WORKERS = int(os.getenv("WORKERS", "1") or 1)
+
+LIST_SCOPE = "list"
+SHARED_SCOPE = "shared"
+MEDIA_SCOPE = "media"
+
+
+def meeting_scope(meeting_id: int) -> str:
+    return f"meeting:{int(meeting_id)}"
+
+
+class ChangeVersionStore:
+    """单进程实现。"""
+
+    def __init__(self):
+        self.epoch = format(time.time_ns(), "x")
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *scopes: str) -> None:
+        with self._lock:
+            for scope in scopes:
+                self._versions[scope] = self._versions.get(scope, 0) + 1
+
+    async def get_many(self, *scopes: str) -> Optional[Dict[str, int]]:
+        """返回 None 表示版本不可用，调用方应放弃条件请求。"""
+        return {scope: self._versions.get(scope, 0) for scope in scopes}
+
+
+class RedisChangeVersionStore(ChangeVersionStore):
+    """Redis 实现：写操作多在同步路由（线程池）中，递增用同步客户端；中间件读取用异步客户端。"""
+
+    def __init__(self, url: str, prefix: str = CHANGE_VERSION_KEY_PREFIX):
+        super().__init__()
+        self._prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._redis_async = redis_asyncio.from_url(url, decode_responses=True)
+        try:
+            # 所有 worker 共用首个 worker 写入的 epoch；Redis 清空后重新生成
+            self._redis.set(self._key("epoch"), self.epoch, nx=True)
+            self.epoch = self._redis.get(self._key("epoch")) or self.epoch
+        except Exception as e:
+            self._warn("init", e)
+
+    def _key(self, scope: str) -> str:
+        return f"{self._prefix}:{scope}"
+
+    @staticmethod
+    def _warn(action: str, error: Exception) -> None:
+        log_sampled(logger, logging.WARNING, f"change_versions.{action}", "Change version %s failed: %s", action, error, every=50)
+
+    def bump(self, *scopes: str) -> None:
+        try:
+            with self._redis.pipeline(transaction=False) as pipe:
+                for scope in scopes:
+                    pipe.incr(self._key(scope))
+                pipe.execute()
+        except Exception as e:
+            self._warn("bump", e)
+
+    async def get_many(self, *scopes: str) -> Optional[Dict[str, int]]:
+        try:
+            values = await self._redis_async.mget([self._key(scope) for scope in scopes])
+        except Exception as e:
+            self._warn("get", e)
+            return None
+        return {scope: int(value or 0) for scope, value in zip(scopes, values)}
+
+
+def _create_store() -> ChangeVersionStore:
+    redis_url = os.environ.get("REDIS_URL")
+    if redis_url and REDIS_AVAILABLE:
+        return RedisChangeVersionStore(redis_url)
+    if WORKERS > 1:
+        logger.warning(
+            "Change versions are per-process (%s) with %d workers; "
+            "writes on other workers may serve stale ETags for up to one time bucket. Configure REDIS_URL.",
+            "redis package not installed" if redis_url else "REDIS_URL not set",
+            WORKERS,
+        )
+    return ChangeVersionStore()
+
+
+change_versions = _create_store()
+
+
+def bump_meeting(*meeting_ids: Optional[int]) -> None:
+    """在事务提交之后调用；先提交后递增，避免旧数据被打上新版本号。"""
+    scopes = [meeting_scope(meeting_id) for meeting_id in meeting_ids if meeting_id is not None]
+    change_versions.bump(LIST_SCOPE, *scopes)
+
+
+def bump_shared() -> None:
+    change_versions.bump(LIST_SCOPE, SHARED_SCOPE)
+
+
+def bump_media() -> None:
+    change_versions.bump(MEDIA_SCOPE)
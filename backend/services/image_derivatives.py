@@ -0,0 +1,240 @@
+"""
+响应式图片衍生图
+为会议封面、媒体图片按 IMAGE_DERIVATIVE_WIDTHS 生成几种宽度（保持宽高比、只缩小不放大）的 WebP，
+Pillow 带 AVIF 编码器时另生成 AVIF。客户端按 srcset 选最小的够用尺寸，不再下载数 MB 的原图。
+- 生成在后台任务中执行（services.background_jobs，按源文件去重），列表接口只列出已生成的文件，不阻塞请求
+- 结果按 (源文件, mtime) 缓存在进程内，全部就绪后列表接口每张图只需一次 stat
+- 衍生图放在 uploads/thumbnails/responsive/ 下，保持源文件的相对目录；源文件更新（mtime 变大）后重新生成
+- 多 worker 可能同时生成同一张图：临时文件名带进程号与随机后缀，各自原子替换，结果相同谁先谁后都无妨
+"""
+import os
+import secrets
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cachetools import LRUCache
+
+from logging_config import get_logger
+from metrics import timed_thumbnail
+from services.background_jobs import background_jobs
+
+try:
+    from PIL import Image, ImageOps, features  # type: ignore
+    PIL_AVAILABLE = True
+    # 源文件无法解码（UnidentifiedImageError 是 OSError 的子类）；写衍生图的 I/O 错误不在此列
+    DECODE_ERRORS: Tuple[type, ...] = (OSError, Image.DecompressionBombError)
+except Exception:
+    PIL_AVAILABLE = False
+    DECODE_ERRORS = (OSError,)
+
+
+def _parse_widths(raw: str) -> Tuple[int, ...]:
+    widths = sorted({int(value) for value in raw.split(",") if value.strip().isdigit() and int(value) > 0})
+    return tuple(widths) or (320, 640, 960, 1280)
+
+
+IMAGE_DERIVATIVE_WIDTHS = _parse_widths(os.getenv("IMAGE_DERIVATIVE_WIDTHS", "320,640,960,1280"))
+IMAGE_DERIVATIVE_WEBP_QUALITY = int(os.getenv("IMAGE_DERIVATIVE_WEBP_QUALITY", "75"))
+IMAGE_DERIVATIVE_AVIF_QUALITY = int(os.getenv("IMAGE_DERIVATIVE_AVIF_QUALITY", "55"))
+IMAGE_DERIVATIVE_AVIF_ENABLED = os.getenv("IMAGE_DERIVATIVE_AVIF_ENABLED", "true").lower() in ("true", "1", "yes")
+IMAGE_DERIVATIVE_CACHE_SIZE = int(os.getenv("IMAGE_DERIVATIVE_CACHE_SIZE", "2048"))
+
+UPLOAD_ROOT = Path("uploads")
+DERIVATIVE_DIR = Path("thumbnails") / "responsive"
+
+logger = get_logger("image_derivatives")
+
+
+def _avif_available() -> bool:
+    if not (PIL_AVAILABLE and IMAGE_DERIVATIVE_AVIF_ENABLED):
+        return False
+    try:
+        return bool(features.check("avif"))
+    except Exception:
+        return False
+
+
+# 按文件体积从小到大排列，客户端同宽度优先取前者
+IMAGE_DERIVATIVE_FORMATS: Tuple[str, ...] = (("avif",) if _avif_available() else ()) + (("webp",) if PIL_AVAILABLE else ())
+
+
+@dataclass(frozen=True)
+class ImageDerivative:
+    path: Path  # 相对 uploads/ 的路径
+    width: int
+    height: int
+    format: str
+
+
+# 源文件绝对路径 -> (mtime_ns, 已就绪的衍生图, 是否全部就绪)
+_cache: "LRUCache[str, Tuple[int, Tuple[ImageDerivative, ...], bool]]" = LRUCache(maxsize=IMAGE_DERIVATIVE_CACHE_SIZE)
+_cache_lock = threading.Lock()
+
+
+def _cache_key(source: Path) -> str:
+    return os.path.abspath(source)
+
+
+def _relative_to_uploads(source: Path) -> Optional[Path]:
+    try:
+        return source.resolve().relative_to(UPLOAD_ROOT.resolve())
+    except (OSError, ValueError):
+        return None
+
+
+def target_widths(source_width: int) -> List[int]:
+    """只缩小：小于原图宽度的档位；原图比最小档还小时只生成原尺寸一份（仍可转为 WebP / AVIF）。"""
+    widths = [width for width in IMAGE_DERIVATIVE_WIDTHS if width < source_width]
+    return widths or [source_width]
+
+
+def planned_derivatives(source: Path, size: Tuple[int, int]) -> List[ImageDerivative]:
+    relative = _relative_to_uploads(source)
+    if relative is None:
+        return []
+    source_width, source_height = size
+    ext = source.suffix.lower().lstrip(".") or "img"
+    planned = []
+    for width in target_widths(source_width):
+        height = max(1, round(source_height * width / source_width))
+        for fmt in IMAGE_DERIVATIVE_FORMATS:
+            name = f"{source.stem}_{ext}_{width}w.{fmt}"
+            planned.append(ImageDerivative(DERIVATIVE_DIR / relative.parent / name, width, height, fmt))
+    return planned
+
+
+def _image_size(source: Path) -> Optional[Tuple[int, int]]:
+    """只读文件头；按 EXIF 方向换算为显示尺寸。动图不生成衍生图（只会剩第一帧），返回 None。"""
+    with Image.open(source) as img:
+        if getattr(img, "is_animated", False):
+            return None
+        width, height = img.size
+        orientation = img.getexif().get(0x0112, 1)
+    if orientation in (5, 6, 7, 8):
+        width, height = height, width
+    return width, height
+
+
+def _is_fresh(path: Path, source_mtime_ns: int) -> bool:
+    try:
+        return path.stat().st_mtime_ns >= source_mtime_ns
+    except OSError:
+        return False
+
+
+def _save(img, target: Path, fmt: str) -> None:
+    staging = target.with_name(f"{target.name}.{os.getpid()}.{secrets.token_hex(4)}.tmp")
+    try:
+        if fmt == "avif":
+            img.save(staging, format="AVIF", quality=IMAGE_DERIVATIVE_AVIF_QUALITY, speed=8)
+        else:
+            img.save(staging, format="WEBP", quality=IMAGE_DERIVATIVE_WEBP_QUALITY, method=4)
+        os.replace(staging, target)
+    finally:
+        staging.unlink(missing_ok=True)
+
+
+def generate_derivatives(source_path: Path) -> List[ImageDerivative]:
+    """同步生成缺失或过期的衍生图，返回全部衍生图。"""
+    if not PIL_AVAILABLE:
+        return []
+    source = Path(source_path)
+    try:
+        source_mtime_ns = source.stat().st_mtime_ns
+    except OSError:
+        return []
+    try:
+        with Image.open(source) as opened:
+            if getattr(opened, "is_animated", False):
+                return []
+            img = ImageOps.exif_transpose(opened)
+            has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+            img = img.convert("RGBA" if has_alpha else "RGB")
+    except DECODE_ERRORS as e:
+        logger.warning("Cannot decode image %s: %s", source_path, e)
+        # 损坏的源文件在 mtime 变化前不再重试
+        with _cache_lock:
+            _cache[_cache_key(source)] = (source_mtime_ns, (), True)
+        return []
+    try:
+        planned = planned_derivatives(source, img.size)
+        resample = Image.Resampling.LANCZOS if hasattr(Image, "Resampling") else Image.LANCZOS
+        resized: Dict[int, object] = {}
+        with timed_thumbnail("image_derivatives"):
+            for derivative in planned:
+                target = UPLOAD_ROOT / derivative.path
+                if _is_fresh(target, source_mtime_ns):
+                    continue
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if derivative.width not in resized:
+                    resized[derivative.width] = (
+                        img if derivative.width == img.size[0] else img.resize((derivative.width, derivative.height), resample)
+                    )
+                _save(resized[derivative.width], target, derivative.format)
+    except Exception as e:
+        # 写入失败（磁盘、权限等）不缓存结果，下次列表请求时重新提交
+        logger.warning("Failed to build image derivatives for %s: %s", source_path, e)
+        return []
+    with _cache_lock:
+        _cache[_cache_key(source)] = (source_mtime_ns, tuple(planned), True)
+    return planned
+
+
+def _generate_job(source: Path, on_ready: Optional[Callable[[], None]]) -> None:
+    if generate_derivatives(source) and on_ready is not None:
+        on_ready()
+
+
+def enqueue_derivatives(source_path: Path, on_ready: Optional[Callable[[], None]] = None) -> bool:
+    source = Path(source_path)
+    if not PIL_AVAILABLE or _relative_to_uploads(source) is None:
+        return False
+    return background_jobs.submit(("image_derivatives", _cache_key(source)), _generate_job, source, on_ready)
+
+
+def ready_derivatives(source_path: Path, on_ready: Optional[Callable[[], None]] = None) -> List[ImageDerivative]:
+    """已就绪的衍生图（从小到大）；有缺失时提交后台生成，本次只返回已有的部分。"""
+    if not PIL_AVAILABLE:
+        return []
+    source = Path(source_path)
+    key = _cache_key(source)
+    try:
+        source_mtime_ns = source.stat().st_mtime_ns
+    except OSError:
+        return []
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] == source_mtime_ns and cached[2]:
+        return list(cached[1])
+
+    try:
+        size = _image_size(source)
+    except Exception:
+        # 无法解码（SVG、损坏文件）：在 mtime 变化前不再尝试
+        size = None
+    planned = planned_derivatives(source, size) if size else []
+    ready = tuple(item for item in planned if _is_fresh(UPLOAD_ROOT / item.path, source_mtime_ns))
+    complete = len(ready) == len(planned)
+    with _cache_lock:
+        _cache[key] = (source_mtime_ns, ready, complete)
+    if not complete:
+        enqueue_derivatives(source, on_ready)
+    return list(ready)
+
+
+def derivative_files(source_path: Path) -> List[Path]:
+    """源文件删除时一并删除的衍生图路径（按文件名查找，不读取源文件）。"""
+    source = Path(source_path)
+    relative = _relative_to_uploads(source)
+    if relative is None:
+        return []
+    ext = source.suffix.lower().lstrip(".") or "img"
+    directory = UPLOAD_ROOT / DERIVATIVE_DIR / relative.parent
+    return list(directory.glob(f"{source.stem}_{ext}_*w.*"))
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
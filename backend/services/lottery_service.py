@@ -7,6 +7,7 @@ from datetime import datetime
 from typing import List, Optional
 
 from fastapi import HTTPException
+from sqlalchemy.orm import selectinload
 from sqlmodel import Session, select
 
 from models import Lottery, LotteryParticipant, LotterySession, LotteryWinner, Meeting
@@ -91,7 +92,10 @@ def normalize_round_orders(rounds: List[Lottery], session: Session) -> bool:
 
 
 def get_rounds(meeting_id: int, session: Session) -> List[Lottery]:
-    rounds = session.exec(select(Lottery).where(Lottery.meeting_id == meeting_id)).all()
+    # 快照会逐轮读取中奖名单，一次性预加载避免逐轮查询
+    rounds = session.exec(
+        select(Lottery).where(Lottery.meeting_id == meeting_id).options(selectinload(Lottery.winners))
+    ).all()
     return sort_rounds(rounds)
 
 
@@ -0,0 +1,58 @@
+"""
+安卓媒体 feed 缓存
+平板只浏览 visible_on_android 的条目，各文件夹每页的响应体按媒体库版本号（change_versions 的 media scope）
+序列化一次后缓存为字节，之后同版本的请求直接返回，不查库、不生成缩略图、不再序列化。
+任何媒体变更经 _notify_media_changed 递增版本号，旧条目在下次访问时被替换；版本号在 Redis 中时多 worker 共享。
+未配置 Redis 时版本号只在本进程递增，其他 worker 感知不到变更，因此版本里再带一个 MEDIA_FEED_MAX_AGE_SECONDS
+的时间桶（与 http_cache 的 ETag 时间桶相同的做法）：缓存的响应体与 ETag 最多沿用一个时间桶。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+MEDIA_FEED_CACHE_SIZE = int(os.getenv("MEDIA_FEED_CACHE_SIZE", "256"))
+MEDIA_FEED_MAX_AGE_SECONDS = max(int(os.getenv("MEDIA_FEED_MAX_AGE_SECONDS", "60")), 1)
+
+
+def feed_version(epoch: str, media_version: int) -> str:
+    """缓存与 ETag 使用的版本：进程 epoch、媒体库版本号与当前时间桶。"""
+    bucket = int(time.time() // MEDIA_FEED_MAX_AGE_SECONDS)
+    return f"{epoch}-{media_version}-{bucket}"
+
+
+class MediaFeedCache:
+    """按 key（文件夹、类型、分页）保存 (版本号, 响应体)，容量满时淘汰最久未使用的条目。"""
+
+    def __init__(self, max_entries: int = MEDIA_FEED_CACHE_SIZE):
+        self.max_entries = max(max_entries, 1)
+        self._entries: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: str, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (version, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+media_feed_cache = MediaFeedCache()
@@ -0,0 +1,86 @@
+"""
+媒体库目录树查询
+基于 parent_id 的递归 CTE（SQLite 与 PostgreSQL 通用），子树、祖先链、移动环路检查与子树删除各为一条语句。
+子树使用 UNION 去重，即使历史数据中出现环也能终止；祖先链带深度上限。
+"""
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, exists, literal, select
+from sqlalchemy.orm import aliased
+from sqlmodel import Session
+
+from models import MediaItem
+
+
+# 祖先链的最大深度，防止异常数据（环）导致无限递归
+MAX_TREE_DEPTH = 256
+
+
+def subtree_ids_cte(root_ids: Iterable[int], name: str = "media_subtree"):
+    """root_ids 及其全部后代的 id（含根本身）。"""
+    roots = list(root_ids)
+    base = select(MediaItem.id.label("id")).where(MediaItem.id.in_(roots))
+    tree = base.cte(name, recursive=True)
+    child = aliased(MediaItem)
+    return tree.union(select(child.id).where(child.parent_id == tree.c.id))
+
+
+def descendant_ids(session: Session, root_id: int, include_root: bool = True) -> Set[int]:
+    tree = subtree_ids_cte([root_id])
+    ids = set(session.execute(select(tree.c.id)).scalars().all())
+    if not include_root:
+        ids.discard(root_id)
+    return ids
+
+
+def is_in_subtree(session: Session, root_id: int, candidate_id: int) -> bool:
+    """candidate_id 是否为 root_id 本身或其后代，用于移动时的环路检查。"""
+    return any_subtree_contains(session, [root_id], candidate_id)
+
+
+def any_subtree_contains(session: Session, root_ids: Iterable[int], candidate_id: int) -> bool:
+    tree = subtree_ids_cte(root_ids)
+    return bool(session.execute(select(exists().where(tree.c.id == candidate_id))).scalar())
+
+
+def ancestors(session: Session, item_id: int) -> List[Tuple[int, str]]:
+    """从根到 item_id（含）的 (id, title) 列表；item 不存在时返回空列表。"""
+    base = select(
+        MediaItem.id.label("id"),
+        MediaItem.title.label("title"),
+        MediaItem.parent_id.label("parent_id"),
+        literal(0).label("depth"),
+    ).where(MediaItem.id == item_id)
+    chain = base.cte("media_ancestors", recursive=True)
+    parent = aliased(MediaItem)
+    chain = chain.union_all(
+        select(parent.id, parent.title, parent.parent_id, chain.c.depth + 1)
+        .where(parent.id == chain.c.parent_id, chain.c.depth < MAX_TREE_DEPTH)
+    )
+    rows = session.execute(select(chain.c.id, chain.c.title, chain.c.depth).order_by(chain.c.depth.desc())).all()
+
+    # 出现环时同一节点会重复出现，只保留离 item 最近的一段
+    path: List[Tuple[int, str]] = []
+    seen: Set[int] = set()
+    for row_id, title, _ in reversed(rows):
+        if row_id in seen:
+            break
+        seen.add(row_id)
+        path.append((row_id, title))
+    path.reverse()
+    return path
+
+
+def delete_subtrees(session: Session, root_ids: Iterable[int]) -> List[Optional[str]]:
+    """删除 root_ids 及其全部后代，返回被删除条目的磁盘文件名（调用方提交后再删除文件）。"""
+    roots = list(root_ids)
+    if not roots:
+        return []
+    tree = subtree_ids_cte(roots)
+    statement = (
+        delete(MediaItem)
+        .where(MediaItem.id.in_(select(tree.c.id)))
+        .returning(MediaItem.filename)
+        .execution_options(synchronize_session=False)
+    )
+    return list(session.execute(statement).scalars().all())
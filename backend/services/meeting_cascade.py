@@ -0,0 +1,97 @@
+"""
+会议级联删除
+按表一次性删除会议的全部从属数据（投票、抽签、签到、同屏状态、参会人、附件及附件页文本、检索文档），
+语句数量固定，与会议下的投票 / 签到条数无关。
+阅读进度与单条删除一致只写墓碑（deleted_at），缓冲区或其他 worker 中晚到的旧进度不会因记录被物理删除而重新插入。
+函数只执行删除不提交事务；附件文件路径与附件 id（预览图目录）随结果返回，由调用方在提交后交给后台任务删除。
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import delete, or_, select, update
+from sqlmodel import Session
+
+from models import (
+    Attachment,
+    AttachmentPage,
+    CheckIn,
+    Lottery,
+    LotteryParticipant,
+    LotterySession,
+    LotteryWinner,
+    Meeting,
+    MeetingAttendeeLink,
+    MeetingSearchDocument,
+    MeetingSyncState,
+    ReadingProgress,
+    UserVote,
+    Vote,
+    VoteOption,
+)
+
+
+@dataclass
+class MeetingCascadeResult:
+    meeting_id: int
+    cover_image: Optional[str] = None
+    file_paths: List[str] = field(default_factory=list)
+    attachment_ids: List[int] = field(default_factory=list)
+    deleted_rows: int = 0
+
+
+def _reading_progress_filter(filenames: List[str]):
+    """客户端以附件下载地址 .../static/{filename} 作为阅读进度的 file_url。"""
+    return or_(*(ReadingProgress.file_url.endswith(f"/static/{name}", autoescape=True) for name in filenames))
+
+
+def delete_meeting_cascade(session: Session, meeting_id: int) -> Optional[MeetingCascadeResult]:
+    """会议不存在时返回 None。"""
+    meeting_row = session.execute(
+        select(Meeting.id, Meeting.cover_image).where(Meeting.id == meeting_id)
+    ).first()
+    if meeting_row is None:
+        return None
+
+    result = MeetingCascadeResult(meeting_id=meeting_id, cover_image=meeting_row.cover_image)
+    attachments = session.execute(
+        select(Attachment.id, Attachment.filename, Attachment.file_path).where(Attachment.meeting_id == meeting_id)
+    ).all()
+    result.file_paths = [row.file_path for row in attachments if row.file_path]
+    result.attachment_ids = [row.id for row in attachments]
+
+    vote_ids = select(Vote.id).where(Vote.meeting_id == meeting_id).scalar_subquery()
+    lottery_ids = select(Lottery.id).where(Lottery.meeting_id == meeting_id).scalar_subquery()
+    statements = [
+        delete(UserVote).where(UserVote.vote_id.in_(vote_ids)),
+        delete(VoteOption).where(VoteOption.vote_id.in_(vote_ids)),
+        delete(Vote).where(Vote.meeting_id == meeting_id),
+        # lotterysession.current_round_id 引用 lottery，先删会话
+        delete(LotterySession).where(LotterySession.meeting_id == meeting_id),
+        delete(LotteryParticipant).where(LotteryParticipant.meeting_id == meeting_id),
+        delete(LotteryWinner).where(LotteryWinner.lottery_id.in_(lottery_ids)),
+        delete(Lottery).where(Lottery.meeting_id == meeting_id),
+        delete(CheckIn).where(CheckIn.meeting_id == meeting_id),
+        delete(MeetingSyncState).where(MeetingSyncState.meeting_id == meeting_id),
+        delete(MeetingAttendeeLink).where(MeetingAttendeeLink.meeting_id == meeting_id),
+        delete(AttachmentPage).where(
+            AttachmentPage.attachment_id.in_(select(Attachment.id).where(Attachment.meeting_id == meeting_id))
+        ),
+        delete(Attachment).where(Attachment.meeting_id == meeting_id),
+        delete(MeetingSearchDocument).where(MeetingSearchDocument.meeting_id == meeting_id),
+        delete(Meeting).where(Meeting.id == meeting_id),
+    ]
+    filenames = [row.filename for row in attachments if row.filename]
+    if filenames:
+        deleted_at = datetime.now()
+        statements.insert(0, (
+            update(ReadingProgress)
+            .where(_reading_progress_filter(filenames), ReadingProgress.deleted_at.is_(None))
+            .values(deleted_at=deleted_at, updated_at=deleted_at)
+        ))
+
+    for statement in statements:
+        # 会话中可能已加载这些对象，统一在提交后过期，不逐条同步
+        outcome = session.execute(statement, execution_options={"synchronize_session": False})
+        result.deleted_rows += outcome.rowcount or 0
+    return result
@@ -0,0 +1,487 @@
+"""
+会议全文检索
+检索会议标题、主讲人、地点、议程以及附件逐页文本（由 attachment_preprocess 抽取）。
+中文不依赖分词词典：文本归一化后切成相邻二字词（utils.text_search.fulltext_tokens），查询词同样切分，
+二字词按顺序相邻出现即命中，效果等同于在归一化文本上做子串匹配。
+- PostgreSQL：二字词连同位置、字段权重写成 tsvector（meetingsearchdocument / attachmentpage.search_tokens，
+  GIN 索引由 migrations.py 创建），查询用 tsquery 短语（<->），按 ts_rank 排序
+- SQLite 等其他数据库：进程内 1/2-gram 倒排索引圈定候选，子串校验后按同样的字段权重计分；
+  启动时在后台建好索引，过期（MEETING_SEARCH_INDEX_TTL_SECONDS）后在后台重建，期间继续使用旧索引
+- 会议字段经 ORM 事件增量更新；附件页文本由 attachment_preprocess 保存时写入；批量 SQL 删除由路由在提交后通知
+- 空格分隔的多个关键字须在同一会议内全部命中（可分别出现在会议字段与附件中）
+"""
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import and_, cast, delete, event, func, inspect as sa_inspect, literal, or_, select, tuple_
+from sqlalchemy.dialects.postgresql import TSQUERY, insert as pg_insert
+from sqlmodel import Session
+
+from database import engine
+from models import Attachment, AttachmentPage, Meeting, MeetingSearchDocument
+from services.background_jobs import background_jobs
+from utils.text_search import char_ngrams, fulltext_tokens, normalize_fulltext
+
+
+MEETING_SEARCH_MAX_RESULTS = int(os.getenv("MEETING_SEARCH_MAX_RESULTS", "500"))
+MEETING_SEARCH_MAX_TERMS = int(os.getenv("MEETING_SEARCH_MAX_TERMS", "8"))
+# 多 worker 下其他进程的修改只能靠定期重建感知
+MEETING_SEARCH_INDEX_TTL_SECONDS = int(os.getenv("MEETING_SEARCH_INDEX_TTL_SECONDS", "300"))
+
+# 字段权重沿用 PostgreSQL ts_rank 的默认权重 {D: 0.1, C: 0.2, B: 0.4, A: 1.0}
+MEETING_FIELDS: Tuple[Tuple[str, str], ...] = (("title", "A"), ("speaker", "B"), ("location", "B"), ("agenda", "C"))
+ATTACHMENT_WEIGHT = "D"
+WEIGHT_SCORES = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+_INDEXED_ATTRIBUTES = tuple(name for name, _ in MEETING_FIELDS) + ("start_time",)
+# tsvector 的词位置上限，超出部分不再索引
+_TSVECTOR_MAX_POSITION = 16383
+# 同一字段内重复出现的计分上限，避免长文档刷分
+_MAX_COUNTED_OCCURRENCES = 10
+
+
+@dataclass
+class PageMatch:
+    attachment_id: int
+    page_number: int
+    text: str
+    score: float
+
+
+def parse_query(q: Optional[str]) -> List[str]:
+    """按空白拆分并归一化关键字，去重，最多 MEETING_SEARCH_MAX_TERMS 个。"""
+    terms: List[str] = []
+    for raw in (q or "").split():
+        term = normalize_fulltext(raw)
+        if term and term not in terms:
+            terms.append(term)
+    return terms[:MEETING_SEARCH_MAX_TERMS]
+
+
+def agenda_text(raw: Optional[str]) -> str:
+    """议程以 JSON 列表保存（[{"content": ...}] 或字符串列表），只取内容文本。"""
+    if not raw:
+        return ""
+    try:
+        items = json.loads(raw)
+    except (TypeError, ValueError):
+        return raw
+    if not isinstance(items, list):
+        return raw
+    parts = []
+    for item in items:
+        if isinstance(item, dict):
+            parts.append(str(item.get("content") or ""))
+        elif isinstance(item, str):
+            parts.append(item)
+    return "\n".join(part for part in parts if part)
+
+
+def meeting_segments(title, speaker, location, agenda) -> List[Tuple[str, str, str]]:
+    """(字段名, 原文, 权重)"""
+    values = {"title": title, "speaker": speaker, "location": location, "agenda": agenda_text(agenda)}
+    return [(name, values[name] or "", weight) for name, weight in MEETING_FIELDS]
+
+
+def tsvector_literal(segments: Iterable[Tuple[str, str]]) -> Optional[str]:
+    """segments: (文本, 权重 A-D)。字段之间空出一个位置，短语不会跨字段命中。"""
+    parts = []
+    position = 1
+    for value, weight in segments:
+        for token in fulltext_tokens(value):
+            if position > _TSVECTOR_MAX_POSITION:
+                break
+            parts.append(f"'{token}':{position}{weight}")
+            position += 1
+        position += 1
+    return " ".join(parts) or None
+
+
+def meeting_tsvector(title, speaker, location, agenda) -> Optional[str]:
+    return tsvector_literal((text, weight) for _, text, weight in meeting_segments(title, speaker, location, agenda))
+
+
+def page_tsvector(text: Optional[str]) -> Optional[str]:
+    return tsvector_literal([(text or "", ATTACHMENT_WEIGHT)])
+
+
+def term_tsquery(term: str) -> str:
+    """单字用前缀匹配（二字词或结尾单字），多字为相邻二字词组成的短语。"""
+    if len(term) == 1:
+        return f"'{term}':*"
+    return " <-> ".join(f"'{term[i:i + 2]}'" for i in range(len(term) - 1))
+
+
+def uses_tsvector(bind) -> bool:
+    """bind 为 Session、Connection 或 Engine。"""
+    if isinstance(bind, Session):
+        bind = bind.get_bind()
+    return bind is not None and bind.dialect.name == "postgresql"
+
+
+def _segment_score(value: str, term: str, weight: float) -> float:
+    return weight * min(value.count(term), _MAX_COUNTED_OCCURRENCES)
+
+
+DocKey = Tuple[int, int, int]  # (meeting_id, attachment_id, page_number)；会议字段文档的 attachment_id 为 0
+
+
+class MeetingFulltextIndex:
+    """会议字段与附件页文本的 1-gram/2-gram 倒排索引（非 PostgreSQL 时使用）。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set[DocKey]] = {}
+        # 文档 -> ((归一化文本, 权重分), ...)
+        self._documents: Dict[DocKey, Tuple[Tuple[str, float], ...]] = {}
+        self._meeting_keys: Dict[int, Set[DocKey]] = {}
+        self._start_times: Dict[int, datetime] = {}
+        self._built_at: Optional[float] = None
+
+    @staticmethod
+    def _grams(segments: Tuple[Tuple[str, float], ...]) -> Set[str]:
+        grams: Set[str] = set()
+        for value, _ in segments:
+            grams.update(char_ngrams(value, 1))
+            grams.update(char_ngrams(value, 2))
+        return grams
+
+    @staticmethod
+    def _meeting_document(title, speaker, location, agenda) -> Tuple[Tuple[str, float], ...]:
+        return tuple(
+            (normalize_fulltext(text), WEIGHT_SCORES[weight])
+            for _, text, weight in meeting_segments(title, speaker, location, agenda)
+        )
+
+    @staticmethod
+    def _page_document(text: Optional[str]) -> Tuple[Tuple[str, float], ...]:
+        return ((normalize_fulltext(text), WEIGHT_SCORES[ATTACHMENT_WEIGHT]),)
+
+    def is_built(self) -> bool:
+        return self._built_at is not None
+
+    def is_stale(self) -> bool:
+        return self._built_at is None or time.monotonic() - self._built_at > MEETING_SEARCH_INDEX_TTL_SECONDS
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._built_at = None
+
+    def _add_locked(self, key: DocKey, segments: Tuple[Tuple[str, float], ...]) -> None:
+        self._documents[key] = segments
+        self._meeting_keys.setdefault(key[0], set()).add(key)
+        for gram in self._grams(segments):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def _remove_locked(self, key: DocKey) -> None:
+        segments = self._documents.pop(key, None)
+        if segments is None:
+            return
+        keys = self._meeting_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+        for gram in self._grams(segments):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(key)
+
+    def rebuild(self, session: Session) -> None:
+        built = MeetingFulltextIndex()
+        for meeting_id, title, speaker, location, agenda, start_time in session.execute(
+            select(Meeting.id, Meeting.title, Meeting.speaker, Meeting.location, Meeting.agenda, Meeting.start_time)
+        ).all():
+            built._add_locked((meeting_id, 0, 0), self._meeting_document(title, speaker, location, agenda))
+            built._start_times[meeting_id] = start_time
+        for meeting_id, attachment_id, page_number, text in session.execute(
+            select(Attachment.meeting_id, AttachmentPage.attachment_id, AttachmentPage.page_number, AttachmentPage.text)
+            .join(Attachment, Attachment.id == AttachmentPage.attachment_id)
+        ).all():
+            if text:
+                built._add_locked((meeting_id, attachment_id, page_number), self._page_document(text))
+
+        with self._lock:
+            self._postings = built._postings
+            self._documents = built._documents
+            self._meeting_keys = built._meeting_keys
+            self._start_times = built._start_times
+            self._built_at = time.monotonic()
+
+    def upsert_meeting(self, meeting_id: int, title, speaker, location, agenda, start_time) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            key = (meeting_id, 0, 0)
+            self._remove_locked(key)
+            self._add_locked(key, self._meeting_document(title, speaker, location, agenda))
+            self._start_times[meeting_id] = start_time
+
+    def replace_attachment(self, meeting_id: int, attachment_id: int, texts: Sequence[str]) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove_attachment_locked(meeting_id, attachment_id)
+            for page_number, text in enumerate(texts, start=1):
+                if text:
+                    self._add_locked((meeting_id, attachment_id, page_number), self._page_document(text))
+
+    def _remove_attachment_locked(self, meeting_id: int, attachment_id: int) -> None:
+        for key in [key for key in self._meeting_keys.get(meeting_id, ()) if key[1] == attachment_id]:
+            self._remove_locked(key)
+
+    def remove_attachment(self, meeting_id: int, attachment_id: int) -> None:
+        with self._lock:
+            self._remove_attachment_locked(meeting_id, attachment_id)
+
+    def remove_meeting(self, meeting_id: int) -> None:
+        with self._lock:
+            for key in list(self._meeting_keys.pop(meeting_id, ())):
+                self._remove_locked(key)
+            self._start_times.pop(meeting_id, None)
+
+    def _term_matches_locked(self, term: str) -> Dict[DocKey, float]:
+        grams = char_ngrams(term, 2) if len(term) >= 2 else {term}
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        if not postings or not postings[0]:
+            return {}
+        matches = {}
+        # n-gram 交集可能有假阳性，再做一次子串校验
+        for key in postings[0].intersection(*postings[1:]):
+            score = sum(_segment_score(value, term, weight) for value, weight in self._documents.get(key, ()))
+            if score:
+                matches[key] = score
+        return matches
+
+    def search(self, terms: Sequence[str], limit: int) -> List[Tuple[int, float]]:
+        """[(meeting_id, score)]，按得分、开始时间倒序。"""
+        scores: Optional[Dict[int, float]] = None
+        with self._lock:
+            for term in terms:
+                term_scores: Dict[int, float] = {}
+                for key, score in self._term_matches_locked(term).items():
+                    term_scores[key[0]] = term_scores.get(key[0], 0.0) + score
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {meeting_id: scores[meeting_id] + score
+                              for meeting_id, score in term_scores.items() if meeting_id in scores}
+                if not scores:
+                    return []
+            start_times = {meeting_id: self._start_times.get(meeting_id) or datetime.min for meeting_id in scores or ()}
+        ranked = sorted((scores or {}).items(), key=lambda item: (item[1], start_times[item[0]]), reverse=True)
+        return ranked[:limit]
+
+    def matched_pages(self, terms: Sequence[str], meeting_ids: Iterable[int]) -> Dict[DocKey, float]:
+        wanted = set(meeting_ids)
+        pages: Dict[DocKey, float] = {}
+        with self._lock:
+            for term in terms:
+                for key, score in self._term_matches_locked(term).items():
+                    if key[1] and key[0] in wanted:
+                        pages[key] = pages.get(key, 0.0) + score
+        return pages
+
+
+_index = MeetingFulltextIndex()
+
+
+def _rebuild_index() -> None:
+    with Session(engine) as session:
+        _index.rebuild(session)
+
+
+def warm_index() -> None:
+    """启动时在后台调用；PostgreSQL 不需要进程内索引。"""
+    if not uses_tsvector(engine):
+        _rebuild_index()
+
+
+def _ensure_index(session: Session) -> MeetingFulltextIndex:
+    if not _index.is_built():
+        _index.rebuild(session)
+    elif _index.is_stale():
+        background_jobs.submit("meeting_search.rebuild", _rebuild_index)
+    return _index
+
+
+def _tsquery(query_text: str):
+    # 直接按 tsquery 字面量解析，不经过文本分析器，与写入时的 tsvector 字面量一致
+    return cast(literal(query_text), TSQUERY)
+
+
+def _matches(vector, query_text: str):
+    return vector.op("@@")(_tsquery(query_text))
+
+
+def _search_postgres(session: Session, terms: Sequence[str], limit: int) -> List[Tuple[int, float]]:
+    any_query = " | ".join(f"({term_tsquery(term)})" for term in terms)
+    document_vector = MeetingSearchDocument.search_tokens
+    page_vector = AttachmentPage.search_tokens
+
+    conditions = []
+    for term in terms:
+        term_query = term_tsquery(term)
+        conditions.append(or_(
+            Meeting.id.in_(select(MeetingSearchDocument.meeting_id).where(_matches(document_vector, term_query))),
+            Meeting.id.in_(
+                select(Attachment.meeting_id)
+                .join(AttachmentPage, AttachmentPage.attachment_id == Attachment.id)
+                .where(_matches(page_vector, term_query))
+            ),
+        ))
+    page_rank = (
+        select(func.max(func.ts_rank(page_vector, _tsquery(any_query))))
+        .join(Attachment, Attachment.id == AttachmentPage.attachment_id)
+        .where(Attachment.meeting_id == Meeting.id, _matches(page_vector, any_query))
+        .scalar_subquery()
+    )
+    rank = (
+        func.coalesce(func.ts_rank(document_vector, _tsquery(any_query)), 0.0) + func.coalesce(page_rank, 0.0)
+    ).label("rank")
+    statement = (
+        select(Meeting.id, rank)
+        .outerjoin(MeetingSearchDocument, MeetingSearchDocument.meeting_id == Meeting.id)
+        .where(and_(*conditions))
+        .order_by(rank.desc(), Meeting.start_time.desc())
+        .limit(limit)
+    )
+    return [(meeting_id, float(score or 0.0)) for meeting_id, score in session.execute(statement).all()]
+
+
+def search_meeting_ids(session: Session, terms: Sequence[str], limit: Optional[int] = None) -> List[Tuple[int, float]]:
+    """命中全部关键字的会议 [(meeting_id, score)]，按相关度、开始时间倒序，最多 limit 条。"""
+    if not terms:
+        return []
+    limit = limit or MEETING_SEARCH_MAX_RESULTS
+    if uses_tsvector(session):
+        return _search_postgres(session, terms, limit)
+    return _ensure_index(session).search(terms, limit)
+
+
+def matching_pages(
+    session: Session, terms: Sequence[str], meeting_ids: Sequence[int], per_meeting: int = 3
+) -> Dict[int, List[PageMatch]]:
+    """给定会议中命中任一关键字的附件页（每个会议取得分最高的 per_meeting 页，附原文供生成摘要）。"""
+    if not terms or not meeting_ids:
+        return {}
+    grouped: Dict[int, List[PageMatch]] = {}
+    if uses_tsvector(session):
+        any_query = " | ".join(f"({term_tsquery(term)})" for term in terms)
+        page_rank = func.ts_rank(AttachmentPage.search_tokens, _tsquery(any_query))
+        ranked = (
+            select(
+                Attachment.meeting_id, AttachmentPage.attachment_id, AttachmentPage.page_number, AttachmentPage.text,
+                page_rank.label("score"),
+                func.row_number().over(
+                    partition_by=Attachment.meeting_id,
+                    order_by=(page_rank.desc(), AttachmentPage.attachment_id, AttachmentPage.page_number),
+                ).label("position"),
+            )
+            .join(Attachment, Attachment.id == AttachmentPage.attachment_id)
+            .where(Attachment.meeting_id.in_(meeting_ids), _matches(AttachmentPage.search_tokens, any_query))
+            .subquery()
+        )
+        for meeting_id, attachment_id, page_number, text, score in session.execute(
+            select(ranked.c.meeting_id, ranked.c.attachment_id, ranked.c.page_number, ranked.c.text, ranked.c.score)
+            .where(ranked.c.position <= per_meeting)
+        ).all():
+            grouped.setdefault(meeting_id, []).append(PageMatch(attachment_id, page_number, text or "", float(score or 0.0)))
+    else:
+        best: Dict[int, List[Tuple[DocKey, float]]] = {}
+        for key, score in _ensure_index(session).matched_pages(terms, meeting_ids).items():
+            best.setdefault(key[0], []).append((key, score))
+        selected: Dict[Tuple[int, int], Tuple[int, float]] = {}
+        for meeting_id, pages in best.items():
+            pages.sort(key=lambda item: (-item[1], item[0]))
+            for key, score in pages[:per_meeting]:
+                selected[(key[1], key[2])] = (meeting_id, score)
+        if selected:
+            for attachment_id, page_number, text in session.execute(
+                select(AttachmentPage.attachment_id, AttachmentPage.page_number, AttachmentPage.text)
+                .where(tuple_(AttachmentPage.attachment_id, AttachmentPage.page_number).in_(list(selected)))
+            ).all():
+                meeting_id, score = selected[(attachment_id, page_number)]
+                grouped.setdefault(meeting_id, []).append(PageMatch(attachment_id, page_number, text or "", score))
+
+    for pages in grouped.values():
+        pages.sort(key=lambda page: (-page.score, page.attachment_id, page.page_number))
+    return grouped
+
+
+def matched_fields(segments: Sequence[Tuple[str, str, str]], terms: Sequence[str]) -> List[str]:
+    return [name for name, text, _ in segments if any(term in normalize_fulltext(text) for term in terms)]
+
+
+def _term_pattern(term: str) -> "re.Pattern[str]":
+    # 归一化时去掉了空白与标点，原文中字符之间可能夹着它们
+    return re.compile(r"[\W_]*".join(re.escape(char) for char in term), re.IGNORECASE)
+
+
+def make_snippet(text: Optional[str], terms: Sequence[str], radius: int = 40) -> Optional[str]:
+    """以第一个命中位置为中心截取摘要；找不到命中时返回 None。"""
+    original = text or ""
+    normalized = unicodedata.normalize("NFKC", original)
+    matches = [match for match in (_term_pattern(term).search(normalized) for term in terms) if match]
+    if not matches:
+        return None
+    # 全角转半角不改变长度时按原文截取，保留原文的全角标点
+    source = original if len(original) == len(normalized) else normalized
+    first = min(matches, key=lambda match: match.start())
+    start = max(0, first.start() - radius)
+    end = min(len(source), first.end() + radius)
+    snippet = " ".join(source[start:end].split())
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(source) else "")
+
+
+def replace_attachment_pages(meeting_id: int, attachment_id: int, texts: Sequence[str]) -> None:
+    """附件页文本提交后调用；PostgreSQL 的词向量随页文本一起写入，这里只更新进程内索引。"""
+    _index.replace_attachment(meeting_id, attachment_id, texts)
+
+
+def remove_attachment(meeting_id: int, attachment_id: int) -> None:
+    _index.remove_attachment(meeting_id, attachment_id)
+
+
+def remove_meeting(meeting_id: int) -> None:
+    """会议经 meeting_cascade 批量删除（不触发 ORM 事件），提交后调用。"""
+    _index.remove_meeting(meeting_id)
+
+
+def _search_fields_changed(target: Meeting) -> bool:
+    state = sa_inspect(target)
+    return any(state.attrs[name].history.has_changes() for name in _INDEXED_ATTRIBUTES)
+
+
+def _index_meeting(connection, target: Meeting) -> None:
+    if uses_tsvector(connection):
+        tokens = meeting_tsvector(target.title, target.speaker, target.location, target.agenda)
+        connection.execute(
+            pg_insert(MeetingSearchDocument.__table__)
+            .values(meeting_id=target.id, search_tokens=tokens)
+            .on_conflict_do_update(index_elements=["meeting_id"], set_={"search_tokens": tokens})
+        )
+        return
+    _index.upsert_meeting(target.id, target.title, target.speaker, target.location, target.agenda, target.start_time)
+
+
+@event.listens_for(Meeting, "after_insert")
+def _index_inserted_meeting(mapper, connection, target: Meeting) -> None:
+    _index_meeting(connection, target)
+
+
+@event.listens_for(Meeting, "after_update")
+def _index_updated_meeting(mapper, connection, target: Meeting) -> None:
+    if _search_fields_changed(target):
+        _index_meeting(connection, target)
+
+
+@event.listens_for(Meeting, "before_delete")
+def _unindex_meeting(mapper, connection, target: Meeting) -> None:
+    if uses_tsvector(connection):
+        connection.execute(delete(MeetingSearchDocument.__table__).where(MeetingSearchDocument.meeting_id == target.id))
+    _index.remove_meeting(target.id)
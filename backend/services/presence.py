@@ -0,0 +1,241 @@
+"""
+Socket.IO 在线状态登记
+记录每个会议房间的在线平板数量以及 sid -> user_id 映射，断开连接时即时清理。
+配置 REDIS_URL 时同步写入 Redis，多 worker 共享同一份计数；
+每个 worker 定期为本进程的连接续期，worker 异常退出后其连接按 TTL 自动过期。
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, Optional, Set
+
+try:
+    import redis.asyncio as redis_asyncio  # type: ignore
+    REDIS_AVAILABLE = True
+except Exception:
+    redis_asyncio = None
+    REDIS_AVAILABLE = False
+
+from logging_config import get_logger, log_sampled
+
+
+logger = get_logger("presence")
+
+PRESENCE_TTL_SECONDS = int(os.getenv("PRESENCE_TTL_SECONDS", "90"))
+PRESENCE_KEY_PREFIX = os.getenv("PRESENCE_KEY_PREFIX", "presence")
+
+
+class _LocalConnection:
+    __slots__ = ("user_id", "meetings")
+
+    def __init__(self):
+        self.user_id: Optional[int] = None
+        self.meetings: Set[int] = set()
+
+
+class PresenceRegistry:
+    """单进程实现：计数直接取集合大小。"""
+
+    def __init__(self):
+        self._connections: Dict[str, _LocalConnection] = {}
+        self._meetings: Dict[int, Set[str]] = {}
+
+    def _connection(self, sid: str) -> _LocalConnection:
+        connection = self._connections.get(sid)
+        if connection is None:
+            connection = self._connections[sid] = _LocalConnection()
+        return connection
+
+    async def connect(self, sid: str) -> None:
+        self._connection(sid)
+
+    async def bind_user(self, sid: str, user_id: Optional[int]) -> None:
+        if user_id is None:
+            return
+        self._connection(sid).user_id = int(user_id)
+
+    async def join(self, sid: str, meeting_id: int, user_id: Optional[int] = None) -> None:
+        connection = self._connection(sid)
+        if user_id is not None:
+            connection.user_id = int(user_id)
+        connection.meetings.add(meeting_id)
+        self._meetings.setdefault(meeting_id, set()).add(sid)
+
+    async def leave(self, sid: str, meeting_id: int) -> None:
+        connection = self._connections.get(sid)
+        if connection is not None:
+            connection.meetings.discard(meeting_id)
+        self._discard_member(meeting_id, sid)
+
+    async def disconnect(self, sid: str) -> None:
+        connection = self._connections.pop(sid, None)
+        if connection is None:
+            return
+        for meeting_id in connection.meetings:
+            self._discard_member(meeting_id, sid)
+
+    def _discard_member(self, meeting_id: int, sid: str) -> None:
+        members = self._meetings.get(meeting_id)
+        if members is None:
+            return
+        members.discard(sid)
+        if not members:
+            self._meetings.pop(meeting_id, None)
+
+    async def get_user_id(self, sid: str) -> Optional[int]:
+        connection = self._connections.get(sid)
+        return connection.user_id if connection else None
+
+    async def meeting_count(self, meeting_id: int) -> int:
+        return len(self._meetings.get(meeting_id, ()))
+
+    async def meeting_counts(self, meeting_ids: Iterable[int]) -> Dict[int, int]:
+        return {meeting_id: await self.meeting_count(meeting_id) for meeting_id in meeting_ids}
+
+    async def refresh(self) -> None:
+        """为本进程的连接续期；单进程实现无需处理。"""
+        return None
+
+    def local_connection_count(self) -> int:
+        return len(self._connections)
+
+
+class RedisPresenceRegistry(PresenceRegistry):
+    """
+    Redis 实现：
+    - {prefix}:meeting:{id}  有序集合，member 为 sid，score 为过期时间戳，ZCOUNT 取未过期数量
+    - {prefix}:sid:{sid}     哈希，保存 user_id，带 TTL
+    本进程的连接同时保留在内存中，用于续期和断开时定位需要清理的房间。
+    """
+
+    def __init__(self, url: str, ttl_seconds: int = PRESENCE_TTL_SECONDS, prefix: str = PRESENCE_KEY_PREFIX):
+        super().__init__()
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self._ttl = ttl_seconds
+        self._prefix = prefix
+
+    def _meeting_key(self, meeting_id: int) -> str:
+        return f"{self._prefix}:meeting:{meeting_id}"
+
+    def _sid_key(self, sid: str) -> str:
+        return f"{self._prefix}:sid:{sid}"
+
+    def _expires_at(self) -> float:
+        return time.time() + self._ttl
+
+    @staticmethod
+    def _warn(action: str, error: Exception, **extra) -> None:
+        # Redis 故障时每个 socket 事件都会失败，按操作采样避免刷屏
+        log_sampled(logger, logging.WARNING, f"presence.{action}", "Presence %s failed: %s", action, error, every=50, extra=extra)
+
+    async def bind_user(self, sid: str, user_id: Optional[int]) -> None:
+        await super().bind_user(sid, user_id)
+        if user_id is None:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.hset(self._sid_key(sid), "user_id", int(user_id))
+                pipe.expire(self._sid_key(sid), self._ttl)
+                await pipe.execute()
+        except Exception as e:
+            self._warn("bind_user", e, sid=sid)
+
+    async def join(self, sid: str, meeting_id: int, user_id: Optional[int] = None) -> None:
+        await super().join(sid, meeting_id, user_id)
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.zadd(self._meeting_key(meeting_id), {sid: self._expires_at()})
+                if user_id is not None:
+                    pipe.hset(self._sid_key(sid), "user_id", int(user_id))
+                    pipe.expire(self._sid_key(sid), self._ttl)
+                await pipe.execute()
+        except Exception as e:
+            self._warn("join", e, sid=sid)
+
+    async def leave(self, sid: str, meeting_id: int) -> None:
+        await super().leave(sid, meeting_id)
+        try:
+            await self._redis.zrem(self._meeting_key(meeting_id), sid)
+        except Exception as e:
+            self._warn("leave", e, sid=sid)
+
+    async def disconnect(self, sid: str) -> None:
+        connection = self._connections.get(sid)
+        meetings = list(connection.meetings) if connection else []
+        await super().disconnect(sid)
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for meeting_id in meetings:
+                    pipe.zrem(self._meeting_key(meeting_id), sid)
+                pipe.delete(self._sid_key(sid))
+                await pipe.execute()
+        except Exception as e:
+            self._warn("disconnect", e, sid=sid)
+
+    async def get_user_id(self, sid: str) -> Optional[int]:
+        local_user_id = await super().get_user_id(sid)
+        if local_user_id is not None:
+            return local_user_id
+        try:
+            value = await self._redis.hget(self._sid_key(sid), "user_id")
+        except Exception as e:
+            self._warn("lookup", e, sid=sid)
+            return None
+        return int(value) if value else None
+
+    async def meeting_count(self, meeting_id: int) -> int:
+        try:
+            return int(await self._redis.zcount(self._meeting_key(meeting_id), time.time(), "+inf"))
+        except Exception as e:
+            self._warn("count", e, meeting_id=meeting_id)
+            return await super().meeting_count(meeting_id)
+
+    async def meeting_counts(self, meeting_ids: Iterable[int]) -> Dict[int, int]:
+        meeting_ids = list(meeting_ids)
+        now = time.time()
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for meeting_id in meeting_ids:
+                    pipe.zcount(self._meeting_key(meeting_id), now, "+inf")
+                counts = await pipe.execute()
+        except Exception as e:
+            self._warn("counts", e)
+            return await super().meeting_counts(meeting_ids)
+        return {meeting_id: int(count) for meeting_id, count in zip(meeting_ids, counts)}
+
+    async def refresh(self) -> None:
+        """续期本进程连接，并清掉已过期（通常来自已退出 worker）的成员。"""
+        if not self._connections:
+            return
+        expires_at = self._expires_at()
+        now = time.time()
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for meeting_id, members in list(self._meetings.items()):
+                    pipe.zadd(self._meeting_key(meeting_id), dict.fromkeys(members, expires_at))
+                    pipe.zremrangebyscore(self._meeting_key(meeting_id), "-inf", now)
+                for sid, connection in list(self._connections.items()):
+                    if connection.user_id is not None:
+                        pipe.expire(self._sid_key(sid), self._ttl)
+                await pipe.execute()
+        except Exception as e:
+            self._warn("refresh", e)
+
+
+def _create_registry() -> PresenceRegistry:
+    redis_url = os.environ.get("REDIS_URL")
+    if redis_url and REDIS_AVAILABLE:
+        return RedisPresenceRegistry(redis_url)
+    return PresenceRegistry()
+
+
+presence = _create_registry()
+
+
+async def run_presence_refresher(interval_seconds: Optional[float] = None):
+    """后台任务：按 TTL 的三分之一周期续期本进程的在线连接。"""
+    interval = interval_seconds or max(PRESENCE_TTL_SECONDS / 3, 1)
+    while True:
+        await presence.refresh()
+        await asyncio.sleep(interval)
@@ -0,0 +1,184 @@
+"""
+阅读进度服务层
+翻页产生的进度写入按 (user_id, file_url) 合并，只保留窗口内最后一次，
+再依赖唯一索引 uq_readingprogress_user_file 一条 upsert 语句批量落库。
+进入缓冲区前先校验用户存在（结果短时缓存），避免外键失败的条目拖住整批写入。
+缓冲区是进程级的，多 worker 下不依赖它判断先后：upsert 只接受比库中 updated_at 更新的进度，
+删除只写墓碑（deleted_at 与 updated_at 置为删除时间），其他 worker 缓冲区中删除前的旧进度落库时自然被忽略。
+"""
+import os
+from datetime import datetime
+import threading
+from typing import Dict, Iterable, List, Set
+
+from cachetools import TTLCache
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from database import engine
+from models import ReadingProgress, User
+from services.write_behind import WriteBehindBuffer, register_buffer
+
+
+READING_PROGRESS_FLUSH_SECONDS = float(os.getenv("READING_PROGRESS_FLUSH_SECONDS", "2"))
+READING_PROGRESS_USER_CACHE_SECONDS = int(os.getenv("READING_PROGRESS_USER_CACHE_SECONDS", "300"))
+
+# 已确认存在的用户 ID，翻页时不必每次查库
+_known_users: "TTLCache[int, bool]" = TTLCache(maxsize=4096, ttl=READING_PROGRESS_USER_CACHE_SECONDS)
+_known_users_lock = threading.Lock()
+
+
+def unknown_user_ids(session: Session, user_ids: Iterable[int]) -> Set[int]:
+    """返回不存在的用户 ID；已确认存在的用户在缓存有效期内不再查库。"""
+    wanted = set(user_ids)
+    with _known_users_lock:
+        missing = {user_id for user_id in wanted if user_id not in _known_users}
+    if not missing:
+        return set()
+    found = set(session.exec(select(User.id).where(User.id.in_(missing))).all())
+    with _known_users_lock:
+        for user_id in found:
+            _known_users[user_id] = True
+    return missing - found
+
+
+def _dialect_insert(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def upsert_progress_entries(session: Session, entries: Iterable[dict]) -> int:
+    """
+    批量写入阅读进度，同一 (user_id, file_url) 只保留最后一条；库中已有更新（或更晚删除）的记录时不覆盖。
+    调用方负责提交事务。
+    """
+    latest: Dict[tuple, dict] = {}
+    for entry in entries:
+        key = (entry["user_id"], entry["file_url"])
+        if key not in latest or latest[key]["updated_at"] <= entry["updated_at"]:
+            latest[key] = {**entry, "deleted_at": entry.get("deleted_at")}
+    rows = list(latest.values())
+    if not rows:
+        return 0
+
+    insert = _dialect_insert(session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(ReadingProgress).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "file_url"],
+            set_={
+                "file_name": stmt.excluded.file_name,
+                "current_page": stmt.excluded.current_page,
+                "total_pages": stmt.excluded.total_pages,
+                "updated_at": stmt.excluded.updated_at,
+                "deleted_at": stmt.excluded.deleted_at,
+            },
+            where=ReadingProgress.updated_at < stmt.excluded.updated_at,
+        )
+        session.execute(stmt)
+        return len(rows)
+
+    # 其他数据库没有 ON CONFLICT 语法，退回先查后写
+    for row in rows:
+        existing = session.exec(
+            select(ReadingProgress).where(
+                ReadingProgress.user_id == row["user_id"],
+                ReadingProgress.file_url == row["file_url"],
+            )
+        ).first()
+        if existing:
+            if existing.updated_at >= row["updated_at"]:
+                continue
+            existing.sqlmodel_update(row)
+            session.add(existing)
+        else:
+            session.add(ReadingProgress(**row))
+    return len(rows)
+
+
+def _flush_progress(entries: List[dict]) -> None:
+    with Session(engine) as session:
+        upsert_progress_entries(session, entries)
+        session.commit()
+
+
+_progress_buffer = register_buffer(
+    WriteBehindBuffer("reading_progress", _flush_progress, interval_seconds=READING_PROGRESS_FLUSH_SECONDS)
+)
+
+
+def build_progress_entry(
+    user_id: int,
+    file_url: str,
+    file_name: str,
+    current_page: int,
+    total_pages: int,
+) -> dict:
+    return {
+        "user_id": user_id,
+        "file_url": file_url,
+        "file_name": file_name,
+        "current_page": current_page,
+        "total_pages": total_pages,
+        "updated_at": datetime.now(),
+    }
+
+
+def queue_progress(entry: dict) -> None:
+    """登记一次翻页进度，由后台任务在合并窗口结束后落库。"""
+    _progress_buffer.put((entry["user_id"], entry["file_url"]), entry)
+
+
+def save_progress_batch(session: Session, entries: List[dict]) -> int:
+    """批量同步直接落库；缓冲区里同一文档较旧的进度一并丢弃，避免随后被覆盖回去。"""
+    for entry in entries:
+        _progress_buffer.discard((entry["user_id"], entry["file_url"]))
+    saved = upsert_progress_entries(session, entries)
+    session.commit()
+    return saved
+
+
+def pending_progress_for_user(session: Session, user_id: int) -> List[dict]:
+    """本进程尚未落库的进度；库中已有同时或更新的记录（含其他 worker 的批量写入、删除墓碑）时不再返回。"""
+    pending = [entry for (pending_user_id, _), entry in _progress_buffer.snapshot().items() if pending_user_id == user_id]
+    if not pending:
+        return []
+    stored = dict(session.exec(
+        select(ReadingProgress.file_url, ReadingProgress.updated_at).where(
+            ReadingProgress.user_id == user_id,
+            ReadingProgress.file_url.in_([entry["file_url"] for entry in pending]),
+        )
+    ).all())
+    return [
+        entry for entry in pending
+        if entry["file_url"] not in stored or stored[entry["file_url"]] < entry["updated_at"]
+    ]
+
+
+def delete_progress(session: Session, user_id: int, file_url: str) -> bool:
+    """删除已落库和尚未落库的进度，任一存在即视为删除成功；落库记录改为墓碑，保证晚到的旧进度不会复活。"""
+    had_pending = _progress_buffer.get((user_id, file_url)) is not None
+    _progress_buffer.discard((user_id, file_url))
+    deleted_at = datetime.now()
+    result = session.execute(
+        update(ReadingProgress)
+        .where(
+            ReadingProgress.user_id == user_id,
+            ReadingProgress.file_url == file_url,
+            ReadingProgress.deleted_at.is_(None),
+        )
+        .values(deleted_at=deleted_at, updated_at=deleted_at)
+    )
+    if not result.rowcount and had_pending:
+        # 进度只在本进程缓冲区中，同样落一条墓碑，挡住其他 worker 里可能还有的同一文档旧进度
+        upsert_progress_entries(session, [{
+            "user_id": user_id, "file_url": file_url, "file_name": "", "current_page": 0, "total_pages": 0,
+            "updated_at": deleted_at, "deleted_at": deleted_at,
+        }])
+    session.commit()
+    return had_pending or result.rowcount > 0
@@ -0,0 +1,170 @@
+"""
+用户检索服务
+PostgreSQL 使用 pg_trgm 三元组 GIN 索引（migrations.py 创建）加速姓名/手机号/拼音首字母的模糊匹配；
+SQLite 等其他数据库使用进程内 n-gram 倒排索引先圈定候选用户，再交给 SQL 过滤分页。
+"""
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import case, event, func, or_
+from sqlmodel import Session, select
+
+from models import User
+from utils.text_search import char_ngrams, normalize_search_text, pinyin_initials
+
+
+# 候选集超过上限时 IN 列表已不划算，直接退回 SQL LIKE 过滤
+USER_SEARCH_MAX_CANDIDATES = int(os.getenv("USER_SEARCH_MAX_CANDIDATES", "5000"))
+# 多 worker 下其他进程的修改只能靠定期重建感知
+USER_SEARCH_INDEX_TTL_SECONDS = int(os.getenv("USER_SEARCH_INDEX_TTL_SECONDS", "300"))
+
+
+def _is_trigram_backend(session: Session) -> bool:
+    bind = session.get_bind()
+    return bind is not None and bind.dialect.name == "postgresql"
+
+
+class UserNgramIndex:
+    """姓名、手机号、拼音首字母的 1-gram/2-gram 倒排索引。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Set[int]] = {}
+        self._documents: Dict[int, Tuple[str, ...]] = {}
+        self._built_at: Optional[float] = None
+
+    @staticmethod
+    def _fields(name: Optional[str], phone: Optional[str], initials: Optional[str]) -> Tuple[str, ...]:
+        return (
+            normalize_search_text(name),
+            normalize_search_text(phone),
+            initials or pinyin_initials(name),
+        )
+
+    @staticmethod
+    def _grams(fields: Tuple[str, ...]) -> Set[str]:
+        grams: Set[str] = set()
+        for value in fields:
+            grams.update(char_ngrams(value, 1))
+            grams.update(char_ngrams(value, 2))
+        return grams
+
+    def is_stale(self) -> bool:
+        return self._built_at is None or time.monotonic() - self._built_at > USER_SEARCH_INDEX_TTL_SECONDS
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._built_at = None
+
+    def rebuild(self, session: Session) -> None:
+        documents: Dict[int, Tuple[str, ...]] = {}
+        postings: Dict[str, Set[int]] = {}
+        for user_id, name, phone, initials in session.exec(
+            select(User.id, User.name, User.phone, User.name_initials)
+        ).all():
+            fields = self._fields(name, phone, initials)
+            documents[user_id] = fields
+            for gram in self._grams(fields):
+                postings.setdefault(gram, set()).add(user_id)
+
+        with self._lock:
+            self._documents = documents
+            self._postings = postings
+            self._built_at = time.monotonic()
+
+    def _remove_locked(self, user_id: int) -> None:
+        fields = self._documents.pop(user_id, None)
+        if fields is None:
+            return
+        for gram in self._grams(fields):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(user_id)
+
+    def upsert(self, user_id: int, name: Optional[str], phone: Optional[str], initials: Optional[str]) -> None:
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._remove_locked(user_id)
+            fields = self._fields(name, phone, initials)
+            self._documents[user_id] = fields
+            for gram in self._grams(fields):
+                self._postings.setdefault(gram, set()).add(user_id)
+
+    def remove(self, user_id: int) -> None:
+        with self._lock:
+            self._remove_locked(user_id)
+
+    def search(self, query: str) -> Optional[List[int]]:
+        """返回精确包含 query 的用户 ID；候选过多时返回 None 由调用方退回 SQL 过滤。"""
+        normalized = normalize_search_text(query)
+        if not normalized:
+            return None
+        grams = char_ngrams(normalized, 2) if len(normalized) >= 2 else {normalized}
+
+        with self._lock:
+            postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+            if not postings or not postings[0]:
+                return []
+            candidates = postings[0].intersection(*postings[1:])
+            # n-gram 交集可能有假阳性，再做一次子串校验
+            matched = [
+                user_id for user_id in candidates
+                if any(normalized in value for value in self._documents.get(user_id, ()))
+            ]
+
+        if len(matched) > USER_SEARCH_MAX_CANDIDATES:
+            return None
+        return matched
+
+
+_user_index = UserNgramIndex()
+
+
+def build_user_search_clauses(session: Session, q: str) -> Tuple[object, list]:
+    """
+    根据关键字生成 (过滤条件, 排序表达式列表)。
+    排序：姓名/手机号完全匹配 > 前缀匹配 > 拼音首字母前缀 > 其他包含匹配。
+    """
+    query = q.strip()
+    normalized = normalize_search_text(query)
+    rank = case(
+        (or_(User.name == query, User.phone == query), 0),
+        (or_(User.name.startswith(query, autoescape=True), User.phone.startswith(query, autoescape=True)), 1),
+        (User.name_initials.startswith(normalized, autoescape=True), 2),
+        else_=3,
+    )
+    like_filter = or_(
+        User.name.contains(query, autoescape=True),
+        User.phone.contains(query, autoescape=True),
+        User.name_initials.contains(normalized, autoescape=True),
+    )
+
+    if _is_trigram_backend(session):
+        return like_filter, [rank, func.similarity(User.name, query).desc()]
+
+    if _user_index.is_stale():
+        _user_index.rebuild(session)
+    candidate_ids = _user_index.search(query)
+    if candidate_ids is None:
+        return like_filter, [rank]
+    return User.id.in_(candidate_ids), [rank]
+
+
+@event.listens_for(User, "before_insert")
+@event.listens_for(User, "before_update")
+def _fill_name_initials(mapper, connection, target: User) -> None:
+    target.name_initials = pinyin_initials(target.name)
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+def _index_user(mapper, connection, target: User) -> None:
+    _user_index.upsert(target.id, target.name, target.phone, target.name_initials)
+
+
+@event.listens_for(User, "after_delete")
+def _unindex_user(mapper, connection, target: User) -> None:
+    _user_index.remove(target.id)
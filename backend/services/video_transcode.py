@@ -0,0 +1,279 @@
+"""
+媒体视频转码
+上传的原始视频（.mov / .mkv / .avi、高码率 MP4）在后台转为限码率的 H.264 + AAC MP4，
+带 faststart（moov 前置，平板可边下边播）；VIDEO_HLS_ENABLED 时再由该 MP4 切出 HLS 分片（只复制流，不二次编码）。
+- 转码在独立的有界线程池中执行（VIDEO_TRANSCODE_WORKERS），同一视频排队或执行中时不重复提交；
+  队列满时放弃，原文件照常可播放，下次启动时由 enqueue_missing 补齐
+- 产物先写临时文件再原子替换，文件存在即视为就绪，与缩略图一样不在数据库中记录状态
+- 多 worker 启动时都会补齐：转码前以 O_EXCL 创建 .lock 文件认领，认领失败的 worker 直接跳过；
+  临时文件名带进程号与随机后缀，互不覆盖。超过 3 倍 VIDEO_TRANSCODE_TIMEOUT（MP4 与 HLS 两次 ffmpeg 的上限之和之外）的锁视为进程中途退出遗留，可被接管
+- 转码失败写 .failed 标记，避免每次启动反复重试同一个坏文件
+未安装 ffmpeg 或 VIDEO_TRANSCODE_ENABLED=false 时不启用，MediaItemRead 中的优化地址保持为空。
+"""
+import os
+import secrets
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from logging_config import get_logger
+from metrics import timed_thumbnail
+from services.background_jobs import BackgroundJobRunner
+
+
+VIDEO_TRANSCODE_ENABLED = os.getenv("VIDEO_TRANSCODE_ENABLED", "true").lower() in ("true", "1", "yes")
+VIDEO_TRANSCODE_WORKERS = int(os.getenv("VIDEO_TRANSCODE_WORKERS", "1"))
+VIDEO_TRANSCODE_MAX_PENDING = int(os.getenv("VIDEO_TRANSCODE_MAX_PENDING", "200"))
+VIDEO_TRANSCODE_TIMEOUT = int(os.getenv("VIDEO_TRANSCODE_TIMEOUT", "3600"))
+VIDEO_MAX_BITRATE_KBPS = int(os.getenv("VIDEO_MAX_BITRATE_KBPS", "4000"))
+VIDEO_MAX_HEIGHT = int(os.getenv("VIDEO_MAX_HEIGHT", "1080"))
+VIDEO_AUDIO_BITRATE_KBPS = int(os.getenv("VIDEO_AUDIO_BITRATE_KBPS", "128"))
+VIDEO_HLS_ENABLED = os.getenv("VIDEO_HLS_ENABLED", "false").lower() in ("true", "1", "yes")
+VIDEO_HLS_SEGMENT_SECONDS = int(os.getenv("VIDEO_HLS_SEGMENT_SECONDS", "6"))
+
+MEDIA_VIDEO_DIR = Path("uploads/videos/media")
+MEDIA_VIDEO_URL_PREFIX = "/static/videos/media"
+HLS_PLAYLIST = "index.m3u8"
+
+logger = get_logger("video_transcode")
+
+transcode_jobs = BackgroundJobRunner(
+    max_workers=VIDEO_TRANSCODE_WORKERS,
+    max_pending=VIDEO_TRANSCODE_MAX_PENDING,
+    name="video-transcode",
+    inline_when_full=False,
+)
+
+
+def ffmpeg_path() -> Optional[str]:
+    return shutil.which("ffmpeg")
+
+
+def transcode_available() -> bool:
+    return VIDEO_TRANSCODE_ENABLED and ffmpeg_path() is not None
+
+
+def derivative_paths(filename: str) -> Tuple[Path, Path]:
+    """(优化后的 MP4, HLS 目录)。"""
+    stem = Path(filename).stem
+    return MEDIA_VIDEO_DIR / f"{stem}_h264.mp4", MEDIA_VIDEO_DIR / f"{stem}_hls"
+
+
+def _failed_marker(filename: str) -> Path:
+    return MEDIA_VIDEO_DIR / f"{Path(filename).stem}_h264.failed"
+
+
+def _lock_path(filename: str) -> Path:
+    return MEDIA_VIDEO_DIR / f"{Path(filename).stem}_h264.lock"
+
+
+def _try_lock(lock: Path) -> bool:
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write(str(os.getpid()))
+    return True
+
+
+@contextmanager
+def _claim(filename: str) -> Iterator[bool]:
+    """跨进程独占一个视频的转码；已被其他 worker 认领时得到 False。"""
+    lock = _lock_path(filename)
+    claimed = _try_lock(lock)
+    if not claimed:
+        try:
+            stale = time.time() - lock.stat().st_mtime > VIDEO_TRANSCODE_TIMEOUT * 3
+        except FileNotFoundError:
+            stale = True
+        if stale:
+            lock.unlink(missing_ok=True)
+            claimed = _try_lock(lock)
+    try:
+        yield claimed
+    finally:
+        if claimed:
+            lock.unlink(missing_ok=True)
+
+
+def _staging_suffix() -> str:
+    return f"{os.getpid()}.{secrets.token_hex(4)}"
+
+
+def optimized_urls(filename: Optional[str]) -> Tuple[str, str]:
+    """(MP4 地址, HLS 播放列表地址)，尚未就绪的为空字符串。"""
+    if not filename:
+        return "", ""
+    mp4_path, hls_dir = derivative_paths(filename)
+    mp4_url = f"{MEDIA_VIDEO_URL_PREFIX}/{mp4_path.name}" if mp4_path.is_file() else ""
+    hls_url = ""
+    if VIDEO_HLS_ENABLED and (hls_dir / HLS_PLAYLIST).is_file():
+        hls_url = f"{MEDIA_VIDEO_URL_PREFIX}/{hls_dir.name}/{HLS_PLAYLIST}"
+    return mp4_url, hls_url
+
+
+def build_mp4_command(ffmpeg: str, source: Path, target: Path) -> List[str]:
+    """限码率的 CRF 编码：画质足够时码率更低，复杂画面也不超过 VIDEO_MAX_BITRATE_KBPS。"""
+    return [
+        ffmpeg,
+        "-y",
+        "-i",
+        str(source),
+        "-map",
+        "0:v:0",
+        "-map",
+        "0:a:0?",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-profile:v",
+        "high",
+        "-pix_fmt",
+        "yuv420p",
+        "-crf",
+        "23",
+        "-maxrate",
+        f"{VIDEO_MAX_BITRATE_KBPS}k",
+        "-bufsize",
+        f"{VIDEO_MAX_BITRATE_KBPS * 2}k",
+        # 只缩小不放大，宽度取偶数
+        "-vf",
+        f"scale=-2:'min({VIDEO_MAX_HEIGHT},ih)'",
+        "-c:a",
+        "aac",
+        "-b:a",
+        f"{VIDEO_AUDIO_BITRATE_KBPS}k",
+        "-ac",
+        "2",
+        "-movflags",
+        "+faststart",
+        "-f",
+        "mp4",
+        str(target),
+    ]
+
+
+def build_hls_command(ffmpeg: str, source: Path, playlist: Path) -> List[str]:
+    return [
+        ffmpeg,
+        "-y",
+        "-i",
+        str(source),
+        "-c",
+        "copy",
+        "-f",
+        "hls",
+        "-hls_time",
+        str(VIDEO_HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type",
+        "vod",
+        "-hls_segment_filename",
+        str(playlist.parent / "segment_%04d.ts"),
+        str(playlist),
+    ]
+
+
+def _run(cmd: List[str]) -> bool:
+    result = subprocess.run(
+        cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=VIDEO_TRANSCODE_TIMEOUT
+    )
+    if result.returncode != 0:
+        logger.warning("ffmpeg failed (%s): %s", result.returncode, result.stderr[-500:].decode("utf-8", "replace"))
+        return False
+    return True
+
+
+def _build_hls(ffmpeg: str, mp4_path: Path, hls_dir: Path) -> None:
+    staging = Path(tempfile.mkdtemp(prefix=f"{hls_dir.name}.", suffix=".tmp", dir=hls_dir.parent))
+    try:
+        if _run(build_hls_command(ffmpeg, mp4_path, staging / HLS_PLAYLIST)):
+            shutil.rmtree(hls_dir, ignore_errors=True)
+            staging.rename(hls_dir)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def transcode_video(source_path: Path) -> bool:
+    """同步转码一个视频；产物已存在时直接返回 True。"""
+    ffmpeg = ffmpeg_path()
+    source = Path(source_path)
+    if not ffmpeg or not source.is_file():
+        return False
+    MEDIA_VIDEO_DIR.mkdir(parents=True, exist_ok=True)
+    mp4_path, hls_dir = derivative_paths(source.name)
+    try:
+        with _claim(source.name) as claimed:
+            if not claimed:
+                logger.info("Video %s is being transcoded by another worker", source.name)
+                return False
+            if not mp4_path.is_file():
+                staging = mp4_path.with_name(f"{mp4_path.stem}.{_staging_suffix()}.tmp.mp4")
+                try:
+                    with timed_thumbnail("media_video_transcode"):
+                        ok = _run(build_mp4_command(ffmpeg, source, staging))
+                    if not ok or not staging.is_file():
+                        _failed_marker(source.name).touch()
+                        return False
+                    os.replace(staging, mp4_path)
+                finally:
+                    staging.unlink(missing_ok=True)
+            if VIDEO_HLS_ENABLED and not (hls_dir / HLS_PLAYLIST).is_file():
+                _build_hls(ffmpeg, mp4_path, hls_dir)
+            return True
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning("Failed to transcode video %s: %s", source, e)
+        return False
+
+
+def _transcode_job(source_path: Path, on_ready: Optional[Callable[[], None]]) -> None:
+    if transcode_video(source_path) and on_ready is not None:
+        on_ready()
+
+
+def needs_transcode(filename: Optional[str]) -> bool:
+    if not filename:
+        return False
+    mp4_path, hls_dir = derivative_paths(filename)
+    if _failed_marker(filename).exists():
+        return False
+    if not mp4_path.is_file():
+        return True
+    return VIDEO_HLS_ENABLED and not (hls_dir / HLS_PLAYLIST).is_file()
+
+
+def enqueue_transcode(source_path: Path, on_ready: Optional[Callable[[], None]] = None) -> bool:
+    """提交后台转码；未启用、无需转码、已在队列中或队列已满时返回 False。"""
+    source = Path(source_path)
+    if not transcode_available() or not needs_transcode(source.name):
+        return False
+    return transcode_jobs.submit(("transcode", source.name), _transcode_job, source, on_ready)
+
+
+def enqueue_missing(sources: Iterable[Tuple[Path, Optional[Callable[[], None]]]]) -> int:
+    """启动时补齐尚未转码的视频，返回提交的数量。"""
+    return sum(1 for source, on_ready in sources if enqueue_transcode(source, on_ready))
+
+
+def remove_derivatives(filenames: Iterable[Optional[str]]) -> None:
+    """删除媒体项后调用（在后台线程中执行）。"""
+    for filename in filenames:
+        if not filename:
+            continue
+        mp4_path, hls_dir = derivative_paths(filename)
+        for path in (mp4_path, _failed_marker(filename)):
+            try:
+                path.unlink(missing_ok=True)
+            except OSError as e:
+                logger.warning("Error deleting file %s: %s", path, e)
+        shutil.rmtree(hls_dir, ignore_errors=True)
+
+
+def shutdown_transcode_jobs() -> None:
+    """退出时不等待正在进行的转码；临时文件不会被当作产物，锁过期后下次启动重新转码。"""
+    transcode_jobs.shutdown(wait=False)
@@ -0,0 +1,172 @@
+"""
+写合并（write-behind）缓冲
+高频且允许秒级延迟的写入先在进程内按 key 合并，只保留最后一次的值，
+再由后台任务周期性地一次性批量落库，避免高峰期每个请求都单独开事务。
+整批落库因某条数据本身出错（IntegrityError / DataError，外键失效等）失败时逐条重试找出失败的条目；
+同一条目连续失败 WRITE_BEHIND_MAX_ATTEMPTS 次后丢弃并记录日志，不让一条永久失败的数据阻塞整个缓冲区。
+连接层面的失败（数据库宕机、连接池超时等）不计入次数：整批放回缓冲区，按 interval 成倍退避
+（上限 WRITE_BEHIND_MAX_BACKOFF_SECONDS）后再试，恢复前不丢数据。
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from sqlalchemy.exc import DataError, IntegrityError
+
+from logging_config import get_logger, log_sampled
+
+
+logger = get_logger("write_behind")
+
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "5"))
+WRITE_BEHIND_MAX_BACKOFF_SECONDS = float(os.getenv("WRITE_BEHIND_MAX_BACKOFF_SECONDS", "60"))
+
+# 只有这些错误说明是某条数据本身的问题，其余按连接层面的暂时故障处理
+ROW_ERRORS = (IntegrityError, DataError)
+
+
+class WriteBehindBuffer:
+    def __init__(
+        self,
+        name: str,
+        flush_fn: Callable[[List[Any]], None],
+        interval_seconds: float = 2.0,
+    ):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self._flush_fn = flush_fn
+        self._pending: Dict[Hashable, Any] = {}
+        # key -> 已连续失败的次数（写入新值时清零）
+        self._failures: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self._last_flush_at = time.monotonic()
+        # 连接层面失败后的退避时长，成功落库后清零
+        self._backoff_seconds = 0.0
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._pending[key] = value
+            self._failures.pop(key, None)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            return self._pending.get(key)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+            self._failures.pop(key, None)
+
+    def snapshot(self) -> Dict[Hashable, Any]:
+        with self._lock:
+            return dict(self._pending)
+
+    def is_due(self) -> bool:
+        wait = max(self.interval_seconds, self._backoff_seconds)
+        return time.monotonic() - self._last_flush_at >= wait
+
+    def flush(self) -> int:
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._last_flush_at = time.monotonic()
+
+        if not pending:
+            return 0
+
+        try:
+            self._flush_fn(list(pending.values()))
+        except ROW_ERRORS as e:
+            log_sampled(
+                logger, logging.WARNING, f"write_behind.{self.name}",
+                "Write-behind flush failed for %s, retrying entries one by one: %s", self.name, e, every=10,
+            )
+            return self._flush_one_by_one(pending)
+        except Exception as e:
+            self._requeue_unavailable(pending, e)
+            return 0
+        with self._lock:
+            for key in pending:
+                self._failures.pop(key, None)
+            self._backoff_seconds = 0.0
+        return len(pending)
+
+    def _requeue_unavailable(self, entries: Dict[Hashable, Any], error: Exception) -> None:
+        """数据库暂时不可用：整批放回（期间写入的新值优先），不计失败次数，并加大退避。"""
+        with self._lock:
+            for key, value in entries.items():
+                self._pending.setdefault(key, value)
+            self._backoff_seconds = min(
+                max(self._backoff_seconds * 2, self.interval_seconds, 1.0),
+                max(WRITE_BEHIND_MAX_BACKOFF_SECONDS, self.interval_seconds),
+            )
+            backoff = self._backoff_seconds
+        log_sampled(
+            logger, logging.WARNING, f"write_behind.{self.name}.unavailable",
+            "Write-behind flush for %s deferred %.1fs, %s entries kept: %s",
+            self.name, backoff, len(entries), error, every=10,
+        )
+
+    def _flush_one_by_one(self, pending: Dict[Hashable, Any]) -> int:
+        flushed = 0
+        failed: Dict[Hashable, Any] = {}
+        remaining = dict(pending)
+        for key, value in pending.items():
+            try:
+                self._flush_fn([value])
+                flushed += 1
+                remaining.pop(key)
+            except ROW_ERRORS as e:
+                failed[key] = (value, e)
+            except Exception as e:
+                # 逐条重试中途连接出错：剩余条目（含已确认出错的）原样放回，不计次数
+                self._requeue_unavailable(remaining, e)
+                with self._lock:
+                    for done_key in pending.keys() - remaining.keys():
+                        self._failures.pop(done_key, None)
+                return flushed
+
+        with self._lock:
+            self._backoff_seconds = 0.0
+            for key in pending:
+                if key not in failed:
+                    self._failures.pop(key, None)
+            for key, (value, error) in failed.items():
+                if key in self._pending:
+                    # 期间已写入更新的值，旧值作废
+                    continue
+                attempts = self._failures.get(key, 0) + 1
+                if attempts >= WRITE_BEHIND_MAX_ATTEMPTS:
+                    self._failures.pop(key, None)
+                    logger.error(
+                        "Dropping write-behind entry %r of %s after %s failed attempts: %s",
+                        key, self.name, attempts, error,
+                    )
+                    continue
+                self._failures[key] = attempts
+                self._pending[key] = value
+        return flushed
+
+
+_buffers: List[WriteBehindBuffer] = []
+
+
+def register_buffer(buffer: WriteBehindBuffer) -> WriteBehindBuffer:
+    _buffers.append(buffer)
+    return buffer
+
+
+def flush_all_buffers() -> int:
+    return sum(buffer.flush() for buffer in _buffers)
+
+
+async def run_write_behind_flusher(tick_seconds: float = 0.5):
+    """后台任务：按各缓冲区的合并窗口定期刷盘，落库放到线程中执行不阻塞事件循环。"""
+    while True:
+        for buffer in list(_buffers):
+            if buffer.is_due():
+                await asyncio.to_thread(buffer.flush)
+        await asyncio.sleep(tick_seconds)
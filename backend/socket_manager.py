@@ -1,23 +1,50 @@
 """
 Socket.IO 实时通信管理器
 用于投票等实时功能的 WebSocket 通信
+
+房间约定：
+- meeting_{id}    正在查看该会议的客户端 (join_meeting)
+- user_{id}       已表明身份的客户端 (identify 或连接时 auth 携带 user_id)
+- tablets         所有已表明用户身份的客户端；会议列表对每台平板都返回全部会议，
+                  会议新建 / 修改 / 删除因此推给所有平板，附件等细节变化仍只推给相关的人
+- admin           后台管理端 (identify 时 role=admin 且 admin_token 与服务端 SOCKET_ADMIN_TOKEN 一致；
+                  未配置 SOCKET_ADMIN_TOKEN 时不接受管理端身份，后台连接留在 broadcast-all)
+- media           正在浏览媒体库的客户端 (join_media)
+- broadcast-all   未表明身份的旧客户端，仍按原方式接收所有 meeting_changed / media_changed；
+                  identify 之后离开，只接收与自己相关的推送
 """
+import asyncio
+import hmac
 import json
+import logging
 import socketio
 import os
-from typing import Dict, Set, Optional
+from typing import Iterable, Optional
+from urllib.parse import parse_qs
+
+import anyio
 
 # 导入数据库依赖
 from sqlmodel import Session as SQLSession
 try:
-    from backend.database import engine
+    from backend.database import open_async_session
     from backend.models import LotteryParticipant, Lottery, LotterySession
 except ImportError:
-    from database import engine
+    from database import open_async_session
     from models import LotteryParticipant, Lottery, LotterySession
+from services.presence import presence
+
+from logging_config import SOCKETIO_LOG_PACKETS, get_logger, log_sampled
+from metrics import record_socket_emit
+from fast_json import socket_json
+
+logger = get_logger("socket")
+lottery_logger = get_logger("lottery")
 
 # 获取 Redis URL (用于多 Worker 模式下的跨进程通信)
 REDIS_URL = os.environ.get('REDIS_URL')
+# 后台管理端加入 admin 房间所需的令牌，客户端自称的 role 不作数
+SOCKET_ADMIN_TOKEN = os.environ.get('SOCKET_ADMIN_TOKEN', '')
 
 # 创建 Socket.IO 服务器实例 (ASGI模式)
 # 如果配置了 Redis，使用 Redis 作为消息管理器，支持多 Worker
@@ -27,102 +54,219 @@ if REDIS_URL:
         async_mode='asgi',
         cors_allowed_origins='*',
         client_manager=mgr,
-        logger=True,
-        engineio_logger=True
+        logger=SOCKETIO_LOG_PACKETS,
+        engineio_logger=SOCKETIO_LOG_PACKETS,
+        json=socket_json
     )
-    print(f"[Socket.IO] Using Redis manager: {REDIS_URL}")
+    logger.info("Using Redis manager: %s", REDIS_URL)
 else:
     sio = socketio.AsyncServer(
         async_mode='asgi',
         cors_allowed_origins='*',
-        logger=True,
-        engineio_logger=True
+        logger=SOCKETIO_LOG_PACKETS,
+        engineio_logger=SOCKETIO_LOG_PACKETS,
+        json=socket_json
     )
-    print("[Socket.IO] Using in-memory manager (single worker only)")
-
-# 会议房间管理
-meeting_rooms: Dict[int, Set[str]] = {}  # meeting_id -> set of sid
-
-
-def get_db_session():
-    return SQLSession(engine)
+    logger.info("Using in-memory manager (single worker only)")
 
 from sqlmodel import select
 
-def get_db_participants(meeting_id: int) -> list:
+# 以下数据库函数都接收同步 Session，由 open_async_session().run_sync 执行：
+# 异步驱动下走 greenlet，退路是有界线程池，都不会在事件循环里阻塞等待数据库
+
+def get_db_participants(session: SQLSession, meeting_id: int) -> list:
     """从数据库获取当前抽签参与者"""
     participants = []
     try:
-        with get_db_session() as session:
-            stmt = select(LotteryParticipant).where(
-                LotteryParticipant.meeting_id == meeting_id,
-                LotteryParticipant.status == "joined"
-            )
-            print(f"[Lottery] Querying participants for meeting_id={meeting_id}, status='joined'")
-            results = session.exec(stmt).all()
-            print(f"[Lottery] Query returned {len(results)} results")
-            for p in results:
-                participants.append({
-                    "id": p.user_id, # 注意：这里用 user_id (int)
-                    "user_id": p.user_id,
-                    "name": p.user_name,
-                    "avatar": p.avatar,
-                    "department": p.department,
-                    "is_winner": p.is_winner, # 返回中奖状态
-                    "winning_lottery_id": p.winning_lottery_id, # 返回中奖轮次ID
-                    "status": p.status,
-                    "created_at": p.created_at.isoformat() if p.created_at else None,
-                })
+        stmt = select(LotteryParticipant).where(
+            LotteryParticipant.meeting_id == meeting_id,
+            LotteryParticipant.status == "joined"
+        )
+        results = session.exec(stmt).all()
+        lottery_logger.debug("Loaded joined participants", extra={"meeting_id": meeting_id, "count": len(results)})
+        for p in results:
+            participants.append({
+                "id": p.user_id, # 注意：这里用 user_id (int)
+                "user_id": p.user_id,
+                "name": p.user_name,
+                "avatar": p.avatar,
+                "department": p.department,
+                "is_winner": p.is_winner, # 返回中奖状态
+                "winning_lottery_id": p.winning_lottery_id, # 返回中奖轮次ID
+                "status": p.status,
+                "created_at": p.created_at.isoformat() if p.created_at else None,
+            })
     except Exception as e:
-        print(f"[Lottery] DB Get Participants Error: {e}")
+        lottery_logger.warning("DB get participants failed: %s", e, extra={"meeting_id": meeting_id})
     return participants
 
 
 # --- 标准 Socket.IO 事件 ---
 
+def _parse_int(value) -> Optional[int]:
+    try:
+        return int(value) if value is not None and value != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+LEGACY_BROADCAST_ROOM = "broadcast-all"
+ADMIN_ROOM = "admin"
+MEDIA_ROOM = "media"
+TABLET_ROOM = "tablets"
+
+# 影响会议列表内容的变化，所有平板都要收到
+LIST_ACTIONS = frozenset({"created", "updated", "deleted"})
+
+
+def meeting_room(meeting_id: int) -> str:
+    return f"meeting_{meeting_id}"
+
+
+def user_room(user_id: int) -> str:
+    return f"user_{user_id}"
+
+
+def _is_admin(identity: dict) -> bool:
+    token = identity.get("admin_token")
+    if identity.get("role") != "admin" or not SOCKET_ADMIN_TOKEN or not isinstance(token, str):
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), SOCKET_ADMIN_TOKEN.encode("utf-8"))
+
+
+async def _identify(sid, identity: dict) -> bool:
+    user_id = _parse_int(identity.get("user_id"))
+    admin = _is_admin(identity)
+    if user_id is None and not admin:
+        return False
+    if user_id is not None:
+        await sio.enter_room(sid, user_room(user_id))
+        await sio.enter_room(sid, TABLET_ROOM)
+        await presence.bind_user(sid, user_id)
+    if admin:
+        await sio.enter_room(sid, ADMIN_ROOM)
+    await sio.leave_room(sid, LEGACY_BROADCAST_ROOM)
+    return True
+
+
 @sio.event
-async def connect(sid, environ):
-    print(f"[Socket.IO] Client connected: {sid}")
+async def connect(sid, environ, auth=None):
+    await presence.connect(sid)
+    await sio.enter_room(sid, LEGACY_BROADCAST_ROOM)
+    # 新客户端可在握手时直接表明身份：auth={"user_id": 1} / {"role": "admin", "admin_token": "..."} 或查询参数
+    identity = dict(auth) if isinstance(auth, dict) else {}
+    if not identity:
+        query = parse_qs(environ.get("QUERY_STRING", ""))
+        identity = {key: values[0] for key, values in query.items() if key in ("user_id", "role", "admin_token")}
+    await _identify(sid, identity)
+    log_sampled(logger, logging.INFO, "socket.connect", "Client connected", extra={"sid": sid})
 
 @sio.event
 async def disconnect(sid):
-    print(f"[Socket.IO] Client disconnected: {sid}")
+    # 断开时清理在线登记，房间成员关系由 Socket.IO 自行回收
+    await presence.disconnect(sid)
+    log_sampled(logger, logging.INFO, "socket.disconnect", "Client disconnected", extra={"sid": sid})
 
 @sio.on('join_meeting')
 async def join_meeting(sid, data):
     """加入会议房间"""
-    meeting_id = data.get('meeting_id')
+    meeting_id = _parse_int(data.get('meeting_id'))
     if meeting_id:
         room = f"meeting_{meeting_id}"
         await sio.enter_room(sid, room)
-        
-        if meeting_id not in meeting_rooms:
-            meeting_rooms[meeting_id] = set()
-        meeting_rooms[meeting_id].add(sid)
-        
-        print(f"[Socket.IO] {sid} joined room: {room}")
+        await presence.join(sid, meeting_id, user_id=_parse_int(data.get('user_id')))
+
+        logger.debug("Joined room", extra={"sid": sid, "room": room})
+
+@sio.on('identify')
+async def identify(sid, data):
+    """表明身份：加入 user_{id} / admin 房间，不再接收与自己无关的全局推送"""
+    identified = await _identify(sid, data if isinstance(data, dict) else {})
+    return {"ok": identified}
+
+
+@sio.on('join_media')
+async def join_media(sid, data=None):
+    await sio.enter_room(sid, MEDIA_ROOM)
+
+
+@sio.on('leave_media')
+async def leave_media(sid, data=None):
+    await sio.leave_room(sid, MEDIA_ROOM)
+
 
 @sio.on('leave_meeting')
 async def leave_meeting(sid, data):
     """离开会议房间"""
-    meeting_id = data.get('meeting_id')
+    meeting_id = _parse_int(data.get('meeting_id'))
     if meeting_id:
         room = f"meeting_{meeting_id}"
         await sio.leave_room(sid, room)
-        if meeting_id in meeting_rooms and sid in meeting_rooms[meeting_id]:
-            meeting_rooms[meeting_id].discard(sid)
+        await presence.leave(sid, meeting_id)
+
+
+async def _emit(event: str, data, room=None):
+    """所有服务端推送统一经过这里，按事件名和房间计数；room 可为房间列表，同一连接只收到一次。"""
+    record_socket_emit(event, room if room is None or isinstance(room, str) else "targeted")
+    await sio.emit(event, data, room=room)
+
+
+_background_tasks: set = set()
+
+
+def _on_broadcast_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Broadcast failed: %s", task.exception())
+
+
+def _spawn(coro_fn, args, kwargs) -> None:
+    task = asyncio.get_running_loop().create_task(coro_fn(*args, **kwargs))
+    _background_tasks.add(task)
+    task.add_done_callback(_on_broadcast_done)
+
+
+# 主事件循环，启动时由 bind_event_loop 记录；后台线程池（视频转码等）不是 anyio 工作线程，借它回到事件循环推送
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def bind_event_loop(loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    global _event_loop
+    _event_loop = loop
+
+
+def schedule_broadcast(coro_fn, *args, **kwargs) -> None:
+    """
+    调度一次推送，不等待完成。
+    同步路由运行在线程池中，没有事件循环，sio.start_background_task 会失败；
+    这里通过 anyio 回到主事件循环创建任务，协程里调用时直接创建任务。
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        try:
+            anyio.from_thread.run_sync(_spawn, coro_fn, args, kwargs)
+        except RuntimeError as e:
+            loop = _event_loop
+            if loop is not None and loop.is_running():
+                loop.call_soon_threadsafe(_spawn, coro_fn, args, kwargs)
+                return
+            # 不在 anyio 工作线程中（脚本、单元测试），没有可用的事件循环
+            logger.warning("Broadcast %s skipped: %s", coro_fn.__name__, e)
+        return
+    _spawn(coro_fn, args, kwargs)
 
 
 # --- 投票相关广播 ---
 
 async def broadcast_vote_state(meeting_id: int, vote_data: dict):
     room = f"meeting_{meeting_id}"
-    await sio.emit('vote_state_change', vote_data, room=room)
+    await _emit('vote_state_change', vote_data, room=room)
 
     # 兼容旧前端事件
     status = vote_data.get("status")
     if status in {"countdown", "active"}:
-        await sio.emit(
+        await _emit(
             'vote_start',
             {
                 "id": vote_data.get("id"),
@@ -134,7 +278,7 @@ async def broadcast_vote_state(meeting_id: int, vote_data: dict):
             room=room,
         )
     if status == "closed":
-        await sio.emit(
+        await _emit(
             'vote_end',
             {
                 "vote_id": vote_data.get("id"),
@@ -151,8 +295,8 @@ async def broadcast_vote_state(meeting_id: int, vote_data: dict):
 
 async def broadcast_vote_results(meeting_id: int, vote_id: int, result_data: dict):
     room = f"meeting_{meeting_id}"
-    await sio.emit('vote_results_change', result_data, room=room)
-    await sio.emit(
+    await _emit('vote_results_change', result_data, room=room)
+    await _emit(
         'vote_update',
         {
             'vote_id': vote_id,
@@ -168,25 +312,44 @@ async def broadcast_vote_start(meeting_id: int, vote_data: dict):
 
 async def broadcast_vote_end(meeting_id: int, vote_id: int, final_results: dict):
     room = f"meeting_{meeting_id}"
-    await sio.emit('vote_end', {'vote_id': vote_id, 'results': final_results}, room=room)
+    await _emit('vote_end', {'vote_id': vote_id, 'results': final_results}, room=room)
 
 
 async def broadcast_vote_update(meeting_id: int, vote_id: int, results: list):
     room = f"meeting_{meeting_id}"
-    await sio.emit('vote_update', {'vote_id': vote_id, 'results': results}, room=room)
-
-async def broadcast_meeting_changed(action: str, meeting_data: Optional[dict] = None):
+    await _emit('vote_update', {'vote_id': vote_id, 'results': results}, room=room)
+
+def _meeting_audience(meeting_id: int, attendee_user_ids: Iterable[int], action: str) -> list:
+    rooms = [LEGACY_BROADCAST_ROOM, ADMIN_ROOM, meeting_room(meeting_id)]
+    if action in LIST_ACTIONS:
+        rooms.append(TABLET_ROOM)
+    else:
+        rooms.extend(user_room(user_id) for user_id in sorted(set(attendee_user_ids)))
+    return rooms
+
+
+async def broadcast_meeting_changed(
+    action: str,
+    meeting_data: Optional[dict] = None,
+    attendee_user_ids: Iterable[int] = (),
+):
+    """
+    会议变化推送：新建 / 修改 / 删除发给所有平板、后台和旧客户端；附件等细节变化只发给会议房间、参会人、后台和旧客户端。
+    不针对具体会议的变化（如全局可见性设置）仍发给所有连接。
+    """
     payload = {"action": action}
     if meeting_data:
         payload.update(meeting_data)
-    await sio.emit('meeting_changed', payload)
+    meeting_id = payload.get("meeting_id")
+    room = _meeting_audience(meeting_id, attendee_user_ids, action) if meeting_id is not None else None
+    await _emit('meeting_changed', payload, room=room)
 
 
 async def broadcast_media_changed(action: str, media_data: Optional[dict] = None):
     payload = {"action": action}
     if media_data:
         payload.update(media_data)
-    await sio.emit('media_changed', payload)
+    await _emit('media_changed', payload, room=[LEGACY_BROADCAST_ROOM, ADMIN_ROOM, MEDIA_ROOM])
 
 
 def _normalize_round_status_value(status: Optional[str]) -> str:
@@ -213,58 +376,61 @@ def _build_lottery_round_payload(round_item: Lottery) -> dict:
     }
 
 
-def _get_lottery_session_snapshot(meeting_id: int) -> dict:
-    with get_db_session() as session:
-        meeting_session = session.get(LotterySession, meeting_id)
-        participants = get_db_participants(meeting_id)
+def _get_lottery_session_snapshot(session: SQLSession, meeting_id: int) -> dict:
+    meeting_session = session.get(LotterySession, meeting_id)
+    participants = get_db_participants(session, meeting_id)
+    rounds = session.exec(select(Lottery).where(Lottery.meeting_id == meeting_id).order_by(Lottery.created_at)).all()
+    dirty = False
+    for round_item in rounds:
+        normalized_status = _normalize_round_status_value(round_item.status)
+        if round_item.status != normalized_status:
+            round_item.status = normalized_status
+            session.add(round_item)
+            dirty = True
+    if dirty:
+        session.commit()
         rounds = session.exec(select(Lottery).where(Lottery.meeting_id == meeting_id).order_by(Lottery.created_at)).all()
-        dirty = False
-        for round_item in rounds:
-            normalized_status = _normalize_round_status_value(round_item.status)
-            if round_item.status != normalized_status:
-                round_item.status = normalized_status
-                session.add(round_item)
-                dirty = True
-        if dirty:
-            session.commit()
-            rounds = session.exec(select(Lottery).where(Lottery.meeting_id == meeting_id).order_by(Lottery.created_at)).all()
-
-        current_round = None
-        if meeting_session and meeting_session.current_round_id:
-            current_round = session.get(Lottery, meeting_session.current_round_id)
-
-        winners = []
-        if meeting_session and meeting_session.last_result:
-            try:
-                winners = json.loads(meeting_session.last_result)
-            except Exception:
-                winners = []
-
-        session_status = meeting_session.session_status if meeting_session else "idle"
-        all_finished = bool(rounds) and all(_normalize_round_status_value(round_item.status) == "finished" for round_item in rounds)
-        if current_round and _normalize_round_status_value(current_round.status) == "ready" and session_status in {"idle", "collecting"}:
-            session_status = "ready" if participants else "collecting"
-        if all_finished and session_status not in {"rolling", "result"}:
-            session_status = "completed"
-
-        return {
-            "meeting_id": meeting_id,
-            "session_status": session_status,
-            "current_round_id": current_round.id if current_round else None,
-            "current_round": _build_lottery_round_payload(current_round) if current_round else None,
-            "participants": participants,
-            "participants_count": len(participants),
-            "winners": winners,
-            "joined": False,
-            "all_rounds_finished": all_finished,
-            "rounds": [_build_lottery_round_payload(round_item) for round_item in rounds],
-        }
+
+    current_round = None
+    if meeting_session and meeting_session.current_round_id:
+        current_round = session.get(Lottery, meeting_session.current_round_id)
+
+    winners = []
+    if meeting_session and meeting_session.last_result:
+        try:
+            winners = json.loads(meeting_session.last_result)
+        except Exception:
+            winners = []
+
+    session_status = meeting_session.session_status if meeting_session else "idle"
+    all_finished = bool(rounds) and all(_normalize_round_status_value(round_item.status) == "finished" for round_item in rounds)
+    if current_round and _normalize_round_status_value(current_round.status) == "ready" and session_status in {"idle", "collecting"}:
+        session_status = "ready" if participants else "collecting"
+    if all_finished and session_status not in {"rolling", "result"}:
+        session_status = "completed"
+
+    return {
+        "meeting_id": meeting_id,
+        "session_status": session_status,
+        "current_round_id": current_round.id if current_round else None,
+        "current_round": _build_lottery_round_payload(current_round) if current_round else None,
+        "participants": participants,
+        "participants_count": len(participants),
+        "winners": winners,
+        "joined": False,
+        "all_rounds_finished": all_finished,
+        "rounds": [_build_lottery_round_payload(round_item) for round_item in rounds],
+    }
 
 
 async def broadcast_lottery_session_change(meeting_id: int, payload: Optional[dict] = None):
     room = f"meeting_{meeting_id}"
-    snapshot = payload or _get_lottery_session_snapshot(meeting_id)
-    await sio.emit('lottery_session_change', snapshot, room=room)
+    snapshot = payload
+    if not snapshot:
+        # 快照查好之后才推送；构建期间事件循环继续处理其他连接
+        async with open_async_session() as session:
+            snapshot = await session.run_sync(_get_lottery_session_snapshot, meeting_id)
+    await _emit('lottery_session_change', snapshot, room=room)
 
 
 # Create ASGI App
@@ -0,0 +1,81 @@
+import asyncio
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine, select
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from models import Meeting  # noqa: E402
+
+
+class AsyncDatabaseUrlTestCase(unittest.TestCase):
+    def test_sync_urls_map_to_async_drivers_when_installed(self):
+        self.assertEqual("sqlite+aiosqlite:////tmp/a.db", self._convert("sqlite:////tmp/a.db"))
+        self.assertEqual(
+            "postgresql+asyncpg://u:p@db:5432/meeting",
+            self._convert("postgresql+psycopg2://u:p@db:5432/meeting"),
+        )
+        self.assertIsNone(self._convert("mysql://u:p@db/meeting"))
+
+    def test_missing_driver_disables_async_engine(self):
+        real_import = __import__
+
+        def fake_import(name, *args, **kwargs):
+            if name == "aiosqlite":
+                raise ImportError(name)
+            return real_import(name, *args, **kwargs)
+
+        with mock.patch("builtins.__import__", side_effect=fake_import):
+            self.assertIsNone(database_module._async_database_url("sqlite:////tmp/a.db"))
+
+    @staticmethod
+    def _convert(url):
+        # 只验证 URL 换算，驱动是否安装不影响结果
+        with mock.patch("builtins.__import__"):
+            return database_module._async_database_url(url)
+
+
+class ThreadedSessionTestCase(unittest.TestCase):
+    def test_run_sync_executes_in_worker_thread_with_sync_session(self):
+        # 内存库需固定单连接，线程池中的会话才能看到建好的表
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(engine)
+
+        def create_meeting(session: Session, title: str) -> int:
+            meeting = Meeting(title=title, start_time=datetime(2026, 3, 3, 9, 30))
+            session.add(meeting)
+            session.commit()
+            return meeting.id
+
+        async def scenario():
+            with mock.patch.object(database_module, "engine", engine), \
+                    mock.patch.object(database_module, "async_session_factory", None):
+                async with database_module.open_async_session() as session:
+                    self.assertIsInstance(session, database_module.ThreadedSession)
+                    return await session.run_sync(create_meeting, "线程池会话")
+
+        meeting_id = asyncio.run(scenario())
+
+        with Session(engine) as session:
+            self.assertEqual("线程池会话", session.exec(select(Meeting.title).where(Meeting.id == meeting_id)).one())
+
+
+if __name__ == "__main__":
+    unittest.main()
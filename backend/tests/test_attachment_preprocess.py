@@ -0,0 +1,140 @@
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine, select
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from models import Attachment, AttachmentPage, AttachmentRead, Meeting  # noqa: E402
+from routes import meetings as meeting_routes  # noqa: E402
+from services import attachment_preprocess  # noqa: E402
+
+
+def _fake_analysis(source, output_dir):
+    # 三页文档，只渲染前两页预览
+    for number in (1, 2):
+        (output_dir / attachment_preprocess._preview_filename(number)).write_bytes(b"webp")
+    return attachment_preprocess.PdfAnalysis(page_count=3, preview_pages=2, texts=["第一页", "第二页", ""])
+
+
+class AttachmentPreprocessTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+        for patcher in (
+            mock.patch.object(attachment_preprocess, "engine", self.engine),
+            mock.patch.object(attachment_preprocess, "PREVIEW_ROOT", self.root / "previews"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        with Session(self.engine) as session:
+            meeting = Meeting(title="党委会", start_time=datetime(2026, 3, 3, 9, 30))
+            session.add(meeting)
+            session.flush()
+            pdf = Attachment(filename="agenda.pdf", display_name="议程", file_path=str(self.root / "agenda.pdf"),
+                             content_type="application/pdf", meeting_id=meeting.id)
+            doc = Attachment(filename="notes.docx", display_name="纪要", file_path=str(self.root / "notes.docx"),
+                             meeting_id=meeting.id)
+            session.add_all([pdf, doc])
+            session.commit()
+            self.pdf_id, self.doc_id = pdf.id, doc.id
+
+    def test_pdf_pages_previews_and_text_are_saved(self):
+        with mock.patch.object(attachment_preprocess, "analyze_pdf", side_effect=_fake_analysis):
+            self.assertEqual("ready", attachment_preprocess.process_attachment(self.pdf_id))
+
+        self.assertEqual(
+            ["page_0001.webp", "page_0002.webp"],
+            sorted(path.name for path in attachment_preprocess.preview_dir(self.pdf_id).iterdir()),
+        )
+        with Session(self.engine) as session:
+            attachment = session.get(Attachment, self.pdf_id)
+            self.assertEqual((3, 2, "ready"), (attachment.page_count, attachment.preview_page_count,
+                                               attachment.preprocess_status))
+            self.assertEqual(
+                f"/static/previews/attachments/{self.pdf_id}/page_0001.webp",
+                AttachmentRead.model_validate(attachment).preview_url,
+            )
+            response = meeting_routes.get_attachment_pages(self.pdf_id, include_text=True, session=session)
+
+        self.assertEqual([1, 2, 3], [page.page_number for page in response.pages])
+        self.assertIsNone(response.pages[2].preview_url)
+        self.assertEqual("第二页", response.pages[1].text)
+
+        # 重新处理失败：旧页文本与预览一并清掉，不留半旧数据
+        with mock.patch.object(attachment_preprocess, "analyze_pdf", side_effect=ValueError("broken")):
+            self.assertEqual("failed", attachment_preprocess.process_attachment(self.pdf_id))
+        self.assertFalse(attachment_preprocess.preview_dir(self.pdf_id).exists())
+        with Session(self.engine) as session:
+            self.assertEqual([], session.exec(select(AttachmentPage)).all())
+            self.assertIsNone(session.get(Attachment, self.pdf_id).page_count)
+
+    def test_non_pdf_is_unsupported_and_missing_backend_keeps_pending(self):
+        self.assertEqual("unsupported", attachment_preprocess.process_attachment(self.doc_id))
+        self.assertIsNone(attachment_preprocess.process_attachment(9999))
+
+        with mock.patch.object(attachment_preprocess, "PYMUPDF_AVAILABLE", False), \
+                mock.patch.object(attachment_preprocess, "PYPDF_AVAILABLE", False), \
+                mock.patch.object(attachment_preprocess.preprocess_jobs, "submit") as submit:
+            self.assertFalse(attachment_preprocess.enqueue_preprocess(self.pdf_id))
+            self.assertEqual(0, attachment_preprocess.enqueue_pending())
+        submit.assert_not_called()
+
+        with Session(self.engine) as session:
+            self.assertEqual("pending", session.get(Attachment, self.pdf_id).preprocess_status)
+
+    def test_pending_attachment_is_processed_by_one_worker_only(self):
+        staging_dirs = []
+
+        def analysis(source, output_dir):
+            staging_dirs.append(output_dir)
+            # 处理期间另一个 worker 的补处理任务认领同一附件失败，不会动本进程的临时目录
+            self.assertIsNone(attachment_preprocess.process_attachment(self.pdf_id, only_pending=True))
+            return _fake_analysis(source, output_dir)
+
+        with mock.patch.object(attachment_preprocess, "analyze_pdf", side_effect=analysis):
+            self.assertEqual("ready", attachment_preprocess.process_attachment(self.pdf_id, only_pending=True))
+            self.assertIsNone(attachment_preprocess.process_attachment(self.pdf_id, only_pending=True))
+
+        self.assertEqual(1, len(staging_dirs))
+        self.assertEqual(self.root / "previews", staging_dirs[0].parent)
+        self.assertEqual([str(self.pdf_id)], [path.name for path in (self.root / "previews").iterdir()])
+
+        # 认领后进程退出留下的 processing 超时后可重新认领
+        with Session(self.engine) as session:
+            attachment = session.get(Attachment, self.doc_id)
+            attachment.preprocess_status = attachment_preprocess.STATUS_PROCESSING
+            attachment.preprocess_started_at = datetime(2026, 1, 1)
+            session.add(attachment)
+            session.commit()
+        with mock.patch.object(attachment_preprocess, "PYPDF_AVAILABLE", True), \
+                mock.patch.object(attachment_preprocess.preprocess_jobs, "submit", return_value=True) as submit:
+            self.assertEqual(1, attachment_preprocess.enqueue_pending())
+        self.assertEqual(self.doc_id, submit.call_args.args[2])
+        self.assertEqual("unsupported", attachment_preprocess.process_attachment(self.doc_id, only_pending=True))
+
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from fastapi import HTTPException
+from sqlmodel import SQLModel, Session, create_engine
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from models import User  # noqa: E402
+from services import auth_service  # noqa: E402
+
+
+class AuthServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(self.engine)
+        auth_service.invalidate_login_cache()
+
+    def test_login_profile_is_served_from_cache_until_invalidated(self):
+        with Session(self.engine) as session:
+            user = User(name="张三", phone="13800000001", department="办公室")
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+
+            first = auth_service.resolve_login_profile("张三", session)
+
+            user.department = "组织部"
+            session.add(user)
+            session.commit()
+
+            cached = auth_service.resolve_login_profile("张三", session)
+            auth_service.invalidate_login_cache()
+            refreshed = auth_service.resolve_login_profile("张三", session)
+
+        self.assertEqual(user.id, first["user_id"])
+        self.assertEqual("办公室", cached["department"])
+        self.assertEqual("组织部", refreshed["department"])
+
+    def test_duplicate_names_require_phone_login(self):
+        with Session(self.engine) as session:
+            session.add(User(name="李四", phone="13800000002"))
+            session.add(User(name="李四", phone="13800000003"))
+            session.commit()
+
+            with self.assertRaises(HTTPException) as ctx:
+                auth_service.resolve_login_profile("李四", session)
+            by_phone = auth_service.resolve_login_profile("13800000003", session)
+
+        self.assertEqual(300, ctx.exception.status_code)
+        self.assertEqual("13800000003", by_phone["phone"])
+
+    def test_last_login_writes_are_coalesced_per_user(self):
+        with Session(self.engine) as session:
+            user = User(name="王五")
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+            user_id = user.id
+
+        auth_service.record_login(user_id, datetime(2026, 4, 2, 8, 55, 0))
+        auth_service.record_login(user_id, datetime(2026, 4, 2, 8, 56, 0))
+
+        with mock.patch.object(auth_service, "engine", self.engine):
+            flushed = auth_service._last_login_buffer.flush()
+
+        with Session(self.engine) as session:
+            refreshed = session.get(User, user_id)
+
+        self.assertEqual(1, flushed)
+        self.assertEqual(datetime(2026, 4, 2, 8, 56, 0), refreshed.last_login)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from benchmarks.harness import find_regressions, load_baseline, measure, save_baseline  # noqa: E402
+
+
+class BenchmarkHarnessTestCase(unittest.TestCase):
+    def test_measure_reports_throughput_and_allocations(self):
+        result = measure("build_list", lambda: [str(index) for index in range(200)], min_time=0.01)
+
+        self.assertGreaterEqual(result.rounds, 5)
+        self.assertGreater(result.ops_per_sec, 0)
+        self.assertGreater(result.alloc_peak_kib, 0)
+
+    def test_saved_baseline_round_trips_and_flags_regressions(self):
+        fast = measure("noop", lambda: None, min_time=0.01)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "baseline.json"
+            save_baseline(path, [fast])
+            baseline = load_baseline(path)
+
+        self.assertIn("noop", baseline)
+        baseline["noop"]["ops_per_sec"] = fast.ops_per_sec * 2
+        self.assertEqual(len(find_regressions([fast], baseline, max_regression=0.2)), 1)
+        self.assertEqual(find_regressions([fast], baseline, max_regression=0.6), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
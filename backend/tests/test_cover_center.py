@@ -0,0 +1,44 @@
+import io
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from fastapi import UploadFile  # noqa: E402
+
+from routes import cover_center  # noqa: E402
+
+
+class CoverPoolChangeVersionTestCase(unittest.TestCase):
+    def test_common_pool_upload_and_delete_bump_shared_version(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        with mock.patch.object(cover_center, "COMMON_POOL_DIR", Path(directory.name)), \
+                mock.patch.object(cover_center, "bump_shared") as bump_shared:
+            item = cover_center.upload_common_cover(UploadFile(io.BytesIO(b"png"), filename="封面.png"))
+            self.assertEqual(1, bump_shared.call_count)
+
+            cover_center.delete_common_cover(item["name"])
+            self.assertEqual(2, bump_shared.call_count)
+
+        self.assertEqual([], list(Path(directory.name).iterdir()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from typing import List
+from unittest import mock
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+import fast_json  # noqa: E402
+from models import MediaItemRead  # noqa: E402
+
+
+class FastJSONTestCase(unittest.TestCase):
+    def setUp(self):
+        self.payload = {
+            "title": "季度工作会",
+            "start_time": datetime(2026, 3, 3, 9, 0, 0, 120000),
+            "counts": {1: 2},
+            "tags": ("a", "b"),
+        }
+        self.expected = {
+            "title": "季度工作会",
+            "start_time": "2026-03-03T09:00:00.120000",
+            "counts": {"1": 2},
+            "tags": ["a", "b"],
+        }
+
+    def test_dumps_matches_stdlib_fallback(self):
+        self.assertEqual(json.loads(fast_json.dumps(self.payload)), self.expected)
+        with mock.patch.object(fast_json, "ORJSON_AVAILABLE", False):
+            fallback = fast_json.dumps(self.payload)
+        self.assertEqual(json.loads(fallback), self.expected)
+        self.assertIn("季度工作会", fallback.decode("utf-8"))
+
+    def test_model_json_response_serializes_models_directly(self):
+        item = MediaItemRead(
+            id=1,
+            kind="image",
+            title="合影",
+            parent_id=None,
+            extension="jpg",
+            file_size=2048,
+            visible_on_android=True,
+            created_at=datetime(2026, 3, 3, 9, 0),
+            updated_at=datetime(2026, 3, 3, 9, 0),
+            previewUrl="/static/media/a.jpg",
+        )
+        response = fast_json.model_json_response([item], TypeAdapter(List[MediaItemRead]))
+
+        self.assertEqual(response.media_type, "application/json")
+        self.assertEqual(json.loads(response.body), [item.model_dump(mode="json", by_alias=True)])
+
+    def test_socket_json_returns_text_and_accepts_socketio_kwargs(self):
+        encoded = fast_json.socket_json.dumps(self.payload, separators=(",", ":"))
+        self.assertIsInstance(encoded, str)
+        self.assertEqual(fast_json.socket_json.loads(encoded), self.expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import PlainTextResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from http_cache import CompressionMiddleware, MeetingETagMiddleware  # noqa: E402
+from services import change_versions  # noqa: E402
+from services.change_versions import bump_meeting, bump_shared  # noqa: E402
+
+
+class MeetingETagMiddlewareTestCase(unittest.TestCase):
+    def setUp(self):
+        self.calls = 0
+        app = FastAPI()
+
+        @app.get("/meetings/")
+        def read_meetings():
+            self.calls += 1
+            return [{"id": 1, "title": "周例会" * 200}]
+
+        @app.get("/meetings/{meeting_id}")
+        def read_meeting(meeting_id: int):
+            self.calls += 1
+            return {"id": meeting_id}
+
+        @app.get("/notes/")
+        def read_notes():
+            return PlainTextResponse("x" * 4096)
+
+        app.add_middleware(MeetingETagMiddleware)
+        app.add_middleware(CompressionMiddleware)
+        self.client = TestClient(app)
+
+    def test_unchanged_meeting_answers_304_without_calling_route(self):
+        etag = self.client.get("/meetings/").headers["etag"]
+        self.assertTrue(etag.startswith('W/"'))
+
+        response = self.client.get("/meetings/", headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.calls, 1)
+
+    def test_versions_are_scoped_per_meeting(self):
+        first_etag = self.client.get("/meetings/1").headers["etag"]
+        second_etag = self.client.get("/meetings/2").headers["etag"]
+        list_etag = self.client.get("/meetings/").headers["etag"]
+
+        bump_meeting(2)
+
+        self.assertEqual(self.client.get("/meetings/1", headers={"If-None-Match": first_etag}).status_code, 304)
+        self.assertEqual(self.client.get("/meetings/2", headers={"If-None-Match": second_etag}).status_code, 200)
+        self.assertEqual(self.client.get("/meetings/", headers={"If-None-Match": list_etag}).status_code, 200)
+
+        first_etag = self.client.get("/meetings/1").headers["etag"]
+        bump_shared()
+        self.assertEqual(self.client.get("/meetings/1", headers={"If-None-Match": first_etag}).status_code, 200)
+
+    def test_different_query_does_not_match(self):
+        etag = self.client.get("/meetings/?user_id=1").headers["etag"]
+        response = self.client.get("/meetings/?user_id=2", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_large_responses_are_gzipped_small_ones_are_not(self):
+        large = self.client.get("/notes/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(large.headers.get("content-encoding"), "gzip")
+        self.assertEqual(large.text, "x" * 4096)
+        self.assertIn("Accept-Encoding", large.headers.get("vary", ""))
+
+        small = self.client.get("/meetings/7", headers={"Accept-Encoding": "gzip"})
+        self.assertIsNone(small.headers.get("content-encoding"))
+
+        listing = self.client.get("/meetings/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(listing.headers.get("content-encoding"), "gzip")
+        self.assertEqual(listing.json()[0]["id"], 1)
+
+
+class ChangeVersionStoreTestCase(unittest.TestCase):
+    def test_multi_worker_without_redis_warns_at_startup(self):
+        env = {key: value for key, value in os.environ.items() if key != "REDIS_URL"}
+        with mock.patch.dict(os.environ, env, clear=True), \
+                mock.patch.object(change_versions, "WORKERS", 4), \
+                self.assertLogs(change_versions.logger, "WARNING") as logs:
+            store = change_versions._create_store()
+
+        self.assertIs(type(store), change_versions.ChangeVersionStore)
+        self.assertIn("4 workers", logs.output[0])
+
+    def test_single_worker_without_redis_is_silent(self):
+        env = {key: value for key, value in os.environ.items() if key != "REDIS_URL"}
+        with mock.patch.dict(os.environ, env, clear=True), \
+                mock.patch.object(change_versions, "WORKERS", 1), \
+                mock.patch.object(change_versions.logger, "warning") as warning:
+            change_versions._create_store()
+
+        warning.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from PIL import Image  # noqa: E402
+
+from services import image_derivatives  # noqa: E402
+
+
+class ImageDerivativesTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        (self.root / "media").mkdir()
+        for patcher in (
+            mock.patch.object(image_derivatives, "UPLOAD_ROOT", self.root),
+            mock.patch.object(image_derivatives, "IMAGE_DERIVATIVE_WIDTHS", (320, 640, 1280)),
+            mock.patch.object(image_derivatives, "IMAGE_DERIVATIVE_FORMATS", ("webp",)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        image_derivatives.clear_cache()
+        self.addCleanup(image_derivatives.clear_cache)
+
+    def _image(self, name: str, size) -> Path:
+        path = self.root / "media" / name
+        Image.new("RGB", size, (200, 30, 30)).save(path)
+        return path
+
+    def test_missing_derivatives_are_queued_then_listed_smallest_first(self):
+        source = self._image("photo.jpg", (1000, 500))
+
+        with mock.patch.object(image_derivatives, "enqueue_derivatives") as enqueue:
+            self.assertEqual([], image_derivatives.ready_derivatives(source))
+        enqueue.assert_called_once()
+
+        image_derivatives.generate_derivatives(source)
+        ready = image_derivatives.ready_derivatives(source)
+
+        # 不放大：1000 宽的原图没有 1280 档
+        self.assertEqual([(320, 160), (640, 320)], [(item.width, item.height) for item in ready])
+        self.assertEqual("thumbnails/responsive/media/photo_jpg_320w.webp", ready[0].path.as_posix())
+        with Image.open(self.root / ready[1].path) as generated:
+            self.assertEqual((640, 320), generated.size)
+
+        self.assertEqual(2, len(image_derivatives.derivative_files(source)))
+
+    def test_small_and_undecodable_images(self):
+        small = self._image("icon.png", (100, 80))
+        broken = self.root / "media" / "broken.jpg"
+        broken.write_bytes(b"not an image")
+
+        image_derivatives.generate_derivatives(small)
+
+        self.assertEqual([100], [item.width for item in image_derivatives.ready_derivatives(small)])
+        with mock.patch.object(image_derivatives, "enqueue_derivatives") as enqueue:
+            self.assertEqual([], image_derivatives.ready_derivatives(broken))
+            self.assertEqual([], image_derivatives.ready_derivatives(broken))
+        enqueue.assert_not_called()
+
+    def test_write_error_is_retried_and_leaves_no_staging_files(self):
+        source = self._image("photo.jpg", (1000, 500))
+
+        with mock.patch.object(image_derivatives.os, "replace", side_effect=FileNotFoundError("raced")):
+            self.assertEqual([], image_derivatives.generate_derivatives(source))
+
+        # 写入失败不当作无法解码：下次列表请求重新提交，生成后正常列出
+        with mock.patch.object(image_derivatives, "enqueue_derivatives") as enqueue:
+            self.assertEqual([], image_derivatives.ready_derivatives(source))
+        enqueue.assert_called_once()
+        self.assertEqual(2, len(image_derivatives.generate_derivatives(source)))
+        self.assertEqual([320, 640], [item.width for item in image_derivatives.ready_derivatives(source)])
+        self.assertEqual([], list((self.root / "thumbnails").rglob("*.tmp")))
+
+
+if __name__ == "__main__":
+    unittest.main()
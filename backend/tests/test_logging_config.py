@@ -0,0 +1,51 @@
+import logging
+import sys
+import unittest
+from pathlib import Path
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from logging_config import StructuredFormatter, get_logger, log_sampled  # noqa: E402
+
+
+class _ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class LoggingConfigTestCase(unittest.TestCase):
+    def setUp(self):
+        self.logger = get_logger("test.sampling")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.handler = _ListHandler()
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def test_sampled_events_emit_once_per_window(self):
+        for _ in range(25):
+            log_sampled(self.logger, logging.INFO, "test.tick", "tick", every=10)
+        log_sampled(self.logger, logging.DEBUG, "test.debug", "skipped", every=1)
+
+        self.assertEqual([1, 11, 21], [record.sample_count for record in self.handler.records])
+
+    def test_structured_formatter_appends_extra_fields(self):
+        self.logger.info("joined", extra={"sid": "abc", "room": "meeting_1"})
+        text_line = StructuredFormatter().format(self.handler.records[0])
+        json_line = StructuredFormatter(as_json=True).format(self.handler.records[0])
+
+        self.assertTrue(text_line.endswith("joined sid=abc room=meeting_1"))
+        self.assertIn('"room": "meeting_1"', json_line)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from fastapi import HTTPException
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine, select
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from models import MediaBulkDelete, MediaBulkMove, MediaBulkVisibility, MediaItem  # noqa: E402
+from routes import media as media_routes  # noqa: E402
+
+
+class MediaBulkTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+        # album -> (a.jpg, b.jpg, inner -> c.jpg)；target 为另一个根文件夹
+        with Session(self.engine) as session:
+            ids = {}
+            for name, kind, parent in (
+                ("album", "folder", None),
+                ("target", "folder", None),
+                ("a", "image", "album"),
+                ("b", "image", "album"),
+                ("inner", "folder", "album"),
+                ("c", "image", "inner"),
+            ):
+                filename = f"{name}.jpg" if kind == "image" else None
+                item = MediaItem(kind=kind, title=name, parent_id=ids.get(parent), filename=filename)
+                session.add(item)
+                session.flush()
+                ids[name] = item.id
+            session.commit()
+        self.ids = ids
+
+        notify_patcher = mock.patch.object(media_routes, "_notify_media_changed")
+        remove_patcher = mock.patch.object(media_routes, "remove_files_later")
+        self.notify = notify_patcher.start()
+        self.remove_files = remove_patcher.start()
+        self.addCleanup(notify_patcher.stop)
+        self.addCleanup(remove_patcher.stop)
+
+    def _parents(self):
+        with Session(self.engine) as session:
+            return {item.title: item.parent_id for item in session.exec(select(MediaItem)).all()}
+
+    def test_bulk_move_sends_one_aggregated_event(self):
+        ids = self.ids
+        with Session(self.engine) as session:
+            result = media_routes.bulk_move(
+                MediaBulkMove(ids=[ids["a"], ids["b"], ids["a"]], parent_id=ids["target"]), session
+            )
+
+        self.assertEqual(2, result["count"])
+        self.assertEqual(ids["target"], self._parents()["a"])
+        self.notify.assert_called_once()
+        action, payload = self.notify.call_args.args
+        self.assertEqual("bulk_moved", action)
+        self.assertEqual([ids["a"], ids["b"]], payload["item_ids"])
+        self.assertEqual([ids["album"], ids["target"]], payload["parent_ids"])
+        self.assertEqual(ids["album"], payload["previous_parent_id"])
+
+    def test_bulk_move_rejects_move_into_own_subtree(self):
+        ids = self.ids
+        with Session(self.engine) as session:
+            with self.assertRaises(HTTPException) as raised:
+                media_routes.bulk_move(MediaBulkMove(ids=[ids["a"], ids["album"]], parent_id=ids["inner"]), session)
+
+        self.assertEqual(400, raised.exception.status_code)
+        self.assertEqual(ids["album"], self._parents()["a"])
+        self.notify.assert_not_called()
+
+    def test_bulk_delete_removes_subtrees_and_queues_files(self):
+        ids = self.ids
+        with Session(self.engine) as session:
+            result = media_routes.bulk_delete(MediaBulkDelete(ids=[ids["inner"], ids["a"]]), session)
+
+        self.assertEqual({"album", "target", "b"}, set(self._parents()))
+        self.assertEqual(3, result["deleted"])
+        queued = sorted(Path(path).name for path in self.remove_files.call_args_list[0].args[0])
+        self.assertEqual(["a.jpg", "c.jpg"], queued)
+        action, payload = self.notify.call_args.args
+        self.assertEqual("bulk_deleted", action)
+        self.assertEqual([ids["album"]], payload["parent_ids"])
+
+    def test_bulk_visibility_and_missing_ids(self):
+        ids = self.ids
+        with Session(self.engine) as session:
+            media_routes.bulk_visibility(MediaBulkVisibility(ids=[ids["a"], ids["c"]], visible_on_android=False), session)
+            with self.assertRaises(HTTPException) as raised:
+                media_routes.bulk_visibility(MediaBulkVisibility(ids=[ids["a"], 9999], visible_on_android=True), session)
+
+        self.assertEqual(404, raised.exception.status_code)
+        with Session(self.engine) as session:
+            hidden = set(session.exec(select(MediaItem.title).where(MediaItem.visible_on_android == False)).all())  # noqa: E712
+        self.assertEqual({"a", "c"}, hidden)
+        payload = self.notify.call_args.args[1]
+        self.assertIsNone(payload["parent_id"])
+        self.assertEqual([ids["album"], ids["inner"]], payload["parent_ids"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from routes import media as media_routes  # noqa: E402
+from services import media_feed as media_feed_module  # noqa: E402
+from services.media_feed import MediaFeedCache, media_feed_cache  # noqa: E402
+
+
+class MediaFeedCacheTestCase(unittest.TestCase):
+    def test_stale_version_misses_and_lru_evicts(self):
+        cache = MediaFeedCache(max_entries=2)
+        cache.put("root", "v1", b"[]")
+        cache.put("album", "v1", b"[1]")
+
+        self.assertIsNone(cache.get("root", "v2"))
+        self.assertEqual(b"[]", cache.get("root", "v1"))
+        cache.put("other", "v1", b"[2]")
+
+        self.assertIsNone(cache.get("album", "v1"))
+        self.assertEqual(2, len(cache))
+
+
+class MediaFeedEndpointTestCase(unittest.TestCase):
+    def setUp(self):
+        self.builds = []
+
+        async def fake_build(parent_id, kind, skip, limit):
+            self.builds.append((parent_id, kind, skip, limit))
+            return b'{"items":[],"total":0,"skip":0,"limit":20}'
+
+        media_feed_cache.clear()
+        build_patcher = mock.patch.object(media_routes, "_build_feed", fake_build)
+        broadcast_patcher = mock.patch.object(media_routes, "schedule_broadcast")
+        build_patcher.start()
+        broadcast_patcher.start()
+        self.addCleanup(build_patcher.stop)
+        self.addCleanup(broadcast_patcher.stop)
+
+        app = FastAPI()
+        app.include_router(media_routes.router)
+        self.client = TestClient(app)
+
+    def test_cached_body_and_304_until_media_changes(self):
+        first = self.client.get("/media/feed?limit=20")
+        etag = first.headers["etag"]
+        self.assertEqual(200, self.client.get("/media/feed?limit=20").status_code)
+        self.assertEqual(304, self.client.get("/media/feed?limit=20", headers={"If-None-Match": etag}).status_code)
+        self.assertEqual(1, len(self.builds))
+
+        media_routes._notify_media_changed("updated", {"item_id": 1})
+
+        changed = self.client.get("/media/feed?limit=20", headers={"If-None-Match": etag})
+        self.assertEqual(200, changed.status_code)
+        self.assertNotEqual(etag, changed.headers["etag"])
+        self.assertEqual(2, len(self.builds))
+
+    def test_folders_and_pages_are_cached_separately(self):
+        root_etag = self.client.get("/media/feed?limit=20").headers["etag"]
+        folder = self.client.get("/media/feed?parent_id=3&kind=all&limit=20", headers={"If-None-Match": root_etag})
+
+        self.assertEqual(200, folder.status_code)
+        self.assertEqual([(None, None, 0, 20), (3, None, 0, 20)], self.builds)
+
+    def test_cached_body_expires_with_time_bucket(self):
+        # 未配置 Redis 时其他 worker 的变更不会递增本进程的版本号，缓存最多沿用一个时间桶
+        now = [media_feed_module.MEDIA_FEED_MAX_AGE_SECONDS * 20.0]
+        clock = mock.Mock(time=lambda: now[0])
+        with mock.patch.object(media_feed_module, "time", clock):
+            etag = self.client.get("/media/feed?limit=20").headers["etag"]
+            now[0] += media_feed_module.MEDIA_FEED_MAX_AGE_SECONDS / 2
+            self.assertEqual(304, self.client.get("/media/feed?limit=20", headers={"If-None-Match": etag}).status_code)
+            now[0] += media_feed_module.MEDIA_FEED_MAX_AGE_SECONDS
+            expired = self.client.get("/media/feed?limit=20", headers={"If-None-Match": etag})
+
+        self.assertEqual(200, expired.status_code)
+        self.assertEqual(2, len(self.builds))
+
+
+if __name__ == "__main__":
+    unittest.main()
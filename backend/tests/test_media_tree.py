@@ -0,0 +1,83 @@
+import sys
+import unittest
+from pathlib import Path
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine, select
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from models import MediaItem  # noqa: E402
+from query_budget import assert_query_budget  # noqa: E402
+from services import media_tree  # noqa: E402
+
+
+class MediaTreeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+        # root -> year -> month -> photo.jpg；other 为无关文件夹
+        with Session(self.engine) as session:
+            ids = {}
+            for name, parent in (("root", None), ("year", "root"), ("month", "year"), ("other", None)):
+                folder = MediaItem(kind="folder", title=name, parent_id=ids.get(parent))
+                session.add(folder)
+                session.flush()
+                ids[name] = folder.id
+            photo = MediaItem(kind="image", title="photo", parent_id=ids["month"], filename="photo.jpg")
+            session.add(photo)
+            session.commit()
+            ids["photo"] = photo.id
+        self.ids = ids
+
+    def test_descendants_and_ancestors_are_single_queries(self):
+        ids = self.ids
+        with Session(self.engine) as session, assert_query_budget(self.engine, 3):
+            descendants = media_tree.descendant_ids(session, ids["year"])
+            path = media_tree.ancestors(session, ids["photo"])
+            cycle = media_tree.is_in_subtree(session, ids["root"], ids["month"])
+
+        self.assertEqual({ids["year"], ids["month"], ids["photo"]}, descendants)
+        self.assertEqual(["root", "year", "month", "photo"], [title for _, title in path])
+        self.assertTrue(cycle)
+        with Session(self.engine) as session:
+            self.assertFalse(media_tree.is_in_subtree(session, ids["year"], ids["other"]))
+            self.assertEqual([], media_tree.ancestors(session, 9999))
+
+    def test_ancestors_stop_on_cycle(self):
+        with Session(self.engine) as session:
+            root = session.get(MediaItem, self.ids["root"])
+            root.parent_id = self.ids["month"]
+            session.add(root)
+            session.commit()
+
+            path = media_tree.ancestors(session, self.ids["month"])
+
+        self.assertEqual(["root", "year", "month"], [title for _, title in path])
+
+    def test_delete_subtree_returns_filenames(self):
+        with Session(self.engine) as session:
+            with assert_query_budget(self.engine, 1):
+                filenames = media_tree.delete_subtrees(session, [self.ids["year"]])
+            session.commit()
+
+            remaining = set(session.exec(select(MediaItem.title)).all())
+
+        self.assertEqual(["photo.jpg"], [name for name in filenames if name])
+        self.assertEqual({"root", "other"}, remaining)
+
+
+if __name__ == "__main__":
+    unittest.main()
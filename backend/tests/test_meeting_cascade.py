@@ -0,0 +1,172 @@
+import sys
+import tempfile
+import threading
+import unittest
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import func
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine, select
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from models import (  # noqa: E402
+    Attachment,
+    AttachmentPage,
+    CheckIn,
+    Lottery,
+    LotteryParticipant,
+    LotterySession,
+    LotteryWinner,
+    Meeting,
+    MeetingAttendeeLink,
+    MeetingSyncState,
+    ReadingProgress,
+    User,
+    UserVote,
+    Vote,
+    VoteOption,
+)
+from query_budget import assert_query_budget  # noqa: E402
+from services.background_jobs import BackgroundJobRunner  # noqa: E402
+from services.meeting_cascade import delete_meeting_cascade  # noqa: E402
+
+
+class MeetingCascadeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+
+    def _seed_meeting(self, session: Session, title: str, user_count: int) -> int:
+        meeting = Meeting(title=title, start_time=datetime(2026, 3, 3, 9, 30))
+        session.add(meeting)
+        session.flush()
+        users = [User(name=f"{title}-{index}", phone=f"{title}-{index}") for index in range(user_count)]
+        session.add_all(users)
+        session.flush()
+
+        vote = Vote(meeting_id=meeting.id, title="议题")
+        lottery = Lottery(meeting_id=meeting.id, title="第一轮")
+        attachment = Attachment(
+            filename=f"{title}.pdf", display_name="议程", file_path=f"/tmp/{title}.pdf", meeting_id=meeting.id
+        )
+        session.add_all([vote, lottery, attachment])
+        session.flush()
+        option = VoteOption(vote_id=vote.id, content="同意")
+        session.add_all([option, AttachmentPage(attachment_id=attachment.id, page_number=1, text="议程正文")])
+        session.flush()
+
+        for user in users:
+            session.add_all([
+                UserVote(vote_id=vote.id, user_id=user.id, option_id=option.id),
+                CheckIn(user_id=user.id, meeting_id=meeting.id),
+                MeetingAttendeeLink(meeting_id=meeting.id, user_id=user.id),
+                LotteryParticipant(meeting_id=meeting.id, user_id=user.id, user_name=user.name),
+                ReadingProgress(
+                    user_id=user.id,
+                    file_url=f"http://10.0.0.2:8000/static/{title}.pdf",
+                    file_name="议程",
+                    current_page=1,
+                    total_pages=3,
+                ),
+            ])
+        session.add_all([
+            LotteryWinner(lottery_id=lottery.id, user_id=users[0].id, user_name=users[0].name),
+            LotterySession(meeting_id=meeting.id, current_round_id=lottery.id),
+            MeetingSyncState(meeting_id=meeting.id, file_id=attachment.id, page_number=1, timestamp=0),
+        ])
+        session.commit()
+        return meeting.id
+
+    def _count(self, session: Session, model) -> int:
+        return session.exec(select(func.count()).select_from(model)).one()
+
+    def test_cascade_removes_dependents_with_fixed_statement_count(self):
+        with Session(self.engine) as session:
+            doomed_id = self._seed_meeting(session, "doomed", user_count=30)
+            self._seed_meeting(session, "kept", user_count=2)
+
+        with Session(self.engine) as session, assert_query_budget(self.engine, 18):
+            result = delete_meeting_cascade(session, doomed_id)
+            session.commit()
+
+        self.assertEqual(["/tmp/doomed.pdf"], result.file_paths)
+        self.assertEqual(1, len(result.attachment_ids))
+        with Session(self.engine) as session:
+            self.assertIsNone(session.get(Meeting, doomed_id))
+            for model, expected in (
+                (Vote, 1), (VoteOption, 1), (UserVote, 2), (Lottery, 1), (LotteryWinner, 1),
+                (LotteryParticipant, 2), (LotterySession, 1), (CheckIn, 2), (MeetingSyncState, 1),
+                (MeetingAttendeeLink, 2), (Attachment, 1), (AttachmentPage, 1),
+            ):
+                self.assertEqual(expected, self._count(session, model), model.__name__)
+            # 阅读进度只写墓碑，晚到的旧进度不会重新插入
+            progress = session.exec(select(ReadingProgress.file_url, ReadingProgress.deleted_at)).all()
+            self.assertEqual(
+                {("http://10.0.0.2:8000/static/doomed.pdf", True): 30, ("http://10.0.0.2:8000/static/kept.pdf", False): 2},
+                Counter((file_url, deleted_at is not None) for file_url, deleted_at in progress),
+            )
+
+    def test_missing_meeting_returns_none(self):
+        with Session(self.engine) as session:
+            self.assertIsNone(delete_meeting_cascade(session, 404))
+
+
+class BackgroundJobRunnerTestCase(unittest.TestCase):
+    def test_duplicate_key_is_ignored_while_pending(self):
+        runner = BackgroundJobRunner(max_workers=1)
+        release = threading.Event()
+        calls = []
+
+        def job(name):
+            release.wait(5)
+            calls.append(name)
+
+        self.assertTrue(runner.submit("cleanup", job, "first"))
+        self.assertFalse(runner.submit("cleanup", job, "second"))
+        release.set()
+        runner.wait_idle(5)
+        runner.shutdown()
+
+        self.assertEqual(["first"], calls)
+
+    def test_full_queue_runs_inline(self):
+        runner = BackgroundJobRunner(max_workers=1, max_pending=1)
+        release = threading.Event()
+        calls = []
+
+        runner.submit("slow", release.wait, 5)
+        runner.submit("inline", calls.append, threading.current_thread().name)
+        release.set()
+        runner.shutdown()
+
+        self.assertEqual([threading.current_thread().name], calls)
+
+    def test_remove_files_later_deletes_after_submit(self):
+        from services import background_jobs as background_jobs_module
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "a.pdf"
+            path.write_bytes(b"%PDF")
+            background_jobs_module.remove_files_later([str(path), None, str(Path(directory) / "missing.pdf")])
+            background_jobs_module.background_jobs.wait_idle(5)
+
+            self.assertFalse(path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from routes import meetings as meeting_routes  # noqa: E402
+from services import image_derivatives  # noqa: E402
+
+
+class MeetingCoverDerivativesTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        (self.root / "meeting_covers").mkdir()
+        self.cover = self.root / "meeting_covers" / "cover.jpg"
+        self.cover.write_bytes(b"jpg")
+        for patcher in (
+            mock.patch.object(meeting_routes, "UPLOAD_DIR", self.root),
+            mock.patch.object(image_derivatives, "UPLOAD_ROOT", self.root),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+
+    def test_unused_cover_is_removed_with_its_derivatives(self):
+        derivative = self.root / "thumbnails" / "responsive" / "meeting_covers" / "cover_jpg_320w.webp"
+        with mock.patch.object(image_derivatives, "derivative_files", return_value=[derivative]), \
+                mock.patch.object(meeting_routes, "remove_files_later") as remove_files_later, \
+                Session(self.engine) as session:
+            meeting_routes._delete_meeting_cover_if_unused(session, "/static/meeting_covers/cover.jpg")
+
+        remove_files_later.assert_called_once_with([str(self.cover.resolve()), str(derivative)])
+
+    def test_srcset_bumps_shared_version_when_derivatives_are_ready(self):
+        with mock.patch.object(image_derivatives, "ready_derivatives", return_value=[]) as ready:
+            self.assertEqual([], meeting_routes.build_image_srcset("/static/meeting_covers/cover.jpg", "http://t/"))
+
+        ready.assert_called_once_with(self.cover.resolve(), meeting_routes.bump_shared)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from models import Attachment, Meeting  # noqa: E402
+from routes import meetings as meeting_routes  # noqa: E402
+from services import attachment_preprocess, meeting_search  # noqa: E402
+from utils.text_search import fulltext_tokens  # noqa: E402
+
+
+class FulltextTokenTestCase(unittest.TestCase):
+    def test_tokens_and_postgres_literals(self):
+        self.assertEqual(["预算", "算b", "bu", "u"], fulltext_tokens("预算，ＢＵ"))
+        self.assertEqual(["年度", "预算"], meeting_search.parse_query("年度 预算 年度"))
+        self.assertEqual(
+            "'党委':1A '委会':2A '会':3A '年度':7C '度预':8C '预算':9C '算':10C",
+            meeting_search.meeting_tsvector("党委会", None, "", '[{"content": "年度预算"}]'),
+        )
+        self.assertEqual("'年度' <-> '度预' <-> '预算'", meeting_search.term_tsquery("年度预算"))
+        self.assertEqual("'会':*", meeting_search.term_tsquery("会"))
+
+
+class MeetingSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(self.engine)
+        meeting_search._index.invalidate()
+        self.addCleanup(meeting_search._index.invalidate)
+        patcher = mock.patch.object(attachment_preprocess, "engine", self.engine)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with Session(self.engine) as session:
+            meetings = [
+                Meeting(title="年度预算审议会", start_time=datetime(2026, 3, 1, 9)),
+                Meeting(title="党委会", agenda='[{"content": "审议 年度预算 调整"}]', start_time=datetime(2026, 3, 2, 9)),
+                Meeting(title="周例会", location="三楼会议室", start_time=datetime(2026, 3, 3, 9)),
+            ]
+            session.add_all(meetings)
+            session.flush()
+            attachment = Attachment(filename="report.pdf", display_name="财务报告", file_path="/tmp/report.pdf",
+                                    content_type="application/pdf", meeting_id=meetings[2].id)
+            session.add(attachment)
+            session.commit()
+            self.ids = [meeting.id for meeting in meetings]
+            self.attachment_id = attachment.id
+
+    def _save_pages(self, texts):
+        with Session(self.engine) as session:
+            attachment = session.get(Attachment, self.attachment_id)
+            analysis = attachment_preprocess.PdfAnalysis(page_count=len(texts), texts=texts)
+            attachment_preprocess._save_result(session, attachment, analysis, attachment_preprocess.STATUS_READY)
+
+    def _search(self, q):
+        with Session(self.engine) as session:
+            return [meeting_id for meeting_id, _ in meeting_search.search_meeting_ids(session, meeting_search.parse_query(q))]
+
+    def test_ranking_prefers_title_over_agenda_over_attachment_text(self):
+        self.assertEqual([self.ids[0], self.ids[1]], self._search("年度预算"))
+
+        # 索引已建立后，附件页文本与会议修改都增量生效
+        self._save_pages(["第一页 目录", "2026 年度\n预算执行情况"])
+        self.assertEqual(self.ids, self._search("年度预算"))
+        with Session(self.engine) as session:
+            meeting = session.get(Meeting, self.ids[0])
+            meeting.title = "年终总结会"
+            session.add(meeting)
+            session.commit()
+        self.assertEqual([self.ids[1], self.ids[2]], self._search("年度预算"))
+
+        meeting_search.remove_meeting(self.ids[1])
+        self.assertEqual([self.ids[2]], self._search("年度预算"))
+
+    def test_terms_must_all_match_within_a_meeting(self):
+        self._save_pages(["预算执行情况"])
+
+        self.assertEqual([self.ids[2]], self._search("三楼 预算执行"))
+        self.assertEqual([], self._search("三楼 党委"))
+        self.assertEqual([self.ids[2]], self._search("楼"))
+
+    def test_search_route_returns_snippets_and_page_hits(self):
+        self._save_pages(["目录", "第二部分：2026 年度预算执行情况说明"])
+
+        with Session(self.engine) as session:
+            response = meeting_routes.search_meetings(q="年度 预算", skip=1, limit=5, force_show_all=True, session=session)
+
+        self.assertEqual(3, response.total)
+        self.assertEqual([self.ids[1], self.ids[2]], [item.id for item in response.items])
+        agenda_hit, attachment_hit = response.items
+        self.assertEqual(["agenda"], agenda_hit.matched_fields)
+        self.assertEqual("审议 年度预算 调整", agenda_hit.snippet)
+        self.assertEqual(["attachment"], attachment_hit.matched_fields)
+        page_hit = attachment_hit.attachment_hits[0]
+        self.assertEqual(("财务报告", 2, None), (page_hit.display_name, page_hit.page_number, page_hit.preview_url))
+        self.assertEqual("第二部分：2026 年度预算执行情况说明", page_hit.snippet)
+
+
+if __name__ == "__main__":
+    unittest.main()
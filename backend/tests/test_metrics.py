@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import time
+import unittest
+from pathlib import Path
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import metrics  # noqa: E402
+
+
+@unittest.skipUnless(metrics.METRICS_ENABLED, "prometheus_client not installed")
+class MetricsMiddlewareTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+        metrics.instrument_engine(self.engine)
+
+        def get_session():
+            with Session(self.engine) as session:
+                yield session
+
+        app = FastAPI()
+        app.add_middleware(metrics.MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        def read_item(item_id: int, session: Session = Depends(get_session)):
+            for _ in range(3):
+                session.exec(text("SELECT 1"))
+            return {"id": item_id}
+
+        self.client = TestClient(app)
+
+    def _sample(self, name, labels):
+        return metrics.REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_route_template_latency_and_query_count(self):
+        labels = {"method": "GET", "route": "/items/{item_id}"}
+        before_count = self._sample("http_request_db_queries_count", labels)
+        before_sum = self._sample("http_request_db_queries_sum", labels)
+
+        self.client.get("/items/1")
+        self.client.get("/items/2")
+
+        self.assertEqual(2, self._sample("http_request_db_queries_count", labels) - before_count)
+        self.assertEqual(6, self._sample("http_request_db_queries_sum", labels) - before_sum)
+        self.assertGreater(self._sample("http_request_duration_seconds_count", {**labels, "status": "200"}), 0)
+        self.assertGreater(self._sample("db_pool_checkout_wait_seconds_count", {}), 0)
+
+    def test_render_metrics_exposes_socket_emits(self):
+        metrics.record_socket_emit("vote_update", "meeting_1")
+        body, _ = metrics.render_metrics()
+        self.assertIn(b'socketio_emits_total{event="vote_update",room="meeting_1"}', body)
+
+    def test_event_loop_lag_monitor_records_blocking_call(self):
+        before_sum = self._sample("event_loop_lag_seconds_sum", {})
+
+        async def scenario():
+            monitor = asyncio.create_task(metrics.run_event_loop_lag_monitor(0.01))
+            await asyncio.sleep(0.02)
+            time.sleep(0.2)  # 模拟在协程里直接执行的同步数据库调用
+            await asyncio.sleep(0.05)
+            monitor.cancel()
+
+        asyncio.run(scenario())
+
+        self.assertGreater(self._sample("event_loop_lag_seconds_sum", {}) - before_sum, 0.15)
+
+
+if __name__ == "__main__":
+    unittest.main()
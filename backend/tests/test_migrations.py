@@ -0,0 +1,113 @@
+import sys
+import unittest
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, create_engine
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from migrations import MIGRATIONS, Migration, get_applied_versions, run_migrations  # noqa: E402
+from query_budget import assert_query_budget  # noqa: E402
+from schema_advisor import SchemaAdvisor  # noqa: E402
+
+
+def _memory_engine():
+    return create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+
+class MigrationTestCase(unittest.TestCase):
+    def test_fresh_database_gets_hot_indexes_and_second_run_is_noop(self):
+        engine = _memory_engine()
+
+        executed = run_migrations(engine, metadata=SQLModel.metadata)
+
+        self.assertEqual([migration.version for migration in MIGRATIONS], executed)
+        self.assertEqual(set(executed), get_applied_versions(engine))
+        index_columns = {item["name"]: item["column_names"] for item in inspect(engine).get_indexes("devicecommand")}
+        self.assertEqual(["device_id", "status", "created_at"], index_columns["ix_devicecommand_device_status"])
+        self.assertIn("ix_vote_meeting_created", {item["name"] for item in inspect(engine).get_indexes("vote")})
+        # 稳态启动只查询一次版本号
+        with assert_query_budget(engine, 1):
+            self.assertEqual([], run_migrations(engine, metadata=SQLModel.metadata))
+
+    def test_legacy_table_gets_missing_columns(self):
+        engine = _memory_engine()
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE device (id INTEGER PRIMARY KEY, device_id VARCHAR)"))
+
+        run_migrations(engine)
+
+        self.assertIn("app_version_code", {column["name"] for column in inspect(engine).get_columns("device")})
+
+    def test_lottery_rounds_are_renumbered_per_meeting(self):
+        engine = _memory_engine()
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE lottery (id INTEGER PRIMARY KEY, meeting_id INTEGER, status VARCHAR, "
+                "sort_order INTEGER, created_at TIMESTAMP)"
+            ))
+            connection.execute(text(
+                "INSERT INTO lottery (id, meeting_id, status, sort_order, created_at) VALUES "
+                "(1, 1, 'pending', 0, '2026-01-01'), (2, 1, 'draft', 5, '2026-01-02'), "
+                "(3, 2, 'draft', NULL, '2026-01-01'), (4, 1, 'draft', 2, '2026-01-03')"
+            ))
+
+        run_migrations(engine)
+
+        with engine.connect() as connection:
+            rows = connection.execute(text("SELECT id, sort_order, status FROM lottery ORDER BY id")).fetchall()
+        self.assertEqual([(1, 3, "draft"), (2, 2, "draft"), (3, 1, "draft"), (4, 1, "draft")], [tuple(row) for row in rows])
+
+    def test_migration_violating_constraint_stops_instead_of_being_skipped(self):
+        engine = _memory_engine()
+
+        def duplicate_rows(connection):
+            connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY)"))
+            connection.execute(text("INSERT INTO item (id) VALUES (1), (1)"))
+
+        migrations = (
+            Migration(1, "broken", duplicate_rows),
+            Migration(2, "later", lambda connection: None),
+        )
+
+        self.assertEqual([], run_migrations(engine, migrations))
+        self.assertEqual(set(), get_applied_versions(engine))
+
+
+class SchemaAdvisorTestCase(unittest.TestCase):
+    def test_frequent_query_without_index_is_flagged(self):
+        engine = _memory_engine()
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY, owner_id INTEGER, code INTEGER)"))
+            connection.execute(text("CREATE INDEX ix_item_code ON item (code)"))
+        advisor = SchemaAdvisor(slow_ms=1000, min_calls=3)
+        advisor.instrument(engine)
+
+        with engine.connect() as connection:
+            for value in range(3):
+                connection.execute(text("SELECT id FROM item WHERE owner_id = :value"), {"value": value})
+                connection.execute(text("SELECT id FROM item WHERE code = :value"), {"value": value})
+
+        report = {entry["fingerprint"]: entry for entry in advisor.report(engine)}
+
+        self.assertEqual(["item"], report["SELECT id FROM item WHERE owner_id = ?"]["full_scans"])
+        self.assertEqual(3, report["SELECT id FROM item WHERE owner_id = ?"]["calls"])
+        self.assertEqual([], report["SELECT id FROM item WHERE code = ?"]["full_scans"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from services.presence import PresenceRegistry  # noqa: E402
+
+
+class PresenceRegistryTestCase(unittest.TestCase):
+    def test_counts_follow_join_leave_and_disconnect(self):
+        async def scenario():
+            registry = PresenceRegistry()
+            await registry.connect("sid-1")
+            await registry.join("sid-1", 7, user_id=3)
+            await registry.join("sid-1", 8)
+            await registry.join("sid-2", 7)
+            await registry.join("sid-2", 7)
+
+            counts = await registry.meeting_counts([7, 8, 9])
+            user_id = await registry.get_user_id("sid-1")
+
+            await registry.leave("sid-2", 7)
+            await registry.disconnect("sid-1")
+            await registry.disconnect("sid-unknown")
+            return counts, user_id, await registry.meeting_counts([7, 8]), registry
+
+        counts, user_id, after, registry = asyncio.run(scenario())
+
+        self.assertEqual({7: 2, 8: 1, 9: 0}, counts)
+        self.assertEqual(3, user_id)
+        self.assertEqual({7: 0, 8: 0}, after)
+        self.assertEqual(1, registry.local_connection_count())
+        self.assertEqual({}, registry._meetings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import sys
+import unittest
+from pathlib import Path
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import query_budget  # noqa: E402
+
+
+class QueryBudgetTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+        query_budget.instrument_engine(self.engine)
+
+    def _client(self, strict: bool) -> TestClient:
+        def get_session():
+            with Session(self.engine) as session:
+                yield session
+
+        app = FastAPI()
+        app.add_middleware(query_budget.QueryBudgetMiddleware, strict=strict)
+
+        @app.get("/items")
+        @query_budget.query_budget(2)
+        def read_items(session: Session = Depends(get_session)):
+            for item_id in range(4):
+                session.exec(text(f"SELECT {item_id}"))
+            return {"ok": True}
+
+        return TestClient(app)
+
+    def test_fingerprint_ignores_literals_and_in_list_length(self):
+        self.assertEqual(
+            query_budget.fingerprint("SELECT * FROM vote WHERE id IN (?, ?, ?) AND title = 'a'"),
+            query_budget.fingerprint("SELECT *  FROM vote WHERE id IN (?) AND title = 'b''c'"),
+        )
+
+    def test_header_reports_query_count_and_strict_mode_fails_over_budget(self):
+        response = self._client(strict=False).get("/items")
+        self.assertEqual("4", response.headers["x-query-count"])
+
+        with self.assertRaises(query_budget.QueryBudgetExceeded):
+            self._client(strict=True).get("/items")
+
+    def test_assert_query_budget_collects_n_plus_one_suspects(self):
+        with Session(self.engine) as session:
+            with self.assertRaises(query_budget.QueryBudgetExceeded) as ctx:
+                with query_budget.assert_query_budget(self.engine, 2) as tracker:
+                    for item_id in range(3):
+                        session.exec(text(f"SELECT {item_id}"))
+
+        self.assertEqual([("SELECT ?", 3)], tracker.n_plus_one_suspects())
+        self.assertIn("x3: SELECT ?", str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from fastapi import HTTPException  # noqa: E402
+
+from models import ReadingProgress, User  # noqa: E402
+from routes import reading_progress as reading_progress_routes  # noqa: E402
+from services import reading_progress_service  # noqa: E402
+
+
+class ReadingProgressServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            user = User(name="张三")
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+            self.user_id = user.id
+
+    def tearDown(self):
+        reading_progress_service._progress_buffer.discard((self.user_id, "/a.pdf"))
+
+    def _entry(self, file_url, page):
+        return reading_progress_service.build_progress_entry(self.user_id, file_url, "文件", page, 100)
+
+    def _rows(self):
+        with Session(self.engine) as session:
+            return [(row.file_url, row.current_page) for row in session.exec(select(ReadingProgress)).all()]
+
+    def test_page_turns_are_coalesced_into_one_row(self):
+        for page in range(10):
+            reading_progress_service.queue_progress(self._entry("/a.pdf", page))
+
+        with Session(self.engine) as session:
+            pending = reading_progress_service.pending_progress_for_user(session, self.user_id)
+        self.assertEqual(9, pending[0]["current_page"])
+        with mock.patch.object(reading_progress_service, "engine", self.engine):
+            flushed = reading_progress_service._progress_buffer.flush()
+
+        self.assertEqual(1, flushed)
+        self.assertEqual([("/a.pdf", 9)], self._rows())
+
+    def test_batch_upserts_existing_rows_and_drops_stale_pending_entry(self):
+        with Session(self.engine) as session:
+            reading_progress_service.save_progress_batch(session, [self._entry("/a.pdf", 1), self._entry("/b.pdf", 2)])
+            reading_progress_service.queue_progress(self._entry("/a.pdf", 3))
+            saved = reading_progress_service.save_progress_batch(
+                session, [self._entry("/a.pdf", 5), self._entry("/a.pdf", 6)]
+            )
+            self.assertEqual([], reading_progress_service.pending_progress_for_user(session, self.user_id))
+
+        self.assertEqual(1, saved)
+        self.assertEqual([("/a.pdf", 6), ("/b.pdf", 2)], sorted(self._rows()))
+
+    def test_older_entries_from_other_workers_do_not_override_batch_or_delete(self):
+        # 模拟另一个 worker 缓冲区里较早的进度，在本进程批量写入 / 删除之后才落库
+        stale = self._entry("/a.pdf", 3)
+        with Session(self.engine) as session:
+            reading_progress_service.save_progress_batch(session, [self._entry("/a.pdf", 8)])
+            reading_progress_service.upsert_progress_entries(session, [stale])
+            session.commit()
+            self.assertEqual([("/a.pdf", 8)], self._rows())
+
+            self.assertTrue(reading_progress_service.delete_progress(session, self.user_id, "/a.pdf"))
+            reading_progress_service.upsert_progress_entries(session, [stale])
+            session.commit()
+            self.assertFalse(reading_progress_service.delete_progress(session, self.user_id, "/a.pdf"))
+            self.assertEqual([], reading_progress_routes.get_progress(self.user_id, session))
+
+            # 本进程缓冲区里的旧条目也被墓碑挡住，不会出现在查询结果中
+            reading_progress_service.queue_progress(stale)
+            self.assertEqual([], reading_progress_service.pending_progress_for_user(session, self.user_id))
+
+            # 删除之后重新阅读，新进度正常恢复
+            reading_progress_service.upsert_progress_entries(session, [self._entry("/a.pdf", 1)])
+            session.commit()
+            self.assertEqual([("/a.pdf", 1)], [(row.file_url, row.current_page)
+                                                for row in reading_progress_routes.get_progress(self.user_id, session)])
+
+
+    def test_unknown_user_is_rejected_before_queueing(self):
+        request = reading_progress_routes.ReadingProgressRequest(
+            user_id=self.user_id + 100, file_url="/a.pdf", file_name="文件", current_page=1, total_pages=10
+        )
+        with Session(self.engine) as session:
+            with self.assertRaises(HTTPException) as raised:
+                reading_progress_routes.save_progress(request, session)
+            self.assertEqual(404, raised.exception.status_code)
+            self.assertEqual(set(), reading_progress_service.unknown_user_ids(session, [self.user_id]))
+
+        self.assertEqual({}, reading_progress_service._progress_buffer.snapshot())
+
+    def test_oversized_batch_is_rejected_before_writing(self):
+        items = [
+            reading_progress_routes.ReadingProgressRequest(
+                user_id=self.user_id, file_url=f"/{index}.pdf", file_name="文件", current_page=1, total_pages=10
+            )
+            for index in range(3)
+        ]
+        with mock.patch.object(reading_progress_routes, "READING_PROGRESS_BATCH_MAX_ITEMS", 2), \
+                Session(self.engine) as session:
+            with self.assertRaises(HTTPException) as raised:
+                reading_progress_routes.save_progress_batch(
+                    reading_progress_routes.ReadingProgressBatchRequest(items=items), session
+                )
+            self.assertEqual(400, raised.exception.status_code)
+
+            saved = reading_progress_routes.save_progress_batch(
+                reading_progress_routes.ReadingProgressBatchRequest(items=items[:2]), session
+            )
+            self.assertEqual(2, saved.saved)
+
+        self.assertEqual([("/0.pdf", 1), ("/1.pdf", 1)], sorted(self._rows()))
+
+
+if __name__ == "__main__":
+    unittest.main()
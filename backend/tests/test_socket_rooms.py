@@ -0,0 +1,110 @@
+import asyncio
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import socketio
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+import socket_manager  # noqa: E402
+
+
+class SocketRoomTargetingTestCase(unittest.TestCase):
+    def _recipients(self, scenario):
+        """连接若干客户端后执行推送，返回每次 emit 实际命中的 sid 集合。"""
+        sio = socket_manager.sio
+        manager = socketio.AsyncManager()
+        manager.set_server(sio)
+        names = {}
+        delivered = []
+
+        async def fake_emit(event, data, room=None, **kwargs):
+            rooms = [room] if isinstance(room, str) else room
+            if rooms is None:
+                delivered.append((event, data, {"*"}))
+                return
+            sids = set()
+            for name in rooms:
+                sids.update(names[sid] for sid, _ in manager.get_participants("/", name))
+            delivered.append((event, data, sids))
+
+        async def run():
+            sid = {}
+            for name in ("legacy", "attendee", "viewer", "admin", "pretender", "other", "media"):
+                sid[name] = await manager.connect(name, "/")
+                names[sid[name]] = name
+            await socket_manager.connect(sid["legacy"], {})
+            await socket_manager.connect(sid["attendee"], {}, {"user_id": 5})
+            await socket_manager.connect(sid["viewer"], {"QUERY_STRING": "user_id=6"})
+            await socket_manager.join_meeting(sid["viewer"], {"meeting_id": 1})
+            await socket_manager.connect(sid["admin"], {})
+            await socket_manager.identify(sid["admin"], {"role": "admin", "admin_token": "secret"})
+            # 自称管理端但令牌不对：只按 user_id 加入自己的房间
+            await socket_manager.connect(sid["pretender"], {}, {"user_id": 9, "role": "admin", "admin_token": "guess"})
+            await socket_manager.connect(sid["other"], {}, {"user_id": 7})
+            await socket_manager.connect(sid["media"], {}, {"user_id": 8})
+            await socket_manager.join_media(sid["media"])
+            await scenario()
+
+        with mock.patch.object(sio, "manager", manager), mock.patch.object(sio, "emit", fake_emit), \
+                mock.patch.object(socket_manager, "SOCKET_ADMIN_TOKEN", "secret"):
+            asyncio.run(run())
+        return delivered
+
+    def test_meeting_details_reach_room_attendees_admin_and_legacy_only(self):
+        async def scenario():
+            await socket_manager.broadcast_meeting_changed(
+                "attachment_uploaded", {"meeting_id": 1}, attendee_user_ids=[5, 5]
+            )
+            await socket_manager.broadcast_meeting_changed("settings_updated", {"setting_key": "x"})
+
+        targeted, global_event = self._recipients(scenario)
+
+        self.assertEqual({"legacy", "attendee", "viewer", "admin"}, targeted[2])
+        self.assertEqual({"action": "attachment_uploaded", "meeting_id": 1}, targeted[1])
+        self.assertEqual({"*"}, global_event[2])
+
+    def test_list_changes_reach_identified_non_attendees(self):
+        # 会议列表对每台平板都返回全部会议：不是参会人的平板也要收到新建 / 修改 / 删除
+        async def scenario():
+            for action in ("created", "updated", "deleted"):
+                await socket_manager.broadcast_meeting_changed(action, {"meeting_id": 1}, attendee_user_ids=[5])
+
+        for _, _, sids in self._recipients(scenario):
+            self.assertEqual({"legacy", "attendee", "viewer", "admin", "pretender", "other", "media"}, sids)
+
+    def test_media_changed_skips_identified_clients_outside_media_room(self):
+        async def scenario():
+            await socket_manager.broadcast_media_changed("moved", {"item_id": 3})
+
+        (_, _, sids), = self._recipients(scenario)
+
+        self.assertEqual({"legacy", "admin", "media"}, sids)
+
+    def test_schedule_broadcast_without_event_loop_is_skipped(self):
+        calls = []
+
+        async def broadcast():
+            calls.append(True)
+
+        socket_manager.schedule_broadcast(broadcast)
+
+        self.assertEqual([], calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import sys
+import unittest
+from pathlib import Path
+
+from sqlmodel import SQLModel, Session, create_engine, select
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+import database as database_module  # noqa: E402
+import models as models_module  # noqa: E402
+
+sys.modules.setdefault("backend.database", database_module)
+sys.modules.setdefault("backend.models", models_module)
+
+from models import User  # noqa: E402
+from services import user_search  # noqa: E402
+from utils.text_search import pinyin_initials  # noqa: E402
+
+
+class UserSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://", connect_args={"check_same_thread": False})
+        SQLModel.metadata.create_all(self.engine)
+        user_search._user_index.invalidate()
+        with Session(self.engine) as session:
+            session.add(User(name="张伟", phone="13800000001"))
+            session.add(User(name="王张伟", phone="13800000002"))
+            session.add(User(name="李娜", phone="13900000003"))
+            session.commit()
+
+    def _search(self, session, q):
+        search_filter, order = user_search.build_user_search_clauses(session, q)
+        return [user.name for user in session.exec(select(User).where(search_filter).order_by(*order, User.id)).all()]
+
+    def test_pinyin_initials(self):
+        self.assertEqual("zw", pinyin_initials("张伟"))
+        self.assertEqual("ln", pinyin_initials(" 李 娜 "))
+
+    def test_search_ranks_exact_and_prefix_matches_first(self):
+        with Session(self.engine) as session:
+            self.assertEqual(["张伟", "王张伟"], self._search(session, "张伟"))
+            self.assertEqual(["张伟", "王张伟"], self._search(session, "zw"))
+            self.assertEqual(["李娜"], self._search(session, "139"))
+
+    def test_index_follows_user_changes(self):
+        with Session(self.engine) as session:
+            self.assertEqual([], self._search(session, "赵"))
+            user = session.exec(select(User).where(User.name == "李娜")).one()
+            user.name = "赵敏"
+            session.add(user)
+            session.commit()
+
+            self.assertEqual(["赵敏"], self._search(session, "赵"))
+            self.assertEqual(["赵敏"], self._search(session, "zm"))
+            self.assertEqual([], self._search(session, "李娜"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from services import video_transcode  # noqa: E402
+from services.background_jobs import BackgroundJobRunner  # noqa: E402
+
+
+def _fake_ffmpeg(returncode=0):
+    """把命令行最后一个参数（输出文件）写出来，模拟 ffmpeg。"""
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        if returncode == 0:
+            Path(cmd[-1]).write_bytes(b"ftyp")
+        return subprocess.CompletedProcess(cmd, returncode, b"", b"error")
+
+    return run, calls
+
+
+class VideoTranscodeTestCase(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        self.source = self.root / "clip.mov"
+        self.source.write_bytes(b"\x00" * 16)
+        for patcher in (
+            mock.patch.object(video_transcode, "MEDIA_VIDEO_DIR", self.root / "videos"),
+            mock.patch.object(video_transcode, "ffmpeg_path", return_value="/usr/bin/ffmpeg"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_mp4_command_caps_bitrate_and_moves_moov_to_front(self):
+        cmd = video_transcode.build_mp4_command("ffmpeg", self.source, Path("out.mp4"))
+
+        self.assertIn("libx264", cmd)
+        self.assertEqual("+faststart", cmd[cmd.index("-movflags") + 1])
+        self.assertEqual(f"{video_transcode.VIDEO_MAX_BITRATE_KBPS}k", cmd[cmd.index("-maxrate") + 1])
+
+    def test_transcode_publishes_mp4_atomically(self):
+        run, calls = _fake_ffmpeg()
+        self.assertEqual(("", ""), video_transcode.optimized_urls("clip.mov"))
+
+        with mock.patch.object(video_transcode.subprocess, "run", run):
+            self.assertTrue(video_transcode.transcode_video(self.source))
+            self.assertTrue(video_transcode.transcode_video(self.source))
+
+        self.assertEqual(1, len(calls))
+        self.assertEqual("/static/videos/media/clip_h264.mp4", video_transcode.optimized_urls("clip.mov")[0])
+        self.assertEqual(["clip_h264.mp4"], sorted(path.name for path in (self.root / "videos").iterdir()))
+        self.assertFalse(video_transcode.needs_transcode("clip.mov"))
+
+        video_transcode.remove_derivatives(["clip.mov", None])
+        self.assertEqual([], list((self.root / "videos").iterdir()))
+
+    def test_failed_transcode_is_not_retried(self):
+        run, _ = _fake_ffmpeg(returncode=1)
+        with mock.patch.object(video_transcode.subprocess, "run", run):
+            self.assertFalse(video_transcode.transcode_video(self.source))
+
+        self.assertEqual("", video_transcode.optimized_urls("clip.mov")[0])
+        self.assertFalse(video_transcode.needs_transcode("clip.mov"))
+
+    def test_video_claimed_by_another_worker_is_skipped(self):
+        run, calls = _fake_ffmpeg()
+        lock = self.root / "videos" / "clip_h264.lock"
+        lock.parent.mkdir(parents=True)
+        lock.write_text("12345")
+
+        with mock.patch.object(video_transcode.subprocess, "run", run):
+            self.assertFalse(video_transcode.transcode_video(self.source))
+            self.assertEqual([], calls)
+            self.assertTrue(video_transcode.needs_transcode("clip.mov"))
+
+            # 持锁进程中途退出：锁过期后被接管，临时文件名带进程号
+            with mock.patch.object(video_transcode, "VIDEO_TRANSCODE_TIMEOUT", -1):
+                self.assertTrue(video_transcode.transcode_video(self.source))
+
+        self.assertIn(f"clip_h264.{video_transcode.os.getpid()}.", calls[0][-1])
+        self.assertEqual(["clip_h264.mp4"], sorted(path.name for path in (self.root / "videos").iterdir()))
+
+
+class DropWhenFullRunnerTestCase(unittest.TestCase):
+    def test_full_queue_drops_instead_of_running_inline(self):
+        runner = BackgroundJobRunner(max_workers=1, max_pending=1, inline_when_full=False)
+        release = threading.Event()
+        calls = []
+
+        self.assertTrue(runner.submit("slow", release.wait, 5))
+        self.assertFalse(runner.submit("next", calls.append, "ran"))
+        release.set()
+        runner.shutdown()
+
+        self.assertEqual([], calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
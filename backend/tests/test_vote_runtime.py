@@ -3,6 +3,7 @@ import unittest
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from sqlalchemy import event
 from sqlmodel import SQLModel, Session, create_engine
 
 
@@ -22,6 +23,7 @@ sys.modules.setdefault("backend.models", models_module)
 from models import Meeting, User, UserVote, Vote, VoteOption  # noqa: E402
 from routes.vote import (  # noqa: E402
     _build_public_vote_snapshot,
+    _build_vote_reads,
     _resolve_effective_vote_state,
     get_vote_history,
 )
@@ -95,6 +97,39 @@ class VoteRuntimeTestCase(unittest.TestCase):
 
         self.assertEqual([newest_vote.id, oldest_vote.id], [item.id for item in history])
 
+    def test_batched_vote_reads_use_constant_query_count(self):
+        with Session(self.engine) as session:
+            meeting = self._create_meeting(session)
+            user = User(name="王五")
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+
+            votes = []
+            for index in range(5):
+                vote = self._create_vote(session, meeting.id, f"议题{index}", created_at=datetime(2026, 4, 2, 9, index, 0))
+                option_ids = self._create_options(session, vote.id, ["同意", "反对", "弃权"])
+                if index % 2 == 0:
+                    session.add(UserVote(vote_id=vote.id, user_id=user.id, option_id=option_ids[1]))
+                votes.append(vote)
+            session.commit()
+            user_id = user.id
+            for vote in votes:
+                session.refresh(vote)
+
+            statements = []
+            listener = lambda *args: statements.append(args[2])
+            event.listen(self.engine, "before_cursor_execute", listener)
+            try:
+                items = _build_vote_reads(votes, session, user_id=user_id)
+            finally:
+                event.remove(self.engine, "before_cursor_execute", listener)
+
+        self.assertEqual(3, len(statements))
+        self.assertEqual([True, False, True, False, True], [item.user_voted for item in items])
+        self.assertEqual([1, 0, 1, 0, 1], [item.total_voters for item in items])
+        self.assertTrue(all(len(item.options) == 3 for item in items))
+
     def _create_meeting(self, session: Session) -> Meeting:
         meeting = Meeting(
             title="专题会",
@@ -0,0 +1,79 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+
+WORKSPACE_DIR = Path(__file__).resolve().parents[2]
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(WORKSPACE_DIR) not in sys.path:
+    sys.path.insert(0, str(WORKSPACE_DIR))
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from sqlalchemy.exc import IntegrityError, OperationalError  # noqa: E402
+
+from services import write_behind  # noqa: E402
+from services.write_behind import WriteBehindBuffer  # noqa: E402
+
+
+class WriteBehindBufferTestCase(unittest.TestCase):
+    def test_failing_entry_is_isolated_and_dropped_after_max_attempts(self):
+        written = []
+
+        def flush_fn(entries):
+            if any(entry == "bad" for entry in entries):
+                raise IntegrityError("INSERT", {}, Exception("foreign key violation"))
+            written.extend(entries)
+
+        buffer = WriteBehindBuffer("test", flush_fn)
+        buffer.put(1, "bad")
+        for key in (2, 3, 4):
+            buffer.put(key, f"good-{key}")
+
+        with mock.patch.object(write_behind, "WRITE_BEHIND_MAX_ATTEMPTS", 3):
+            self.assertEqual(3, buffer.flush())
+            self.assertEqual(["good-2", "good-3", "good-4"], written)
+            self.assertEqual({1: "bad"}, buffer.snapshot())
+
+            buffer.put(5, "good-5")
+            self.assertEqual(1, buffer.flush())
+            self.assertEqual(0, buffer.flush())
+
+        # 第三次失败后丢弃，不再阻塞后续写入
+        self.assertEqual({}, buffer.snapshot())
+        buffer.put(6, "good-6")
+        self.assertEqual(1, buffer.flush())
+        self.assertEqual(["good-2", "good-3", "good-4", "good-5", "good-6"], written)
+
+    def test_database_outage_keeps_entries_and_backs_off(self):
+        written = []
+        down = [True]
+
+        def flush_fn(entries):
+            if down[0]:
+                raise OperationalError("INSERT", {}, Exception("connection refused"))
+            written.extend(entries)
+
+        buffer = WriteBehindBuffer("test", flush_fn, interval_seconds=0)
+        for key in (1, 2):
+            buffer.put(key, f"v{key}")
+
+        with mock.patch.object(write_behind, "WRITE_BEHIND_MAX_ATTEMPTS", 2), \
+                mock.patch.object(write_behind, "WRITE_BEHIND_MAX_BACKOFF_SECONDS", 60):
+            for _ in range(5):
+                self.assertEqual(0, buffer.flush())
+            # 宕机期间不丢数据、不计失败次数，下一次刷盘要等退避结束
+            self.assertEqual({1: "v1", 2: "v2"}, buffer.snapshot())
+            self.assertFalse(buffer.is_due())
+
+            buffer.put(2, "v2-new")
+            down[0] = False
+            self.assertEqual(2, buffer.flush())
+
+        self.assertEqual(["v1", "v2-new"], written)
+        self.assertTrue(buffer.is_due())
+
+
+if __name__ == "__main__":
+    unittest.main()
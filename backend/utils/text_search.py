@@ -0,0 +1,79 @@
+"""检索相关的文本工具：归一化、字符 n-gram、拼音首字母与全文检索分词。"""
+import bisect
+import unicodedata
+from typing import List, Set
+
+try:
+    from pypinyin import Style, lazy_pinyin  # type: ignore
+    PYPINYIN_AVAILABLE = True
+except Exception:
+    PYPINYIN_AVAILABLE = False
+
+
+# GB2312 一级汉字按拼音排序，按区位码分段即可得到声母首字母（未安装 pypinyin 时兜底）
+_GB2312_INITIAL_BOUNDARIES = [
+    (45217, "a"), (45253, "b"), (45761, "c"), (46318, "d"), (46826, "e"),
+    (47010, "f"), (47297, "g"), (47614, "h"), (48119, "j"), (49062, "k"),
+    (49324, "l"), (49896, "m"), (50371, "n"), (50614, "o"), (50622, "p"),
+    (50906, "q"), (51387, "r"), (51446, "s"), (52218, "t"), (52698, "w"),
+    (52980, "x"), (53689, "y"), (54481, "z"),
+]
+_GB2312_BOUNDARY_CODES = [code for code, _ in _GB2312_INITIAL_BOUNDARIES]
+_GB2312_LEVEL1_END = 55289
+
+
+def normalize_search_text(value: str | None) -> str:
+    return "".join((value or "").split()).lower()
+
+
+def char_ngrams(value: str, n: int = 2) -> Set[str]:
+    """返回字符 n-gram 集合；文本短于 n 时返回整个文本。"""
+    if not value:
+        return set()
+    if len(value) <= n:
+        return {value}
+    return {value[i:i + n] for i in range(len(value) - n + 1)}
+
+
+def _gb2312_initial(char: str) -> str:
+    if char.isascii():
+        return char.lower() if char.isalnum() else ""
+    try:
+        encoded = char.encode("gb2312")
+    except UnicodeEncodeError:
+        return ""
+    if len(encoded) != 2:
+        return ""
+    code = encoded[0] * 256 + encoded[1]
+    if code < _GB2312_BOUNDARY_CODES[0] or code > _GB2312_LEVEL1_END:
+        return ""
+    return _GB2312_INITIAL_BOUNDARIES[bisect.bisect_right(_GB2312_BOUNDARY_CODES, code) - 1][1]
+
+
+def pinyin_initials(value: str | None) -> str:
+    """中文姓名的拼音首字母，如 "张伟" -> "zw"；非中文字符原样保留（小写）。"""
+    text = normalize_search_text(value)
+    if not text:
+        return ""
+    if PYPINYIN_AVAILABLE:
+        return "".join(
+            item[0] for item in lazy_pinyin(text, style=Style.FIRST_LETTER, errors=lambda chars: list(chars)) if item
+        ).lower()
+    return "".join(_gb2312_initial(char) for char in text)
+
+
+def normalize_fulltext(value: str | None) -> str:
+    """全文检索归一化：全角转半角、小写，只保留字母数字（含汉字），标点与空白全部去掉。"""
+    text = unicodedata.normalize("NFKC", value or "").lower()
+    return "".join(char for char in text if char.isalnum())
+
+
+def fulltext_tokens(value: str | None) -> List[str]:
+    """
+    中文友好的全文检索分词：归一化后按相邻二字切分（不依赖词典，任意长度 >= 2 的子串都能由连续二字词组成），
+    末尾再补最后一个字，使单字前缀查询也能命中结尾字符。
+    """
+    text = normalize_fulltext(value)
+    if len(text) <= 1:
+        return [text] if text else []
+    return [text[i:i + 2] for i in range(len(text) - 1)] + [text[-1]]
@@ -1,15 +1,20 @@
 """
 自动检测并关闭过期投票的后台任务
+扫描与状态修正经异步会话的 run_sync 执行，不阻塞事件循环
 """
 import asyncio
+from typing import List, Tuple
 from sqlalchemy import text
 from sqlmodel import Session, select
 from models import Vote
-from database import engine
+from database import engine, open_async_session
 from socket_manager import broadcast_vote_results, broadcast_vote_state
+from logging_config import get_logger
 
 AUTO_CLOSE_LOCK_KEY = 20260409
 
+logger = get_logger("vote.auto_close")
+
 
 def _try_acquire_iteration_lock(session: Session) -> bool:
     """
@@ -27,53 +32,65 @@ def _try_acquire_iteration_lock(session: Session) -> bool:
     )
 
 
+def _apply_expired_votes(session: Session) -> List[Tuple[int, int, dict, dict]]:
+    """修正已到时的投票状态，返回待广播的 (meeting_id, vote_id, 快照, 结果)。"""
+    if not _try_acquire_iteration_lock(session):
+        return []
+
+    from routes.vote import _build_vote_broadcast, _resolve_effective_vote_state
+
+    stmt = select(Vote).where(Vote.status.in_(["countdown", "active"]))
+    runtime_votes = session.exec(stmt).all()
+
+    changed_votes: list[tuple[Vote, str]] = []
+    for vote in runtime_votes:
+        effective_status, _, effective_closed_at = _resolve_effective_vote_state(vote)
+        if effective_status == vote.status and effective_closed_at == vote.closed_at:
+            continue
+
+        previous_status = vote.status
+        vote.status = effective_status
+        vote.closed_at = effective_closed_at
+        session.add(vote)
+        changed_votes.append((vote, previous_status))
+
+    if changed_votes:
+        session.commit()
+
+    broadcasts = []
+    for vote, previous_status in changed_votes:
+        session.refresh(vote)
+        effective_status = vote.status
+
+        try:
+            snapshot, result_payload = _build_vote_broadcast(vote, session)
+            broadcasts.append((vote.meeting_id, vote.id, snapshot, result_payload))
+        except Exception as e:
+            logger.warning("Failed to build vote state change: %s", e, extra={"vote_id": vote.id})
+
+        if previous_status == "countdown" and effective_status == "active":
+            logger.info("Activated vote", extra={"vote_id": vote.id, "title": vote.title})
+        elif effective_status == "closed":
+            logger.info("Closing expired vote", extra={"vote_id": vote.id, "title": vote.title})
+    return broadcasts
+
+
 async def auto_close_expired_votes():
     """定期检查并关闭过期的投票"""
     while True:
         try:
-            with Session(engine) as session:
-                if not _try_acquire_iteration_lock(session):
-                    pass
-                else:
-                    stmt = select(Vote).where(Vote.status.in_(["countdown", "active"]))
-                    runtime_votes = session.exec(stmt).all()
-                    from routes.vote import _build_public_vote_snapshot, _build_vote_result, _resolve_effective_vote_state
-
-                    changed_votes: list[tuple[Vote, str]] = []
-                    for vote in runtime_votes:
-                        effective_status, _, effective_closed_at = _resolve_effective_vote_state(vote)
-                        if effective_status == vote.status and effective_closed_at == vote.closed_at:
-                            continue
-
-                        previous_status = vote.status
-                        vote.status = effective_status
-                        vote.closed_at = effective_closed_at
-                        session.add(vote)
-                        changed_votes.append((vote, previous_status))
-
-                    if changed_votes:
-                        session.commit()
-
-                    for vote, previous_status in changed_votes:
-                        session.refresh(vote)
-                        effective_status = vote.status
-
-                        try:
-                            result_payload = _build_vote_result(vote, session).model_dump(mode="json")
-                            snapshot = _build_public_vote_snapshot(vote, session)
-                            snapshot["results"] = result_payload["results"]
-                            await broadcast_vote_state(vote.meeting_id, snapshot)
-                            await broadcast_vote_results(vote.meeting_id, vote.id, result_payload)
-                        except Exception as e:
-                            print(f"[AUTO-CLOSE] Failed to broadcast vote state change: {e}")
-
-                        if previous_status == "countdown" and effective_status == "active":
-                            print(f"[AUTO-CLOSE] Activated vote {vote.id} ('{vote.title}')")
-                        elif effective_status == "closed":
-                            print(f"[AUTO-CLOSE] Closing expired vote {vote.id} ('{vote.title}')")
+            async with open_async_session() as session:
+                broadcasts = await session.run_sync(_apply_expired_votes)
+
+            for meeting_id, vote_id, snapshot, result_payload in broadcasts:
+                try:
+                    await broadcast_vote_state(meeting_id, snapshot)
+                    await broadcast_vote_results(meeting_id, vote_id, result_payload)
+                except Exception as e:
+                    logger.warning("Failed to broadcast vote state change: %s", e, extra={"vote_id": vote_id})
 
         except Exception as e:
-            print(f"[AUTO-CLOSE] Error in auto_close_expired_votes: {e}")
+            logger.exception("Error in auto_close_expired_votes: %s", e)
 
         # 每10秒检查一次
         await asyncio.sleep(10)
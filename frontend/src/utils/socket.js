@@ -0,0 +1,13 @@
+// Socket.IO 握手身份：服务端据此把连接放进 user_{id} / admin 房间，只推送与其相关的会议变化
+
+// 后台管理端：令牌与服务端 SOCKET_ADMIN_TOKEN 一致时才加入 admin 房间；未填写时按旧方式接收全部推送
+export const adminSocketAuth = () => {
+  const token = localStorage.getItem('socketAdminToken') || import.meta.env.VITE_SOCKET_ADMIN_TOKEN
+  return token ? { role: 'admin', admin_token: token } : {}
+}
+
+// 参会端：携带登录的用户 ID
+export const userSocketAuth = () => {
+  const userId = Number(localStorage.getItem('user_id') || 0)
+  return userId ? { user_id: userId } : {}
+}
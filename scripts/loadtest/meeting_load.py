@@ -0,0 +1,516 @@
+"""
+会场全流程压测：模拟 N 台平板同时参会
+
+每台平板依次：登录 -> 建立 Socket.IO 连接并加入 meeting_{id} 房间 -> 打开会议详情与互动概览，
+随后在后台持续心跳、轮询同屏状态；所有平板就绪后同时提交投票（突发），再加入抽签池，
+保持在线一段时间后断开。
+
+输出各操作的 p50/p95/p99 延迟、错误率以及客户端收到的 Socket.IO 推送速率，
+可保存为基线并与之后的运行对比。
+
+用法见同目录 README.md。
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+try:
+    import socketio  # type: ignore
+    SOCKETIO_AVAILABLE = True
+except Exception:
+    SOCKETIO_AVAILABLE = False
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[2] / "backend"
+LOADTEST_USER_PREFIX = "压测用户"
+LOADTEST_PHONE_BASE = 19900000000
+
+
+# ============================================================
+# 统计
+# ============================================================
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = Counter()
+        self.status_codes: Dict[str, Counter] = defaultdict(Counter)
+        self.error_samples: List[str] = []
+        self.emits: Counter = Counter()
+        self.emit_started_at: Optional[float] = None
+
+    def record(self, op: str, elapsed_ms: float, status: Optional[int], ok: bool, detail: str = "") -> None:
+        self.latencies[op].append(elapsed_ms)
+        self.status_codes[op][str(status) if status is not None else "exception"] += 1
+        if not ok:
+            self.errors[op] += 1
+            if len(self.error_samples) < 10:
+                self.error_samples.append(f"{op} {status}: {detail[:200]}")
+
+    def record_emit(self, event: str) -> None:
+        if self.emit_started_at is None:
+            self.emit_started_at = time.perf_counter()
+        self.emits[event] += 1
+
+    def summary(self, wall_seconds: float) -> dict:
+        operations = {}
+        for op, values in sorted(self.latencies.items()):
+            ordered = sorted(values)
+            total = len(ordered)
+            operations[op] = {
+                "count": total,
+                "errors": self.errors.get(op, 0),
+                "error_rate": round(self.errors.get(op, 0) / total, 4) if total else 0.0,
+                "p50_ms": round(percentile(ordered, 50), 2),
+                "p95_ms": round(percentile(ordered, 95), 2),
+                "p99_ms": round(percentile(ordered, 99), 2),
+                "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+                "status_codes": dict(self.status_codes[op]),
+            }
+        emit_total = sum(self.emits.values())
+        emit_window = time.perf_counter() - self.emit_started_at if self.emit_started_at else 0.0
+        return {
+            "wall_seconds": round(wall_seconds, 2),
+            "operations": operations,
+            "socket": {
+                "received_total": emit_total,
+                "received_per_second": round(emit_total / emit_window, 1) if emit_window > 0 else 0.0,
+                "by_event": dict(self.emits.most_common()),
+            },
+            "error_samples": self.error_samples,
+        }
+
+
+async def timed_request(
+    stats: Stats,
+    client: httpx.AsyncClient,
+    op: str,
+    method: str,
+    url: str,
+    expected_status: tuple = (200,),
+    **kwargs,
+) -> Optional[httpx.Response]:
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except Exception as e:
+        stats.record(op, (time.perf_counter() - started) * 1000, None, False, repr(e))
+        return None
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    ok = response.status_code in expected_status
+    stats.record(op, elapsed_ms, response.status_code, ok, "" if ok else response.text)
+    return response
+
+
+# ============================================================
+# 准备数据
+# ============================================================
+
+async def prepare_scenario(client: httpx.AsyncClient, tablets: int, meeting_id: Optional[int]) -> dict:
+    """创建（或复用）压测用户、会议、投票和抽签轮次。不计入统计。"""
+    users = []
+    for index in range(tablets):
+        phone = str(LOADTEST_PHONE_BASE + index)
+        response = await client.post("/auth/login", json={"query": phone})
+        if response.status_code == 200:
+            users.append({"user_id": response.json()["user_id"], "phone": phone})
+            continue
+        response = await client.post(
+            "/users/",
+            json={"name": f"{LOADTEST_USER_PREFIX}{index:04d}", "phone": phone, "department": "压测"},
+        )
+        response.raise_for_status()
+        users.append({"user_id": response.json()["id"], "phone": phone})
+
+    if meeting_id is None:
+        response = await client.post(
+            "/meetings/",
+            json={
+                "title": f"压测会议 {datetime.now():%m-%d %H:%M:%S}",
+                "start_time": datetime.now().isoformat(timespec="seconds"),
+                "status": "active",
+                "attendee_entries": [{"user_id": user["user_id"]} for user in users],
+            },
+        )
+        response.raise_for_status()
+        meeting_id = response.json()["id"]
+
+    response = await client.post(
+        "/vote/",
+        json={
+            "meeting_id": meeting_id,
+            "title": "压测表决",
+            "options": ["同意", "反对", "弃权"],
+            "duration_seconds": 600,
+            "countdown_seconds": 0,
+        },
+    )
+    response.raise_for_status()
+    vote = response.json()
+    (await client.post(f"/vote/{vote['id']}/start")).raise_for_status()
+
+    response = await client.post(f"/lottery/{meeting_id}/round", json={"title": "压测抽签", "count": 3})
+    response.raise_for_status()
+
+    return {
+        "meeting_id": meeting_id,
+        "vote_id": vote["id"],
+        "option_ids": [option["id"] for option in vote["options"]],
+        "users": users,
+    }
+
+
+# ============================================================
+# 平板模拟
+# ============================================================
+
+class Tablet:
+    def __init__(self, index: int, user: dict, scenario: dict, args, stats: Stats, client: httpx.AsyncClient):
+        self.index = index
+        self.user = user
+        self.scenario = scenario
+        self.args = args
+        self.stats = stats
+        self.client = client
+        self.device_id = f"loadtest-{index:04d}"
+        self.sio = None
+
+    async def login(self) -> None:
+        await timed_request(self.stats, self.client, "login", "POST", "/auth/login", json={"query": self.user["phone"]})
+
+    async def connect_socket(self) -> None:
+        if not self.args.socket or not SOCKETIO_AVAILABLE:
+            return
+        self.sio = socketio.AsyncClient(reconnection=False)
+
+        @self.sio.on("*")
+        async def _any_event(event, *_):
+            self.stats.record_emit(event)
+
+        started = time.perf_counter()
+        try:
+            await self.sio.connect(self.args.base_url, transports=["websocket"], wait_timeout=10)
+            await self.sio.emit(
+                "join_meeting",
+                {"meeting_id": self.scenario["meeting_id"], "user_id": self.user["user_id"]},
+            )
+            self.stats.record("socket_connect", (time.perf_counter() - started) * 1000, 101, True)
+        except Exception as e:
+            self.stats.record("socket_connect", (time.perf_counter() - started) * 1000, None, False, repr(e))
+            self.sio = None
+
+    async def open_meeting(self) -> None:
+        meeting_id = self.scenario["meeting_id"]
+        user_id = self.user["user_id"]
+        await timed_request(self.stats, self.client, "meeting_list", "GET", "/meetings/", params={"user_id": user_id})
+        await timed_request(self.stats, self.client, "meeting_detail", "GET", f"/meetings/{meeting_id}", params={"user_id": user_id})
+        await timed_request(
+            self.stats, self.client, "interaction_overview", "GET",
+            f"/interactions/meeting/{meeting_id}/overview", params={"user_id": user_id},
+        )
+
+    async def heartbeat_loop(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            await timed_request(
+                self.stats, self.client, "heartbeat", "POST", "/devices/heartbeat",
+                json={
+                    "device_id": self.device_id,
+                    "name": f"压测平板 {self.index:04d}",
+                    "user_id": self.user["user_id"],
+                    "battery_level": random.randint(20, 100),
+                    "app_version": "loadtest",
+                },
+            )
+            await _sleep_or_stop(stop, self.args.heartbeat_interval)
+
+    async def sync_poll_loop(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            await timed_request(self.stats, self.client, "sync_poll", "GET", f"/sync/{self.scenario['meeting_id']}/sync_state")
+            await _sleep_or_stop(stop, self.args.sync_interval)
+
+    async def submit_vote(self) -> None:
+        await timed_request(
+            self.stats, self.client, "vote_submit", "POST", f"/vote/{self.scenario['vote_id']}/submit",
+            json={"user_id": self.user["user_id"], "option_ids": [random.choice(self.scenario["option_ids"])]},
+        )
+
+    async def join_lottery(self) -> None:
+        await timed_request(
+            self.stats, self.client, "lottery_join", "POST",
+            f"/lottery/{self.scenario['meeting_id']}/participants/join",
+            json={"user_id": self.user["user_id"]},
+        )
+
+    async def disconnect(self) -> None:
+        if self.sio is not None:
+            await self.sio.disconnect()
+
+
+async def _sleep_or_stop(stop: asyncio.Event, seconds: float) -> None:
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+class OneShotBarrier:
+    """
+    一次性的同步点：parties 个平板都调用 wait() 后同时放行。
+    asyncio.Barrier 需要 Python 3.11，后端镜像是 python:3.10，这里用 Event + 计数实现。
+    """
+
+    def __init__(self, parties: int):
+        self._remaining = parties
+        self._released = asyncio.Event()
+        self._broken = False
+
+    async def wait(self) -> None:
+        self._remaining -= 1
+        if self._remaining <= 0:
+            self._released.set()
+        await self._released.wait()
+        if self._broken:
+            raise RuntimeError("barrier aborted")
+
+    def abort(self) -> None:
+        self._broken = True
+        self._released.set()
+
+
+async def _wait_barrier(barrier: OneShotBarrier, stop: asyncio.Event) -> bool:
+    """等待所有平板到齐；压测时间已到或有平板异常退出时放弃等待。"""
+    barrier_task = asyncio.ensure_future(barrier.wait())
+    stop_task = asyncio.ensure_future(stop.wait())
+    done, _ = await asyncio.wait({barrier_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+    stop_task.cancel()
+    if barrier_task in done and not barrier_task.cancelled() and barrier_task.exception() is None:
+        return True
+    barrier_task.cancel()
+    return False
+
+
+async def run_tablet(tablet: Tablet, ready: OneShotBarrier, voted: OneShotBarrier, stop: asyncio.Event) -> None:
+    # 错峰进入会场，模拟平板陆续开机
+    await asyncio.sleep(random.uniform(0, tablet.args.ramp_up))
+    try:
+        await tablet.login()
+        await tablet.connect_socket()
+        await tablet.open_meeting()
+    except Exception:
+        # 进场失败的平板不再参与同步投票，避免其他平板一直等待
+        ready.abort()
+        voted.abort()
+        raise
+
+    background = [
+        asyncio.create_task(tablet.heartbeat_loop(stop)),
+        asyncio.create_task(tablet.sync_poll_loop(stop)),
+    ]
+    try:
+        # 所有平板到齐后同时投票，形成突发
+        if await _wait_barrier(ready, stop):
+            await tablet.submit_vote()
+        if await _wait_barrier(voted, stop):
+            await tablet.join_lottery()
+        await stop.wait()
+    finally:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        await tablet.disconnect()
+
+
+async def presenter_loop(client: httpx.AsyncClient, stats: Stats, meeting_id: int, stop: asyncio.Event, interval: float) -> None:
+    """主讲人翻页，更新同屏状态。"""
+    page = 0
+    while not stop.is_set():
+        page += 1
+        await timed_request(
+            stats, client, "sync_update", "POST", f"/sync/{meeting_id}/sync_state",
+            params={"file_id": 1, "page_number": page, "is_syncing": True},
+        )
+        await _sleep_or_stop(stop, interval)
+
+
+async def run_load(args) -> dict:
+    stats = Stats()
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        scenario = await prepare_scenario(client, args.tablets, args.meeting_id)
+        print(
+            f"[loadtest] meeting={scenario['meeting_id']} vote={scenario['vote_id']} "
+            f"tablets={args.tablets} socket={'on' if args.socket and SOCKETIO_AVAILABLE else 'off'}"
+        )
+
+        ready = OneShotBarrier(args.tablets)
+        voted = OneShotBarrier(args.tablets)
+        stop = asyncio.Event()
+        tablets = [
+            Tablet(index, user, scenario, args, stats, client)
+            for index, user in enumerate(scenario["users"])
+        ]
+
+        started = time.perf_counter()
+        presenter = asyncio.create_task(presenter_loop(client, stats, scenario["meeting_id"], stop, args.page_interval))
+        tablet_tasks = [asyncio.create_task(run_tablet(tablet, ready, voted, stop)) for tablet in tablets]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(presenter, *tablet_tasks, return_exceptions=True)
+        wall_seconds = time.perf_counter() - started
+
+    summary = stats.summary(wall_seconds)
+    summary["config"] = {
+        "tablets": args.tablets,
+        "duration": args.duration,
+        "socket": bool(args.socket and SOCKETIO_AVAILABLE),
+        "heartbeat_interval": args.heartbeat_interval,
+        "sync_interval": args.sync_interval,
+        "base_url": args.base_url,
+        "recorded_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    return summary
+
+
+# ============================================================
+# 报告与基线
+# ============================================================
+
+def print_report(summary: dict, baseline: Optional[dict]) -> None:
+    base_ops = (baseline or {}).get("operations", {})
+    header = f"{'operation':<22}{'count':>7}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline:
+        header += f"{'p95 vs base':>14}"
+    print(header)
+    print("-" * len(header))
+    for op, item in summary["operations"].items():
+        line = (
+            f"{op:<22}{item['count']:>7}{item['error_rate'] * 100:>6.1f}%"
+            f"{item['p50_ms']:>9.1f}{item['p95_ms']:>9.1f}{item['p99_ms']:>9.1f}"
+        )
+        base = base_ops.get(op)
+        if base and base.get("p95_ms"):
+            delta = (item["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100
+            line += f"{delta:>+13.1f}%"
+        print(line)
+
+    socket_summary = summary["socket"]
+    line = f"\nsocket emits received: {socket_summary['received_total']} ({socket_summary['received_per_second']}/s)"
+    base_socket = (baseline or {}).get("socket")
+    if base_socket:
+        line += f", baseline {base_socket['received_total']} ({base_socket['received_per_second']}/s)"
+    print(line)
+    for event, count in list(socket_summary["by_event"].items())[:8]:
+        print(f"  {event:<28}{count:>8}")
+    if summary["error_samples"]:
+        print("\nerror samples:")
+        for sample in summary["error_samples"][:5]:
+            print(f"  {sample}")
+
+
+# ============================================================
+# 本地启动被测服务
+# ============================================================
+
+def spawn_backend(port: int, database_url: Optional[str], workers: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    if database_url is None:
+        database_url = f"sqlite:///{Path(tempfile.mkdtemp(prefix='loadtest-')) / 'loadtest.db'}"
+    env["DATABASE_URL"] = database_url
+    env.setdefault("LOG_LEVEL", "WARNING")
+    cmd = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("backend exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("backend did not become ready within 60s")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate N tablets attending one meeting.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--tablets", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=30, help="seconds tablets stay in the meeting")
+    parser.add_argument("--ramp-up", type=float, default=3, help="seconds over which tablets join")
+    parser.add_argument("--meeting-id", type=int, default=None, help="reuse an existing meeting")
+    parser.add_argument("--heartbeat-interval", type=float, default=10)
+    parser.add_argument("--sync-interval", type=float, default=2)
+    parser.add_argument("--page-interval", type=float, default=3, help="presenter page-turn interval")
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--no-socket", dest="socket", action="store_false", help="skip Socket.IO clients")
+    parser.add_argument("--spawn", action="store_true", help="start a local backend for the run")
+    parser.add_argument("--spawn-port", type=int, default=8765)
+    parser.add_argument("--spawn-workers", type=int, default=1)
+    parser.add_argument("--database-url", default=None, help="DATABASE_URL for --spawn (default: temp SQLite)")
+    parser.add_argument("--output-json", default=None)
+    parser.add_argument("--baseline", default=None, help="compare against a saved baseline JSON")
+    parser.add_argument("--save-baseline", default=None, help="write this run as the new baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # 客户端断开时 engineio 会打印 "packet queue is empty"，与压测结果无关
+    logging.getLogger("engineio.client").setLevel(logging.CRITICAL)
+    if args.socket and not SOCKETIO_AVAILABLE:
+        print("[loadtest] python-socketio not installed, running without Socket.IO clients")
+
+    process = None
+    if args.spawn:
+        args.base_url = f"http://127.0.0.1:{args.spawn_port}"
+        process = spawn_backend(args.spawn_port, args.database_url, args.spawn_workers)
+    try:
+        summary = asyncio.run(run_load(args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    baseline = None
+    if args.baseline and Path(args.baseline).exists():
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    print_report(summary, baseline)
+
+    for path in (args.output_json, args.save_baseline):
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    total_errors = sum(item["errors"] for item in summary["operations"].values())
+    return 1 if total_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())